@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Update de-duplication: cost per update of claiming update IDs.
+
+Runs UpdateDedup in front of a no-op dispatcher against a throwaway SQLite
+file (the production setup) and reports microseconds per update for new
+updates delivered one at a time (webhook) and in polling batches, for
+repeats answered from memory, and for repeats after a restart, which only
+the processed_updates table knows about.
+Run from the repository root:
+    python -m benchmarks.bench_dedup [--updates 2000] [--batch 100] [--json dedup.json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import database
+from dedup import UpdateDedup
+
+
+def run(dedup: UpdateDedup, update_ids, batch: int) -> float:
+    """Microseconds per update to push update_ids through a deduplicated no-op dispatcher"""
+    bot = SimpleNamespace(process_new_updates=lambda updates: None, last_update_id=0)
+    dedup.install(bot)
+    updates = [SimpleNamespace(update_id=update_id) for update_id in update_ids]
+    started = time.perf_counter()
+    for i in range(0, len(updates), batch):
+        bot.process_new_updates(updates[i:i + batch])
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100, help="updates per getUpdates response")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    database.set_backend(database.SQLiteBackend(os.path.join(workdir.name, "bench.db")))
+    database.init_database()
+
+    n = args.updates
+    baseline = SimpleNamespace(process_new_updates=lambda updates: None)
+    started = time.perf_counter()
+    for i in range(0, n, args.batch):
+        baseline.process_new_updates([SimpleNamespace(update_id=u) for u in range(i, i + args.batch)])
+    results = {"no dedup": (time.perf_counter() - started) / n * 1e6}
+
+    dedup = UpdateDedup()
+    results["new, webhook (1 per call)"] = run(dedup, range(n), 1)
+    results[f"new, polling ({args.batch} per call)"] = run(dedup, range(n, 2 * n), args.batch)
+    results["repeat, in memory"] = run(dedup, range(2 * n), args.batch)
+    results["repeat after restart"] = run(UpdateDedup(), range(2 * n), args.batch)
+
+    for name, us in results.items():
+        print(f"{name:<28} {us:>9.1f} µs/update")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
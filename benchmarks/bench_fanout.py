@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Fan-out benchmark: assigning one task to many employees.
+
+The old path inserts one task per employee (one commit each) and sends the
+message and location sequentially; the new path writes the whole group in
+one transaction and notifies through the sender pool. Telegram is replaced
+by a fake bot that sleeps for --latency per call. Run from the repository root:
+    python -m benchmarks.bench_fanout [--assignees 1 50 500] [--latency 0.05]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import database
+from sender_pool import send_all
+
+
+class FakeBot:
+    """Stands in for telebot.TeleBot with a fixed round-trip per call"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.latency)
+
+    def send_location(self, chat_id, latitude, longitude):
+        time.sleep(self.latency)
+
+
+def old_fanout(bot, employees):
+    for index, employee in enumerate(employees):
+        database.add_task("Montaj", 41.3, 69.2, None, 50000, employee, 1)
+        bot.send_message(index, "🔔 Sizga yangi vazifa tayinlandi!")
+        bot.send_location(index, 41.3, 69.2)
+
+
+def new_fanout(bot, employees):
+    _, task_ids = database.add_task_group("Montaj", 41.3, 69.2, None, 50000, employees, 1)
+
+    def notify(employee):
+        bot.send_message(employee, "🔔 Sizga yangi vazifa tayinlandi!")
+        bot.send_location(employee, 41.3, 69.2)
+
+    send_all(task_ids, notify)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assignees", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake Telegram call")
+    args = parser.parse_args()
+
+    print(f"{'assignees':>9}  {'old db':>9}  {'new db':>9}  {'old total':>10}  {'new total':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.assignees:
+            employees = [f"Xodim {i}" for i in range(count)]
+            results = []
+            for name, func in (("old", old_fanout), ("new", new_fanout)):
+                database.DATABASE_PATH = os.path.join(tmp, f"{name}_{count}.db")
+                database.init_database()
+                db_only = timed(func, FakeBot(0), employees)
+                total = timed(func, FakeBot(args.latency), employees)
+                results.extend([db_only, total])
+
+            old_db, old_total, new_db, new_total = results
+            print(f"{count:>9}  {old_db * 1000:>7.1f}ms  {new_db * 1000:>7.1f}ms  "
+                  f"{old_total:>9.2f}s  {new_total:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
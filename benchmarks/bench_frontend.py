@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+HTTP front end: listeners, threads and memory of a running deployment, and health-check latency under load.
+
+Starts start.py (or --script) in a fresh process, waits for its port, then
+reads /proc for the process's listening TCP ports, thread count and RSS,
+and drives --clients concurrent clients against --path for --seconds. The
+numbers are read after a settle period, which is where keep-alive threads
+and extra servers show up, and again (peak) under load. --root runs
+the script from another checkout, so a before/after comparison is:
+    git worktree add /tmp/before <commit>
+    python -m benchmarks.bench_frontend --root /tmp/before --json before.json
+    python -m benchmarks.bench_frontend --json after.json
+Linux only (/proc).
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def listening_ports(pid: int):
+    """TCP ports the process listens on, from /proc/<pid>/net/tcp* and its socket fds"""
+    inodes = set()
+    fd_dir = f"/proc/{pid}/fd"
+    for fd in os.listdir(fd_dir):
+        try:
+            target = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            inodes.add(target[8:-1])
+    ports = set()
+    for table in ("tcp", "tcp6"):
+        try:
+            lines = open(f"/proc/{pid}/net/{table}").read().splitlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if fields[3] == "0A" and fields[9] in inodes:  # 0A = LISTEN
+                ports.add(int(fields[1].rsplit(":", 1)[1], 16))
+    return sorted(ports)
+
+
+def process_stats(pid: int):
+    status = dict(line.split(":", 1) for line in open(f"/proc/{pid}/status").read().splitlines() if ":" in line)
+    return {
+        "threads": int(status["Threads"]),
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+        "listeners": listening_ports(pid),
+    }
+
+
+def load(url: str, clients: int, seconds: float):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        mine = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    response.read()
+                mine.append(time.perf_counter() - started)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=client) for _ in range(clients)]
+    for worker in workers:
+        worker.start()
+    return workers, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--root", default=ROOT, help="checkout to run the script from")
+    parser.add_argument("--script", default="start.py")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds after startup before measuring")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), BOT_TOKEN=os.environ.get("BOT_TOKEN") or "0:benchmark")
+    process = subprocess.Popen([sys.executable, args.script], cwd=args.root, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.05).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.perf_counter() - started > 20:
+                    sys.exit(f"{args.script} did not open port {port} (exit code {process.poll()})")
+                time.sleep(0.01)
+        time.sleep(args.settle)
+        if process.poll() is not None:
+            sys.exit(f"{args.script} exited after opening its port (exit code {process.returncode})")
+        idle = process_stats(process.pid)
+
+        url = f"http://127.0.0.1:{port}{args.path}"
+        workers, latencies, errors = load(url, args.clients, args.seconds)
+        # Per-connection threads come and go; keep the peak
+        busy = dict(idle, threads=0)
+        while any(worker.is_alive() for worker in workers):
+            if process.poll() is not None:
+                sys.exit(f"{args.script} exited during the run (exit code {process.returncode})")
+            sample = process_stats(process.pid)
+            busy = dict(sample, threads=max(busy["threads"], sample["threads"]),
+                        rss_mb=max(busy["rss_mb"], sample["rss_mb"]))
+            time.sleep(0.05)
+    finally:
+        process.kill()
+        process.wait()
+
+    latencies.sort()
+    report = {
+        "script": os.path.join(args.root, args.script),
+        "idle": idle,
+        "under_load": busy,
+        "requests_per_s": len(latencies) / args.seconds,
+        "errors": errors[0],
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+    }
+    for name in ("idle", "under_load"):
+        stats = report[name]
+        print(f"{name:<11} threads {stats['threads']:>3}  rss {stats['rss_mb']:>6.1f} MB  "
+              f"listening on {', '.join(map(str, stats['listeners'])) or 'nothing'}")
+    if latencies:
+        print(f"{args.path}: {report['requests_per_s']:.0f} req/s with {args.clients} clients, "
+              f"p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, {errors[0]} errors")
+    else:
+        print(f"{args.path}: no successful requests, {errors[0]} errors")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cold start: module import time from -X importtime, and health-port bind time.
+
+Imports each module in a fresh interpreter with -X importtime, parses the
+per-module timings it prints to stderr and reports the cumulative import
+time, the heaviest imports underneath and whether modules that should load
+lazily (openpyxl, flask, requests, ...) were pulled in. --health also starts
+start.py and measures how long the health port takes to accept connections.
+--budget fails the run (exit 1) when a module is slower than its budget, so
+CI can track regressions.
+Run from the repository root:
+    python -m benchmarks.bench_import [--modules main,utils] [--repeat 5] [--health]
+    python -m benchmarks.bench_import --budget main=400,utils=60 --json import.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = "start,start_render,main,website_api,utils,database,routing"
+# Loaded on first use; their presence at import time is a regression
+LAZY_MODULES = ("openpyxl", "flask", "requests", "xml.etree.ElementTree")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str):
+    """[(module, self_us, cumulative_us, depth)] in the order -X importtime printed them"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_module(module: str):
+    """(rows, error) for one import of module in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, env=dict(os.environ, BOT_TOKEN=""),
+    )
+    error = None
+    if result.returncode:
+        error = (result.stderr.strip().splitlines() or ["?"])[-1]
+    return parse_importtime(result.stderr), error
+
+
+def measure_module(module: str, repeat: int, top: int):
+    best = None
+    for _ in range(repeat):
+        rows, error = import_module(module)
+        if error:
+            # Timings of a partial import would look like a speed-up
+            return {"module": module, "error": error}
+        total = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), None)
+        if total is not None and (best is None or total < best[0]):
+            best = (total, rows)
+    if best is None:
+        return {"module": module, "error": "not imported"}
+
+    total, rows = best
+    loaded = {name for name, _, _, _ in rows}
+    heaviest = sorted((row for row in rows if row[0] != module), key=lambda row: -row[2])[:top]
+    return {
+        "module": module,
+        "ms": total / 1000,
+        "modules_loaded": len(rows),
+        "lazy_loaded": [name for name in LAZY_MODULES if name in loaded],
+        "heaviest": [{"module": name, "ms": cumulative / 1000, "self_ms": self_us / 1000}
+                     for name, self_us, cumulative, _ in heaviest],
+    }
+
+
+def measure_health(timeout: float = 20.0) -> float:
+    """Milliseconds from launching start.py until its health port accepts a connection"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, PORT=str(port), BOT_TOKEN=os.environ.get("BOT_TOKEN") or "0:benchmark")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "start.py"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                    return (time.perf_counter() - started) * 1000
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"start.py exited with {process.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError("health port did not open")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="imports per module; the fastest counts")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports listed per module")
+    parser.add_argument("--health", action="store_true", help="also time start.py until the health port opens")
+    parser.add_argument("--budget", default="", help="module=ms,... ; exit 1 when exceeded")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [measure_module(module, args.repeat, args.top) for module in args.modules.split(",")]
+    for result in results:
+        if "ms" not in result:
+            print(f"{result['module']:<14} failed: {result['error']}")
+            continue
+        lazy = ", ".join(result["lazy_loaded"]) or "none"
+        print(f"{result['module']:<14} {result['ms']:>8.1f} ms  {result['modules_loaded']:>4} modules  "
+              f"eager heavy modules: {lazy}")
+        for row in result["heaviest"]:
+            print(f"    {row['module']:<40} {row['ms']:>8.1f} ms")
+
+    report = {"modules": results}
+    if args.health:
+        samples = [measure_health() for _ in range(args.repeat)]
+        report["health_bind_ms"] = min(samples)
+        print(f"\nstart.py health port open after {min(samples):.0f} ms (best of {len(samples)})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    over = []
+    for item in filter(None, args.budget.split(",")):
+        module, limit = item.split("=")
+        result = next((r for r in results if r["module"] == module), None)
+        if result is None or "ms" not in result or result["ms"] > float(limit):
+            over.append(f"{module} ({result.get('ms', 'failed') if result else 'not measured'} > {limit} ms)")
+    if over:
+        print("\nover budget: " + ", ".join(over))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Logging overhead per update: synchronous print vs the queued logger.
+
+Replays the logging pattern of the location handler (the hottest update
+type) - two lines per update, plus the assign-task lines for one update in
+fifty - against a stdout stand-in whose writes take --write-delay
+microseconds, as a back-pressured container log pipe does. Prints the time
+each variant adds to the handler thread per update, and how many lines the
+writer kept up with.
+Run from the repository root:
+    python -m benchmarks.bench_logging [--updates 20000] [--write-delay 50]
+"""
+
+import argparse
+import io
+import logging
+import statistics
+import time
+
+from logs import dropped_records, setup_logging, stop_logging
+
+log = logging.getLogger("bench.location")
+
+
+class SlowStream(io.TextIOBase):
+    """Text stream whose every write blocks for a fixed time"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += text.count("\n")
+        return len(text)
+
+
+def with_print(stream, chat_id, state, admin_data, assign):
+    print(f"URGENT DEBUG: Location handler called! Chat ID: {chat_id}", file=stream)
+    print(f"DEBUG: Location received from {chat_id}, current state: {state}", file=stream)
+    if assign:
+        print(f"DEBUG: Processing admin task location assignment for {chat_id}", file=stream)
+        print(f"DEBUG: Current admin_data: {admin_data}", file=stream)
+        print(f"DEBUG: State changed to assign_task_payment for {chat_id}", file=stream)
+
+
+def with_logging(stream, chat_id, state, admin_data, assign):
+    log.debug("Location received from %s, current state: %s", chat_id, state, extra={"sample": "location"})
+    if assign:
+        log.debug("Processing admin task location assignment for %s", chat_id)
+        log.debug("State changed to assign_task_payment for %s", chat_id)
+    log.debug("Unhandled location state: %s", state, extra={"sample": "location_unhandled"})
+
+
+def run(variant, updates, stream):
+    admin_data = {"description": "Konditsionerni tozalash", "location": {"latitude": 41.31, "longitude": 69.28}}
+    timings = []
+    for i in range(updates):
+        started = time.perf_counter()
+        variant(stream, 7442895800 + i % 50, None, admin_data, i % 50 == 0)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--write-delay", type=float, default=50, help="microseconds per stdout write")
+    args = parser.parse_args()
+
+    print(f"{'variant':<22} {'mean':>9} {'p50':>9} {'p99':>9} {'lines':>8} {'dropped':>8}")
+    for name, variant, level in (("print", with_print, None),
+                                 ("logging INFO", with_logging, "INFO"),
+                                 ("logging DEBUG", with_logging, "DEBUG")):
+        stream = SlowStream(args.write_delay / 1e6)
+        if level:
+            setup_logging(level, stream=stream)
+        timings = run(variant, args.updates, stream)
+        dropped = dropped_records()
+        if level:
+            stop_logging()  # waits for the writer to drain the queue
+        timings.sort()
+        print(f"{name:<22} {statistics.mean(timings):>7.2f}us {timings[len(timings) // 2]:>7.2f}us "
+              f"{timings[int(len(timings) * 0.99)]:>7.2f}us {stream.lines:>8} {dropped:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-message render cost: inline f-strings and per-call keyboards vs messages.py.
+
+The inline variants are copies of what the handlers did before; the keyboard
+baseline uses telebot's ReplyKeyboardMarkup when it is installed and an
+equivalent dict + json.dumps otherwise. Templates render with str.format_map,
+which parses the body on every call, so they cost a microsecond or two more
+than the inline f-strings; the saving is in the keyboards. Run from the
+repository root:
+    python -m benchmarks.bench_messages [--rounds 200000]
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from messages import CARD_PAYMENT_ADMIN, KEYBOARDS, LOCATION_CARD, LOCATION_CARD_STYLES
+
+try:
+    from telebot import types
+except ImportError:
+    types = None
+
+REPORT = "Konditsioner o'rnatildi, mijoz rozi"
+
+
+def inline_admin_message(task_id, employee_name, received_amount, report):
+    return f"""
+✅ Vazifa yakunlandi!
+
+🆔 Vazifa ID: {task_id}
+👤 Xodim: {employee_name or "Noma'lum"}
+💳 To'lov usuli: Karta orqali  
+💰 Olingan to'lov: {received_amount:,.0f} so'm
+📊 Status: Kartaga o'tkazildi, hisobga tushirildi
+
+📝 Hisobot: {report}
+"""
+
+
+def template_admin_message(task_id, employee_name, received_amount, report):
+    return CARD_PAYMENT_ADMIN.render(task_id=task_id, employee=employee_name or "Noma'lum",
+                                     amount=received_amount, report=report)
+
+
+def inline_location_card(sender_name, latitude, longitude, location_type, current_time):
+    if location_type == "employee_location":
+        card_title, card_icon, card_color = "👤 Xodim Lokatsiyasi", "📍", "🟢"
+    elif location_type == "task_location":
+        card_title, card_icon, card_color = "🎯 Vazifa Lokatsiyasi", "🚩", "🔵"
+    elif location_type == "customer_location":
+        card_title, card_icon, card_color = "👥 Mijoz Lokatsiyasi", "📌", "🟡"
+    else:
+        card_title, card_icon, card_color = "📍 Lokatsiya Ma'lumoti", "📍", "⚪"
+    google_maps_url = f"https://maps.google.com/?q={latitude},{longitude}"
+    google_maps_embed = f"https://maps.google.com/maps?q={latitude},{longitude}&output=embed"  # noqa: F841
+    yandex_maps_url = f"https://yandex.ru/maps/?ll={longitude},{latitude}&z=16&l=map"
+    return f"""
+{card_color} **{card_title}** {card_color}
+╭─────────────────────────╮
+│  {card_icon} **{sender_name}**
+│  🌍 Joylashuv ma'lumotlari
+╰─────────────────────────╯
+
+📊 **Koordinatalar:**
+• 🌐 Kenglik: `{latitude:.6f}`
+• 🌐 Uzunlik: `{longitude:.6f}`
+
+🗺 **Interaktiv Xaritalar:**
+• [📍 Google Maps]({google_maps_url})
+• [🗺 Yandex Maps]({yandex_maps_url})
+
+⏰ **Vaqt:** {current_time}
+📡 **Status:** ✅ Faol
+
+┌─────────────────────────┐
+│   🎯 Tezkor Amallar:    │
+├─────────────────────────┤
+│ 🧭 Navigatsiya          │
+│ 📏 Masofa hisoblash     │
+│ 📱 Telefondan ochish    │
+└─────────────────────────┘
+"""
+
+
+def template_location_card(sender_name, latitude, longitude, location_type, current_time):
+    color, title, icon = LOCATION_CARD_STYLES.get(location_type, LOCATION_CARD_STYLES["general"])
+    return LOCATION_CARD.render(color=color, title=title, icon=icon, sender=sender_name,
+                                lat=latitude, lon=longitude, time=current_time)
+
+
+def per_call_keyboard():
+    """What show_admin_panel sent before: a fresh markup serialized by telebot"""
+    rows = [["➕ Yangi xodim qo'shish", "📤 Vazifa berish"],
+            ["📍 Xodimlarni kuzatish", "👥 Mijozlar so'rovlari"],
+            ["💸 Qarzlar", "📊 Ma'lumotlar"],
+            ["🔙 Ortga"]]
+    if types is not None:
+        markup = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
+        for row in rows:
+            markup.add(*row)
+        return markup.to_json()
+    return json.dumps({"keyboard": [[{"text": text} for text in row] for row in rows],
+                       "resize_keyboard": True})
+
+
+def cached_keyboard():
+    return KEYBOARDS["admin_panel"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200000)
+    args = parser.parse_args()
+
+    now = datetime.now().strftime('%d.%m.%Y %H:%M:%S')
+    cases = [
+        ("admin completion message",
+         lambda: inline_admin_message(42, "Kamol", 150000.0, REPORT),
+         lambda: template_admin_message(42, "Kamol", 150000.0, REPORT)),
+        ("location card",
+         lambda: inline_location_card("Kamol", 41.311081, 69.240562, "employee_location", now),
+         lambda: template_location_card("Kamol", 41.311081, 69.240562, "employee_location", now)),
+        ("admin panel keyboard" + ("" if types else " (no telebot)"),
+         per_call_keyboard, cached_keyboard),
+    ]
+
+    print(f"{'case':<36}  {'before':>10}  {'after':>10}")
+    for name, before, after in cases:
+        costs = [min(timeit.repeat(func, number=args.rounds, repeat=3)) / args.rounds
+                 for func in (before, after)]
+        print(f"{name:<36}  {costs[0] * 1e6:>7.2f} µs  {costs[1] * 1e6:>7.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
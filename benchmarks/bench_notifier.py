@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Admin notification digests: API messages saved and event-to-delivery latency.
+
+Replays a random stream of admin events against a fake send that records
+when each event reached the admin chat. Windows are in real seconds, so keep
+--duration short or scale --window down. Run from the repository root:
+    python -m benchmarks.bench_notifier [--rate 5] [--duration 20] [--window 5]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from notifier import NotificationAggregator
+
+KINDS = ["task_started", "task_completed", "debt", "inquiry", "location"]
+EVENT_ID = re.compile(r"#evt(\d+)")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=5.0, help="events per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--urgent", type=float, default=0.05, help="fraction of urgent events")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    enqueued, urgent_ids = {}, set()
+    latency = {}
+
+    def send(text):
+        now = time.monotonic()
+        for event_id in EVENT_ID.findall(text):
+            latency[int(event_id)] = now - enqueued[int(event_id)]
+
+    notifier = NotificationAggregator(send, window=args.window, batch_size=args.batch_size)
+    notifier.start()
+
+    event_id = 0
+    finish = time.monotonic() + args.duration
+    while time.monotonic() < finish:
+        time.sleep(rng.expovariate(args.rate))
+        urgent = rng.random() < args.urgent
+        enqueued[event_id] = time.monotonic()
+        if urgent:
+            urgent_ids.add(event_id)
+        notifier.notify(rng.choice(KINDS), f"🔔 Hodisa #evt{event_id}\n👤 Xodim: Kamol", urgent=urgent)
+        event_id += 1
+
+    time.sleep(args.window + 0.5)
+    notifier.stop(1)
+
+    routine = [value * 1000 for key, value in latency.items() if key not in urgent_ids]
+    urgent = [value * 1000 for key, value in latency.items() if key in urgent_ids]
+    print(f"events:            {notifier.events} ({len(urgent_ids)} urgent)")
+    print(f"admin messages:    {notifier.messages} (was {notifier.events}, "
+          f"{100 * (1 - notifier.messages / max(notifier.events, 1)):.0f}% fewer)")
+    print(f"delivered:         {len(latency)}")
+    for name, values in (("routine", routine), ("urgent", urgent)):
+        if values:
+            print(f"{name + ' latency':<18} p50 {statistics.median(values):.1f} ms, "
+                  f"p99 {percentile(values, 99):.1f} ms, max {max(values):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+End-to-end update replay: handler latency, SQL and API calls per update.
+
+Builds the real bot with create_bot() against an in-memory database and a
+fake Telegram API (benchmarks/fake_telegram.py), then feeds it a mix of
+scripted conversations - admins assigning tasks, employees completing them,
+customers chatting with the admin, bursts of employee locations - interleaved
+across chats the way polling delivers them. Each conversation reacts to what
+the bot answered (it presses the inline buttons the bot sent), so the flows
+stay valid as handlers change. Reports updates/s, per-handler p50/p95/p99 and
+SQL statements, connections and API calls per update. Updates that end in
+handle_unknown or the unhandled-location fallback are counted; a generated
+run with any of them exits with status 1, since it measured the wrong paths.
+
+The generated stream can be saved with --record and fed back with --replay
+(one raw Update JSON per line). Tokenized inline buttons in a recording point
+at the registry of the run that recorded it, so on replay they are answered
+as expired; use the generated mode (fixed --seed) for before/after numbers.
+Run from the repository root:
+    python -m benchmarks.bench_replay [--updates 3000] [--latency 0] [--log-level INFO] [--record out.jsonl]
+    python -m benchmarks.bench_replay --replay out.jsonl [--json result.json]
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import database
+import metrics
+from benchmarks.fake_telegram import FakeTelegram
+from logs import setup_logging, stop_logging
+from config import ADMIN_CHAT_ID, EMPLOYEES
+
+CENTER = (41.31, 69.28)
+CUSTOMER_BASE_ID = 5_000_000
+DESCRIPTIONS = [
+    "Konditsionerni tozalash", "Kir yuvish mashinasini ta'mirlash", "Muzlatgichga freon quyish",
+    "Suv isitgichni o'rnatish", "Elektr hisoblagichni almashtirish",
+]
+CUSTOMER_TEXTS = ["Assalomu alaykum", "Usta qachon keladi?", "Manzilni yubordim", "Rahmat!"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class CountingBackend:
+    """Wraps a storage backend and counts connections and executed SQL statements"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.connections = 0
+        self.statements = 0
+
+    def _trace(self, statement):
+        self.statements += 1
+
+    def connect(self):
+        self.connections += 1
+        conn = self.backend.connect()
+        conn.set_trace_callback(self._trace)
+        return conn
+
+
+def instrument(bot, timings):
+    """Time every registered handler; callbacks are labelled by their action"""
+    def wrap(handler, callback):
+        function = handler["function"]
+
+        @functools.wraps(function)
+        def timed(update, *args, **kwargs):
+            label = function.__name__
+            if callback:
+                label = f"callback {(update.data or '').partition(':')[0]}"
+            started = time.perf_counter()
+            try:
+                return function(update, *args, **kwargs)
+            finally:
+                timings[label].append((time.perf_counter() - started) * 1000)
+        handler["function"] = timed
+
+    for handler in bot.message_handlers:
+        wrap(handler, callback=False)
+    for handler in bot.callback_query_handlers:
+        wrap(handler, callback=True)
+
+
+def random_point(rng, spread=0.08):
+    return CENTER[0] + rng.uniform(-spread, spread), CENTER[1] + rng.uniform(-spread, spread)
+
+
+def find_button(fake, chat_id, prefix, since=0):
+    """callback_data of the newest inline button whose text starts with prefix,
+    among the messages sent to chat_id after the first since ones"""
+    for message in reversed(fake.sent.get(chat_id, [])[since:]):
+        rows = (message.get("reply_markup") or {}).get("inline_keyboard", [])
+        for row in rows:
+            for button in row:
+                if button["text"].startswith(prefix) and button.get("callback_data"):
+                    return button["callback_data"]
+    return None
+
+
+# =============================================================================
+# Conversations: generators yield one update at a time and resume after the
+# bot has processed it, so they can react to what it sent back
+# =============================================================================
+
+def admin_assign(fake, rng, employees):
+    name = "Admin"
+    yield fake.text(ADMIN_CHAT_ID, "📤 Vazifa berish", name)
+    yield fake.text(ADMIN_CHAT_ID, rng.choice(DESCRIPTIONS), name)
+    yield fake.location(ADMIN_CHAT_ID, *random_point(rng), name)
+    yield fake.text(ADMIN_CHAT_ID, "💰 To'lov miqdorini kiriting", name)
+    yield fake.text(ADMIN_CHAT_ID, str(rng.randrange(50, 500) * 1000), name)
+    for employee in rng.sample(employees, rng.randint(1, 2)):
+        yield fake.text(ADMIN_CHAT_ID, employee, name)
+    yield fake.text(ADMIN_CHAT_ID, "📨 Yuborish", name)
+
+
+def employee_complete(fake, rng, name):
+    chat_id = EMPLOYEES[name]
+    since = len(fake.sent[chat_id])
+    yield fake.text(chat_id, "📌 Mening vazifalarim", name)
+    start = find_button(fake, chat_id, "▶️", since)
+    if start:
+        yield fake.callback(chat_id, start, name)
+    finish = find_button(fake, chat_id, "✅", since)
+    if not finish:
+        return
+    yield fake.callback(chat_id, finish, name)
+    yield fake.text(chat_id, "Vazifa bajarildi, mijoz rozi.", name)
+    yield fake.photo(chat_id, name)
+    yield fake.text(chat_id, "💵 Naqd pul olindi", name)
+    yield fake.text(chat_id, str(rng.randrange(50, 500) * 1000), name)
+
+
+def location_burst(fake, rng, name, size=10):
+    chat_id = EMPLOYEES[name]
+    # What the admin's "📍 Xodimlarni kuzatish" request leaves an idle employee in;
+    # sending it from the admin chat would break the admin's own conversation
+    if not database.get_user_state(chat_id).state:
+        database.set_user_state(chat_id, "employee_location")
+    lat, lon = random_point(rng)
+    for _ in range(size):
+        lat, lon = lat + rng.uniform(-0.001, 0.001), lon + rng.uniform(-0.001, 0.001)
+        yield fake.location(chat_id, lat, lon, name)
+
+
+def customer_chat(fake, rng, chat_id):
+    name = f"Mijoz {chat_id - CUSTOMER_BASE_ID}"
+    yield fake.text(chat_id, "👥 Mijoz", name)
+    yield fake.text(chat_id, "💬 Admin bilan bog'lanish", name)
+    yield fake.contact(chat_id, f"+99890{chat_id % 10_000_000:07d}", name)
+    yield fake.location(chat_id, *random_point(rng), name)
+    for _ in range(rng.randint(1, 4)):
+        yield fake.text(chat_id, rng.choice(CUSTOMER_TEXTS), name)
+    yield fake.text(chat_id, "❌ Suhbatni tugatish", name)
+
+
+def generate(fake, rng, process, total, customers):
+    """Drive interleaved conversations until total updates have been processed"""
+    # Salih shares the admin's chat id; his panel is the admin panel
+    employees = [name for name, chat_id in EMPLOYEES.items() if chat_id != ADMIN_CHAT_ID]
+
+    def next_conversation(chat):
+        if chat == ADMIN_CHAT_ID:
+            return admin_assign(fake, rng, employees)
+        if chat in employees:
+            if rng.random() < 0.5:
+                return employee_complete(fake, rng, chat)
+            return location_burst(fake, rng, chat)
+        return customer_chat(fake, rng, chat)
+
+    chats = [ADMIN_CHAT_ID] + employees + [CUSTOMER_BASE_ID + i for i in range(customers)]
+    active = {chat: next_conversation(chat) for chat in chats}
+    done = 0
+    while done < total:
+        chat = rng.choice(chats)
+        update = next(active[chat], None)
+        if update is None:
+            active[chat] = next_conversation(chat)
+            continue
+        process(update)
+        done += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--customers", type=int, default=20, help="concurrent customer chats")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per fake API call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--record", help="write the generated updates to this JSONL file")
+    parser.add_argument("--replay", help="process the updates in this JSONL file instead")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--log-level", default="INFO", help="bot log level (records go to /dev/null)")
+    args = parser.parse_args()
+
+    from telebot import types
+    import main as bot_main
+
+    record = open(args.record, "w") if args.record else None
+    workdir = tempfile.TemporaryDirectory()
+    home = os.getcwd()
+    os.chdir(workdir.name)  # media and reports are written relative to the working directory
+
+    backend = CountingBackend(database.MemoryBackend())
+    database.set_backend(backend)
+    fake = FakeTelegram(latency=args.latency)
+    log_sink = open(os.devnull, "w")
+    setup_logging(args.log_level, stream=log_sink)
+    bot, notifier = bot_main.create_bot("123:TEST", threaded=False, background=False)
+    fake.install(bot)
+
+    timings = defaultdict(list)
+    instrument(bot, timings)
+    errors = Counter()
+    backend.connections = backend.statements = 0
+    fake.calls.clear()
+    unhandled_before = {kind: metrics.UNHANDLED_UPDATES.value(kind) for kind in ("message", "location")}
+    processed = 0
+
+    def process(payload):
+        nonlocal processed
+        if record:
+            record.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        try:
+            bot.process_new_updates([types.Update.de_json(payload)])
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        processed += 1
+
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if args.replay:
+                with open(os.path.join(home, args.replay)) as f:
+                    for line in f:
+                        if line.strip():
+                            process(json.loads(line))
+            else:
+                generate(fake, random.Random(args.seed), process, args.updates, args.customers)
+        elapsed = time.perf_counter() - started
+    finally:
+        notifier.stop(0)
+        stop_logging()
+        log_sink.close()
+        fake.uninstall()
+        os.chdir(home)
+        workdir.cleanup()
+        if record:
+            record.close()
+
+    api_calls = sum(fake.calls.values())
+    unhandled = {kind: int(metrics.UNHANDLED_UPDATES.value(kind) - count)
+                 for kind, count in unhandled_before.items()}
+    print(f"{processed} updates in {elapsed:.2f} s: {processed / elapsed:.0f} updates/s")
+    print(f"per update: {backend.statements / processed:.1f} SQL statements, "
+          f"{backend.connections / processed:.2f} connections, {api_calls / processed:.2f} API calls")
+    if errors:
+        print("errors: " + ", ".join(f"{name} x{count}" for name, count in errors.most_common()))
+    print(f"unhandled: {unhandled['message']} messages (handle_unknown), "
+          f"{unhandled['location']} locations (no location state)")
+    print(f"\n{'handler':<34} {'calls':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, values in sorted(timings.items(), key=lambda item: -sum(item[1])):
+        print(f"{label:<34} {len(values):>6} {statistics.median(values):>7.2f}ms "
+              f"{percentile(values, 95):>7.2f}ms {percentile(values, 99):>7.2f}ms")
+    print("\nAPI calls: " + ", ".join(f"{name} {count}" for name, count in fake.calls.most_common()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "updates": processed,
+                "seconds": elapsed,
+                "updates_per_second": processed / elapsed,
+                "sql_per_update": backend.statements / processed,
+                "connections_per_update": backend.connections / processed,
+                "api_calls_per_update": api_calls / processed,
+                "api_calls": dict(fake.calls),
+                "errors": dict(errors),
+                "unhandled": unhandled,
+                "handlers": {
+                    label: {"calls": len(values), "p50": statistics.median(values),
+                            "p95": percentile(values, 95), "p99": percentile(values, 99)}
+                    for label, values in timings.items()
+                },
+            }, f, indent=2)
+
+    if not args.replay and any(unhandled.values()):
+        sys.exit("generated flows reached unhandled paths; the numbers above do not measure them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Offline routing: index build time and size, and route query latency.
+
+Builds a routing index from a synthetic city grid (arterials every tenth
+street, alternating one-way side streets) or from a real OSM extract, then
+times single routes and employee-to-task ETAs on the contraction hierarchy.
+Run from the repository root:
+    python -m benchmarks.bench_routing [--grid 120] [--osm extract.osm] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from routing import RoadGraph, build_graph, read_osm, route, routes_to
+
+ORIGIN = (41.20, 69.10)
+SPACING = 0.002  # degrees between grid streets, about 200 m
+
+
+def write_grid_osm(path, size, rng):
+    """A size x size street grid as OSM XML"""
+    def node_id(row, col):
+        return row * size + col + 1
+
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+        for row in range(size):
+            for col in range(size):
+                lat = ORIGIN[0] + row * SPACING + rng.uniform(-0.0002, 0.0002)
+                lon = ORIGIN[1] + col * SPACING + rng.uniform(-0.0002, 0.0002)
+                f.write(f'  <node id="{node_id(row, col)}" lat="{lat:.7f}" lon="{lon:.7f}"/>\n')
+        way_id = 1
+        for line in range(size):
+            for refs in ([node_id(line, col) for col in range(size)], [node_id(row, line) for row in range(size)]):
+                if line % 10 == 0:
+                    tags = '<tag k="highway" v="primary"/>'
+                else:
+                    tags = '<tag k="highway" v="residential"/>'
+                    if rng.random() < 0.3:
+                        tags += f'<tag k="oneway" v="{"yes" if line % 2 else "-1"}"/>'
+                nds = "".join(f'<nd ref="{ref}"/>' for ref in refs)
+                f.write(f'  <way id="{way_id}">{nds}{tags}</way>\n')
+                way_id += 1
+        f.write("</osm>\n")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(name, values):
+    print(f"{name:<24} p50 {statistics.median(values):.2f} ms, p99 {percentile(values, 99):.2f} ms, "
+          f"max {max(values):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--grid", type=int, default=120, help="streets per side of the synthetic city")
+    parser.add_argument("--osm", help="build from this OSM XML extract instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--employees", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        extract = args.osm
+        if not extract:
+            extract = os.path.join(tmp, "city.osm")
+            write_grid_osm(extract, args.grid, rng)
+
+        started = time.perf_counter()
+        coords, ways = read_osm(extract)
+        parsed = time.perf_counter()
+        index_path = os.path.join(tmp, "roads.graph")
+        nodes, edges, shortcuts = build_graph(coords, ways, index_path)
+        built = time.perf_counter()
+        graph = RoadGraph(index_path)
+        loaded = time.perf_counter()
+
+        print(f"graph:                   {nodes} nodes, {edges} edges, {shortcuts} shortcuts, "
+              f"{os.path.getsize(index_path) / 1e6:.1f} MB index")
+        print(f"parse / contract / load: {parsed - started:.2f} s / {built - parsed:.2f} s / "
+              f"{(loaded - built) * 1000:.2f} ms")
+
+        def random_point():
+            node = rng.randrange(graph.node_count)
+            return graph.lat[node] + rng.uniform(-0.001, 0.001), graph.lon[node] + rng.uniform(-0.001, 0.001)
+
+        single, snap, km = [], [], []
+        for _ in range(args.queries):
+            (lat1, lon1), (lat2, lon2) = random_point(), random_point()
+            started = time.perf_counter()
+            graph.nearest_node(lat1, lon1)
+            snap.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            result = route(lat1, lon1, lat2, lon2, graph=graph)
+            single.append((time.perf_counter() - started) * 1000)
+            km.append(result.distance_m / 1000)
+
+        many = []
+        for _ in range(max(1, args.queries // 10)):
+            employees = {i: random_point() for i in range(args.employees)}
+            started = time.perf_counter()
+            routes_to(*random_point(), employees, graph=graph)
+            many.append((time.perf_counter() - started) * 1000)
+
+        print(f"route length:            mean {statistics.mean(km):.1f} km")
+        report("snap to road", snap)
+        report("route", single)
+        report(f"{args.employees} employees -> task", many)
+
+
+if __name__ == "__main__":
+    main()
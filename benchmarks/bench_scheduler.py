@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Scheduler benchmark: load, firing accuracy and CPU cost with 100k jobs.
+
+Run from the repository root:
+    python -m benchmarks.bench_scheduler [--jobs 100000] [--spread 10]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import database
+from scheduler import Scheduler
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def insert_jobs(count, start, spread):
+    """Bulk-insert pending jobs evenly spread over [start, start + spread)"""
+    conn = database.get_connection()
+    conn.executemany(
+        "INSERT INTO scheduled_jobs (kind, ref_id, run_at) VALUES ('bench', ?, ?)",
+        ((i, start + spread * i / count) for i in range(count))
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--spread", type=float, default=10.0, help="seconds over which jobs come due")
+    parser.add_argument("--idle", type=float, default=3.0, help="seconds to measure idle CPU")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, "bench.db")
+        database.init_database()
+
+        # Idle cost: every job far in the future
+        insert_jobs(args.jobs, time.time() + 86400, 86400)
+        scheduler = Scheduler()
+        started = time.perf_counter()
+        loaded = scheduler.load()
+        load_time = time.perf_counter() - started
+
+        scheduler.start()
+        cpu_before = time.process_time()
+        time.sleep(args.idle)
+        idle_cpu = time.process_time() - cpu_before
+        scheduler.stop(1)
+
+        # Firing: fresh database, jobs coming due over the next `spread` seconds
+        database.DATABASE_PATH = os.path.join(tmp, "bench_fire.db")
+        database.init_database()
+        start = time.time() + 1
+        insert_jobs(args.jobs, start, args.spread)
+
+        lateness = []
+        done = threading.Event()
+
+        def handler(ref_id, payload):
+            lateness.append(time.time() - (start + args.spread * ref_id / args.jobs))
+            if len(lateness) == args.jobs:
+                done.set()
+
+        scheduler = Scheduler()
+        scheduler.register("bench", handler)
+        scheduler.load()
+        cpu_before = time.process_time()
+        wall_before = time.perf_counter()
+        scheduler.start()
+        done.wait(args.spread + 120)
+        fire_cpu = time.process_time() - cpu_before
+        fire_wall = time.perf_counter() - wall_before
+        scheduler.stop(1)
+
+        conn = database.get_connection()
+        pending = conn.execute("SELECT COUNT(*) FROM scheduled_jobs WHERE status = 'pending'").fetchone()[0]
+        conn.close()
+
+    lateness_ms = [value * 1000 for value in lateness]
+    print(f"jobs:                 {args.jobs}")
+    print(f"load:                 {loaded} jobs in {load_time:.3f}s")
+    print(f"idle CPU ({args.idle:.0f}s):        {idle_cpu * 1000:.1f} ms")
+    print(f"fired:                {len(lateness)} (pending left: {pending})")
+    print(f"firing wall/CPU:      {fire_wall:.2f}s / {fire_cpu:.2f}s")
+    if lateness_ms:
+        print(f"lateness p50/p99/max: {statistics.median(lateness_ms):.1f} / "
+              f"{percentile(lateness_ms, 99):.1f} / {max(lateness_ms):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
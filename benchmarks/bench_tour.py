@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Task route planning: solver runtime and tour quality from 10 to 500 stops.
+
+Scatters stops over a 25 x 25 km city and times the distance matrix, the
+nearest-neighbour path and the 2-opt pass, comparing tour length with the
+greedy path and with the order the tasks were listed in (creation order).
+Run from the repository root:
+    python -m benchmarks.bench_tour [--sizes 10,50,100,200,500] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from tour import distance_matrix, nearest_neighbour_path, path_length, two_opt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,50,100,200,500")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'stops':>6} {'matrix':>10} {'greedy':>10} {'2-opt':>10} {'total':>10} "
+          f"{'km listed':>10} {'km greedy':>10} {'km 2-opt':>10}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        timings = {"matrix": [], "greedy": [], "2-opt": []}
+        lengths = {"listed": [], "greedy": [], "2-opt": []}
+        for _ in range(args.repeat):
+            points = [(41.20 + rng.random() * 0.22, 69.15 + rng.random() * 0.30) for _ in range(size + 1)]
+
+            started = time.perf_counter()
+            matrix = distance_matrix(points)
+            built = time.perf_counter()
+            greedy = nearest_neighbour_path(matrix)
+            ordered = time.perf_counter()
+            improved = two_opt(greedy, matrix)
+            finished = time.perf_counter()
+
+            timings["matrix"].append((built - started) * 1000)
+            timings["greedy"].append((ordered - built) * 1000)
+            timings["2-opt"].append((finished - ordered) * 1000)
+            lengths["listed"].append(path_length(list(range(size + 1)), matrix) / 1000)
+            lengths["greedy"].append(path_length(greedy, matrix) / 1000)
+            lengths["2-opt"].append(path_length(improved, matrix) / 1000)
+
+        ms = {name: statistics.median(values) for name, values in timings.items()}
+        km = {name: statistics.mean(values) for name, values in lengths.items()}
+        print(f"{size:>6} {ms['matrix']:>8.1f}ms {ms['greedy']:>8.1f}ms {ms['2-opt']:>8.1f}ms "
+              f"{sum(ms.values()):>8.1f}ms {km['listed']:>10.0f} {km['greedy']:>10.0f} {km['2-opt']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+In-process stand-in for the Telegram Bot API.
+
+FakeTelegram plugs into telebot's request hook (apihelper.CUSTOM_REQUEST_SENDER),
+answers every API method with a plausible result and records what the bot
+sent, so handlers run unchanged without network access. It also builds the
+Update payloads that users would send.
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Vazifa bot", "username": "vazifa_bot"}
+
+# Methods whose result is a sent or edited message
+MESSAGE_METHODS = {
+    "sendMessage", "sendLocation", "sendPhoto", "sendVideo", "sendVoice", "sendDocument",
+    "sendAudio", "sendAnimation", "editMessageText", "editMessageReplyMarkup", "editMessageCaption",
+}
+
+
+class FakeResponse:
+    """The parts of requests.Response telebot reads"""
+
+    def __init__(self, payload: dict):
+        self.status_code = 200
+        self.reason = "OK"
+        self.text = json.dumps(payload)
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeTelegram:
+    """Answers Bot API calls locally and records the outgoing messages"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # seconds slept per call, to model the network round-trip
+        self.calls = Counter()
+        self.sent: Dict[int, List[dict]] = defaultdict(list)  # chat_id -> messages, oldest first
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1000)
+        self._update_ids = itertools.count(1)
+        self._files = itertools.count(1)
+
+    def install(self, bot=None):
+        """Route telebot's HTTP calls (and bot's file downloads) to this fake"""
+        from telebot import apihelper
+        apihelper.CUSTOM_REQUEST_SENDER = self.request
+        if bot is not None:
+            bot.download_file = self.download_file
+
+    @staticmethod
+    def uninstall():
+        from telebot import apihelper
+        apihelper.CUSTOM_REQUEST_SENDER = None
+
+    def request(self, method, url, params=None, files=None, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        with self._lock:
+            self.calls[api_method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse({"ok": True, "result": self._result(api_method, params or {}, files or {})})
+
+    def download_file(self, file_path: str) -> bytes:
+        with self._lock:
+            self.calls["downloadFile"] += 1
+        return b"\x00" * 2048
+
+    def _result(self, api_method: str, params: dict, files: dict):
+        if api_method == "getMe":
+            return BOT_USER
+        if api_method == "getFile":
+            file_id = params.get("file_id", "file")
+            return {"file_id": file_id, "file_unique_id": file_id, "file_size": 2048,
+                    "file_path": f"photos/{file_id}.jpg"}
+        if api_method not in MESSAGE_METHODS:
+            return True
+
+        chat_id = int(params.get("chat_id", 0))
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "from": BOT_USER,
+            "chat": {"id": chat_id, "type": "private"},
+            "date": int(time.time()),
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        if api_method == "sendLocation":
+            message["location"] = {"latitude": float(params["latitude"]), "longitude": float(params["longitude"])}
+        elif api_method in ("sendPhoto", "sendVideo", "sendVoice", "sendDocument"):
+            file_id = f"sent{next(self._files)}"
+            media = {"file_id": file_id, "file_unique_id": file_id}
+            if api_method == "sendPhoto":
+                message["photo"] = [dict(media, width=1280, height=720)]
+            elif api_method == "sendVideo":
+                message["video"] = dict(media, width=1280, height=720, duration=10)
+            elif api_method == "sendVoice":
+                message["voice"] = dict(media, duration=10)
+            else:
+                message["document"] = media
+        elif "text" not in message:
+            message["text"] = ""
+
+        markup = params.get("reply_markup")
+        record = dict(message, method=api_method,
+                      reply_markup=json.loads(markup) if isinstance(markup, str) and markup else None)
+        with self._lock:
+            self.sent[chat_id].append(record)
+        return message
+
+    def last_inline_buttons(self, chat_id: int) -> Dict[str, str]:
+        """Text -> callback_data of the newest inline keyboard sent to chat_id"""
+        with self._lock:
+            for message in reversed(self.sent.get(chat_id, [])):
+                markup = message.get("reply_markup") or {}
+                if "inline_keyboard" in markup:
+                    return {button["text"]: button.get("callback_data")
+                            for row in markup["inline_keyboard"] for button in row}
+        return {}
+
+    def last_message(self, chat_id: int) -> Optional[dict]:
+        with self._lock:
+            messages = self.sent.get(chat_id)
+            return messages[-1] if messages else None
+
+    # =========================================================================
+    # Incoming updates
+    # =========================================================================
+
+    def _message(self, chat_id: int, first_name: str, **content) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "from": {"id": chat_id, "is_bot": False, "first_name": first_name, "language_code": "uz"},
+            "chat": {"id": chat_id, "type": "private", "first_name": first_name},
+            "date": int(time.time()),
+            **content,
+        }
+
+    def _update(self, **payload) -> dict:
+        return {"update_id": next(self._update_ids), **payload}
+
+    def text(self, chat_id: int, text: str, first_name: str = "Foydalanuvchi") -> dict:
+        return self._update(message=self._message(chat_id, first_name, text=text))
+
+    def location(self, chat_id: int, latitude: float, longitude: float, first_name: str = "Foydalanuvchi") -> dict:
+        return self._update(message=self._message(
+            chat_id, first_name, location={"latitude": latitude, "longitude": longitude}))
+
+    def contact(self, chat_id: int, phone: str, first_name: str = "Foydalanuvchi") -> dict:
+        return self._update(message=self._message(
+            chat_id, first_name, contact={"phone_number": phone, "first_name": first_name, "user_id": chat_id}))
+
+    def photo(self, chat_id: int, first_name: str = "Foydalanuvchi") -> dict:
+        file_id = f"in{next(self._files)}"
+        return self._update(message=self._message(chat_id, first_name, photo=[
+            {"file_id": file_id + "s", "file_unique_id": file_id + "s", "width": 320, "height": 180},
+            {"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 720},
+        ]))
+
+    def callback(self, chat_id: int, data: str, first_name: str = "Foydalanuvchi") -> dict:
+        """A press on the inline button carrying data, on the newest message that has it"""
+        source = None
+        with self._lock:
+            for message in reversed(self.sent.get(chat_id, [])):
+                rows = (message.get("reply_markup") or {}).get("inline_keyboard", [])
+                if any(button.get("callback_data") == data for row in rows for button in row):
+                    source = message
+                    break
+        source = source or self._message(chat_id, first_name)
+        source = {key: value for key, value in source.items() if key not in ("method", "reply_markup")}
+        return self._update(callback_query={
+            "id": str(next(self._update_ids)),
+            "from": {"id": chat_id, "is_bot": False, "first_name": first_name, "language_code": "uz"},
+            "message": source,
+            "chat_instance": str(chat_id),
+            "data": data,
+        })
@@ -83,6 +83,10 @@ def handle_admin_payment(message):
 def handle_admin_employees(message):
     admin_handler.choose_employees(message)
 
+@bot.message_handler(func=lambda message: message.text == "📋 Hisobot" and user_sessions.get(message.chat.id) == "admin")
+def handle_admin_report(message):
+    admin_handler.send_task_report(message)
+
 # Employee handlers
 @bot.message_handler(func=lambda message: message.text == "📋 Mening vazifalarim" and user_sessions.get(message.chat.id) == "employee")
 def handle_my_tasks(message):
@@ -0,0 +1,71 @@
+"""
+Inline-button callback routing with server-side payloads.
+
+callback_data is "<action>:<rest>". The action picks the handler with one
+dict lookup. Buttons that carry state get an opaque token as <rest>; the
+payload stays in an LRU store with a TTL, so nothing is rebuilt from
+strings and the data stays well under Telegram's 64-byte limit.
+"""
+
+import secrets
+from typing import Any, Callable, Dict, Tuple
+
+from cache import LRUCache
+from config import CALLBACK_REGISTRY_SIZE, CALLBACK_TOKEN_TTL
+
+# Telegram rejects longer callback_data
+MAX_CALLBACK_DATA = 64
+
+_MISSING = object()
+
+
+class CallbackRegistry:
+    """Maps callback actions to handlers and tokens to payloads"""
+
+    def __init__(self, maxsize: int = CALLBACK_REGISTRY_SIZE, ttl: float = CALLBACK_TOKEN_TTL):
+        self._payloads = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._routes: Dict[str, Tuple[Callable, bool]] = {}
+
+    def route(self, action: str, payload: bool = False):
+        """Register handler(call) for action, or handler(call, payload) for tokenized buttons"""
+        if ":" in action:
+            raise ValueError(f"Callback action ':' belgisiz bo'lishi kerak: {action}")
+
+        def register(handler):
+            self._routes[action] = (handler, payload)
+            return handler
+        return register
+
+    def data(self, action: str, payload: Any = None) -> str:
+        """callback_data for a button whose payload is kept server-side"""
+        token = secrets.token_urlsafe(6)
+        data = f"{action}:{token}"
+        if len(data.encode()) > MAX_CALLBACK_DATA:
+            raise ValueError(f"callback_data juda uzun: {data}")
+        self._payloads.set(token, payload)
+        return data
+
+    def dispatch(self, call) -> bool:
+        """Run the handler for call.data; False when unknown or its payload expired"""
+        action, _, rest = (call.data or "").partition(":")
+        route = self._routes.get(action)
+        if route is None:
+            return False
+
+        handler, tokenized = route
+        if not tokenized:
+            handler(call)
+            return True
+
+        payload = self._payloads.get(rest, _MISSING)
+        if payload is _MISSING:
+            return False
+        handler(call, payload)
+        return True
+
+    def actions(self):
+        """Registered action names"""
+        return list(self._routes)
+
+    def __len__(self) -> int:
+        return len(self._payloads)
@@ -24,3 +24,63 @@ EMPLOYEES = {
 REPORTS_DIR = "reports"
 MEDIA_DIR = "media"
 EXCEL_FILE = "tasks_report.xlsx"
+
+# Website API configuration
+INQUIRY_STATUS_CACHE_SIZE = 1024
+INQUIRY_STATUS_CACHE_TTL = 10  # seconds; bounds staleness when another process responds
+INQUIRY_LONG_POLL_TIMEOUT = 25  # seconds
+INQUIRY_FEED_POLL_INTERVAL = 2  # seconds between feed checks for writes from other processes
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")  # required for the admin inquiry feed
+
+# Scheduler configuration
+DEBT_REMINDER_HOUR = 9  # local hour on the due date when debtors are reminded
+ADMIN_DIGEST_HOUR = 9  # local hour of the daily due-debts digest to the admin
+
+# Notification fan-out
+SENDER_POOL_SIZE = 8  # concurrent Telegram sends when notifying many employees
+
+# Message templates
+DEFAULT_LOCALE = "uz"  # "uz" or "ru"; users whose Telegram language is Russian get "ru"
+
+# Admin notification digests
+ADMIN_BATCH_WINDOW = 60  # seconds routine admin notifications are buffered; 0 sends each at once
+ADMIN_BATCH_SIZE = 20  # a kind's digest is sent early once this many events are buffered
+
+# Inline button callbacks
+CALLBACK_REGISTRY_SIZE = 20000  # button payloads kept server-side
+CALLBACK_TOKEN_TTL = 86400  # seconds a tokenized button keeps working
+
+# Offline routing (build the graph with: python routing.py build extract.osm data/roads.graph)
+ROUTING_GRAPH_FILE = os.getenv("ROUTING_GRAPH_FILE", "data/roads.graph")
+ROUTING_WALK_SPEED_KMH = 5
+ROUTING_FALLBACK_SPEED_KMH = 25  # average city speed when no graph is available
+ROUTING_DETOUR_FACTOR = 1.3  # road distance / straight-line distance without a graph
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+LOG_QUEUE_SIZE = 10000  # records buffered for the writer thread; more are dropped, not waited on
+LOG_SAMPLE_EVERY = 100  # one in this many high-frequency records (e.g. every location update) is written
+
+# Sampling profiler (admin: "🔬 Profiler" button or /profile [seconds])
+PROFILER_INTERVAL = 0.01  # seconds between stack samples
+PROFILER_MAX_OVERHEAD = 0.02  # sampling may take at most this fraction of wall time
+PROFILER_DEFAULT_SECONDS = 30
+PROFILER_MAX_SECONDS = 600
+
+# SQLite query log (admin report: "📊 Ma'lumotlar" -> "🐢 Sekin so'rovlar")
+SLOW_QUERY_MS = 100  # statements slower than this are logged with parameters and query plan
+QUERY_STATS_SIZE = 500  # distinct normalized statements kept in the report
+
+# HTTP front end: /health, /metrics, the website API and the Telegram webhook share one port
+HTTP_PORT = int(os.getenv("PORT", "8080"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL; when set, updates arrive on /webhook/<BOT_TOKEN> instead of polling
+
+# Shutdown and restarts (SIGTERM/SIGINT drain, see lifecycle.py)
+SHUTDOWN_DRAIN_TIMEOUT = 20  # seconds to finish taken updates and flush queues; platforms SIGKILL after ~30
+RESTART_DELAY = 10  # seconds before polling restarts after a crash; doubles while crashes repeat
+RESTART_MAX_DELAY = 300
+
+# Update de-duplication (see dedup.py)
+UPDATE_DEDUP_SIZE = 10000  # recent update IDs answered from memory
+UPDATE_DEDUP_RETENTION = 2 * 86400  # seconds update IDs are kept in SQLite; Telegram redelivers for 24 h
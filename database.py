@@ -1,13 +1,103 @@
 import sqlite3
 import os
 import json
+import hashlib
+import threading
+import time
 from datetime import datetime
-from typing import List, Tuple, Optional, Dict, Any
-from config import DATABASE_PATH
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from config import (
+    DATABASE_PATH, INQUIRY_STATUS_CACHE_SIZE, INQUIRY_STATUS_CACHE_TTL, INQUIRY_FEED_POLL_INTERVAL
+)
+from cache import LRUCache
+
+_query_observers = ()
+
+def add_query_observer(observer):
+    """Call observer(sql, parameters, seconds, conn) after every statement run on a backend connection"""
+    global _query_observers
+    if observer not in _query_observers:
+        _query_observers = _query_observers + (observer,)
+
+def remove_query_observer(observer):
+    global _query_observers
+    _query_observers = tuple(o for o in _query_observers if o != observer)
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's execution time to the query observers"""
+    
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            for observer in _query_observers:
+                observer(sql, parameters, elapsed, self.connection)
+    
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            for observer in _query_observers:
+                observer(sql, seq_of_parameters[0] if seq_of_parameters else (), elapsed, self.connection)
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors are TimedCursor"""
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+class SQLiteBackend:
+    """File-backed SQLite store; defaults to DATABASE_PATH"""
+    
+    def __init__(self, path: str = None):
+        self.path = path
+    
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path or DATABASE_PATH, factory=TimedConnection)
+
+class MemoryBackend:
+    """Shared in-memory SQLite store that lives as long as this object (tests, benchmarks)"""
+    
+    def __init__(self, name: str = None):
+        self.uri = f"file:{name or f'memdb{id(self)}'}?mode=memory&cache=shared"
+        # The database is dropped when its last connection closes
+        self._keepalive = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+    
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.uri, uri=True, factory=TimedConnection)
+    
+    def close(self):
+        self._keepalive.close()
+
+_backend = SQLiteBackend()
+
+def set_backend(backend):
+    """Route every repository function to another storage backend"""
+    global _backend
+    _backend = backend
+
+def get_connection() -> sqlite3.Connection:
+    """Open a connection to the configured storage backend"""
+    return _backend.connect()
+
+# Public inquiry status, keyed by inquiry ID (see get_inquiry_status)
+_inquiry_status_cache = LRUCache(maxsize=INQUIRY_STATUS_CACHE_SIZE, ttl=INQUIRY_STATUS_CACHE_TTL)
+
+# Signalled whenever an inquiry is created or answered in this process
+_inquiries_changed = threading.Condition()
+_inquiries_generation = 0
 
 def init_database():
     """Initialize the database with all required tables"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Tasks table
@@ -106,31 +196,297 @@ def init_database():
         )
     """)
     
+    # Inquiry change feed: one row per inquiry, re-numbered on every change,
+    # so "version > cursor" yields exactly the inquiries created or updated since
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inquiry_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            inquiry_id INTEGER NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS inquiry_changes_on_insert
+        AFTER INSERT ON customer_inquiries
+        BEGIN
+            INSERT OR REPLACE INTO inquiry_changes (inquiry_id) VALUES (NEW.id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS inquiry_changes_on_update
+        AFTER UPDATE ON customer_inquiries
+        BEGIN
+            INSERT OR REPLACE INTO inquiry_changes (inquiry_id) VALUES (NEW.id);
+        END
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO inquiry_changes (inquiry_id)
+        SELECT id FROM customer_inquiries ORDER BY id
+    """)
+    
+    # Debt ledger: signed entries (charge > 0, payment/writeoff < 0) plus a
+    # running balance per debtor kept in step with them in the same transaction
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS debt_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            debt_id INTEGER NOT NULL,
+            debtor TEXT NOT NULL,
+            entry_type TEXT NOT NULL CHECK (entry_type IN ('charge', 'payment', 'writeoff')),
+            amount REAL NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_debt_ledger_debt ON debt_ledger (debt_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS debtor_balances (
+            debtor TEXT PRIMARY KEY,
+            balance REAL NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Debts created before the ledger existed get their entries once
+    cursor.execute("""
+        INSERT INTO debt_ledger (debt_id, debtor, entry_type, amount, created_at)
+        SELECT id, employee_name, 'charge', amount, created_at FROM debts
+        WHERE id NOT IN (SELECT debt_id FROM debt_ledger)
+    """)
+    backfilled = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO debt_ledger (debt_id, debtor, entry_type, amount, created_at)
+        SELECT d.id, d.employee_name, 'payment', -d.amount, d.created_at FROM debts d
+        WHERE d.status = 'paid'
+          AND NOT EXISTS (SELECT 1 FROM debt_ledger l WHERE l.debt_id = d.id AND l.entry_type != 'charge')
+    """)
+    if backfilled or cursor.rowcount:
+        _rebuild_debtor_balances(cursor)
+    
+    # Persistent one-shot jobs for the scheduler (see scheduler.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            ref_id INTEGER,
+            run_at REAL NOT NULL,
+            payload TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            fired_at TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_pending ON scheduled_jobs (status, run_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_ref ON scheduled_jobs (kind, ref_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_due ON scheduled_jobs (kind, run_at)")
+    
+    # Multi-assignee tasks: one parent row, one tasks row per employee
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS task_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            description TEXT NOT NULL,
+            location_lat REAL,
+            location_lon REAL,
+            location_address TEXT,
+            payment_amount REAL DEFAULT NULL,
+            assigned_by INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS task_assignments (
+            task_id INTEGER PRIMARY KEY,
+            group_id INTEGER NOT NULL,
+            employee TEXT NOT NULL,
+            FOREIGN KEY (task_id) REFERENCES tasks (id),
+            FOREIGN KEY (group_id) REFERENCES task_groups (id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_assignments_group ON task_assignments (group_id)")
+    
+    # Append-only log of task sends; the topshiriqlar spreadsheet is built from it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS task_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            logged_at TEXT NOT NULL,
+            description TEXT NOT NULL,
+            location TEXT,
+            employees TEXT,
+            payment TEXT,
+            status TEXT
+        )
+    """)
+    
+    # Rows merged in from the legacy stores by migrate_storage.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS legacy_imports (
+            source TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            target_table TEXT NOT NULL,
+            target_id INTEGER NOT NULL,
+            imported_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, source_id)
+        )
+    """)
+    
+    # Telegram update IDs already dispatched (see dedup.py); pruned by age
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS processed_updates (
+            update_id INTEGER PRIMARY KEY,
+            processed_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_processed_updates_age ON processed_updates (processed_at)")
+    
+    # Rows created by a state-changing write, by the idempotency key of the request behind it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            result_id INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Indexes backing the keyset-paginated listings
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_inquiries_source ON customer_inquiries (source, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_debts_status ON debts (status, id)")
+    
+    # Last known location per employee (routing ETAs)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employee_locations_employee ON employee_locations (employee_name, id)")
+    
     conn.commit()
     conn.close()
 
+def claim_updates(update_ids: List[int], now: float) -> List[int]:
+    """Record Telegram updates as dispatched in one transaction; returns the ones not recorded before"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        update_ids = list(dict.fromkeys(update_ids))
+        cursor.execute(f"""
+            SELECT update_id FROM processed_updates WHERE update_id IN ({",".join("?" * len(update_ids))})
+        """, update_ids)
+        seen = {row[0] for row in cursor.fetchall()}
+        claimed = [update_id for update_id in update_ids if update_id not in seen]
+        cursor.executemany("INSERT INTO processed_updates (update_id, processed_at) VALUES (?, ?)",
+                           [(update_id, now) for update_id in claimed])
+        conn.commit()
+        return claimed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def release_update(update_id: int):
+    """Forget a claimed update, so its redelivery is processed"""
+    conn = get_connection()
+    conn.execute("DELETE FROM processed_updates WHERE update_id = ?", (update_id,))
+    conn.commit()
+    conn.close()
+
+def prune_processed_updates(before: float) -> int:
+    """Drop update IDs recorded before the given time; returns how many"""
+    conn = get_connection()
+    cursor = conn.execute("DELETE FROM processed_updates WHERE processed_at < ?", (before,))
+    conn.commit()
+    conn.close()
+    return cursor.rowcount
+
+def _idempotent_result(cursor, key: Optional[str]) -> Optional[int]:
+    """Take the write lock; the ID an earlier write under key created, if any"""
+    cursor.execute("BEGIN IMMEDIATE")
+    if key is None:
+        return None
+    cursor.execute("SELECT result_id FROM idempotency_keys WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def _remember_result(cursor, key: Optional[str], result_id: int):
+    if key is not None:
+        cursor.execute("INSERT INTO idempotency_keys (key, result_id) VALUES (?, ?)", (key, result_id))
+
 def add_task(description: str, location_lat: float, location_lon: float, 
              location_address: Optional[str], payment_amount: Optional[float], 
-             assigned_to: str, assigned_by: int) -> int:
-    """Add a new task and return task ID"""
-    conn = sqlite3.connect(DATABASE_PATH)
+             assigned_to: str, assigned_by: int, idempotency_key: str = None) -> int:
+    """Add a new task and return task ID; a repeated idempotency_key returns the first task's ID"""
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO tasks (description, location_lat, location_lon, location_address, 
-                          payment_amount, assigned_to, assigned_by)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (description, location_lat, location_lon, location_address, 
-          payment_amount, assigned_to, assigned_by))
-    
-    task_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    try:
+        task_id = _idempotent_result(cursor, idempotency_key)
+        if task_id is None:
+            cursor.execute("""
+                INSERT INTO tasks (description, location_lat, location_lon, location_address, 
+                                  payment_amount, assigned_to, assigned_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (description, location_lat, location_lon, location_address, 
+                  payment_amount, assigned_to, assigned_by))
+            task_id = cursor.lastrowid
+            _remember_result(cursor, idempotency_key, task_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
     return task_id or 0
 
+def add_task_group(description: str, location_lat: float, location_lon: float,
+                   location_address: Optional[str], payment_amount: Optional[float],
+                   employees: List[str], assigned_by: int,
+                   idempotency_key: str = None) -> Tuple[int, Dict[str, int]]:
+    """Assign one task to many employees in a single transaction.
+    
+    Returns (group_id, {employee: task_id}); each employee gets an ordinary
+    tasks row, so the per-employee task flows work unchanged. A repeated
+    idempotency_key returns the first call's group without creating tasks.
+    """
+    employees = list(dict.fromkeys(employees))
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Hold the write lock from the start so the new task IDs are contiguous
+        group_id = _idempotent_result(cursor, idempotency_key)
+        if group_id is not None:
+            cursor.execute("SELECT employee, task_id FROM task_assignments WHERE group_id = ? ORDER BY task_id",
+                           (group_id,))
+            task_ids = dict(cursor.fetchall())
+            conn.commit()
+            return group_id, task_ids
+        cursor.execute("""
+            INSERT INTO task_groups (description, location_lat, location_lon, location_address,
+                                    payment_amount, assigned_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (description, location_lat, location_lon, location_address, payment_amount, assigned_by))
+        group_id = cursor.lastrowid
+        
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM tasks")
+        last_task_id = cursor.fetchone()[0]
+        cursor.executemany("""
+            INSERT INTO tasks (description, location_lat, location_lon, location_address, 
+                              payment_amount, assigned_to, assigned_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(description, location_lat, location_lon, location_address,
+               payment_amount, employee, assigned_by) for employee in employees])
+        
+        cursor.execute("SELECT id, assigned_to FROM tasks WHERE id > ? ORDER BY id", (last_task_id,))
+        task_ids = {employee: task_id for task_id, employee in cursor.fetchall()}
+        cursor.executemany("""
+            INSERT INTO task_assignments (task_id, group_id, employee) VALUES (?, ?, ?)
+        """, [(task_id, group_id, employee) for employee, task_id in task_ids.items()])
+        _remember_result(cursor, idempotency_key, group_id)
+        
+        conn.commit()
+        return group_id, task_ids
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 def get_employee_tasks(employee_name: str, status: str = None) -> List[Tuple]:
     """Get tasks for a specific employee"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     if status:
@@ -151,9 +507,13 @@ def get_employee_tasks(employee_name: str, status: str = None) -> List[Tuple]:
     return tasks
 
 def update_task_status(task_id: int, status: str, completion_report: str = None,
-                      completion_media: str = None, received_amount: float = None):
-    """Update task status and completion details"""
-    conn = sqlite3.connect(DATABASE_PATH)
+                      completion_media: str = None, received_amount: float = None) -> bool:
+    """Update task status and completion details.
+    
+    Returns False when the task is missing or already has this status, so a
+    repeated completion changes nothing and its caller can skip the follow-ups.
+    """
+    conn = get_connection()
     cursor = conn.cursor()
     
     update_fields = ["status = ?"]
@@ -178,31 +538,66 @@ def update_task_status(task_id: int, status: str, completion_report: str = None,
             update_fields.append("received_amount = ?")
             values.append(received_amount)
     
-    values.append(task_id)
+    values.extend([task_id, status])
     
-    query = f"UPDATE tasks SET {', '.join(update_fields)} WHERE id = ?"
+    query = f"UPDATE tasks SET {', '.join(update_fields)} WHERE id = ? AND status IS NOT ?"
     cursor.execute(query, values)
+    changed = cursor.rowcount > 0
     
     conn.commit()
     conn.close()
+    return changed
+
+def _post_ledger_entry(cursor, debt_id: int, debtor: str, entry_type: str, amount: float):
+    """Append a ledger entry and move the debtor's running balance by the same amount"""
+    cursor.execute("""
+        INSERT INTO debt_ledger (debt_id, debtor, entry_type, amount) VALUES (?, ?, ?, ?)
+    """, (debt_id, debtor, entry_type, amount))
+    cursor.execute("""
+        INSERT INTO debtor_balances (debtor, balance, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT (debtor) DO UPDATE SET
+            balance = balance + excluded.balance,
+            updated_at = excluded.updated_at
+    """, (debtor, amount, datetime.now().isoformat()))
+
+def _rebuild_debtor_balances(cursor):
+    """Recompute every debtor balance from the ledger"""
+    cursor.execute("DELETE FROM debtor_balances")
+    cursor.execute("""
+        INSERT INTO debtor_balances (debtor, balance, updated_at)
+        SELECT debtor, SUM(amount), ? FROM debt_ledger GROUP BY debtor
+    """, (datetime.now().isoformat(),))
 
 def add_debt(employee_name: str, employee_chat_id: int, task_id: Optional[int],
-            amount: float, reason: str, payment_date: str):
-    """Add a debt record"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+            amount: float, reason: str, payment_date: str, idempotency_key: str = None) -> int:
+    """Add a debt record and its ledger charge; returns the debt ID.
     
-    cursor.execute("""
-        INSERT INTO debts (employee_name, employee_chat_id, task_id, amount, reason, payment_date)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (employee_name, employee_chat_id, task_id, amount, reason, payment_date))
+    A repeated idempotency_key returns the first debt's ID and charges nothing.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
     
-    conn.commit()
-    conn.close()
+    try:
+        debt_id = _idempotent_result(cursor, idempotency_key)
+        if debt_id is None:
+            cursor.execute("""
+                INSERT INTO debts (employee_name, employee_chat_id, task_id, amount, reason, payment_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (employee_name, employee_chat_id, task_id, amount, reason, payment_date))
+            debt_id = cursor.lastrowid
+            _post_ledger_entry(cursor, debt_id, employee_name, 'charge', amount)
+            _remember_result(cursor, idempotency_key, debt_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return debt_id
 
 def get_debts(employee_name: str = None) -> List[Tuple]:
     """Get debt records"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     if employee_name:
@@ -222,10 +617,342 @@ def get_debts(employee_name: str = None) -> List[Tuple]:
     conn.close()
     return debts
 
+def _keyset_page(cursor, base_query: str, params: list, before_id: int = None,
+                 after_id: int = None, limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Run an id-ordered keyset query; returns (rows newest first, has_more)"""
+    conditions = []
+    if before_id is not None:
+        conditions.append("id < ?")
+        params.append(before_id)
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+    
+    query = base_query
+    if conditions:
+        query += (" AND " if " WHERE " in query else " WHERE ") + " AND ".join(conditions)
+    
+    # Walking towards newer rows reads ascending, then flips back
+    query += " ORDER BY id ASC" if after_id is not None else " ORDER BY id DESC"
+    query += " LIMIT ?"
+    params.append(limit + 1)
+    
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after_id is not None:
+        rows.reverse()
+    return rows, has_more
+
+def get_debts_page(before_id: int = None, after_id: int = None, limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Get one page of unpaid debts, newest first.
+    
+    Pass the smallest ID of the current page as before_id for the next (older)
+    page or the largest as after_id for the previous one. has_more tells whether
+    further rows exist in the direction of travel.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    page = _keyset_page(cursor, "SELECT * FROM debts WHERE status = 'unpaid'", [],
+                        before_id, after_id, limit)
+    conn.close()
+    return page
+
+def get_debt_by_id(debt_id: int) -> Optional[Tuple]:
+    """Get a single debt record"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM debts WHERE id = ?", (debt_id,))
+    debt = cursor.fetchone()
+    conn.close()
+    return debt
+
+def _debt_outstanding(cursor, debt_id: int) -> float:
+    cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM debt_ledger WHERE debt_id = ?", (debt_id,))
+    return cursor.fetchone()[0]
+
+def get_debt_outstanding(debt_id: int) -> float:
+    """Amount still owed on a single debt"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    outstanding = _debt_outstanding(cursor, debt_id)
+    conn.close()
+    return outstanding
+
+def get_debts_outstanding(debt_ids: List[int]) -> Dict[int, float]:
+    """Amount still owed on each of the given debts"""
+    if not debt_ids:
+        return {}
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    placeholders = ", ".join("?" * len(debt_ids))
+    cursor.execute(f"""
+        SELECT debt_id, SUM(amount) FROM debt_ledger
+        WHERE debt_id IN ({placeholders}) GROUP BY debt_id
+    """, list(debt_ids))
+    
+    outstanding = dict(cursor.fetchall())
+    conn.close()
+    return outstanding
+
+def record_debt_payment(debt_id: int, amount: float = None) -> Optional[Dict[str, Any]]:
+    """Record a full (amount=None) or partial payment against a debt.
+    
+    The debt is marked paid once nothing is left on it. Returns None if the
+    debt does not exist; raises ValueError for amounts outside (0, outstanding].
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Under the write lock, so concurrent payments cannot both pass the balance check
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            SELECT employee_name, employee_chat_id, amount, reason 
+            FROM debts WHERE id = ?
+        """, (debt_id,))
+        debt_info = cursor.fetchone()
+        if not debt_info:
+            conn.rollback()
+            return None
+        
+        employee_name, employee_chat_id, debt_amount, reason = debt_info
+        outstanding = _debt_outstanding(cursor, debt_id)
+        paid = outstanding if amount is None else amount
+        
+        if amount is not None and not 0 < amount <= outstanding:
+            raise ValueError(f"To'lov miqdori 0 dan katta va {outstanding:,.0f} so'mdan oshmasligi kerak")
+        
+        if paid > 0:
+            _post_ledger_entry(cursor, debt_id, employee_name, 'payment', -paid)
+        
+        remaining = outstanding - paid
+        if remaining <= 0:
+            cursor.execute("UPDATE debts SET status = 'paid' WHERE id = ?", (debt_id,))
+        
+        conn.commit()
+        return {
+            "employee_name": employee_name,
+            "employee_chat_id": employee_chat_id,
+            "amount": debt_amount,
+            "reason": reason,
+            "paid": paid,
+            "remaining": remaining
+        }
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def mark_debt_paid(debt_id: int) -> Optional[Tuple]:
+    """Settle a debt in full; returns (employee_name, employee_chat_id, amount, reason)"""
+    payment = record_debt_payment(debt_id)
+    if not payment:
+        return None
+    return payment["employee_name"], payment["employee_chat_id"], payment["amount"], payment["reason"]
+
+def delete_debt(debt_id: int) -> Optional[Tuple]:
+    """Delete a debt, writing off what is left; returns (employee_name, amount, reason)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT employee_name, amount, reason 
+        FROM debts WHERE id = ?
+    """, (debt_id,))
+    
+    debt_info = cursor.fetchone()
+    if debt_info:
+        outstanding = _debt_outstanding(cursor, debt_id)
+        if outstanding:
+            _post_ledger_entry(cursor, debt_id, debt_info[0], 'writeoff', -outstanding)
+        cursor.execute("DELETE FROM debts WHERE id = ?", (debt_id,))
+        conn.commit()
+    
+    conn.close()
+    return debt_info
+
+def get_debtor_balance(debtor: str) -> float:
+    """Current balance owed by a debtor"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT balance FROM debtor_balances WHERE debtor = ?", (debtor,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else 0.0
+
+def get_total_outstanding_debt() -> float:
+    """Total owed across all debtors"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(SUM(balance), 0) FROM debtor_balances")
+    total = cursor.fetchone()[0]
+    conn.close()
+    return total
+
+def reconcile_debt_ledger(fix: bool = True) -> List[Tuple[str, float, float]]:
+    """Check debtor balances against the ledger.
+    
+    Returns (debtor, stored_balance, ledger_balance) for every mismatch and,
+    with fix=True, rebuilds the balances from the ledger.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT debtor, stored, expected FROM (
+            SELECT b.debtor, b.balance AS stored, COALESCE(l.total, 0) AS expected
+            FROM debtor_balances b
+            LEFT JOIN (SELECT debtor, SUM(amount) AS total FROM debt_ledger GROUP BY debtor) l
+                ON l.debtor = b.debtor
+            UNION ALL
+            SELECT l.debtor, 0, l.total
+            FROM (SELECT debtor, SUM(amount) AS total FROM debt_ledger GROUP BY debtor) l
+            WHERE l.debtor NOT IN (SELECT debtor FROM debtor_balances)
+        )
+        WHERE ABS(stored - expected) > 0.005
+    """)
+    mismatches = cursor.fetchall()
+    
+    if mismatches and fix:
+        _rebuild_debtor_balances(cursor)
+        conn.commit()
+    
+    conn.close()
+    return mismatches
+
+def add_scheduled_job(kind: str, run_at: float, ref_id: int = None, payload: Dict[str, Any] = None) -> int:
+    """Persist a pending job; run_at is a Unix timestamp"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        INSERT INTO scheduled_jobs (kind, ref_id, run_at, payload) VALUES (?, ?, ?, ?)
+    """, (kind, ref_id, run_at, json.dumps(payload) if payload is not None else None))
+    job_id = cursor.lastrowid
+    
+    conn.commit()
+    conn.close()
+    return job_id
+
+def get_pending_jobs() -> List[Tuple]:
+    """Get (id, kind, ref_id, run_at, payload) of every pending job"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id, kind, ref_id, run_at, payload FROM scheduled_jobs
+        WHERE status = 'pending' ORDER BY run_at
+    """)
+    
+    jobs = [(job_id, kind, ref_id, run_at, json.loads(payload) if payload else None)
+            for job_id, kind, ref_id, run_at, payload in cursor.fetchall()]
+    conn.close()
+    return jobs
+
+def claim_scheduled_jobs(job_ids: List[int]) -> List[int]:
+    """Move pending jobs to 'sent' and return the IDs this caller won.
+    
+    Jobs are claimed before they run, so a restart (or a second process)
+    never fires the same job twice.
+    """
+    if not job_ids:
+        return []
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    fired_at = datetime.now().isoformat()
+    claimed = []
+    for job_id in job_ids:
+        cursor.execute("""
+            UPDATE scheduled_jobs SET status = 'sent', fired_at = ?
+            WHERE id = ? AND status = 'pending'
+        """, (fired_at, job_id))
+        if cursor.rowcount:
+            claimed.append(job_id)
+    
+    conn.commit()
+    conn.close()
+    return claimed
+
+def cancel_scheduled_jobs(kind: str, ref_id: int) -> List[int]:
+    """Cancel pending jobs of a kind for one referenced row; returns their IDs"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id FROM scheduled_jobs WHERE kind = ? AND ref_id = ? AND status = 'pending'
+    """, (kind, ref_id))
+    job_ids = [row[0] for row in cursor.fetchall()]
+    
+    if job_ids:
+        cursor.execute("""
+            UPDATE scheduled_jobs SET status = 'cancelled'
+            WHERE kind = ? AND ref_id = ? AND status = 'pending'
+        """, (kind, ref_id))
+        conn.commit()
+    
+    conn.close()
+    return job_ids
+
+def has_pending_job(kind: str) -> bool:
+    """Check whether any job of this kind is still pending"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT 1 FROM scheduled_jobs WHERE kind = ? AND status = 'pending' LIMIT 1
+    """, (kind,))
+    found = cursor.fetchone() is not None
+    
+    conn.close()
+    return found
+
+def get_unscheduled_debts(kind: str) -> List[Tuple]:
+    """Unpaid debts that have never had a job of this kind; returns (id, payment_date)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT d.id, d.payment_date FROM debts d
+        WHERE d.status = 'unpaid'
+          AND NOT EXISTS (SELECT 1 FROM scheduled_jobs j WHERE j.kind = ? AND j.ref_id = d.id)
+    """, (kind,))
+    
+    debts = cursor.fetchall()
+    conn.close()
+    return debts
+
+def get_due_debts(kind: str, until: float) -> List[Tuple]:
+    """Unpaid debts whose job of this kind is due by `until` (Unix timestamp).
+    
+    payment_date is free text, so due dates come from the parsed run_at of
+    each debt's reminder job rather than from the debts table itself.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT d.* FROM scheduled_jobs j
+        JOIN debts d ON d.id = j.ref_id
+        WHERE j.kind = ? AND j.run_at <= ? AND j.status != 'cancelled' AND d.status = 'unpaid'
+        ORDER BY j.run_at
+    """, (kind, until))
+    
+    debts = cursor.fetchall()
+    conn.close()
+    return debts
+
 def add_message(from_chat_id: int, to_chat_id: int, message_text: str,
                message_type: str = "general", task_id: Optional[int] = None):
     """Add a message record"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -236,22 +963,80 @@ def add_message(from_chat_id: int, to_chat_id: int, message_text: str,
     conn.commit()
     conn.close()
 
-def set_user_state(chat_id: int, state: str, state_data: str = None):
-    """Set user conversation state"""
-    conn = sqlite3.connect(DATABASE_PATH)
+class UserState(NamedTuple):
+    """A conversation step and the data its wizard has collected so far"""
+    state: str
+    data: Dict[str, Any]
+
+# state_data is a format byte and compact JSON of the data dict. JSON reads the
+# same on every Python version; values it has no type for are stored as text
+STATE_DATA_FORMAT = b"\x01"
+
+def _encode_state_data(data: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    if not data:
+        return None
+    return STATE_DATA_FORMAT + json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+def _decode_state_data(raw) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    try:
+        if isinstance(raw, bytes) and raw[:1] == STATE_DATA_FORMAT:
+            raw = raw[1:]
+        # Rows written before the format byte hold plain JSON text
+        data = json.loads(raw)
+    except (ValueError, TypeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def set_user_state(chat_id: int, state: str, data: Dict[str, Any] = None):
+    """Start a conversation step, replacing any data collected before"""
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
         INSERT OR REPLACE INTO user_states (chat_id, state, state_data, updated_at)
         VALUES (?, ?, ?, ?)
-    """, (chat_id, state, state_data, datetime.now().isoformat()))
+    """, (chat_id, state, _encode_state_data(data), datetime.now().isoformat()))
     
     conn.commit()
     conn.close()
 
-def get_user_state(chat_id: int) -> Tuple[str, str]:
-    """Get user conversation state"""
-    conn = sqlite3.connect(DATABASE_PATH)
+def update_user_state(chat_id: int, state: str, merge: Callable[[Dict[str, Any]], None] = None,
+                      **changes) -> Dict[str, Any]:
+    """Move to the next step, merging changes into the collected data; returns the data as stored.
+
+    merge(data), if given, then edits the data in place (e.g. appends to a
+    list). The read and the write share one transaction under the write
+    lock, so workers in other processes cannot interleave with the merge.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT state_data FROM user_states WHERE chat_id = ?", (chat_id,))
+        row = cursor.fetchone()
+        data = _decode_state_data(row[0] if row else None)
+        data.update(changes)
+        if merge is not None:
+            merge(data)
+        encoded = _encode_state_data(data)
+        cursor.execute("""
+            INSERT OR REPLACE INTO user_states (chat_id, state, state_data, updated_at)
+            VALUES (?, ?, ?, ?)
+        """, (chat_id, state, encoded, datetime.now().isoformat()))
+        conn.commit()
+        # What get_user_state will read back, e.g. datetimes as text
+        return _decode_state_data(encoded)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_user_state(chat_id: int) -> UserState:
+    """Get user conversation state; ("", {}) outside a conversation"""
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -262,12 +1047,12 @@ def get_user_state(chat_id: int) -> Tuple[str, str]:
     conn.close()
     
     if result:
-        return result[0], result[1] or ""
-    return "", ""
+        return UserState(result[0], _decode_state_data(result[1]))
+    return UserState("", {})
 
 def clear_user_state(chat_id: int):
     """Clear user conversation state"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("DELETE FROM user_states WHERE chat_id = ?", (chat_id,))
@@ -277,7 +1062,7 @@ def clear_user_state(chat_id: int):
 
 def get_task_statistics() -> Dict[str, Any]:
     """Get task statistics for reporting"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Total tasks
@@ -295,8 +1080,8 @@ def get_task_statistics() -> Dict[str, Any]:
     total_payments = cursor.fetchone()[0] or 0
     
     # Total debts
-    cursor.execute("SELECT SUM(amount) FROM debts WHERE status = 'unpaid'")
-    total_debts = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COALESCE(SUM(balance), 0) FROM debtor_balances")
+    total_debts = cursor.fetchone()[0]
     
     conn.close()
     
@@ -312,7 +1097,7 @@ def add_customer_inquiry(customer_name: str, inquiry_text: str, customer_phone:
                         location_lon: float = None, location_address: str = None, 
                         inquiry_type: str = 'bot', source: str = 'telegram') -> int:
     """Add a new customer inquiry"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO customer_inquiries 
@@ -324,11 +1109,13 @@ def add_customer_inquiry(customer_name: str, inquiry_text: str, customer_phone:
     inquiry_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    
+    _notify_inquiry_change()
     return inquiry_id
 
 def get_customer_inquiries(status: str = None, source: str = None) -> List[Tuple]:
     """Get customer inquiries with optional filtering"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     query = "SELECT * FROM customer_inquiries"
@@ -353,9 +1140,135 @@ def get_customer_inquiries(status: str = None, source: str = None) -> List[Tuple
     conn.close()
     return inquiries
 
+def get_customer_inquiries_page(source: str = None, before_id: int = None, after_id: int = None,
+                                limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Get one page of customer inquiries, newest first (see get_debts_page)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    query = "SELECT * FROM customer_inquiries"
+    params = []
+    if source:
+        query += " WHERE source = ?"
+        params.append(source)
+    
+    page = _keyset_page(cursor, query, params, before_id, after_id, limit)
+    conn.close()
+    return page
+
+def search_tasks_page(query: str, before_id: int = None, after_id: int = None,
+                      limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Page through tasks whose ID, description or assignee matches query (see get_debts_page)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    pattern = f"%{query}%"
+    page = _keyset_page(cursor, """
+        SELECT id, description, assigned_to, status, created_at, payment_amount FROM tasks
+        WHERE (CAST(id AS TEXT) LIKE ? OR description LIKE ? OR assigned_to LIKE ?)
+    """, [pattern, pattern, pattern], before_id, after_id, limit)
+    conn.close()
+    return page
+
+def search_debts_page(query: str, before_id: int = None, after_id: int = None,
+                      limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Page through debts whose debtor or reason matches query"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    pattern = f"%{query}%"
+    page = _keyset_page(cursor, """
+        SELECT id, employee_name, amount, reason, payment_date, created_at FROM debts
+        WHERE (employee_name LIKE ? OR reason LIKE ?)
+    """, [pattern, pattern], before_id, after_id, limit)
+    conn.close()
+    return page
+
+def get_location_history_page(before_id: int = None, after_id: int = None,
+                              limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Page through employee locations from the last 24 hours"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    page = _keyset_page(cursor, """
+        SELECT id, employee_name, latitude, longitude, created_at, location_type
+        FROM employee_locations WHERE created_at > datetime('now', '-1 day')
+    """, [], before_id, after_id, limit)
+    conn.close()
+    return page
+
+def get_latest_employee_locations(employee_name: str = None) -> List[Tuple]:
+    """Last known (employee_name, latitude, longitude, created_at) of every employee, or of one"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    if employee_name:
+        cursor.execute("""
+            SELECT employee_name, latitude, longitude, created_at FROM employee_locations
+            WHERE employee_name = ? ORDER BY id DESC LIMIT 1
+        """, (employee_name,))
+    else:
+        cursor.execute("""
+            SELECT employee_name, latitude, longitude, created_at FROM employee_locations
+            WHERE id IN (SELECT MAX(id) FROM employee_locations GROUP BY employee_name)
+            ORDER BY employee_name
+        """)
+    locations = cursor.fetchall()
+    conn.close()
+    return locations
+
+def get_customer_messages_page(to_chat_id: int, since: str, before_id: int = None,
+                               after_id: int = None, limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Page through customer messages sent to a chat since a timestamp"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    page = _keyset_page(cursor, """
+        SELECT id, from_chat_id, message_text, created_at FROM messages
+        WHERE to_chat_id = ? AND message_type IN ('customer_message', 'customer_start') AND created_at > ?
+    """, [to_chat_id, since], before_id, after_id, limit)
+    conn.close()
+    return page
+
+def _completed_tasks_filter(employee_name: str, since: str = None, paid_only: bool = False) -> Tuple[str, list]:
+    query = " WHERE assigned_to = ? AND status = 'completed'"
+    params = [employee_name]
+    if since:
+        query += " AND created_at >= ?"
+        params.append(since)
+    if paid_only:
+        query += " AND received_amount > 0"
+    return query, params
+
+def get_completed_tasks_page(employee_name: str, since: str = None, paid_only: bool = False,
+                             before_id: int = None, after_id: int = None,
+                             limit: int = 10) -> Tuple[List[Tuple], bool]:
+    """Page through an employee's completed tasks, optionally since a date or paid only"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    where, params = _completed_tasks_filter(employee_name, since, paid_only)
+    page = _keyset_page(cursor, """
+        SELECT id, description, created_at, completion_report, received_amount FROM tasks
+    """ + where, params, before_id, after_id, limit)
+    conn.close()
+    return page
+
+def get_completed_tasks_summary(employee_name: str, since: str = None,
+                                paid_only: bool = False) -> Tuple[int, float]:
+    """Count and total received of the tasks get_completed_tasks_page walks through"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    where, params = _completed_tasks_filter(employee_name, since, paid_only)
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(received_amount), 0) FROM tasks" + where, params)
+    summary = cursor.fetchone()
+    conn.close()
+    return summary
+
 def respond_to_inquiry(inquiry_id: int, admin_response: str) -> Optional[Tuple]:
     """Add admin response to customer inquiry"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE customer_inquiries 
@@ -371,26 +1284,228 @@ def respond_to_inquiry(inquiry_id: int, admin_response: str) -> Optional[Tuple]:
     """, (inquiry_id,))
     inquiry_details = cursor.fetchone()
     conn.close()
+    
+    invalidate_inquiry_status(inquiry_id)
     return inquiry_details
 
 def get_inquiry_by_id(inquiry_id: int) -> Optional[Tuple]:
     """Get specific inquiry by ID"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM customer_inquiries WHERE id = ?", (inquiry_id,))
     inquiry = cursor.fetchone()
     conn.close()
     return inquiry
 
+def _inquiry_etag(inquiry_id: int, status: str, responded_at: Optional[str]) -> str:
+    """Build a strong ETag from the fields that change when an inquiry is answered"""
+    raw = f"{inquiry_id}:{status}:{responded_at or ''}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+def get_inquiry_status(inquiry_id: int) -> Optional[Dict[str, Any]]:
+    """Get public inquiry status fields, served from the LRU cache when possible"""
+    status = _inquiry_status_cache.get(inquiry_id)
+    if status is not None:
+        return status
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, customer_name, status, created_at, admin_response, responded_at
+        FROM customer_inquiries WHERE id = ?
+    """, (inquiry_id,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    if not row:
+        return None
+    
+    status = {
+        "id": row[0],
+        "customer_name": row[1],
+        "status": row[2],
+        "created_at": row[3],
+        "admin_response": row[4],
+        "responded_at": row[5],
+        "etag": _inquiry_etag(row[0], row[2], row[5])
+    }
+    _inquiry_status_cache.set(inquiry_id, status)
+    return status
+
+def _notify_inquiry_change():
+    """Wake up status and feed long-poll waiters in this process"""
+    global _inquiries_generation
+    
+    with _inquiries_changed:
+        _inquiries_generation += 1
+        _inquiries_changed.notify_all()
+
+def invalidate_inquiry_status(inquiry_id: int):
+    """Drop cached inquiry status and wake up long-poll waiters"""
+    _inquiry_status_cache.pop(inquiry_id)
+    _notify_inquiry_change()
+
+def wait_for_inquiry_status(inquiry_id: int, etag: Optional[str], timeout: float) -> Optional[Dict[str, Any]]:
+    """Block until the inquiry's ETag differs from etag or timeout passes"""
+    deadline = time.monotonic() + timeout
+    
+    while True:
+        generation = _inquiries_generation
+        status = get_inquiry_status(inquiry_id)
+        if status is None or status["etag"] != etag:
+            return status
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return status
+        
+        # Changes made in this process wake us immediately; changes from other
+        # processes are picked up once the cached entry expires.
+        with _inquiries_changed:
+            if generation == _inquiries_generation:
+                _inquiries_changed.wait(min(remaining, INQUIRY_STATUS_CACHE_TTL))
+
+def get_inquiry_feed_version() -> int:
+    """Get the newest inquiry change version (a cursor for get_inquiry_changes)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM inquiry_changes")
+    version = cursor.fetchone()[0]
+    conn.close()
+    return version
+
+def get_inquiry_changes(since_version: int, source: str = None, limit: int = 100) -> List[Tuple[int, Tuple]]:
+    """Get (version, inquiry) pairs for inquiries created or updated after since_version"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    query = """
+        SELECT c.version, i.* FROM inquiry_changes c
+        JOIN customer_inquiries i ON i.id = c.inquiry_id
+        WHERE c.version > ?
+    """
+    params = [since_version]
+    
+    if source:
+        query += " AND i.source = ?"
+        params.append(source)
+    
+    query += " ORDER BY c.version LIMIT ?"
+    params.append(limit)
+    
+    cursor.execute(query, params)
+    changes = [(row[0], row[1:]) for row in cursor.fetchall()]
+    conn.close()
+    return changes
+
+def wait_for_inquiry_changes(since_version: int, timeout: float, source: str = None,
+                             limit: int = 100) -> List[Tuple[int, Tuple]]:
+    """Block until inquiries change after since_version or timeout passes"""
+    deadline = time.monotonic() + timeout
+    
+    while True:
+        generation = _inquiries_generation
+        changes = get_inquiry_changes(since_version, source, limit)
+        if changes:
+            return changes
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return []
+        
+        # Other processes (e.g. the bot writing inquiries) cannot signal us,
+        # so re-check the cheap version index every INQUIRY_FEED_POLL_INTERVAL
+        with _inquiries_changed:
+            if generation == _inquiries_generation:
+                _inquiries_changed.wait(min(remaining, INQUIRY_FEED_POLL_INTERVAL))
+
+def get_latest_inquiries(source: str = None, limit: int = 10) -> List[Tuple]:
+    """Get the newest inquiries, optionally for one source"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    if source:
+        cursor.execute("""
+            SELECT * FROM customer_inquiries WHERE source = ?
+            ORDER BY id DESC LIMIT ?
+        """, (source, limit))
+    else:
+        cursor.execute("SELECT * FROM customer_inquiries ORDER BY id DESC LIMIT ?", (limit,))
+    
+    inquiries = cursor.fetchall()
+    conn.close()
+    return inquiries
+
+def get_inquiry_counts() -> Dict[str, int]:
+    """Count inquiries per source and pending ones in a single pass"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT source, status, COUNT(*) FROM customer_inquiries GROUP BY source, status
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+    
+    counts = {"website": 0, "telegram": 0, "pending": 0, "total": 0}
+    for source, status, count in rows:
+        counts[source] = counts.get(source, 0) + count
+        if status == "pending":
+            counts["pending"] += count
+        counts["total"] += count
+    return counts
+
 def get_task_by_id(task_id: int) -> Optional[Tuple]:
     """Get specific task by ID"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
     task = cursor.fetchone()
     conn.close()
     return task
 
+def append_task_log(description: str, location: str, employees: str, payment: str,
+                    status: str, logged_at: str = None) -> int:
+    """Append one task send to the task log; returns the entry ID"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        INSERT INTO task_log (logged_at, description, location, employees, payment, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (logged_at or datetime.now().isoformat(sep=" ", timespec="seconds"),
+          description, location, employees, payment, status))
+    entry_id = cursor.lastrowid
+    
+    conn.commit()
+    conn.close()
+    return entry_id
+
+def get_task_log_version() -> int:
+    """ID of the newest task log entry (0 when empty)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM task_log")
+    version = cursor.fetchone()[0]
+    conn.close()
+    return version
+
+def iter_task_log(batch_size: int = 1000):
+    """Stream (logged_at, description, location, employees, payment, status) in log order"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT logged_at, description, location, employees, payment, status
+            FROM task_log ORDER BY id
+        """)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
 # Initialize database on import
 if not os.path.exists(DATABASE_PATH):
-    init_database()
\ No newline at end of file
+    init_database()
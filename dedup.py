@@ -0,0 +1,94 @@
+"""
+At-most-once dispatch of Telegram updates.
+
+Telegram delivers an update again when the previous process did not confirm
+it (a polling restart, a crash, a webhook answer that never arrived). Before
+an update reaches the handlers, UpdateDedup claims its update_id: a bounded
+in-memory set answers the hot repeats, and the processed_updates table makes
+the claim survive restarts and hold across worker processes. Updates refused
+by a draining bot are released again, so their redelivery is processed.
+Rows older than UPDATE_DEDUP_RETENTION are pruned; Telegram keeps an
+unconfirmed update for 24 hours.
+
+Handlers that create rows pass an idempotency key (see database.add_debt)
+as a second line of defence for repeats the claim cannot see.
+"""
+
+import logging
+import threading
+import time
+from typing import List
+
+import metrics
+from cache import LRUCache
+from config import UPDATE_DEDUP_RETENTION, UPDATE_DEDUP_SIZE
+from database import claim_updates, prune_processed_updates, release_update
+from lifecycle import Draining
+
+log = logging.getLogger(__name__)
+
+DUPLICATE_UPDATES = metrics.Counter("bot_duplicate_updates_total", "Redelivered updates that were skipped")
+
+# Claims between two prunes of the processed_updates table
+PRUNE_EVERY = 1000
+
+
+def idempotency_key(kind: str, message) -> str:
+    """Key for the write a message triggers; a redelivered message gets the same one"""
+    return f"{kind}:{message.chat.id}:{message.message_id}"
+
+
+class UpdateDedup:
+    """Claims update IDs so each update is dispatched once"""
+
+    def __init__(self, size: int = UPDATE_DEDUP_SIZE, retention: float = UPDATE_DEDUP_RETENTION):
+        self.retention = retention
+        self._seen = LRUCache(maxsize=size)
+        self._claims = 0
+        self._lock = threading.Lock()
+
+    def claim(self, update_ids: List[int]) -> List[int]:
+        """The update IDs seen for the first time, in this process or another; one write per call"""
+        fresh = [update_id for update_id in update_ids if update_id not in self._seen]
+        if not fresh:
+            return []
+        now = time.time()
+        claimed = claim_updates(fresh, now)
+        for update_id in fresh:
+            self._seen.set(update_id, True)
+        with self._lock:
+            prune = self._claims // PRUNE_EVERY != (self._claims + len(fresh)) // PRUNE_EVERY
+            self._claims += len(fresh)
+        if prune:
+            prune_processed_updates(now - self.retention)
+        return claimed
+
+    def release(self, update_id: int):
+        self._seen.pop(update_id)
+        release_update(update_id)
+
+    def install(self, bot):
+        """Filter repeats out of everything bot.process_new_updates receives"""
+        process_new_updates = bot.process_new_updates
+
+        def process_unique_updates(updates):
+            # A polling batch is claimed in one transaction
+            claimed = set(self.claim([update.update_id for update in updates]))
+            for update in updates:
+                if update.update_id not in claimed:
+                    # Confirm it anyway: polling asks for updates after last_update_id,
+                    # and a skipped repeat would otherwise come back on every request
+                    bot.last_update_id = max(bot.last_update_id, update.update_id)
+                    DUPLICATE_UPDATES.inc()
+                    log.info("Duplicate update %s skipped", update.update_id)
+                    continue
+                claimed.discard(update.update_id)
+                try:
+                    process_new_updates([update])
+                except Draining:
+                    # This update and the rest of the batch go back to Telegram
+                    for update_id in [update.update_id, *claimed]:
+                        self.release(update_id)
+                    raise
+
+        bot.process_new_updates = process_unique_updates
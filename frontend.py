@@ -0,0 +1,161 @@
+"""
+The process's only HTTP listener.
+
+One threaded WSGI server answers /health and /metrics itself, feeds
+POST /webhook/<BOT_TOKEN> into the bot, and hands every other path to the
+website API's Flask app, which is imported on the first such request. Each
+connection gets its own thread, so a long-poll or SSE client does not hold
+up health checks or webhook deliveries.
+"""
+
+import json
+import logging
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import metrics
+from config import BOT_TOKEN, HTTP_PORT
+
+log = logging.getLogger(__name__)
+
+# (status, content type, body)
+Response = Tuple[str, str, bytes]
+
+# Largest webhook update accepted; Telegram's are a few KB
+MAX_UPDATE_BYTES = 1 << 20
+
+
+def health_text(environ) -> Response:
+    return "200 OK", "text/plain", b"Bot is running"
+
+
+def health_json(environ) -> Response:
+    body = json.dumps({"status": "healthy", "service": "Enhanced Telegram Task Bot", "timestamp": time.time()})
+    return "200 OK", "application/json", body.encode()
+
+
+def metrics_page(environ) -> Response:
+    return "200 OK", "text/plain; version=0.0.4; charset=utf-8", metrics.render().encode()
+
+
+class FrontEnd:
+    """WSGI app: own routes first, then the Telegram webhook, then the website API"""
+
+    def __init__(self, routes: Optional[Dict[str, Callable]] = None, token: str = BOT_TOKEN):
+        self.routes = {"/health": health_text, "/metrics": metrics_page}
+        self.routes.update(routes or {})
+        self.webhook_path = f"/webhook/{token}" if token else None
+        self.bot = None
+        self._website = None
+        self._website_lock = threading.Lock()
+
+    def attach_bot(self, bot):
+        """Start passing webhook updates to bot; until then Telegram is asked to retry"""
+        self.bot = bot
+
+    def website(self):
+        """The website API's Flask app, imported on first use"""
+        if self._website is None:
+            with self._website_lock:
+                if self._website is None:
+                    from website_api import app
+                    self._website = app
+        return self._website
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO") or "/"
+        route = self.routes.get(path)
+        if route is not None:
+            status, content_type, body = route(environ)
+        elif self.webhook_path and path == self.webhook_path:
+            status, content_type, body = self.webhook(environ)
+        else:
+            try:
+                website = self.website()
+            except ImportError as e:
+                log.error("Website API unavailable: %s", e)
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found"
+            else:
+                return website(environ, start_response)
+        start_response(status, [("Content-Type", content_type), ("Content-Length", str(len(body)))])
+        return [body]
+
+    def webhook(self, environ) -> Response:
+        if environ["REQUEST_METHOD"] != "POST":
+            return "405 Method Not Allowed", "text/plain", b""
+        bot = self.bot
+        if bot is None:
+            return "503 Service Unavailable", "text/plain", b""
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if not 0 < length <= MAX_UPDATE_BYTES:
+            return "400 Bad Request", "text/plain", b""
+
+        from telebot.types import Update
+        try:
+            update = Update.de_json(environ["wsgi.input"].read(length).decode("utf-8"))
+        except (ValueError, KeyError) as e:
+            log.warning("Bad webhook update: %s", e)
+            return "400 Bad Request", "text/plain", b""
+        # A threaded bot queues the handlers, so Telegram gets its answer at once
+        try:
+            bot.process_new_updates([update])
+        except Exception as e:
+            # Not taken (e.g. the bot is draining); Telegram retries non-2xx deliveries
+            log.warning("Webhook update %s not taken: %s", update.update_id, e)
+            return "503 Service Unavailable", "text/plain", b""
+        return "200 OK", "text/plain", b""
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    block_on_close = False
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        log.debug("%s %s", self.address_string(), format % args)
+
+
+_front_end: Optional[FrontEnd] = None
+_server: Optional[ThreadingWSGIServer] = None
+_lock = threading.Lock()
+
+
+def serve(port: int = HTTP_PORT, routes: Optional[Dict[str, Callable]] = None,
+          host: str = "0.0.0.0") -> ThreadingWSGIServer:
+    """Bind the front end and serve it from a daemon thread; later calls return the same server"""
+    global _front_end, _server
+    with _lock:
+        if _server is None:
+            front_end = FrontEnd(routes)
+            server = ThreadingWSGIServer((host, port), QuietHandler)
+            server.set_app(front_end)
+            threading.Thread(target=server.serve_forever, name="http", daemon=True).start()
+            _front_end, _server = front_end, server
+            log.info("🌐 HTTP server on port %d: /health, /metrics, /api, webhook", server.server_port)
+        return _server
+
+
+def running() -> bool:
+    return _server is not None
+
+
+def attach_bot(bot):
+    """Route webhook updates to bot, if the front end is serving"""
+    if _front_end is not None:
+        _front_end.attach_bot(bot)
+
+
+def shutdown():
+    global _front_end, _server
+    with _lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+        _front_end = _server = None
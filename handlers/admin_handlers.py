@@ -3,6 +3,7 @@ from telebot import types
 from datetime import datetime
 from utils.database import get_task_db, get_debt_db
 from utils.excel_handler import ExcelHandler
+from sender_pool import send_all
 from config import EMPLOYEES, ADMIN_CHAT_ID
 
 class AdminHandler:
@@ -110,31 +111,30 @@ class AdminHandler:
         lat, lon = data["location"].latitude, data["location"].longitude
         task_text = f"📢 Sizga yangi topshiriq:\n\n📝 {data['description']}\n📍 Lokatsiya: xaritada\n💰 Pul: {data['payment']} so'm"
         
-        # Send to each selected employee
-        success_count = 0
-        for name in data["selected"]:
-            user_id = EMPLOYEES.get(name)
-            if not user_id:
-                continue
-            
-            try:
-                # Send task message and location
-                self.bot.send_message(user_id, task_text)
-                self.bot.send_location(user_id, latitude=lat, longitude=lon)
-                
-                # Save to database
-                short_name = name.split()[-1]
-                location_str = f"{lat}, {lon}"
-                self.task_db.add_task(
-                    description=data['description'],
-                    location=location_str,
-                    employee=short_name,
-                    amount=data['payment']
-                )
-                success_count += 1
-                
-            except Exception as e:
-                self.bot.send_message(chat_id, f"⚠️ {name} ga yuborilmadi.\nXato: {e}")
+        # Save every assignment in one transaction, then notify in parallel
+        selected = [name for name in data["selected"] if EMPLOYEES.get(name)]
+        short_names = {name: name.split()[-1] for name in selected}
+        try:
+            self.task_db.add_task_group(
+                description=data['description'],
+                location=f"{lat}, {lon}",
+                employees=list(short_names.values()),
+                amount=data['payment']
+            )
+        except Exception as e:
+            self.bot.send_message(chat_id, f"❌ Topshiriqni saqlashda xato: {e}")
+            self.show_admin_panel(message)
+            return
+        
+        def notify(name):
+            user_id = EMPLOYEES[name]
+            self.bot.send_message(user_id, task_text)
+            self.bot.send_location(user_id, latitude=lat, longitude=lon)
+        
+        delivered, failed = send_all(selected, notify)
+        for name, e in failed:
+            self.bot.send_message(chat_id, f"⚠️ {name} ga yuborilmadi.\nXato: {e}")
+        success_count = len(delivered)
         
         # Save to Excel
         self.excel_handler.save_task_to_excel(
@@ -149,6 +149,16 @@ class AdminHandler:
         
         self.show_admin_panel(message)
     
+    def send_task_report(self, message):
+        """Send the task log spreadsheet"""
+        chat_id = message.chat.id
+        try:
+            filepath = self.excel_handler.export_task_log()
+            with open(filepath, 'rb') as f:
+                self.bot.send_document(chat_id, f, caption="📋 Topshiriqlar hisoboti")
+        except Exception as e:
+            self.bot.send_message(chat_id, f"❌ Hisobot yaratishda xato: {e}")
+    
     def show_debt_menu(self, message):
         """Show debt management menu"""
         markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
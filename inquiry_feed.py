@@ -0,0 +1,74 @@
+"""
+Incremental view of customer inquiries for the admin panel.
+
+Instead of re-reading the whole customer_inquiries table on every refresh,
+the feed remembers the last change version it has seen and only pulls
+inquiries created or updated after it (see database.get_inquiry_changes).
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from database import get_inquiry_changes, get_inquiry_feed_version, get_latest_inquiries
+
+INQUIRY_SOURCES = ("website", "telegram")
+
+
+class InquiryFeed:
+    """Newest inquiries per source, kept up to date from the change feed"""
+
+    def __init__(self, window: int = 50, batch_size: int = 500):
+        self.window = window
+        self.batch_size = batch_size
+        self.cursor: Optional[int] = None
+        self._rows: Dict[int, Tuple] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> List[Tuple]:
+        """Pull changes since the last refresh and return the changed inquiries"""
+        with self._lock:
+            if self.cursor is None:
+                self._load_initial()
+                return []
+
+            changed = {}
+            while True:
+                changes = get_inquiry_changes(self.cursor, limit=self.batch_size)
+                for version, inquiry in changes:
+                    self._rows[inquiry[0]] = inquiry
+                    changed[inquiry[0]] = inquiry
+                    self.cursor = version
+                if len(changes) < self.batch_size:
+                    break
+
+            if changed:
+                self._trim()
+            return list(changed.values())
+
+    def latest(self, source: str = None, limit: int = 10) -> List[Tuple]:
+        """Newest inquiries (by ID), optionally for a single source"""
+        with self._lock:
+            rows = [row for row in self._rows.values() if not source or row[14] == source]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return rows[:limit]
+
+    def _load_initial(self):
+        # Read the cursor first: anything written while we load is replayed
+        # by the next refresh, and replaying an inquiry is harmless.
+        self.cursor = get_inquiry_feed_version()
+        for source in INQUIRY_SOURCES:
+            for inquiry in get_latest_inquiries(source, self.window):
+                self._rows[inquiry[0]] = inquiry
+        for inquiry in get_latest_inquiries(limit=self.window):
+            self._rows[inquiry[0]] = inquiry
+
+    def _trim(self):
+        """Keep only the newest `window` inquiries of each source"""
+        by_source: Dict[str, List[int]] = {}
+        for inquiry_id, row in self._rows.items():
+            by_source.setdefault(row[14], []).append(inquiry_id)
+
+        for inquiry_ids in by_source.values():
+            inquiry_ids.sort(reverse=True)
+            for inquiry_id in inquiry_ids[self.window:]:
+                del self._rows[inquiry_id]
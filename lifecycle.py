@@ -0,0 +1,177 @@
+"""
+Process lifecycle: signal-driven drain and a supervisor loop.
+
+On SIGTERM or SIGINT the process stops taking updates, lets every update
+already taken finish (queued and running handlers are counted where telebot
+hands them to its worker pool), then runs the remaining shutdown steps -
+scheduler, buffered admin digests - in order under one deadline, and exits.
+Updates that arrive once the drain has begun are refused, not dropped:
+polling has not confirmed them and a refused webhook delivery is retried, so
+Telegram hands them to the next process.
+A second signal skips whatever is left of the drain.
+
+supervise() restarts a crashed loop with backoff instead of recursing, so
+handlers are registered once and the stack stays flat.
+"""
+
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from config import RESTART_DELAY, RESTART_MAX_DELAY, SHUTDOWN_DRAIN_TIMEOUT
+
+log = logging.getLogger(__name__)
+
+
+class Draining(RuntimeError):
+    """Raised for updates that arrive once the drain has begun"""
+
+
+class InFlight:
+    """Counts work that has been accepted but not finished"""
+
+    def __init__(self):
+        self._count = 0
+        self._cond = threading.Condition()
+
+    def enter(self):
+        with self._cond:
+            self._count += 1
+
+    def leave(self):
+        with self._cond:
+            self._count -= 1
+            if not self._count:
+                self._cond.notify_all()
+
+    @property
+    def count(self) -> int:
+        with self._cond:
+            return self._count
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until nothing is in flight; False when timeout ran out first"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._count, timeout)
+
+
+class Drain:
+    """Ordered shutdown steps run under one deadline"""
+
+    def __init__(self):
+        self.in_flight = InFlight()
+        self.stopping = threading.Event()
+        self._intake: List[Callable[[], object]] = []
+        self._steps: List[Tuple[str, Callable]] = []
+        self._signals = 0
+
+    def track(self, bot):
+        """Count every handler call bot queues, from dispatch until it returns"""
+        exec_task = bot._exec_task
+        in_flight = self.in_flight
+
+        def run(task, *args, **kwargs):
+            try:
+                return task(*args, **kwargs)
+            finally:
+                in_flight.leave()
+
+        def tracked_exec_task(task, *args, **kwargs):
+            if self.stopping.is_set():
+                # Unconfirmed (polling) or answered with an error (webhook), so
+                # Telegram delivers it again after the restart
+                raise Draining("shutting down")
+            in_flight.enter()
+            # Threaded bots queue run() for a worker; others call it inline
+            exec_task(run, task, *args, **kwargs)
+
+        bot._exec_task = tracked_exec_task
+
+    def on_stop(self, stop_intake: Callable[[], object]):
+        """Call stop_intake() first thing in the drain, so no new updates are taken"""
+        self._intake.append(stop_intake)
+
+    def add(self, name: str, step: Callable[[float], object]):
+        """Run step(seconds_left) once handlers are done, after the steps added before it"""
+        self._steps.append((name, step))
+
+    def install_signal_handlers(self):
+        """SIGTERM/SIGINT start the drain; a second one exits at once (main thread only)"""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        self._signals += 1
+        if self._signals > 1:
+            log.warning("Second %s during the drain; exiting now", signal.Signals(signum).name)
+            os._exit(1)
+        log.info("%s received; draining", signal.Signals(signum).name)
+        self.stopping.set()
+
+    def wait(self):
+        """Block until a stop is requested"""
+        # A timed wait, so the main thread still runs signal handlers promptly
+        while not self.stopping.wait(1):
+            pass
+
+    def run(self, timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> Dict[str, float]:
+        """Stop intake, wait for in-flight handlers, then run the steps; returns seconds per step"""
+        self.stopping.set()
+        deadline = time.monotonic() + timeout
+        timings = {}
+        started = time.monotonic()
+        for stop_intake in self._intake:
+            try:
+                stop_intake()
+            except Exception as e:
+                log.error("Stopping intake failed: %s", e)
+        timings["intake"] = time.monotonic() - started
+        steps = [("handlers", self.in_flight.wait_idle)] + self._steps
+        for name, step in steps:
+            started = time.monotonic()
+            left = max(0.0, deadline - started)
+            try:
+                if step(left) is False:
+                    log.warning("Drain step %s did not finish in %.1f s", name, left)
+            except Exception as e:
+                log.error("Drain step %s failed: %s", name, e)
+            timings[name] = time.monotonic() - started
+        if self.in_flight.count:
+            log.warning("Drain timed out with %d handler calls unfinished", self.in_flight.count)
+        log.info("Drained in %.2f s: %s", sum(timings.values()),
+                 ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+        return timings
+
+
+def supervise(target: Callable[[], object], stopping: threading.Event,
+              on_crash: Callable[[Exception, float], object] = None,
+              delay: float = RESTART_DELAY, max_delay: float = RESTART_MAX_DELAY):
+    """Call target() until stopping is set, restarting it after crashes.
+
+    The delay doubles while target keeps crashing soon after a restart and
+    falls back to the initial delay once it has run for max_delay.
+    """
+    wait = delay
+    while not stopping.is_set():
+        started = time.monotonic()
+        try:
+            target()
+        except Exception as e:
+            log.exception("Supervised loop crashed: %s", e)
+            if time.monotonic() - started >= max_delay:
+                wait = delay
+            if on_crash:
+                try:
+                    on_crash(e, wait)
+                except Exception as notify_error:
+                    log.error("Crash notification failed: %s", notify_error)
+            if stopping.wait(wait):
+                break
+            wait = min(wait * 2, max_delay)
+        else:
+            if not stopping.is_set():
+                log.warning("Supervised loop returned; restarting")
+                stopping.wait(delay)
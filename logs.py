@@ -0,0 +1,159 @@
+"""
+Non-blocking logging for the bot process.
+
+Modules log through the standard logging API (log = logging.getLogger(__name__)).
+setup_logging() puts one queue handler on the root logger, so a call costs a
+level check and a put on a bounded queue; a background listener thread
+formats the record and writes it to stdout. When the queue is full (stdout is
+back-pressured) records are dropped and counted instead of blocking the
+handler. High-frequency events pass extra={"sample": "<event>"} and only one
+in LOG_SAMPLE_EVERY of them is written.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Dict, Optional
+
+from config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_EVERY
+
+# Record attributes that are not user-supplied extra fields
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sample", "sampled"}
+
+_listener: Optional["_Listener"] = None
+_handler: Optional["DroppingQueueHandler"] = None
+
+
+class SamplingFilter(logging.Filter):
+    """Passes one in every records carrying the same sample key; others always pass"""
+
+    def __init__(self, every: int = LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: full queue means the record is dropped"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve arguments here (they may be mutated after the call);
+        # timestamps and the final line are formatted on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Blocking put: the stop marker must get in even when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class StructuredFormatter(logging.Formatter):
+    """"time level logger message key=value..." with the record's extra fields"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS}
+        if getattr(record, "sampled", None):
+            fields["sampled"] = f"1/{record.sampled}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _STANDARD_ATTRS)
+        if getattr(record, "sampled", None):
+            entry["sampled"] = record.sampled
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL, stream=None, fmt: str = LOG_FORMAT,
+                  queue_size: int = LOG_QUEUE_SIZE, sample_every: int = LOG_SAMPLE_EVERY):
+    """Route all logging through a bounded queue to a writer thread (idempotent)"""
+    global _listener, _handler
+    stop_logging()
+
+    # The format uses none of these, and looking them up dominates a record's cost
+    logging._srcfile = None
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter() if fmt == "json" else StructuredFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(SamplingFilter(sample_every))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = _Listener(_handler.queue, writer)
+    _listener.start()
+    return _handler
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler else 0
+
+
+atexit.register(stop_logging)
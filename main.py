@@ -7,47 +7,188 @@ with location sharing, Excel reporting, debt tracking, and media support.
 
 import telebot
 from telebot import types
-import json
+import logging
 import os
 import sys
+import threading
 from datetime import datetime, timedelta
 
-from config import BOT_TOKEN, ADMIN_CODE, ADMIN_CHAT_ID, EMPLOYEES
+from config import (
+    BOT_TOKEN, ADMIN_CODE, ADMIN_CHAT_ID, EMPLOYEES, DEBT_REMINDER_HOUR, ADMIN_DIGEST_HOUR, REPORTS_DIR,
+    PROFILER_DEFAULT_SECONDS, PROFILER_MAX_SECONDS, HTTP_PORT, WEBHOOK_URL
+)
 from database import (
     init_database, add_task, get_employee_tasks, update_task_status, add_debt, get_debts,
-    add_message, get_user_state, set_user_state, clear_user_state,
-    add_customer_inquiry, get_customer_inquiries, respond_to_inquiry, get_inquiry_by_id, get_task_by_id
+    add_message, get_user_state, set_user_state, update_user_state, clear_user_state,
+    add_customer_inquiry, get_customer_inquiries, respond_to_inquiry, get_inquiry_by_id, get_task_by_id,
+    get_inquiry_counts, get_customer_inquiries_page, get_debts_page, delete_debt,
+    record_debt_payment, get_debt_outstanding, get_debts_outstanding, get_total_outstanding_debt,
+    reconcile_debt_ledger, get_debt_by_id, get_due_debts, get_unscheduled_debts, has_pending_job,
+    add_task_group, search_tasks_page, search_debts_page, get_location_history_page,
+    get_customer_messages_page, get_completed_tasks_page, get_completed_tasks_summary,
+    get_latest_employee_locations, add_query_observer
+)
+from inquiry_feed import InquiryFeed
+from scheduler import Scheduler, parse_due_date, next_daily_run
+from sender_pool import send_all
+from notifier import NotificationAggregator
+from pager import MAX_MESSAGE_LENGTH, split_message, take_page, tg_len
+from cache import LRUCache
+from callbacks import CallbackRegistry
+from routing import format_duration, route, routes_to
+from tour import plan_tour
+import frontend
+import metrics
+from logs import setup_logging
+from profiler import StackSampler
+from querylog import QueryLog
+from lifecycle import Drain, supervise
+from dedup import UpdateDedup, idempotency_key
+from messages import (
+    KEYBOARDS, LOCATION_CARD_STYLES, TASK_ASSIGNED, CARD_PAYMENT_DONE, CASH_PAYMENT_DONE,
+    CARD_PAYMENT_ADMIN, CASH_PAYMENT_ADMIN, LOCATION_CARD, DETAILED_STATISTICS,
+    format_money, locale_for
 )
 from utils import (
     save_media_file, generate_employee_report, generate_admin_report,
-    format_task_info, parse_json_data, serialize_json_data, ensure_directories
+    format_task_info, ensure_directories
 )
+
+log = logging.getLogger(__name__)
+
+# Every statement is timed; slow ones are logged with their query plan. One per
+# process: create_bot can run more than once (tests, replay benchmarks)
+query_log = QueryLog()
+
 # Return to employee panel after task completion
 
 
 
 
-def main():
-    """Main function to start the enhanced bot"""
-    if not BOT_TOKEN:
-        print("❌ BOT_TOKEN mavjud emas. Iltimos, bot tokenini qo'shing.")
-        sys.exit(1)
+def create_bot(token: str = BOT_TOKEN, threaded: bool = True, background: bool = True, drain: Drain = None):
+    """Build the bot with every handler registered, without polling.
 
-    # Initialize bot
-    bot = telebot.TeleBot(BOT_TOKEN)
+    background=False leaves the scheduler and the admin digest thread stopped
+    (replay benchmarks drive the bot synchronously). With a drain, shutdown
+    stops intake, waits for the bot's handlers and then stops the scheduler
+    and flushes the admin digests. Returns (bot, admin_notifier).
+    """
+    bot = telebot.TeleBot(token, threaded=threaded)
     
-    # Delete webhook to ensure polling works
-    try:
-        bot.delete_webhook()
-    except Exception as e:
-        print(f"⚠️ Webhook deletion warning: {e}")
+    add_query_observer(query_log.observe)
     
     # Initialize database and directories
     init_database()
     ensure_directories()
     
-    # Global variables for conversation states
-    admin_data = {}
+    def current_state(message) -> str:
+        """The sender's conversation step, read once per update however many handler filters ask"""
+        try:
+            return message.conversation_state
+        except AttributeError:
+            message.conversation_state = get_user_state(message.chat.id).state
+            return message.conversation_state
+    
+    # Newest inquiries per source, refreshed incrementally from the change feed
+    inquiry_feed = InquiryFeed()
+    
+    # Debt reminders and the daily admin digest
+    scheduler = Scheduler()
+
+    def schedule_debt_reminder(debt_id, payment_date):
+        """Queue a reminder for the due date, replacing an earlier one; unparseable dates get none"""
+        run_at = parse_due_date(payment_date, DEBT_REMINDER_HOUR)
+        if run_at:
+            # A repeated request for the same debt must not remind twice
+            scheduler.cancel("debt_reminder", debt_id)
+            scheduler.schedule("debt_reminder", run_at, ref_id=debt_id)
+
+    def send_debt_reminder(debt_id, payload):
+        """Remind the debtor that a debt is due"""
+        debt = get_debt_by_id(debt_id)
+        if not debt:
+            return
+        
+        debt_id, employee_name, employee_chat_id, task_id, amount, reason, payment_date, created_at, status = debt
+        # External debtors have no chat; they appear in the admin digest instead
+        if status != 'unpaid' or not employee_chat_id:
+            return
+        
+        bot.send_message(
+            employee_chat_id,
+            f"⏰ Qarz to'lov muddati keldi!\n\n"
+            f"💰 Qolgan qarz: {get_debt_outstanding(debt_id):,.0f} so'm\n"
+            f"📝 Sabab: {reason}\n"
+            f"📅 To'lov sanasi: {payment_date}"
+        )
+
+    def send_admin_digest(ref_id, payload):
+        """Send the admin every unpaid debt due by today, then queue tomorrow's digest"""
+        try:
+            end_of_day = datetime.now().replace(hour=23, minute=59, second=59).timestamp()
+            due_debts = get_due_debts("debt_reminder", end_of_day)
+            
+            if due_debts:
+                outstanding = get_debts_outstanding([debt[0] for debt in due_debts])
+                digest_text = f"📅 Muddati kelgan qarzlar ({len(due_debts)} ta):\n\n"
+                for debt in due_debts[:30]:
+                    debt_id, employee_name, employee_chat_id, task_id, amount, reason, payment_date, created_at, status = debt
+                    digest_text += f"👤 {employee_name} (ID: {debt_id})\n"
+                    digest_text += f"   💰 {outstanding.get(debt_id, amount):,.0f} so'm - {reason}\n"
+                    digest_text += f"   📅 {payment_date}\n\n"
+                if len(due_debts) > 30:
+                    digest_text += f"... va yana {len(due_debts) - 30} ta"
+                bot.send_message(ADMIN_CHAT_ID, digest_text)
+        finally:
+            scheduler.schedule("admin_digest", next_daily_run(ADMIN_DIGEST_HOUR))
+
+    scheduler.register("debt_reminder", send_debt_reminder)
+    scheduler.register("admin_digest", send_admin_digest)
+    
+    def warm_up():
+        """Whole-table maintenance that updates do not wait for"""
+        # Debtor balances must match the ledger; drift is repaired and reported
+        mismatches = reconcile_debt_ledger()
+        if mismatches:
+            log.warning("⚠️ Qarz balanslari ledger bo'yicha tuzatildi: %d ta qarzdor", len(mismatches))
+        
+        try:
+            # Debts recorded before the scheduler existed get their reminders once
+            for debt_id, payment_date in get_unscheduled_debts("debt_reminder"):
+                run_at = parse_due_date(payment_date, DEBT_REMINDER_HOUR)
+                if run_at:
+                    scheduler.schedule("debt_reminder", run_at, ref_id=debt_id)
+            if not has_pending_job("admin_digest"):
+                scheduler.schedule("admin_digest", next_daily_run(ADMIN_DIGEST_HOUR))
+            log.info("⏰ Rejalashtirilgan ishlar: %d ta", scheduler.load())
+            if background:
+                scheduler.start()
+        except Exception as e:
+            log.exception("⚠️ Scheduler start error: %s", e)
+    
+    # Off the startup path when background threads are allowed
+    if background:
+        threading.Thread(target=warm_up, name="warm_up", daemon=True).start()
+    else:
+        warm_up()
+
+    # Routine admin notifications go out as per-kind digests
+    admin_notifier = NotificationAggregator(lambda text: bot.send_message(ADMIN_CHAT_ID, text))
+    if background:
+        admin_notifier.start()
+
+    # All inline buttons go through one handler that routes on the action prefix
+    callbacks = CallbackRegistry()
+
+    @bot.callback_query_handler(func=lambda call: True)
+    def dispatch_callback(call):
+        """Route a button press to its handler"""
+        # Per-task buttons sent before the registry carry "start_task_<id>"
+        for action in ("start_task", "complete_task"):
+            if call.data and call.data.startswith(f"{action}_"):
+                call.data = f"{action}:{call.data[len(action) + 1:]}"
+        if not callbacks.dispatch(call):
+            bot.answer_callback_query(call.id, "⌛ Bu tugma eskirgan. Menyuni qaytadan oching.")
 
     @bot.message_handler(commands=['contact', 'sorov', 'murojaat'])
     def customer_contact(message):
@@ -77,7 +218,7 @@ def main():
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "customer_contact_start")
+    @bot.message_handler(func=lambda message: current_state(message) == "customer_contact_start")
     def handle_customer_contact_start(message):
         """Handle customer contact start options"""
         if message.text == "📞 Telefon raqamni ulashish":
@@ -111,8 +252,7 @@ def main():
         elif message.text == "💬 So'rov yuborish":
             set_user_state(message.chat.id, "writing_inquiry")
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            markup.add("🔙 Bekor qilish")
+            markup = KEYBOARDS["cancel"]
             
             bot.send_message(
                 message.chat.id,
@@ -142,12 +282,10 @@ def main():
             if employee_name:
                 show_employee_panel(message, employee_name)
 
-    @bot.message_handler(content_types=['contact'])
+    # Contacts in other states belong to their own handlers (customer_phone)
+    @bot.message_handler(content_types=['contact'], func=lambda message: current_state(message) == "waiting_for_contact")
     def handle_customer_contact(message):
         """Handle customer contact sharing"""
-        if get_user_state(message.chat.id)[0] != "waiting_for_contact":
-            return
-        
         # Store contact info
         customer_data = {
             'phone': message.contact.phone_number,
@@ -155,7 +293,7 @@ def main():
             'username': message.from_user.username
         }
         
-        set_user_state(message.chat.id, "customer_contact_saved", json.dumps(customer_data))
+        set_user_state(message.chat.id, "customer_contact_saved", customer_data)
         
         markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
         location_button = types.KeyboardButton("📍 Joylashuvni ulashish", request_location=True)
@@ -172,26 +310,21 @@ def main():
     @bot.message_handler(content_types=['location'])
     def handle_all_location(message):
         """Handle all location sharing - customer, admin task assignment, employee"""
-        print(f"URGENT DEBUG: Location handler called! Chat ID: {message.chat.id}")
         state, data = get_user_state(message.chat.id)
-        print(f"DEBUG: Location received from {message.chat.id}, current state: {state}")
+        log.debug("Location received from %s, current state: %s", message.chat.id, state,
+                  extra={"sample": "location"})
         
         # Handle admin task assignment location
         if state == "assign_task_location":
-            print(f"DEBUG: Processing admin task location assignment for {message.chat.id}")
-            
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
-                admin_data[message.chat.id] = {}
-                print(f"DEBUG: Created new admin_data for {message.chat.id}")
+            log.debug("Processing admin task location assignment for %s", message.chat.id)
             
-            admin_data[message.chat.id]["location"] = {
+            update_user_state(message.chat.id, "assign_task_payment", location={
                 "latitude": message.location.latitude,
                 "longitude": message.location.longitude
-            }
+            })
             
-            print(f"DEBUG: Location saved - lat: {message.location.latitude}, lon: {message.location.longitude}")
-            print(f"DEBUG: Current admin_data: {admin_data.get(message.chat.id, {})}")
+            log.debug("Task location saved for %s: %s, %s", message.chat.id,
+                      message.location.latitude, message.location.longitude)
             
             # Send location confirmation first
             bot.send_message(
@@ -208,14 +341,11 @@ def main():
                     message.location.longitude,
                     "task_location"
                 )
-                print("DEBUG: Animated location card sent")
+                log.debug("Animated location card sent")
             except NameError:
-                print("DEBUG: send_animated_location_card function not found, skipping")
+                log.debug("send_animated_location_card function not found, skipping")
             except Exception as e:
-                print(f"DEBUG: Error sending location card: {e}")
-            
-            set_user_state(message.chat.id, "assign_task_payment")
-            print(f"DEBUG: State changed to assign_task_payment for {message.chat.id}")
+                log.debug("Error sending location card: %s", e)
             
             markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
             markup.add("💰 To'lov miqdorini kiriting")
@@ -227,7 +357,7 @@ def main():
                 "💰 To'lov miqdorini tanlang:",
                 reply_markup=markup
             )
-            print(f"DEBUG: Payment buttons sent to {message.chat.id}")
+            log.debug("Payment buttons sent to %s", message.chat.id)
             return
         
         # Handle customer location sharing
@@ -242,8 +372,7 @@ def main():
             
         # Handle customer location sharing (moved from separate handler)
         if state == "customer_location":
-            data_str = data
-            temp_data = parse_json_data(data_str)
+            temp_data = data
             
             if message.location:
                 latitude = message.location.latitude
@@ -257,7 +386,7 @@ def main():
                     "username": message.from_user.username or ""
                 })
                 
-                set_user_state(message.chat.id, "customer_chat", serialize_json_data(temp_data))
+                set_user_state(message.chat.id, "customer_chat", temp_data)
                 
                 # Notify admin about new customer
                 customer_info = f"""
@@ -273,8 +402,8 @@ def main():
 Mijoz admindan javob kutmoqda.
 """
                 
-                bot.send_message(ADMIN_CHAT_ID, customer_info)
-                bot.send_location(ADMIN_CHAT_ID, latitude, longitude)
+                admin_notifier.notify("customer", customer_info, urgent=True,
+                                      attach=lambda: bot.send_location(ADMIN_CHAT_ID, latitude, longitude))
                 
                 markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
                 markup.add("❌ Suhbatni tugatish")
@@ -290,14 +419,15 @@ Mijoz admindan javob kutmoqda.
                 bot.send_message(message.chat.id, "❌ Joylashuvni yuborishda xatolik. Qayta urinib ko'ring.")
             return
             
-        print(f"DEBUG: Unhandled location state: {state}")
+        metrics.UNHANDLED_UPDATES.inc("location")
+        log.debug("Unhandled location state: %s", state, extra={"sample": "location_unhandled"})
     
     def handle_customer_location_data(message, state, data):
         """Handle customer location sharing"""
         
         # Get existing customer data or create new
         if data:
-            customer_data = json.loads(data)
+            customer_data = dict(data)
         else:
             customer_data = {
                 'name': message.from_user.first_name + (' ' + message.from_user.last_name if message.from_user.last_name else ''),
@@ -317,7 +447,7 @@ Mijoz admindan javob kutmoqda.
             "customer_location"
         )
         
-        set_user_state(message.chat.id, "customer_location_saved", json.dumps(customer_data))
+        set_user_state(message.chat.id, "customer_location_saved", customer_data)
         
         markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
         markup.add("💬 So'rov yuborish")
@@ -338,7 +468,7 @@ Mijoz admindan javob kutmoqda.
         # Use the main location sharing handler which includes employee panel redirect
         handle_location_sharing(message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] in ["writing_inquiry", "customer_contact_saved", "customer_location_saved"])
+    @bot.message_handler(func=lambda message: current_state(message) in ["writing_inquiry", "customer_contact_saved", "customer_location_saved"])
     def handle_customer_inquiry(message):
         """Handle customer inquiry text"""
         if message.text == "🔙 Bekor qilish":
@@ -366,8 +496,7 @@ Mijoz admindan javob kutmoqda.
         
         if message.text == "💬 So'rov yuborish":
             set_user_state(message.chat.id, "writing_inquiry_final")
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            markup.add("🔙 Bekor qilish")
+            markup = KEYBOARDS["cancel"]
             
             bot.send_message(
                 message.chat.id,
@@ -381,7 +510,7 @@ Mijoz admindan javob kutmoqda.
         
         # Get customer data
         if data:
-            customer_data = json.loads(data)
+            customer_data = dict(data)
         else:
             customer_data = {
                 'name': message.from_user.first_name + (' ' + message.from_user.last_name if message.from_user.last_name else ''),
@@ -433,22 +562,14 @@ Mijoz admindan javob kutmoqda.
 💡 Javob berish: 👥 Mijozlar so'rovlari → 🤖 Botdan kelgan so'rovlar
 """
                 
-                try:
-                    bot.send_message(ADMIN_CHAT_ID, admin_message)
-                    
-                    # Send location if available
-                    if customer_data.get('location_lat') and customer_data.get('location_lon'):
-                        bot.send_location(
-                            ADMIN_CHAT_ID, 
-                            customer_data['location_lat'], 
-                            customer_data['location_lon']
-                        )
-                        bot.send_message(
-                            ADMIN_CHAT_ID,
-                            f"📍 Mijoz joylashuvi (So'rov #{inquiry_id})"
-                        )
-                except Exception as admin_error:
-                    print(f"Admin notification error: {admin_error}")
+                # A map link keeps the location inside the digest entry
+                if customer_data.get('location_lat') and customer_data.get('location_lon'):
+                    admin_message += (
+                        f"📍 Joylashuv: https://maps.google.com/?q="
+                        f"{customer_data['location_lat']},{customer_data['location_lon']}\n"
+                    )
+                
+                admin_notifier.notify("inquiry", admin_message)
             
         except Exception as e:
             bot.send_message(
@@ -478,15 +599,11 @@ Mijoz admindan javob kutmoqda.
         """Handle /start command"""
         clear_user_state(message.chat.id)
         
-        markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-        markup.add("🔐 Admin", "👤 Xodim")
-        markup.add("👥 Mijoz")
-        
         bot.send_message(
             message.chat.id,
             "🤖 Vazifa boshqaruv botiga xush kelibsiz!\n\n"
             "Iltimos, rolingizni tanlang:",
-            reply_markup=markup
+            reply_markup=KEYBOARDS["start"]
         )
 
     @bot.message_handler(commands=['getid'])
@@ -507,7 +624,7 @@ Mijoz admindan javob kutmoqda.
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "admin_login")
+    @bot.message_handler(func=lambda message: current_state(message) == "admin_login")
     def verify_admin_code(message):
         """Verify admin code"""
         if message.text == ADMIN_CODE:
@@ -519,25 +636,19 @@ Mijoz admindan javob kutmoqda.
 
     def show_admin_panel(message):
         """Show admin panel"""
-        print(f"DEBUG: Admin panel ko'rsatilmoqda. Chat ID: {message.chat.id}")
-        
-        markup = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
-        markup.add("➕ Yangi xodim qo'shish", "📤 Vazifa berish")
-        markup.add("📍 Xodimlarni kuzatish", "👥 Mijozlar so'rovlari")
-        markup.add("💸 Qarzlar", "📊 Ma'lumotlar")
-        markup.add("🔙 Ortga")
+        log.debug("Admin panel ko'rsatilmoqda. Chat ID: %s", message.chat.id)
         
         bot.send_message(
             message.chat.id,
             "🛠 Admin paneli\n\nKerakli bo'limni tanlang:",
-            reply_markup=markup
+            reply_markup=KEYBOARDS["admin_panel"]
         )
-        print(f"DEBUG: Admin paneli yuborildi")
+        log.debug("Admin paneli yuborildi")
 
     @bot.message_handler(func=lambda message: message.text == "📤 Vazifa berish")
     def start_task_assignment(message):
         """Start task assignment process"""
-        print(f"DEBUG: Vazifa berish tugmasi bosildi. Chat ID: {message.chat.id}")
+        log.debug("Vazifa berish tugmasi bosildi. Chat ID: %s", message.chat.id)
         
         if message.chat.id != ADMIN_CHAT_ID:
             bot.send_message(message.chat.id, "❌ Bu funksiya faqat admin uchun!")
@@ -548,7 +659,6 @@ Mijoz admindan javob kutmoqda.
             return
         
         set_user_state(message.chat.id, "assign_task_description")
-        admin_data[message.chat.id] = {}
         
         markup = types.ReplyKeyboardRemove()
         bot.send_message(
@@ -556,21 +666,16 @@ Mijoz admindan javob kutmoqda.
             "📝 Vazifa tavsifini kiriting:",
             reply_markup=markup
         )
-        print(f"DEBUG: Admin'ga vazifa tavsifi so'raldi")
+        log.debug("Admin'ga vazifa tavsifi so'raldi")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "assign_task_description")
+    @bot.message_handler(func=lambda message: current_state(message) == "assign_task_description")
     def get_task_description(message):
         """Get task description"""
-        print(f"DEBUG: Task description received from {message.chat.id}: {message.text}")
+        log.debug("Task description received from %s", message.chat.id)
         
-        # Ensure admin_data exists for this user
-        if message.chat.id not in admin_data:
-            admin_data[message.chat.id] = {}
-            
-        admin_data[message.chat.id]["description"] = message.text
-        set_user_state(message.chat.id, "assign_task_location")
+        update_user_state(message.chat.id, "assign_task_location", description=message.text)
         
-        print(f"DEBUG: State set to assign_task_location for {message.chat.id}")
+        log.debug("State set to assign_task_location for %s", message.chat.id)
         
         markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
         location_btn = types.KeyboardButton("📍 Lokatsiyani yuborish", request_location=True)
@@ -582,11 +687,11 @@ Mijoz admindan javob kutmoqda.
             "📍 Vazifa uchun lokatsiyani yuboring:",
             reply_markup=markup
         )
-        print(f"DEBUG: Location request sent to {message.chat.id}")
+        log.debug("Location request sent to %s", message.chat.id)
 
 
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "assign_task_payment")
+    @bot.message_handler(func=lambda message: current_state(message) == "assign_task_payment")
     def get_task_payment(message):
         """Handle task payment selection"""
         if message.text == "🔙 Bekor qilish":
@@ -595,7 +700,7 @@ Mijoz admindan javob kutmoqda.
             return
         
         if message.text == "💰 To'lov miqdorini kiriting":
-            set_user_state(message.chat.id, "assign_task_payment_amount")
+            update_user_state(message.chat.id, "assign_task_payment_amount")
             markup = types.ReplyKeyboardRemove()
             bot.send_message(
                 message.chat.id,
@@ -603,120 +708,130 @@ Mijoz admindan javob kutmoqda.
                 reply_markup=markup
             )
         elif message.text == "⏭ To'lov belgilanmagan":
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
-                admin_data[message.chat.id] = {}
-                
-            admin_data[message.chat.id]["payment"] = None
-            proceed_to_employee_selection(message)
+            proceed_to_employee_selection(message, None)
         else:
             bot.send_message(message.chat.id, "❌ Iltimos, tugmalardan birini tanlang!")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "assign_task_payment_amount")
+    @bot.message_handler(func=lambda message: current_state(message) == "assign_task_payment_amount")
     def get_task_payment_amount(message):
         """Get specific payment amount"""
         try:
             payment = float(message.text.replace(" ", "").replace(",", ""))
-            
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
-                admin_data[message.chat.id] = {}
-                
-            admin_data[message.chat.id]["payment"] = payment
-            proceed_to_employee_selection(message)
+            proceed_to_employee_selection(message, payment)
             
         except ValueError:
             bot.send_message(message.chat.id, "❌ Noto'g'ri format. Raqam kiriting (masalan: 50000):")
 
-    def proceed_to_employee_selection(message):
+    def proceed_to_employee_selection(message, payment):
         """Proceed to employee selection step"""
-        set_user_state(message.chat.id, "assign_task_employee")
+        update_user_state(message.chat.id, "assign_task_employee", payment=payment, employees=[])
         
         markup = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
         for employee_name in EMPLOYEES.keys():
             markup.add(employee_name)
+        markup.add("👥 Hammasi", "📨 Yuborish")
         markup.add("🔙 Bekor qilish")
         
         bot.send_message(
             message.chat.id,
-            "👥 Vazifani bajaradigan xodimni tanlang:",
+            "👥 Vazifani bajaradigan xodim(lar)ni tanlang va \"📨 Yuborish\" tugmasini bosing:",
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "assign_task_employee")
+    @bot.message_handler(func=lambda message: current_state(message) == "assign_task_employee")
     def select_task_employee(message):
-        """Select employee for task"""
+        """Select employees for task"""
         if message.text == "🔙 Bekor qilish":
             clear_user_state(message.chat.id)
             show_admin_panel(message)
             return
         
         if message.text in EMPLOYEES:
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
-                admin_data[message.chat.id] = {}
-                
-            admin_data[message.chat.id]["employee"] = message.text
-            
-            # Create task in database
-            data = admin_data[message.chat.id]
-            task_id = add_task(
-                description=data["description"],
-                location_lat=data["location"]["latitude"],
-                location_lon=data["location"]["longitude"],
-                location_address=None,
-                payment_amount=data["payment"],
-                assigned_to=data["employee"],
-                assigned_by=message.chat.id
-            )
-            
-            # Send task to employee
-            employee_chat_id = EMPLOYEES[data["employee"]]
-            
-            # Format payment info
-            if data["payment"] is not None:
-                payment_text = f"💰 To'lov: {data['payment']} so'm"
+            added = False
+
+            def select(data):
+                # Appended under the state's write lock, so concurrent selections all land
+                nonlocal added
+                selected = data.setdefault("employees", [])
+                added = message.text not in selected
+                if added:
+                    selected.append(message.text)
+
+            selected = update_user_state(message.chat.id, "assign_task_employee", merge=select)["employees"]
+            if added:
+                bot.send_message(message.chat.id, f"✅ {message.text} tanlandi ({len(selected)} ta).")
             else:
-                payment_text = "💰 To'lov: Belgilanmagan"
-            
-            task_text = f"""
-🔔 Sizga yangi vazifa tayinlandi!
-
-📝 Vazifa: {data['description']}
-{payment_text}
-📅 Vaqt: {datetime.now().strftime('%d.%m.%Y %H:%M')}
-
-Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko'ring.
-"""
+                bot.send_message(message.chat.id, f"⚠️ {message.text} allaqachon tanlangan.")
+        elif message.text == "👥 Hammasi":
+            selected = update_user_state(message.chat.id, "assign_task_employee", employees=list(EMPLOYEES))["employees"]
+            bot.send_message(message.chat.id, f"✅ Barcha xodimlar tanlandi ({len(selected)} ta).")
+        elif message.text == "📨 Yuborish":
+            data = get_user_state(message.chat.id).data
+            if not data.get("employees"):
+                bot.send_message(message.chat.id, "❌ Kamida bitta xodim tanlang!")
+                return
             
             try:
-                bot.send_message(employee_chat_id, task_text)
-                bot.send_location(
-                    employee_chat_id,
-                    data["location"]["latitude"],
-                    data["location"]["longitude"]
-                )
-                
-                bot.send_message(
-                    message.chat.id,
-                    f"✅ Vazifa muvaffaqiyatli yuborildi!\n\n"
-                    f"👤 Xodim: {data['employee']}\n"
-                    f"🆔 Vazifa ID: {task_id}"
-                )
-                
+                assign_task_to_employees(message, data)
             except Exception as e:
-                bot.send_message(
-                    message.chat.id,
-                    f"❌ Xodimga vazifa yetkazib berishda xatolik:\n{str(e)}"
-                )
+                bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
             
             clear_user_state(message.chat.id)
-            admin_data.pop(message.chat.id, None)
             show_admin_panel(message)
-            
         else:
             bot.send_message(message.chat.id, "❌ Iltimos, ro'yxatdan xodim tanlang!")
 
+    def assign_task_to_employees(message, data):
+        """Create the task for every selected employee and notify them in parallel"""
+        group_id, task_ids = add_task_group(
+            description=data["description"],
+            location_lat=data["location"]["latitude"],
+            location_lon=data["location"]["longitude"],
+            location_address=None,
+            payment_amount=data["payment"],
+            employees=data["employees"],
+            assigned_by=message.chat.id,
+            idempotency_key=idempotency_key("task_group", message)
+        )
+        for employee in task_ids:
+            invalidate_task_pages(employee)
+        
+        task_text = TASK_ASSIGNED.render(
+            description=data["description"],
+            payment=format_money(data["payment"]),
+            time=datetime.now().strftime('%d.%m.%Y %H:%M')
+        )
+        
+        def notify(employee):
+            employee_chat_id = EMPLOYEES[employee]
+            bot.send_message(employee_chat_id, task_text)
+            bot.send_location(
+                employee_chat_id,
+                data["location"]["latitude"],
+                data["location"]["longitude"]
+            )
+        
+        delivered, failed = send_all(task_ids, notify)
+        
+        if len(task_ids) == 1 and delivered:
+            employee = delivered[0]
+            report = (
+                f"✅ Vazifa muvaffaqiyatli yuborildi!\n\n"
+                f"👤 Xodim: {employee}\n"
+                f"🆔 Vazifa ID: {task_ids[employee]}"
+            )
+        else:
+            report = f"✅ Vazifa {len(delivered)}/{len(task_ids)} ta xodimga yuborildi (guruh #{group_id})."
+            if delivered:
+                report += "\n\n" + "\n".join(f"👤 {employee} - 🆔 {task_ids[employee]}" for employee in delivered)
+        
+        if failed:
+            report += "\n\n❌ Yetkazilmadi:\n" + "\n".join(
+                f"👤 {employee} (🆔 {task_ids[employee]}): {str(error)}" for employee, error in failed
+            )
+        
+        bot.send_message(message.chat.id, report)
+
     @bot.message_handler(func=lambda message: message.text == "📊 Ma'lumotlar")
     def show_data_menu(message):
         """Show comprehensive data management menu"""
@@ -730,7 +845,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         markup.add("📤 Ma'lumot eksport", "🔄 Ma'lumot import")
         markup.add("🧹 Ma'lumot tozalash", "🔍 Ma'lumot qidirish")
         markup.add("📥 Excel yuklab olish", "📈 Umumiy hisobot")
-        markup.add("🔙 Ortga")
+        markup.add("🐢 Sekin so'rovlar", "🔙 Ortga")
         
         bot.send_message(
             message.chat.id,
@@ -744,6 +859,31 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
+    @bot.message_handler(func=lambda message: message.text == "🐢 Sekin so'rovlar")
+    def show_query_report(message):
+        """Admin report of the SQL statements that took the most time since startup"""
+        if message.chat.id != ADMIN_CHAT_ID:
+            return
+        
+        report = query_log.report()
+        if not report:
+            bot.send_message(message.chat.id, "📭 Hali SQL so'rovlari qayd etilmagan.")
+            return
+        
+        text = (f"🐢 Eng ko'p vaqt olgan SQL so'rovlari\n"
+                f"(sekin: {query_log.slow_seconds * 1000:.0f} ms dan ortiq)\n")
+        for rank, (statement, stats) in enumerate(report, 1):
+            text += (
+                f"\n{rank}. Jami {stats.total * 1000:,.0f} ms | {stats.count} marta | "
+                f"o'rtacha {stats.mean * 1000:.1f} ms | eng uzoq {stats.worst * 1000:.1f} ms"
+                f"{f' | sekin {stats.slow}' if stats.slow else ''}\n"
+                f"{statement[:300]}\n"
+            )
+            if stats.plan:
+                text += f"📋 {stats.plan}\n"
+        for part in split_message(text):
+            bot.send_message(message.chat.id, part)
+
     @bot.message_handler(func=lambda message: message.text == "📥 Excel yuklab olish")
     def generate_excel_report(message):
         """Generate and send Excel report"""
@@ -796,28 +936,26 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 return
             
             debt_text = "💸 Barcha qarzlar:\n\n"
-            total_debt = 0
+            outstanding = get_debts_outstanding([debt[0] for debt in debts])
             
             for i, debt in enumerate(debts, 1):
                 debt_id, employee_name, employee_chat_id, task_id, amount, reason, payment_date, created_at, status = debt
-                total_debt += amount
                 
                 debt_text += f"{i}. 👤 {employee_name} (ID: {debt_id})\n"
                 debt_text += f"   💰 {amount:,.0f} so'm\n"
+                remaining = outstanding.get(debt_id, amount)
+                if remaining < amount:
+                    debt_text += f"   💳 Qolgan: {remaining:,.0f} so'm\n"
                 debt_text += f"   📝 {reason}\n"
                 debt_text += f"   📅 To'lov sanasi: {payment_date}\n"
                 status_text = "To'lanmagan" if status == 'unpaid' else "To'langan"
                 debt_text += f"   📊 Holat: {status_text}\n\n"
             
-            debt_text += f"💸 Jami qarz: {total_debt} so'm"
+            debt_text += f"💸 Jami qarz: {get_total_outstanding_debt():,.0f} so'm"
             
-            # Split long messages
-            if len(debt_text) > 4000:
-                parts = [debt_text[i:i+4000] for i in range(0, len(debt_text), 4000)]
-                for part in parts:
-                    bot.send_message(message.chat.id, part)
-            else:
-                bot.send_message(message.chat.id, debt_text)
+            # Split long messages between debts, never inside one
+            for part in split_message(debt_text):
+                bot.send_message(message.chat.id, part)
                 
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
@@ -829,7 +967,6 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         set_user_state(message.chat.id, "add_employee_name")
-        admin_data[message.chat.id] = {}
         
         markup = types.ReplyKeyboardRemove()
         bot.send_message(
@@ -851,9 +988,10 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         
         # Get inquiry counts
         try:
-            website_inquiries = len(get_customer_inquiries(source='website'))
-            bot_inquiries = len(get_customer_inquiries(source='telegram'))
-            pending_inquiries = len(get_customer_inquiries(status='pending'))
+            counts = get_inquiry_counts()
+            website_inquiries = counts['website']
+            bot_inquiries = counts['telegram']
+            pending_inquiries = counts['pending']
         except:
             website_inquiries = bot_inquiries = pending_inquiries = 0
         
@@ -867,6 +1005,59 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
+    INQUIRY_LISTS = {
+        'website': ("🌐 **Website dan kelgan so'rovlar:**", 10),
+        'telegram': ("🤖 **Botdan kelgan so'rovlar:**", 10),
+        'all': ("📋 **Barcha mijoz so'rovlari:**", 15)
+    }
+
+    def build_inquiry_page(list_key, inquiries, has_newer, has_older):
+        """Render one page of an inquiry list with inline view and paging buttons"""
+        response_text = INQUIRY_LISTS[list_key][0] + "\n\n"
+        markup = types.InlineKeyboardMarkup()
+        
+        for inquiry in inquiries:
+            inquiry_id, customer_name, customer_phone, customer_username, chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
+            
+            status_emoji = "⏳" if status == "pending" else "✅"
+            if list_key == 'all':
+                source_emoji = "🌐" if source == "website" else "🤖"
+                response_text += f"{status_emoji}{source_emoji} **ID{inquiry_id}** - {customer_name}\n"
+                response_text += f"📧 {inquiry_text[:40]}{'...' if len(inquiry_text) > 40 else ''}\n"
+            else:
+                response_text += f"{status_emoji} **ID{inquiry_id}** - {customer_name}\n"
+                if list_key == 'telegram' and customer_username:
+                    response_text += f"👤 @{customer_username}\n"
+                response_text += f"📧 {inquiry_text[:50]}{'...' if len(inquiry_text) > 50 else ''}\n"
+            response_text += f"📅 {created_at}\n\n"
+            
+            markup.add(types.InlineKeyboardButton(
+                f"📋 ID{inquiry_id} - Ko'rish", callback_data=f"inq_view:{inquiry_id}"
+            ))
+        
+        # Page cursors are the first/last inquiry IDs shown
+        nav_buttons = []
+        if has_newer:
+            nav_buttons.append(types.InlineKeyboardButton(
+                "⬅️ Oldingi", callback_data=f"inq_page:{list_key}:a:{inquiries[0][0]}"
+            ))
+        if has_older:
+            nav_buttons.append(types.InlineKeyboardButton(
+                "Keyingi ➡️", callback_data=f"inq_page:{list_key}:b:{inquiries[-1][0]}"
+            ))
+        if nav_buttons:
+            markup.row(*nav_buttons)
+        markup.add(types.InlineKeyboardButton("🔄 Yangilash", callback_data=f"inq_page:{list_key}:r:0"))
+        
+        return response_text, markup
+
+    def first_inquiry_page(list_key):
+        """Newest page of an inquiry list, served from the incremental feed"""
+        per_page = INQUIRY_LISTS[list_key][1]
+        source = None if list_key == 'all' else list_key
+        inquiries = inquiry_feed.latest(source, per_page + 1)
+        return inquiries[:per_page], len(inquiries) > per_page
+
     @bot.message_handler(func=lambda message: message.text == "🌐 Website dan kelgan so'rovlar")
     def show_website_inquiries(message):
         """Show website inquiries"""
@@ -874,7 +1065,8 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            inquiries = get_customer_inquiries(source='website')
+            inquiry_feed.refresh()
+            inquiries, has_older = first_inquiry_page('website')
             
             if not inquiries:
                 bot.send_message(
@@ -885,21 +1077,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 )
                 return
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            response_text = "🌐 **Website dan kelgan so'rovlar:**\n\n"
-            
-            for inquiry in inquiries[:10]:  # Show first 10
-                inquiry_id, customer_name, customer_phone, customer_username, chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
-                
-                status_emoji = "⏳" if status == "pending" else "✅"
-                response_text += f"{status_emoji} **ID{inquiry_id}** - {customer_name}\n"
-                response_text += f"📧 {inquiry_text[:50]}{'...' if len(inquiry_text) > 50 else ''}\n"
-                response_text += f"📅 {created_at}\n\n"
-                
-                markup.add(f"📋 ID{inquiry_id} - Ko'rish va javob berish")
-            
-            markup.add("🔄 Yangilash", "🔙 Ortga")
-            
+            response_text, markup = build_inquiry_page('website', inquiries, False, has_older)
             bot.send_message(message.chat.id, response_text, reply_markup=markup)
             
         except Exception as e:
@@ -912,7 +1090,8 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            inquiries = get_customer_inquiries(source='telegram')
+            inquiry_feed.refresh()
+            inquiries, has_older = first_inquiry_page('telegram')
             
             if not inquiries:
                 bot.send_message(
@@ -923,23 +1102,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 )
                 return
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            response_text = "🤖 **Botdan kelgan so'rovlar:**\n\n"
-            
-            for inquiry in inquiries[:10]:  # Show first 10
-                inquiry_id, customer_name, customer_phone, customer_username, chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
-                
-                status_emoji = "⏳" if status == "pending" else "✅"
-                response_text += f"{status_emoji} **ID{inquiry_id}** - {customer_name}\n"
-                if customer_username:
-                    response_text += f"👤 @{customer_username}\n"
-                response_text += f"📧 {inquiry_text[:50]}{'...' if len(inquiry_text) > 50 else ''}\n"
-                response_text += f"📅 {created_at}\n\n"
-                
-                markup.add(f"📋 ID{inquiry_id} - Ko'rish va javob berish")
-            
-            markup.add("🔄 Yangilash", "🔙 Ortga")
-            
+            response_text, markup = build_inquiry_page('telegram', inquiries, False, has_older)
             bot.send_message(message.chat.id, response_text, reply_markup=markup)
             
         except Exception as e:
@@ -952,7 +1115,8 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            inquiries = get_customer_inquiries()
+            inquiry_feed.refresh()
+            inquiries, has_older = first_inquiry_page('all')
             
             if not inquiries:
                 bot.send_message(
@@ -962,57 +1126,76 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 )
                 return
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            response_text = "📋 **Barcha mijoz so'rovlari:**\n\n"
-            
-            for inquiry in inquiries[:15]:  # Show first 15
-                inquiry_id, customer_name, customer_phone, customer_username, chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
-                
-                status_emoji = "⏳" if status == "pending" else "✅"
-                source_emoji = "🌐" if source == "website" else "🤖"
-                
-                response_text += f"{status_emoji}{source_emoji} **ID{inquiry_id}** - {customer_name}\n"
-                response_text += f"📧 {inquiry_text[:40]}{'...' if len(inquiry_text) > 40 else ''}\n"
-                response_text += f"📅 {created_at}\n\n"
-                
-                markup.add(f"📋 ID{inquiry_id} - Ko'rish")
-            
-            markup.add("🔄 Yangilash", "🔙 Ortga")
-            
+            response_text, markup = build_inquiry_page('all', inquiries, False, has_older)
             bot.send_message(message.chat.id, response_text, reply_markup=markup)
             
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.message_handler(func=lambda message: "ID" in message.text and "Ko'rish" in message.text)
-    def view_inquiry_details(message):
-        """View inquiry details and respond"""
-        if message.chat.id != ADMIN_CHAT_ID:
+    @callbacks.route("inq_page")
+    def page_inquiries(call):
+        """Move an inquiry list one page older/newer, or refresh it"""
+        if call.message.chat.id != ADMIN_CHAT_ID:
             return
         
         try:
-            # Extract inquiry ID
-            inquiry_id = int(message.text.split("ID")[1].split(" ")[0])
-            inquiry = get_inquiry_by_id(inquiry_id)
+            _, list_key, direction, cursor_id = call.data.split(":")
+            source = None if list_key == 'all' else list_key
+            per_page = INQUIRY_LISTS[list_key][1]
+            
+            if direction == "r":
+                changed = [row for row in inquiry_feed.refresh() if not source or row[14] == source]
+                inquiries, has_older = first_inquiry_page(list_key)
+                has_newer = False
+                bot.answer_callback_query(call.id, f"🔄 {len(changed)} ta yangi/o'zgargan so'rov")
+            elif direction == "b":
+                inquiries, has_older = get_customer_inquiries_page(source, before_id=int(cursor_id), limit=per_page)
+                has_newer = True
+                bot.answer_callback_query(call.id)
+            else:
+                inquiries, has_newer = get_customer_inquiries_page(source, after_id=int(cursor_id), limit=per_page)
+                has_older = True
+                bot.answer_callback_query(call.id)
             
-            if not inquiry:
-                bot.send_message(message.chat.id, "❌ So'rov topilmadi.")
+            if not inquiries:
+                bot.send_message(call.message.chat.id, "📋 Boshqa so'rovlar yo'q.")
                 return
             
-            inquiry_id, customer_name, customer_phone, customer_username, chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
-            
-            # Format inquiry details
-            source_name = "Website" if source == "website" else "Telegram Bot"
-            status_name = "Javob berilgan" if status == "responded" else "Javob kutmoqda"
+            response_text, markup = build_inquiry_page(list_key, inquiries, has_newer, has_older)
+            bot.edit_message_text(
+                response_text,
+                call.message.chat.id,
+                call.message.message_id,
+                reply_markup=markup
+            )
             
-            details_text = f"""
+        except Exception as e:
+            # Refreshing an unchanged first page leaves the message as it is
+            if "message is not modified" not in str(e):
+                bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
+
+    def send_inquiry_details(chat_id, inquiry_id):
+        """Send inquiry details with response options"""
+        inquiry = get_inquiry_by_id(inquiry_id)
+        
+        if not inquiry:
+            bot.send_message(chat_id, "❌ So'rov topilmadi.")
+            return
+        
+        inquiry_id, customer_name, customer_phone, customer_username, inquiry_chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
+        
+        # Format inquiry details
+        source_name = "Website" if source == "website" else "Telegram Bot"
+        status_name = "Javob berilgan" if status == "responded" else "Javob kutmoqda"
+        
+        details_text = f"""
 🔍 **So'rov tafsilotlari**
 
 🆔 ID: {inquiry_id}
 👤 Mijoz: {customer_name}
 📞 Telefon: {customer_phone or 'Kiritilmagan'}
 👤 Username: @{customer_username or 'Mavjud emas'}
-📱 Chat ID: {chat_id or 'Mavjud emas'}
+📱 Chat ID: {inquiry_chat_id or 'Mavjud emas'}
 🌐 Manba: {source_name}
 📋 Status: {status_name}
 📅 Kelgan vaqt: {created_at}
@@ -1020,35 +1203,58 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
 📝 **So'rov matni:**
 {inquiry_text}
 """
-            
-            if location_lat and location_lon:
-                details_text += f"\n📍 **Joylashuv:** {location_address or 'Mavjud'}"
-            
-            if admin_response:
-                details_text += f"\n\n✅ **Admin javobi:**\n{admin_response}\n📅 Javob vaqti: {responded_at}"
-            
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            
-            if status == "pending":
-                markup.add(f"💬 ID{inquiry_id}ga javob berish")
-            
-            if source == "telegram" and chat_id:
-                markup.add(f"📞 ID{inquiry_id}ga bevosita xabar yuborish")
-            
-            markup.add("🔙 Ortga")
-            
-            # Store inquiry ID for response
-            set_user_state(message.chat.id, "viewing_inquiry", str(inquiry_id))
-            
-            bot.send_message(message.chat.id, details_text, reply_markup=markup)
-            
-            # Show location if available
-            if location_lat and location_lon:
-                bot.send_location(message.chat.id, location_lat, location_lon)
+        
+        if location_lat and location_lon:
+            details_text += f"\n📍 **Joylashuv:** {location_address or 'Mavjud'}"
+        
+        if admin_response:
+            details_text += f"\n\n✅ **Admin javobi:**\n{admin_response}\n📅 Javob vaqti: {responded_at}"
+        
+        markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
+        
+        if status == "pending":
+            markup.add(f"💬 ID{inquiry_id}ga javob berish")
+        
+        if source == "telegram" and inquiry_chat_id:
+            markup.add(f"📞 ID{inquiry_id}ga bevosita xabar yuborish")
+        
+        markup.add("🔙 Ortga")
+        
+        # Store inquiry ID for response
+        set_user_state(chat_id, "viewing_inquiry", {"inquiry_id": inquiry_id})
+        
+        bot.send_message(chat_id, details_text, reply_markup=markup)
+        
+        # Show location if available
+        if location_lat and location_lon:
+            bot.send_location(chat_id, location_lat, location_lon)
+
+    @bot.message_handler(func=lambda message: "ID" in message.text and "Ko'rish" in message.text)
+    def view_inquiry_details(message):
+        """View inquiry details and respond"""
+        if message.chat.id != ADMIN_CHAT_ID:
+            return
+        
+        try:
+            # Extract inquiry ID
+            inquiry_id = int(message.text.split("ID")[1].split(" ")[0])
+            send_inquiry_details(message.chat.id, inquiry_id)
             
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
+    @callbacks.route("inq_view")
+    def view_inquiry_details_callback(call):
+        """View inquiry details from an inline list button"""
+        if call.message.chat.id != ADMIN_CHAT_ID:
+            return
+        
+        try:
+            bot.answer_callback_query(call.id)
+            send_inquiry_details(call.message.chat.id, int(call.data.split(":")[1]))
+        except Exception as e:
+            bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
+
     @bot.message_handler(func=lambda message: "javob berish" in message.text and "ID" in message.text)
     def start_inquiry_response(message):
         """Start responding to inquiry"""
@@ -1059,10 +1265,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             # Extract inquiry ID
             inquiry_id = int(message.text.split("ID")[1].split("ga")[0])
             
-            set_user_state(message.chat.id, "responding_to_inquiry", str(inquiry_id))
+            set_user_state(message.chat.id, "responding_to_inquiry", {"inquiry_id": inquiry_id})
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            markup.add("🔙 Bekor qilish")
+            markup = KEYBOARDS["cancel"]
             
             bot.send_message(
                 message.chat.id, 
@@ -1074,7 +1279,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "responding_to_inquiry")
+    @bot.message_handler(func=lambda message: current_state(message) == "responding_to_inquiry")
     def send_inquiry_response(message):
         """Send response to inquiry"""
         if message.text == "🔙 Bekor qilish":
@@ -1083,8 +1288,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            state, inquiry_id = get_user_state(message.chat.id)
-            inquiry_id = int(inquiry_id)
+            inquiry_id = get_user_state(message.chat.id).data["inquiry_id"]
             
             # Save response to database
             inquiry_details = respond_to_inquiry(inquiry_id, message.text)
@@ -1154,7 +1358,8 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            bot.send_message(message.chat.id, "🔄 Website so'rovlari yangilanmoqda...")
+            changed = [row for row in inquiry_feed.refresh() if row[14] == 'website']
+            bot.send_message(message.chat.id, f"🔄 Website so'rovlari yangilandi: {len(changed)} ta yangi/o'zgargan")
             show_website_inquiries(message)
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
@@ -1166,7 +1371,8 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            bot.send_message(message.chat.id, "🔄 Bot so'rovlari yangilanmoqda...")
+            changed = [row for row in inquiry_feed.refresh() if row[14] == 'telegram']
+            bot.send_message(message.chat.id, f"🔄 Bot so'rovlari yangilandi: {len(changed)} ta yangi/o'zgargan")
             show_bot_inquiries(message)
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
@@ -1179,10 +1385,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         
         # Get active customer chats from database
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get users in customer_chat state
@@ -1221,6 +1426,169 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
+    # Long result lists: one message per page, rows queried only for the page viewed
+    PAGE_ROWS = 10
+    paged_queries = LRUCache(maxsize=512, ttl=3600)  # (chat_id, view) -> query params
+
+    def format_short_time(created_at, fmt="%d.%m %H:%M"):
+        try:
+            return datetime.fromisoformat(created_at).strftime(fmt)
+        except (TypeError, ValueError):
+            return (created_at or "Noma'lum")[:16]
+
+    def render_task_search_row(row):
+        task_id, desc, assigned_to, status, created_at, payment = row
+        emoji = {"pending": "⏳", "in_progress": "🔄", "completed": "✅"}.get(status, "❓")
+        return (f"{emoji} ID: {task_id}\n"
+                f"📝 {desc[:50]}{'...' if len(desc) > 50 else ''}\n"
+                f"👤 {assigned_to} | 💰 {payment or 0:,.0f} so'm")
+
+    def render_debt_search_row(row):
+        debt_id, emp_name, amount, reason, pay_date, created = row
+        return f"👤 {emp_name}\n💰 {amount:,.0f} so'm\n📝 {reason}\n📅 {pay_date}"
+
+    def render_location_row(row):
+        location_id, emp_name, lat, lon, created_at, loc_type = row
+        return (f"👤 {emp_name}\n"
+                f"   📍 {lat:.6f}, {lon:.6f}\n"
+                f"   🕐 {format_short_time(created_at)}\n"
+                f"   🗺 https://maps.google.com/?q={lat},{lon}")
+
+    def render_customer_message_row(row):
+        message_id, chat_id, message_text, created_at = row
+        try:
+            # Only the rows on the viewed page cost a get_chat call
+            name = bot.get_chat(chat_id).first_name or "Noma'lum"
+        except Exception:
+            name = "Noma'lum mijoz"
+        return (f"👤 {name} ({chat_id})\n"
+                f"   🕐 {format_short_time(created_at)}\n"
+                f"   💬 {message_text[:50]}{'...' if len(message_text) > 50 else ''}")
+
+    def render_completed_task_row(row):
+        task_id, description, created_at, completion_report, received_amount = row
+        amount_text = f"{received_amount:,.0f} so'm" if received_amount else "To'lov belgilanmagan"
+        text = (f"📋 **{description[:60]}{'...' if len(description) > 60 else ''}**\n"
+                f"   📅 {format_short_time(created_at, '%d.%m.%Y %H:%M')}\n"
+                f"   💰 {amount_text}")
+        if completion_report:
+            text += f"\n   📝 {completion_report[:50]}{'...' if len(completion_report) > 50 else ''}"
+        return text
+
+    def task_history_header(params):
+        total_tasks, total_earned = get_completed_tasks_summary(
+            params["employee"], params.get("since"), params.get("paid_only", False)
+        )
+        avg_earning = total_earned / total_tasks if total_tasks else 0
+        header = (f"📂 **{params['employee']}** - {params['title']}\n\n"
+                  f"📊 **Statistika:**\n"
+                  f"🔢 Jami vazifalar: {total_tasks} ta\n"
+                  f"💰 Jami daromad: {total_earned:,.0f} so'm\n"
+                  f"📈 O'rtacha to'lov: {avg_earning:,.0f} so'm")
+        if total_earned > 0:
+            if avg_earning >= 100000:
+                header += "\n🏆 A'lo natija! Yuqori to'lovli vazifalar!"
+            elif avg_earning >= 50000:
+                header += "\n⭐️ Yaxshi natija! Davom eting!"
+            else:
+                header += "\n💪 Yaxshi ish! Yanada yuqoriga!"
+        return header
+
+    # view key -> (header(params), fetch(params, before_id, after_id, limit), render(row))
+    PAGED_VIEWS = {
+        "ts": (lambda params: "🔍 Vazifa qidiruv natijalari:",
+               lambda params, **page: search_tasks_page(params["query"], **page),
+               render_task_search_row),
+        "ds": (lambda params: "💸 Qarz qidiruv natijalari:",
+               lambda params, **page: search_debts_page(params["query"], **page),
+               render_debt_search_row),
+        "loc": (lambda params: "📊 So'nggi 24 soat lokatsiya tarixi:",
+                lambda params, **page: get_location_history_page(**page),
+                render_location_row),
+        "cc": (lambda params: "📋 So'nggi mijoz so'rovlari (24 soat):",
+               lambda params, **page: get_customer_messages_page(ADMIN_CHAT_ID, params["since"], **page),
+               render_customer_message_row),
+        "th": (task_history_header,
+               lambda params, **page: get_completed_tasks_page(
+                   params["employee"], params.get("since"), params.get("paid_only", False), **page),
+               render_completed_task_row),
+    }
+
+    def build_paged_view(chat_id, view_key, before_id=None, after_id=None):
+        """Render one page of a paged view; returns (text, markup), or None when nothing to show"""
+        params = paged_queries.get((chat_id, view_key))
+        if params is None:
+            return "⌛ Natijalar eskirgan. Iltimos, qaytadan so'rang.", None
+        
+        header, fetch, render = PAGED_VIEWS[view_key]
+        rows, has_more = fetch(params, before_id=before_id, after_id=after_id, limit=PAGE_ROWS)
+        if not rows:
+            return None
+        
+        # Stream rows into the page until the next one would overflow the message;
+        # walking towards newer rows keeps the ones next to the current page
+        header_text = header(params)
+        ordered = rows if after_id is None else rows[::-1]
+        blocks = take_page((render(row) for row in ordered), MAX_MESSAGE_LENGTH - tg_len(header_text) - 2)
+        shown = ordered[:len(blocks)]
+        if after_id is not None:
+            shown.reverse()
+            blocks.reverse()
+        has_more = has_more or len(shown) < len(rows)
+        
+        if after_id is None:
+            has_newer, has_older = before_id is not None, has_more
+        else:
+            has_newer, has_older = has_more, True
+        
+        markup = None
+        nav_buttons = []
+        if has_newer:
+            nav_buttons.append(types.InlineKeyboardButton(
+                "⬅️ Oldingi", callback_data=f"pg:{view_key}:a:{shown[0][0]}"
+            ))
+        if has_older:
+            nav_buttons.append(types.InlineKeyboardButton(
+                "Keyingi ➡️", callback_data=f"pg:{view_key}:b:{shown[-1][0]}"
+            ))
+        if nav_buttons:
+            markup = types.InlineKeyboardMarkup()
+            markup.row(*nav_buttons)
+        
+        return header_text + "\n\n" + "\n\n".join(blocks), markup
+
+    def send_paged_view(chat_id, view_key, params, empty_text):
+        """Start a paged view for chat with fresh query params"""
+        paged_queries.set((chat_id, view_key), params)
+        page = build_paged_view(chat_id, view_key)
+        if page is None:
+            bot.send_message(chat_id, empty_text)
+            return
+        text, markup = page
+        bot.send_message(chat_id, text, reply_markup=markup)
+
+    @callbacks.route("pg")
+    def page_view(call):
+        """Move a paged view one page older/newer by editing it in place"""
+        try:
+            _, view_key, direction, cursor_id = call.data.split(":")
+            if direction == "b":
+                page = build_paged_view(call.message.chat.id, view_key, before_id=int(cursor_id))
+            else:
+                page = build_paged_view(call.message.chat.id, view_key, after_id=int(cursor_id))
+            bot.answer_callback_query(call.id)
+            
+            if page is None:
+                bot.send_message(call.message.chat.id, "📭 Boshqa natijalar yo'q.")
+                return
+            
+            text, markup = page
+            bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=markup)
+            
+        except Exception as e:
+            if "message is not modified" not in str(e):
+                bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
+
     @bot.message_handler(func=lambda message: message.text == "📋 Mijozning So'rovlari")
     def show_customer_calls(message):
         """Show customer requests history"""
@@ -1228,57 +1596,11 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
-            
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Get recent customer messages (last 24 hours)
+            # Recent customer messages (last 24 hours)
             yesterday = (datetime.now() - timedelta(days=1)).isoformat()
+            send_paged_view(message.chat.id, "cc", {"since": yesterday},
+                            "📭 So'nggi 24 soatda mijoz so'rovlari yo'q.")
             
-            cursor.execute("""
-                SELECT from_chat_id, message_text, created_at FROM messages 
-                WHERE to_chat_id = ? AND message_type IN ('customer_message', 'customer_start')
-                AND created_at > ?
-                ORDER BY created_at DESC
-                LIMIT 20
-            """, (ADMIN_CHAT_ID, yesterday))
-            
-            recent_messages = cursor.fetchall()
-            conn.close()
-            
-            if not recent_messages:
-                bot.send_message(message.chat.id, "📭 So'nggi 24 soatda mijoz so'rovlari yo'q.")
-                return
-            
-            calls_text = "📋 So'nggi mijoz so'rovlari (24 soat):\n\n"
-            
-            for i, (chat_id, message_text, created_at) in enumerate(recent_messages, 1):
-                try:
-                    # Try to get user info
-                    user_info = bot.get_chat(chat_id)
-                    name = user_info.first_name or "Noma'lum"
-                except:
-                    name = "Noma'lum mijoz"
-                
-                try:
-                    time_str = datetime.fromisoformat(created_at).strftime("%d.%m %H:%M")
-                except:
-                    time_str = created_at[:16]
-                
-                calls_text += f"{i}. 👤 {name} ({chat_id})\n"
-                calls_text += f"   🕐 {time_str}\n"
-                calls_text += f"   💬 {message_text[:50]}{'...' if len(message_text) > 50 else ''}\n\n"
-            
-            if len(calls_text) > 4000:
-                # Split long messages
-                parts = [calls_text[i:i+4000] for i in range(0, len(calls_text), 4000)]
-                for part in parts:
-                    bot.send_message(message.chat.id, part)
-            else:
-                bot.send_message(message.chat.id, calls_text)
-                
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
     
@@ -1289,10 +1611,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get total customer messages
@@ -1349,7 +1670,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "select_debt_employee")
+    @bot.message_handler(func=lambda message: current_state(message) == "select_debt_employee")
     def select_debt_employee(message):
         """Select employee for debt"""
         if message.text == "🔙 Bekor qilish":
@@ -1358,8 +1679,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         if message.text in EMPLOYEES:
-            admin_data[message.chat.id] = {"employee": message.text, "employee_type": "staff"}
-            set_user_state(message.chat.id, "manual_debt_amount")
+            set_user_state(message.chat.id, "manual_debt_amount", {"employee": message.text, "employee_type": "staff"})
             
             markup = types.ReplyKeyboardRemove()
             bot.send_message(
@@ -1368,8 +1688,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 reply_markup=markup
             )
         elif message.text == "👥 Boshqalar":
-            admin_data[message.chat.id] = {"employee_type": "other"}
-            set_user_state(message.chat.id, "other_debt_name")
+            set_user_state(message.chat.id, "other_debt_name", {"employee_type": "other"})
             
             markup = types.ReplyKeyboardRemove()
             bot.send_message(
@@ -1380,18 +1699,12 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         else:
             bot.send_message(message.chat.id, "❌ Iltimos, ro'yxatdan variant tanlang!")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "manual_debt_amount")
+    @bot.message_handler(func=lambda message: current_state(message) == "manual_debt_amount")
     def get_manual_debt_amount(message):
         """Get manual debt amount"""
         try:
             amount = float(message.text.replace(" ", "").replace(",", ""))
-            
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
-                admin_data[message.chat.id] = {}
-            
-            admin_data[message.chat.id]["amount"] = amount
-            set_user_state(message.chat.id, "manual_debt_reason")
+            update_user_state(message.chat.id, "manual_debt_reason", amount=amount)
             
             bot.send_message(message.chat.id, "📝 Qarz sababini kiriting:")
             
@@ -1402,16 +1715,11 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             clear_user_state(message.chat.id)
             show_debts_menu(message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "manual_debt_reason")
+    @bot.message_handler(func=lambda message: current_state(message) == "manual_debt_reason")
     def get_manual_debt_reason(message):
         """Get manual debt reason"""
         try:
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
-                admin_data[message.chat.id] = {}
-            
-            admin_data[message.chat.id]["reason"] = message.text
-            set_user_state(message.chat.id, "manual_debt_date")
+            update_user_state(message.chat.id, "manual_debt_date", reason=message.text)
             
             bot.send_message(
                 message.chat.id,
@@ -1422,18 +1730,17 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             clear_user_state(message.chat.id)
             show_debts_menu(message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "manual_debt_date")
+    @bot.message_handler(func=lambda message: current_state(message) == "manual_debt_date")
     def get_manual_debt_date(message):
         """Get manual debt date and create debt"""
         try:
-            # Ensure admin_data exists for this user
-            if message.chat.id not in admin_data:
+            data = get_user_state(message.chat.id).data
+            if not data:
                 bot.send_message(message.chat.id, "❌ Sessiya tugagan. Qaytadan boshlang.")
                 clear_user_state(message.chat.id)
                 show_debts_menu(message)
                 return
             
-            data = admin_data[message.chat.id]
             employee_name = data["employee"]
         
             # Handle different employee types
@@ -1443,14 +1750,16 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 employee_chat_id = 0  # For non-employees
         
             # Add debt record
-            add_debt(
+            debt_id = add_debt(
                 employee_name=employee_name,
                 employee_chat_id=employee_chat_id,
                 task_id=None,
                 amount=data["amount"],
                 reason=data["reason"],
-                payment_date=message.text
+                payment_date=message.text,
+                idempotency_key=idempotency_key("debt", message)
             )
+            schedule_debt_reminder(debt_id, message.text)
             
             bot.send_message(
                 message.chat.id,
@@ -1475,7 +1784,6 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                     pass
         
             clear_user_state(message.chat.id)
-            admin_data.pop(message.chat.id, None)
             show_debts_menu(message)
         
         except KeyError as e:
@@ -1487,186 +1795,225 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             clear_user_state(message.chat.id)
             show_debts_menu(message)
 
-    @bot.message_handler(func=lambda message: message.text == "✅ Qarzni to'lash")
-    def start_pay_debt(message):
-        """Start debt payment process"""
+    DEBT_ACTIONS = {
+        'pay': ("💸", "✅ Qaysi qarzni to'langanini belgilaysiz?", "✅ To'lanadigan qarzlar yo'q!"),
+        'del': ("🗑", "🗑 Qaysi qarzni o'chirmoqchisiz?", "✅ O'chiriladigan qarzlar yo'q!")
+    }
+
+    def build_debt_page(action, debts, has_newer, has_older):
+        """Render one page of unpaid debts as inline pay/delete buttons"""
+        emoji = DEBT_ACTIONS[action][0]
+        markup = types.InlineKeyboardMarkup()
+        
+        for debt in debts:
+            debt_id, employee_name, employee_chat_id, task_id, amount, reason, payment_date, created_at, status = debt
+            markup.add(types.InlineKeyboardButton(
+                f"{emoji} ID:{debt_id} - {employee_name} ({amount} so'm)",
+                callback_data=f"debt_{action}:{debt_id}"
+            ))
+        
+        nav_buttons = []
+        if has_newer:
+            nav_buttons.append(types.InlineKeyboardButton(
+                "⬅️ Oldingi", callback_data=f"debt_page:{action}:a:{debts[0][0]}"
+            ))
+        if has_older:
+            nav_buttons.append(types.InlineKeyboardButton(
+                "Keyingi ➡️", callback_data=f"debt_page:{action}:b:{debts[-1][0]}"
+            ))
+        if nav_buttons:
+            markup.row(*nav_buttons)
+        markup.add(types.InlineKeyboardButton("🔙 Bekor qilish", callback_data=f"debt_page:{action}:x:0"))
+        
+        return markup
+
+    def start_debt_selection(message, action):
+        """Send the first page of unpaid debts for paying or deleting"""
         if message.chat.id != ADMIN_CHAT_ID:
             return
         
         try:
-            debts = get_debts()
+            debts, has_older = get_debts_page(limit=10)
             
             if not debts:
-                bot.send_message(message.chat.id, "✅ To'lanadigan qarzlar yo'q!")
+                bot.send_message(message.chat.id, DEBT_ACTIONS[action][2])
                 return
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            
-            for debt in debts[:10]:  # Show first 10 debts
-                debt_id, employee_name, employee_chat_id, task_id, amount, reason, payment_date, created_at, status = debt
-                markup.add(f"💸 ID:{debt_id} - {employee_name} ({amount} so'm)")
-            
-            markup.add("🔙 Bekor qilish")
-            
-            set_user_state(message.chat.id, "select_debt_to_pay")
-            
             bot.send_message(
                 message.chat.id,
-                "✅ Qaysi qarzni to'langanini belgilaysiz?",
-                reply_markup=markup
+                DEBT_ACTIONS[action][1],
+                reply_markup=build_debt_page(action, debts, False, has_older)
             )
             
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "select_debt_to_pay")
-    def pay_selected_debt(message):
-        """Pay selected debt"""
-        if message.text == "🔙 Bekor qilish":
-            clear_user_state(message.chat.id)
-            show_debts_menu(message)
-            return
-        
-        try:
-            # Extract debt ID from message
-            if "ID:" in message.text:
-                debt_id = int(message.text.split("ID:")[1].split(" ")[0])
-                
-                # Update debt status to paid
-                from database import DATABASE_PATH
-                import sqlite3
-                
-                conn = sqlite3.connect(DATABASE_PATH)
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    UPDATE debts SET status = 'paid' WHERE id = ?
-                """, (debt_id,))
-                
-                # Get debt info
-                cursor.execute("""
-                    SELECT employee_name, employee_chat_id, amount, reason 
-                    FROM debts WHERE id = ?
-                """, (debt_id,))
-                
-                debt_info = cursor.fetchone()
-                conn.commit()
-                conn.close()
-                
-                if debt_info:
-                    employee_name, employee_chat_id, amount, reason = debt_info
-                    
-                    bot.send_message(
-                        message.chat.id,
-                        f"✅ Qarz to'langanini belgilandi!\n\n"
-                        f"🆔 Qarz ID: {debt_id}\n"
-                        f"👤 Xodim: {employee_name}\n"
-                        f"💰 Miqdor: {amount} so'm\n"
-                        f"📝 Sabab: {reason}"
-                    )
-                    
-                    # Notify employee
-                    try:
-                        bot.send_message(
-                            employee_chat_id,
-                            f"✅ Sizning qarzingiz to'langanini belgilandi:\n\n"
-                            f"💰 Miqdor: {amount} so'm\n"
-                            f"📝 Sabab: {reason}"
-                        )
-                    except:
-                        pass
-                else:
-                    bot.send_message(message.chat.id, "❌ Qarz topilmadi.")
-            else:
-                bot.send_message(message.chat.id, "❌ Noto'g'ri format.")
-                
-        except Exception as e:
-            bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
-        
-        clear_user_state(message.chat.id)
-        show_debts_menu(message)
+    @bot.message_handler(func=lambda message: message.text == "✅ Qarzni to'lash")
+    def start_pay_debt(message):
+        """Start debt payment process"""
+        start_debt_selection(message, 'pay')
 
     @bot.message_handler(func=lambda message: message.text == "❌ Qarzni o'chirish")
     def start_delete_debt(message):
         """Start debt deletion process"""
-        if message.chat.id != ADMIN_CHAT_ID:
+        start_debt_selection(message, 'del')
+
+    @callbacks.route("debt_page")
+    def page_debts(call):
+        """Move the debt selection one page older/newer, or cancel it"""
+        if call.message.chat.id != ADMIN_CHAT_ID:
             return
         
         try:
-            debts = get_debts()
+            bot.answer_callback_query(call.id)
+            _, action, direction, cursor_id = call.data.split(":")
             
-            if not debts:
-                bot.send_message(message.chat.id, "✅ O'chiriladigan qarzlar yo'q!")
+            if direction == "x":
+                bot.edit_message_reply_markup(call.message.chat.id, call.message.message_id, reply_markup=None)
+                show_debts_menu(call.message)
                 return
             
-            markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-            
-            for debt in debts[:10]:  # Show first 10 debts
-                debt_id, employee_name, employee_chat_id, task_id, amount, reason, payment_date, created_at, status = debt
-                markup.add(f"🗑 ID:{debt_id} - {employee_name} ({amount} so'm)")
+            if direction == "b":
+                debts, has_older = get_debts_page(before_id=int(cursor_id), limit=10)
+                has_newer = True
+            else:
+                debts, has_newer = get_debts_page(after_id=int(cursor_id), limit=10)
+                has_older = True
             
-            markup.add("🔙 Bekor qilish")
+            if not debts:
+                bot.send_message(call.message.chat.id, "✅ Boshqa qarzlar yo'q.")
+                return
             
-            set_user_state(message.chat.id, "select_debt_to_delete")
+            bot.edit_message_reply_markup(
+                call.message.chat.id,
+                call.message.message_id,
+                reply_markup=build_debt_page(action, debts, has_newer, has_older)
+            )
             
+        except Exception as e:
+            bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
+
+    def pay_debt(chat_id, debt_id, amount=None):
+        """Record a full or partial debt payment and notify the employee"""
+        payment = record_debt_payment(debt_id, amount)
+        
+        if not payment:
+            bot.send_message(chat_id, "❌ Qarz topilmadi.")
+            return
+        
+        if payment["remaining"] > 0:
+            status_line = f"💳 Qolgan qarz: {payment['remaining']:,.0f} so'm"
+        else:
+            status_line = "✅ Qarz to'liq yopildi"
+            scheduler.cancel("debt_reminder", debt_id)
+        
+        bot.send_message(
+            chat_id,
+            f"✅ To'lov qabul qilindi!\n\n"
+            f"🆔 Qarz ID: {debt_id}\n"
+            f"👤 Xodim: {payment['employee_name']}\n"
+            f"💰 To'langan: {payment['paid']:,.0f} so'm\n"
+            f"{status_line}\n"
+            f"📝 Sabab: {payment['reason']}"
+        )
+        
+        # Notify employee
+        try:
             bot.send_message(
-                message.chat.id,
-                "🗑 Qaysi qarzni o'chirmoqchisiz?",
-                reply_markup=markup
+                payment["employee_chat_id"],
+                f"✅ Qarzingiz bo'yicha to'lov qabul qilindi:\n\n"
+                f"💰 To'langan: {payment['paid']:,.0f} so'm\n"
+                f"{status_line}\n"
+                f"📝 Sabab: {payment['reason']}"
             )
+        except:
+            pass
+
+    def remove_debt(chat_id, debt_id):
+        """Delete a debt and report what was removed"""
+        debt_info = delete_debt(debt_id)
+        
+        if not debt_info:
+            bot.send_message(chat_id, "❌ Qarz topilmadi.")
+            return
+        
+        scheduler.cancel("debt_reminder", debt_id)
+        
+        employee_name, amount, reason = debt_info
+        
+        bot.send_message(
+            chat_id,
+            f"🗑 Qarz o'chirildi!\n\n"
+            f"🆔 Qarz ID: {debt_id}\n"
+            f"👤 Xodim: {employee_name}\n"
+            f"💰 Miqdor: {amount} so'm\n"
+            f"📝 Sabab: {reason}"
+        )
+
+    @callbacks.route("debt_pay")
+    @callbacks.route("debt_del")
+    def select_debt(call):
+        """Pay or delete the debt chosen from the inline list"""
+        if call.message.chat.id != ADMIN_CHAT_ID:
+            return
+        
+        try:
+            bot.answer_callback_query(call.id)
+            action, debt_id = call.data.split(":")
+            
+            # Drop the list so a second tap can't repeat the action
+            bot.edit_message_reply_markup(call.message.chat.id, call.message.message_id, reply_markup=None)
+            
+            if action == "debt_pay":
+                outstanding = get_debt_outstanding(int(debt_id))
+                
+                markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
+                markup.add("💯 To'liq to'lash")
+                markup.add("🔙 Bekor qilish")
+                
+                set_user_state(call.message.chat.id, "debt_payment_amount", {"debt_id": int(debt_id)})
+                
+                bot.send_message(
+                    call.message.chat.id,
+                    f"💳 Qarz ID: {debt_id}\n"
+                    f"💰 Qolgan qarz: {outstanding:,.0f} so'm\n\n"
+                    f"To'lov miqdorini kiriting (so'mda) yoki to'liq to'lashni tanlang:",
+                    reply_markup=markup
+                )
+                return
             
+            remove_debt(call.message.chat.id, int(debt_id))
+                
         except Exception as e:
-            bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
+            bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
+        
+        show_debts_menu(call.message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "select_debt_to_delete")
-    def delete_selected_debt(message):
-        """Delete selected debt"""
+    @bot.message_handler(func=lambda message: current_state(message) == "debt_payment_amount")
+    def get_debt_payment_amount(message):
+        """Get payment amount for the selected debt"""
         if message.text == "🔙 Bekor qilish":
             clear_user_state(message.chat.id)
             show_debts_menu(message)
             return
         
+        debt_id = get_user_state(message.chat.id).data["debt_id"]
+        
         try:
-            # Extract debt ID from message
-            if "ID:" in message.text:
-                debt_id = int(message.text.split("ID:")[1].split(" ")[0])
-                
-                # Delete debt
-                from database import DATABASE_PATH
-                import sqlite3
-                
-                conn = sqlite3.connect(DATABASE_PATH)
-                cursor = conn.cursor()
-                
-                # Get debt info before deleting
-                cursor.execute("""
-                    SELECT employee_name, amount, reason 
-                    FROM debts WHERE id = ?
-                """, (debt_id,))
-                
-                debt_info = cursor.fetchone()
-                
-                if debt_info:
-                    cursor.execute("DELETE FROM debts WHERE id = ?", (debt_id,))
-                    conn.commit()
-                    
-                    employee_name, amount, reason = debt_info
-                    
-                    bot.send_message(
-                        message.chat.id,
-                        f"🗑 Qarz o'chirildi!\n\n"
-                        f"🆔 Qarz ID: {debt_id}\n"
-                        f"👤 Xodim: {employee_name}\n"
-                        f"💰 Miqdor: {amount} so'm\n"
-                        f"📝 Sabab: {reason}"
-                    )
-                else:
-                    bot.send_message(message.chat.id, "❌ Qarz topilmadi.")
-                
-                conn.close()
+            if message.text == "💯 To'liq to'lash":
+                amount = None
             else:
-                bot.send_message(message.chat.id, "❌ Noto'g'ri format.")
-                
+                amount = float(message.text.replace(" ", "").replace(",", ""))
+        except ValueError:
+            bot.send_message(message.chat.id, "❌ Noto'g'ri format. Raqam kiriting:")
+            return
+        
+        try:
+            pay_debt(message.chat.id, debt_id, amount)
+        except ValueError as e:
+            # Amount outside what is still owed: ask again
+            bot.send_message(message.chat.id, f"❌ {str(e)}. Qaytadan kiriting:")
+            return
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
         
@@ -1701,23 +2048,22 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
     # NEW EMPLOYEE ADDITION HANDLERS
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "add_employee_name")
+    @bot.message_handler(func=lambda message: current_state(message) == "add_employee_name")
     def get_employee_name(message):
         """Get new employee name"""
-        admin_data[message.chat.id]["name"] = message.text
-        set_user_state(message.chat.id, "add_employee_id")
+        update_user_state(message.chat.id, "add_employee_id", name=message.text)
         
         bot.send_message(
             message.chat.id,
             "🆔 Xodimning Telegram ID sini kiriting:"
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "add_employee_id")
+    @bot.message_handler(func=lambda message: current_state(message) == "add_employee_id")
     def get_employee_id(message):
         """Get new employee Telegram ID and add to system"""
         try:
             chat_id = int(message.text)
-            name = admin_data[message.chat.id]["name"]
+            name = get_user_state(message.chat.id).data["name"]
             
             # Update config file
             import config
@@ -1783,15 +2129,13 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
         
         clear_user_state(message.chat.id)
-        admin_data.pop(message.chat.id, None)
         show_admin_panel(message)
 
     # OTHER DEBT HANDLERS
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "other_debt_name")
+    @bot.message_handler(func=lambda message: current_state(message) == "other_debt_name")
     def get_other_debt_name(message):
         """Get name for non-employee debt"""
-        admin_data[message.chat.id]["employee"] = message.text
-        set_user_state(message.chat.id, "manual_debt_amount")
+        update_user_state(message.chat.id, "manual_debt_amount", employee=message.text)
         
         bot.send_message(
             message.chat.id,
@@ -1823,10 +2167,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get tasks count
@@ -1871,10 +2214,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Tasks statistics
@@ -1888,9 +2230,10 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             total_received = cursor.fetchone()[0] or 0
             
             # Debts statistics
-            cursor.execute("SELECT COUNT(*), SUM(amount) FROM debts")
-            debt_count, total_debt = cursor.fetchone()
-            total_debt = total_debt or 0
+            cursor.execute("SELECT COUNT(*) FROM debts WHERE status = 'unpaid'")
+            debt_count = cursor.fetchone()[0]
+            cursor.execute("SELECT COALESCE(SUM(balance), 0) FROM debtor_balances")
+            total_debt = cursor.fetchone()[0]
             
             # Employee locations statistics
             cursor.execute("SELECT COUNT(*) FROM employee_locations WHERE created_at > datetime('now', '-24 hours')")
@@ -1920,29 +2263,19 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             for i, (emp_name, count) in enumerate(top_employees, 1):
                 top_emp_text += f"{i}. {emp_name}: {count} ta\n"
             
-            stats_text = f"""
-📊 Batafsil Tizim Statistikasi
-
-📝 VAZIFALAR:
-{task_status_text}
-💰 Umumiy to'lov: {total_payments:,.0f} so'm
-💵 Olingan to'lov: {total_received:,.0f} so'm
-💸 To'lanmagan: {total_payments - total_received:,.0f} so'm
-
-💳 QARZLAR:
-🔢 Umumiy qarzlar: {debt_count} ta
-💰 Umumiy qarz miqdori: {total_debt:,.0f} so'm
-
-📍 LOKATSIYA KUZATUVI:
-📊 So'nggi 24 soat: {recent_locations} ta lokatsiya
-
-🏆 ENG FAOL XODIMLAR:
-{top_emp_text}
-
-👥 Ro'yxatdagi xodimlar: {len(EMPLOYEES)} ta
-
-🕐 Hisoblangan vaqt: {datetime.now().strftime('%d.%m.%Y %H:%M')}
-"""
+            stats_text = DETAILED_STATISTICS.render(
+                locale_for(message.from_user),
+                task_status=task_status_text,
+                total_payments=total_payments,
+                total_received=total_received,
+                unpaid=total_payments - total_received,
+                debt_count=debt_count,
+                total_debt=total_debt,
+                recent_locations=recent_locations,
+                top_employees=top_emp_text,
+                employee_count=len(EMPLOYEES),
+                time=datetime.now().strftime('%d.%m.%Y %H:%M')
+            )
             
             bot.send_message(message.chat.id, stats_text)
             
@@ -2048,7 +2381,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "search_data_type")
+    @bot.message_handler(func=lambda message: current_state(message) == "search_data_type")
     def handle_search_type_selection(message):
         """Handle data search type selection"""
         if message.text == "🔙 Bekor qilish":
@@ -2086,40 +2419,21 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         else:
             bot.send_message(message.chat.id, "❌ Noto'g'ri tanlov. Qaytadan tanlang.")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0].startswith("search_"))
+    @bot.message_handler(func=lambda message: current_state(message).startswith("search_"))
     def handle_search_query(message):
         """Handle search queries"""
         state = get_user_state(message.chat.id)[0]
         query = message.text.strip()
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
-            
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            results = []
-            
             if state == "search_task_search":
-                cursor.execute("""
-                    SELECT id, description, assigned_to, status, created_at, payment_amount
-                    FROM tasks 
-                    WHERE id LIKE ? OR description LIKE ? OR assigned_to LIKE ?
-                """, (f"%{query}%", f"%{query}%", f"%{query}%"))
-                results = cursor.fetchall()
-                
-                if results:
-                    result_text = "🔍 Vazifa qidiruv natijalari:\n\n"
-                    for task_id, desc, assigned_to, status, created_at, payment in results:
-                        emoji = {"pending": "⏳", "in_progress": "🔄", "completed": "✅"}.get(status, "❓")
-                        result_text += f"{emoji} ID: {task_id}\n"
-                        result_text += f"📝 {desc[:50]}{'...' if len(desc) > 50 else ''}\n"
-                        result_text += f"👤 {assigned_to} | 💰 {payment or 0:,.0f} so'm\n\n"
-                else:
-                    result_text = "❌ Hech qanday vazifa topilmadi."
+                send_paged_view(message.chat.id, "ts", {"query": query}, "❌ Hech qanday vazifa topilmadi.")
             
             elif state == "search_employee_search":
+                from database import get_connection
+                
+                conn = get_connection()
+                cursor = conn.cursor()
                 cursor.execute("""
                     SELECT COUNT(*) as task_count, 
                            SUM(CASE WHEN status='completed' THEN 1 ELSE 0 END) as completed,
@@ -2128,6 +2442,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                     WHERE assigned_to LIKE ?
                 """, (f"%{query}%",))
                 emp_stats = cursor.fetchone()
+                conn.close()
                 
                 if emp_stats and emp_stats[0] > 0:
                     task_count, completed, total_payment = emp_stats
@@ -2137,35 +2452,13 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                     result_text += f"💰 Umumiy to'lov: {total_payment or 0:,.0f} so'm"
                 else:
                     result_text = "❌ Bunday xodim topilmadi."
+                bot.send_message(message.chat.id, result_text)
             
             elif state == "search_debt_search":
-                cursor.execute("""
-                    SELECT employee_name, amount, reason, payment_date, created_at
-                    FROM debts 
-                    WHERE employee_name LIKE ? OR reason LIKE ?
-                """, (f"%{query}%", f"%{query}%"))
-                results = cursor.fetchall()
-                
-                if results:
-                    result_text = "💸 Qarz qidiruv natijalari:\n\n"
-                    for emp_name, amount, reason, pay_date, created in results:
-                        result_text += f"👤 {emp_name}\n"
-                        result_text += f"💰 {amount:,.0f} so'm\n"
-                        result_text += f"📝 {reason}\n"
-                        result_text += f"📅 {pay_date}\n\n"
-                else:
-                    result_text = "❌ Hech qanday qarz topilmadi."
-            else:
-                result_text = "❌ Qidiruv turi tanilmadi."
+                send_paged_view(message.chat.id, "ds", {"query": query}, "❌ Hech qanday qarz topilmadi.")
             
-            conn.close()
-            
-            if len(result_text) > 4000:
-                parts = [result_text[i:i+4000] for i in range(0, len(result_text), 4000)]
-                for part in parts:
-                    bot.send_message(message.chat.id, part)
             else:
-                bot.send_message(message.chat.id, result_text)
+                bot.send_message(message.chat.id, "❌ Qidiruv turi tanilmadi.")
             
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Qidirishda xatolik: {str(e)}")
@@ -2238,7 +2531,21 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "select_employee_track")
+    def request_employee_location(employee_chat_id):
+        """Ask an employee for their location; the reply is saved unless they are mid-wizard"""
+        markup = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
+        location_btn = types.KeyboardButton("📍 Joriy joylashuvim", request_location=True)
+        markup.add(location_btn)
+        
+        bot.send_message(
+            employee_chat_id,
+            "📍 Vazifa uchun joriy joylashuvingizni yuboring:",
+            reply_markup=markup
+        )
+        if not get_user_state(employee_chat_id).state:
+            set_user_state(employee_chat_id, "employee_location")
+
+    @bot.message_handler(func=lambda message: current_state(message) == "select_employee_track")
     def handle_employee_tracking_selection(message):
         """Handle employee tracking selection"""
         if message.text == "🔙 Ortga":
@@ -2259,15 +2566,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             for employee_name, employee_chat_id in config.EMPLOYEES.items():
                 try:
                     # Send silent location request
-                    markup = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
-                    location_btn = types.KeyboardButton("📍 Joriy joylashuvim", request_location=True)
-                    markup.add(location_btn)
-                    
-                    bot.send_message(
-                        employee_chat_id,
-                        "📍 Vazifa uchun joriy joylashuvingizni yuboring:",
-                        reply_markup=markup
-                    )
+                    request_employee_location(employee_chat_id)
                     success_count += 1
                 except:
                     pass
@@ -2287,15 +2586,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             employee_chat_id = config.EMPLOYEES[message.text]
             
             try:
-                markup = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
-                location_btn = types.KeyboardButton("📍 Joriy joylashuvim", request_location=True)
-                markup.add(location_btn)
-                
-                bot.send_message(
-                    employee_chat_id,
-                    "📍 Vazifa uchun joriy joylashuvingizni yuboring:",
-                    reply_markup=markup
-                )
+                request_employee_location(employee_chat_id)
                 
                 bot.send_message(
                     message.chat.id,
@@ -2318,88 +2609,39 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
     def show_location_history(message):
         """Show recent employee locations"""
         try:
-            from database import DATABASE_PATH
-            import sqlite3
-            
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Get recent locations (last 24 hours)
-            cursor.execute("""
-                SELECT employee_name, latitude, longitude, created_at, location_type
-                FROM employee_locations 
-                WHERE created_at > datetime('now', '-1 day')
-                ORDER BY created_at DESC
-                LIMIT 20
-            """)
-            
-            locations = cursor.fetchall()
-            conn.close()
-            
-            if not locations:
-                bot.send_message(message.chat.id, "📍 So'nggi 24 soatda lokatsiya ma'lumotlari topilmadi.")
-                return
-            
-            history_text = "📊 So'nggi 24 soat lokatsiya tarixi:\n\n"
-            
-            for i, (emp_name, lat, lon, created_at, loc_type) in enumerate(locations, 1):
-                try:
-                    time_str = datetime.fromisoformat(created_at).strftime("%d.%m %H:%M")
-                except:
-                    time_str = created_at
-                
-                history_text += f"{i}. 👤 {emp_name}\n"
-                history_text += f"   📍 {lat:.6f}, {lon:.6f}\n"
-                history_text += f"   🕐 {time_str}\n\n"
-            
-            # Send Google Maps links for recent locations
-            if locations:
-                latest_locations = {}
-                for emp_name, lat, lon, created_at, loc_type in locations:
-                    if emp_name not in latest_locations:
-                        latest_locations[emp_name] = (lat, lon)
-                
-                history_text += "🗺 Google Maps havolalar:\n"
-                for emp_name, (lat, lon) in latest_locations.items():
-                    maps_url = f"https://maps.google.com/?q={lat},{lon}"
-                    history_text += f"📍 {emp_name}: {maps_url}\n"
-            
-            if len(history_text) > 4000:
-                parts = [history_text[i:i+4000] for i in range(0, len(history_text), 4000)]
-                for part in parts:
-                    bot.send_message(message.chat.id, part)
-            else:
-                bot.send_message(message.chat.id, history_text)
-                
+            send_paged_view(message.chat.id, "loc", {},
+                            "📍 So'nggi 24 soatda lokatsiya ma'lumotlari topilmadi.")
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
+    def location_actions_keyboard(latitude, longitude, refresh=True):
+        """Map links and distance/refresh/nearby buttons for a point"""
+        point = (latitude, longitude)
+        keyboard = types.InlineKeyboardMarkup(row_width=2)
+        keyboard.add(
+            types.InlineKeyboardButton("🧭 Navigatsiya", url=f"https://maps.google.com/?q={latitude},{longitude}"),
+            types.InlineKeyboardButton("📱 Telefondan ochish", url=f"geo:{latitude},{longitude}")
+        )
+        distance = types.InlineKeyboardButton("📏 Masofa hisoblash", callback_data=callbacks.data("calc_distance", point))
+        nearby = types.InlineKeyboardButton("📊 Atrofdagi joylar", callback_data=callbacks.data("nearby_places", point))
+        if refresh:
+            keyboard.add(
+                distance,
+                types.InlineKeyboardButton("🔄 Yangilash", callback_data=callbacks.data("refresh_location", point))
+            )
+            keyboard.add(nearby)
+        else:
+            keyboard.add(distance, nearby)
+        return keyboard
+
     def send_animated_location_card(chat_id, sender_name, latitude, longitude, location_type="general"):
         """Send animated location sharing card with interactive Google Maps preview"""
         import time
         
         # Create different card styles based on location type
-        if location_type == "employee_location":
-            card_title = "👤 Xodim Lokatsiyasi"
-            card_icon = "📍"
-            card_color = "🟢"
-        elif location_type == "task_location":
-            card_title = "🎯 Vazifa Lokatsiyasi"
-            card_icon = "🚩"
-            card_color = "🔵"
-        elif location_type == "customer_location":
-            card_title = "👥 Mijoz Lokatsiyasi"
-            card_icon = "📌"
-            card_color = "🟡"
-        else:
-            card_title = "📍 Lokatsiya Ma'lumoti"
-            card_icon = "📍"
-            card_color = "⚪"
-        
-        # Generate interactive map URLs
-        google_maps_url = f"https://maps.google.com/?q={latitude},{longitude}"
-        google_maps_embed = f"https://maps.google.com/maps?q={latitude},{longitude}&output=embed"
-        yandex_maps_url = f"https://yandex.ru/maps/?ll={longitude},{latitude}&z=16&l=map"
+        card_color, card_title, card_icon = LOCATION_CARD_STYLES.get(
+            location_type, LOCATION_CARD_STYLES["general"]
+        )
         
         # Send animated loading message first
         loading_msg = bot.send_message(
@@ -2418,32 +2660,10 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         # Create animated location card with rich formatting
         current_time = datetime.now().strftime('%d.%m.%Y %H:%M:%S')
         
-        location_card = f"""
-{card_color} **{card_title}** {card_color}
-╭─────────────────────────╮
-│  {card_icon} **{sender_name}**
-│  🌍 Joylashuv ma'lumotlari
-╰─────────────────────────╯
-
-📊 **Koordinatalar:**
-• 🌐 Kenglik: `{latitude:.6f}`
-• 🌐 Uzunlik: `{longitude:.6f}`
-
-🗺 **Interaktiv Xaritalar:**
-• [📍 Google Maps]({google_maps_url})
-• [🗺 Yandex Maps]({yandex_maps_url})
-
-⏰ **Vaqt:** {current_time}
-📡 **Status:** ✅ Faol
-
-┌─────────────────────────┐
-│   🎯 Tezkor Amallar:    │
-├─────────────────────────┤
-│ 🧭 Navigatsiya          │
-│ 📏 Masofa hisoblash     │
-│ 📱 Telefondan ochish    │
-└─────────────────────────┘
-"""
+        location_card = LOCATION_CARD.render(
+            color=card_color, title=card_title, icon=card_icon, sender=sender_name,
+            lat=latitude, lon=longitude, time=current_time
+        )
         
         # Send the main location card
         bot.send_message(
@@ -2461,18 +2681,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         )
         
         # Send interactive inline keyboard for additional actions
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
-        keyboard.add(
-            types.InlineKeyboardButton("🧭 Navigatsiya", url=google_maps_url),
-            types.InlineKeyboardButton("📱 Telefondan ochish", url=f"geo:{latitude},{longitude}")
-        )
-        keyboard.add(
-            types.InlineKeyboardButton("📏 Masofa hisoblash", callback_data=f"calc_distance_{latitude}_{longitude}"),
-            types.InlineKeyboardButton("🔄 Yangilash", callback_data=f"refresh_location_{latitude}_{longitude}")
-        )
-        keyboard.add(
-            types.InlineKeyboardButton("📊 Atrofdagi joylar", callback_data=f"nearby_places_{latitude}_{longitude}")
-        )
+        keyboard = location_actions_keyboard(latitude, longitude)
         
         bot.send_message(
             chat_id,
@@ -2500,10 +2709,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         if employee_name:
             # Save location to database
             try:
-                from database import DATABASE_PATH
-                import sqlite3
+                from database import get_connection
                 
-                conn = sqlite3.connect(DATABASE_PATH)
+                conn = get_connection()
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -2525,13 +2733,12 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                 # Show employee panel after location sharing
                 show_employee_panel(message, employee_name)
                 
-                # Send animated location sharing card with interactive map preview
-                send_animated_location_card(
-                    ADMIN_CHAT_ID, 
-                    employee_name, 
-                    message.location.latitude, 
-                    message.location.longitude,
-                    "employee_location"
+                admin_notifier.notify(
+                    "location",
+                    f"👤 {employee_name}\n"
+                    f"📍 {message.location.latitude:.6f}, {message.location.longitude:.6f}\n"
+                    f"🗺 https://maps.google.com/?q={message.location.latitude},{message.location.longitude}\n"
+                    f"🕐 {datetime.now().strftime('%d.%m.%Y %H:%M')}"
                 )
                 
             except Exception as e:
@@ -2619,59 +2826,190 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             bot.send_message(message.chat.id, "❌ Profil topilmadi.")
             return
         
-        markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
-        markup.add("📌 Mening vazifalarim", "📂 Vazifalar tarixi")
-        markup.add("📊 Hisobotlar")
-        markup.add("🔙 Ortga")
-        
         bot.send_message(
             message.chat.id,
             f"👤 Xodim paneli\n\nSalom, {employee_name}!\n\nKerakli bo'limni tanlang:",
-            reply_markup=markup
+            reply_markup=KEYBOARDS["employee_panel"]
         )
 
+    # Open tasks as one paged message per employee; rendered pages are cached
+    # until one of the employee's tasks changes status (TTL covers other writers)
+    TASK_PAGE_SIZE = 8
+    task_pages = LRUCache(maxsize=256, ttl=300)  # employee name -> [(text, markup)]
+
+    def invalidate_task_pages(employee_name):
+        """Drop an employee's cached task pages after a status change or new task"""
+        if employee_name:
+            task_pages.pop(employee_name)
+
+    def get_task_pages(employee_name):
+        """Rendered open-task pages for an employee, built once per change"""
+        pages = task_pages.get(employee_name)
+        if pages is not None:
+            return pages
+        
+        tasks = get_employee_tasks(employee_name, "in_progress") + get_employee_tasks(employee_name, "pending")
+        total_pages = (len(tasks) + TASK_PAGE_SIZE - 1) // TASK_PAGE_SIZE
+        pages = []
+        for page in range(total_pages):
+            chunk = tasks[page * TASK_PAGE_SIZE:(page + 1) * TASK_PAGE_SIZE]
+            text = f"📌 Mening vazifalarim ({len(tasks)} ta)"
+            if total_pages > 1:
+                text += f" - {page + 1}/{total_pages}"
+            text += "\n"
+            
+            markup = types.InlineKeyboardMarkup(row_width=2)
+            buttons = []
+            for task in chunk:
+                task_id, description, payment_amount, status = task[0], task[1], task[5], task[8]
+                emoji = "🔄" if status == "in_progress" else "⏳"
+                payment = f"{payment_amount:,.0f} so'm" if payment_amount else "To'lov belgilanmagan"
+                text += f"\n{emoji} #{task_id} {description[:40]}{'...' if len(description) > 40 else ''}\n    💰 {payment}"
+                if status == "in_progress":
+                    buttons.append(types.InlineKeyboardButton(f"✅ #{task_id} Yakunlash", callback_data=f"complete_task:{task_id}"))
+                else:
+                    buttons.append(types.InlineKeyboardButton(f"▶️ #{task_id} Boshlash", callback_data=f"tb:s:{task_id}:{page}"))
+            markup.add(*buttons)
+            
+            nav_buttons = []
+            if page > 0:
+                nav_buttons.append(types.InlineKeyboardButton("⬅️ Oldingi", callback_data=f"tb:p:{page - 1}"))
+            if page < total_pages - 1:
+                nav_buttons.append(types.InlineKeyboardButton("Keyingi ➡️", callback_data=f"tb:p:{page + 1}"))
+            if nav_buttons:
+                markup.row(*nav_buttons)
+            pages.append((text, markup))
+        
+        task_pages.set(employee_name, pages)
+        return pages
+
+    def find_employee_name(chat_id):
+        for name, employee_chat_id in EMPLOYEES.items():
+            if employee_chat_id == chat_id:
+                return name
+        return None
+
     @bot.message_handler(func=lambda message: message.text == "📌 Mening vazifalarim")
     def show_employee_tasks(message):
         """Show employee's current tasks"""
-        employee_name = None
-        for name, chat_id in EMPLOYEES.items():
-            if chat_id == message.chat.id:
-                employee_name = name
-                break
-        
+        employee_name = find_employee_name(message.chat.id)
         if not employee_name:
             bot.send_message(message.chat.id, "❌ Profil topilmadi.")
             return
         
-        # Get pending and in-progress tasks
-        pending_tasks = get_employee_tasks(employee_name, "pending")
-        active_tasks = get_employee_tasks(employee_name, "in_progress")
-        
-        if not pending_tasks and not active_tasks:
+        pages = get_task_pages(employee_name)
+        if not pages:
             bot.send_message(message.chat.id, "📭 Sizda hozircha vazifa yo'q.")
             return
         
-        # Show pending tasks
-        if pending_tasks:
-            bot.send_message(message.chat.id, "⏳ Kutilayotgan vazifalar:")
-            for task in pending_tasks:
-                task_info = format_task_info(task)
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("▶️ Boshlash", callback_data=f"start_task_{task[0]}"))
-                
-                bot.send_message(message.chat.id, task_info, reply_markup=markup)
+        text, markup = pages[0]
+        bot.send_message(message.chat.id, text, reply_markup=markup)
+
+    @callbacks.route("tb")
+    def browse_tasks(call):
+        """Page through the task list or start a task, editing the list in place"""
+        try:
+            employee_name = find_employee_name(call.message.chat.id)
+            if not employee_name:
+                bot.answer_callback_query(call.id, "❌ Profil topilmadi.")
+                return
+            
+            parts = call.data.split(":")
+            if parts[1] == "s":
+                task_id, page = int(parts[2]), int(parts[3])
+                if not begin_task(call, task_id):
+                    return
+            else:
+                page = int(parts[2])
+                bot.answer_callback_query(call.id)
+            
+            pages = get_task_pages(employee_name)
+            if not pages:
+                bot.edit_message_text("📭 Sizda hozircha vazifa yo'q.", call.message.chat.id, call.message.message_id)
+                return
+            
+            text, markup = pages[min(page, len(pages) - 1)]
+            bot.edit_message_text(text, call.message.chat.id, call.message.message_id, reply_markup=markup)
+            
+        except Exception as e:
+            if "message is not modified" not in str(e):
+                bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
+
+    # Visiting order of open tasks; a plan is reused until the task set changes
+    tour_plans = LRUCache(maxsize=256)  # employee name -> (task signature, text, directions url)
+
+    def build_tour_plan(employee_name, tasks):
+        """Order located tasks from the employee's last fix and render the plan"""
+        located = [task for task in tasks if task[2] is not None and task[3] is not None]
+        unlocated = [task for task in tasks if task[2] is None or task[3] is None]
         
-        # Show active tasks
-        if active_tasks:
-            bot.send_message(message.chat.id, "🔄 Bajarilayotgan vazifalar:")
-            for task in active_tasks:
-                task_info = format_task_info(task)
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("✅ Yakunlash", callback_data=f"complete_task_{task[0]}"))
-                
-                bot.send_message(message.chat.id, task_info, reply_markup=markup)
+        latest = get_latest_employee_locations(employee_name)
+        if latest:
+            start = (latest[0][1], latest[0][2])
+            start_text = f"🚩 Boshlanish: oxirgi lokatsiyangiz ({latest[0][3]})"
+        else:
+            # Without a fix the oldest task is the natural first stop
+            oldest = min(located, key=lambda task: task[0])
+            start = (oldest[2], oldest[3])
+            start_text = "🚩 Boshlanish: eng eski vazifa (lokatsiyangiz hali yo'q)"
+        
+        order, _ = plan_tour(start, [(task[2], task[3]) for task in located])
+        
+        lines, total_m, total_s, exact = [], 0.0, 0.0, True
+        previous = start
+        for number, index in enumerate(order, 1):
+            task = located[index]
+            leg = route(*previous, task[2], task[3])
+            total_m, total_s, exact = total_m + leg.distance_m, total_s + leg.drive_s, exact and leg.exact
+            lines.append(
+                f"{number}. #{task[0]} {task[1][:40]}{'...' if len(task[1]) > 40 else ''}\n"
+                f"    📏 {leg.distance_m / 1000:.1f} km · 🚗 {format_duration(leg.drive_s)}"
+            )
+            previous = (task[2], task[3])
+        
+        text = f"📍 Optimal marshrut ({len(located)} ta vazifa)\n{start_text}\n\n" + "\n\n".join(lines)
+        text += f"\n\n📊 Jami: {total_m / 1000:.1f} km, 🚗 {format_duration(total_s)}"
+        if not exact:
+            text += " (taxminiy)"
+        if unlocated:
+            text += "\n\n❔ Lokatsiyasiz: " + ", ".join(f"#{task[0]}" for task in unlocated)
+        
+        # Google Maps takes the start and up to 9 further points
+        points = [start] + [(located[index][2], located[index][3]) for index in order[:9]]
+        url = "https://www.google.com/maps/dir/" + "/".join(f"{lat},{lon}" for lat, lon in points)
+        return text, url
+
+    @bot.message_handler(func=lambda message: message.text == "📍 Optimal marshrut")
+    def show_optimal_route(message):
+        """Show the employee's open tasks in an efficient visiting order"""
+        try:
+            employee_name = find_employee_name(message.chat.id)
+            if not employee_name:
+                bot.send_message(message.chat.id, "❌ Profil topilmadi.")
+                return
+            
+            tasks = [task for task in get_employee_tasks(employee_name) if task[8] in ("pending", "in_progress")]
+            if not any(task[2] is not None and task[3] is not None for task in tasks):
+                bot.send_message(message.chat.id, "📭 Lokatsiyasi bor ochiq vazifa yo'q.")
+                return
+            
+            signature = tuple(sorted((task[0], task[2], task[3]) for task in tasks))
+            cached = tour_plans.get(employee_name)
+            if cached and cached[0] == signature:
+                _, text, url = cached
+            else:
+                text, url = build_tour_plan(employee_name, tasks)
+                tour_plans.set(employee_name, (signature, text, url))
+            
+            markup = types.InlineKeyboardMarkup()
+            markup.add(types.InlineKeyboardButton("🗺 Xaritada ochish", url=url))
+            parts = split_message(text)
+            for part in parts[:-1]:
+                bot.send_message(message.chat.id, part)
+            bot.send_message(message.chat.id, parts[-1], reply_markup=markup)
+            
+        except Exception as e:
+            bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
 
     @bot.message_handler(func=lambda message: message.text == "📂 Vazifalar tarixi")
     def show_employee_task_history(message):
@@ -2701,7 +3039,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "task_history_menu")
+    @bot.message_handler(func=lambda message: current_state(message) == "task_history_menu")
     def handle_task_history_menu(message):
         """Handle task history menu selections"""
         if message.text == "🔙 Ortga":
@@ -2734,116 +3072,33 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         """Show detailed task history based on period"""
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
             from datetime import datetime, timedelta
             
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
-            
-            # Build query based on period type
-            base_query = """
-                SELECT id, title, description, status, created_at, completion_report, 
-                       received_amount, completion_media
-                FROM tasks 
-                WHERE assigned_to = ? AND status = 'completed'
-            """
-            
-            params = [employee_name]
-            
+            params = {"employee": employee_name}
             if period_type == "week":
-                week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-                base_query += " AND created_at >= ?"
-                params.append(week_ago)
-                limit = 50
+                params["since"] = (datetime.now() - timedelta(days=7)).isoformat()
             elif period_type == "month":
-                month_ago = (datetime.now() - timedelta(days=30)).isoformat()
-                base_query += " AND created_at >= ?"
-                params.append(month_ago)
-                limit = 100
+                params["since"] = (datetime.now() - timedelta(days=30)).isoformat()
             elif period_type == "paid":
-                base_query += " AND received_amount > 0"
-                limit = 50
-            else:  # all
-                limit = 30
-            
-            base_query += f" ORDER BY created_at DESC LIMIT {limit}"
-            
-            cursor.execute(base_query, params)
-            
-            completed_tasks = cursor.fetchall()
-            conn.close()
-            
-            if not completed_tasks:
-                period_text = {
-                    "week": "so'nggi 7 kun",
-                    "month": "so'nggi 30 kun", 
-                    "paid": "to'lovli",
-                    "all": "barcha"
-                }.get(period_type, "")
-                
-                bot.send_message(message.chat.id, f"📭 {period_text} davrdagi bajarilgan vazifalar topilmadi.")
-                clear_user_state(message.chat.id)
-                show_employee_panel(message)
-                return
+                params["paid_only"] = True
             
-            # Period title
             period_titles = {
                 "week": "So'nggi 7 kun",
                 "month": "So'nggi 30 kun",
                 "paid": "To'lovli vazifalar",
                 "all": "Barcha vazifalar"
             }
+            params["title"] = period_titles.get(period_type, "Vazifalar tarixi")
             
-            period_title = period_titles.get(period_type, "Vazifalar tarixi")
-            history_text = f"📂 **{employee_name}** - {period_title}\n\n"
-            total_earned = 0
-            total_tasks = len(completed_tasks)
-            
-            for i, task in enumerate(completed_tasks, 1):
-                task_id, title, description, status, created_at, completion_report, received_amount, completion_media = task
-                
-                try:
-                    date_str = datetime.fromisoformat(created_at).strftime("%d.%m.%Y %H:%M")
-                except:
-                    date_str = created_at[:16] if created_at else "Noma'lum"
-                
-                amount_text = f"{received_amount:,.0f} so'm" if received_amount else "To'lov belgilanmagan"
-                if received_amount:
-                    total_earned += received_amount
-                
-                history_text += f"{i}. 📋 **{title}**\n"
-                history_text += f"   📅 {date_str}\n"
-                history_text += f"   💰 {amount_text}\n"
-                if completion_report:
-                    report_preview = completion_report[:50] + "..." if len(completion_report) > 50 else completion_report
-                    history_text += f"   📝 {report_preview}\n"
-                history_text += "\n"
-            
-            # Summary statistics
-            avg_earning = total_earned / total_tasks if total_tasks > 0 else 0
-            
-            history_text += f"📊 **Statistika:**\n"
-            history_text += f"🔢 Jami vazifalar: {total_tasks} ta\n"
-            history_text += f"💰 Jami daromad: {total_earned:,.0f} so'm\n"
-            history_text += f"📈 O'rtacha to'lov: {avg_earning:,.0f} so'm\n\n"
-            
-            # Performance indicators
-            if total_earned > 0:
-                if avg_earning >= 100000:
-                    history_text += "🏆 A'lo natija! Yuqori to'lovli vazifalar!\n"
-                elif avg_earning >= 50000:
-                    history_text += "⭐️ Yaxshi natija! Davom eting!\n"
-                else:
-                    history_text += "💪 Yaxshi ish! Yanada yuqoriga!\n"
+            period_text = {
+                "week": "so'nggi 7 kun",
+                "month": "so'nggi 30 kun", 
+                "paid": "to'lovli",
+                "all": "barcha"
+            }.get(period_type, "")
             
-            # Send in chunks if too long
-            if len(history_text) > 4000:
-                parts = [history_text[i:i+4000] for i in range(0, len(history_text), 4000)]
-                for part in parts:
-                    bot.send_message(message.chat.id, part)
-            else:
-                bot.send_message(message.chat.id, history_text)
+            send_paged_view(message.chat.id, "th", params,
+                            f"📭 {period_text} davrdagi bajarilgan vazifalar topilmadi.")
             
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Vazifalar tarixi yuklanmadi: {str(e)}")
@@ -2896,15 +3151,14 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             from datetime import datetime, timedelta
             
             # Calculate date range (last 7 days)
             end_date = datetime.now()
             start_date = end_date - timedelta(days=7)
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get completed tasks in last 7 days
@@ -2969,15 +3223,14 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             from datetime import datetime, timedelta
             
             # Calculate date range (last 30 days)
             end_date = datetime.now()
             start_date = end_date - timedelta(days=30)
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get completed tasks in last 30 days
@@ -3053,11 +3306,10 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             return
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             from datetime import datetime
             
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             # Get all task statistics
@@ -3138,13 +3390,12 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         bot.send_message(message.chat.id, "📤 Excel hisobot tayyorlanyapti...")
         
         try:
-            from database import DATABASE_PATH
-            import sqlite3
+            from database import get_connection
             from datetime import datetime
             import os
             
             # Get all tasks for employee
-            conn = sqlite3.connect(DATABASE_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -3233,63 +3484,68 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Excel hisobot xatoligi: {str(e)}")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("start_task_"))
-    def start_task(call):
-        """Start a task"""
-        task_id = int(call.data.split("_")[-1])
+    def begin_task(call, task_id):
+        """Mark a task in progress and send its details; returns False if it is gone"""
+        # Get task details including location
+        task = get_task_by_id(task_id)
+        if not task:
+            bot.answer_callback_query(call.id, "❌ Vazifa topilmadi!")
+            return False
+        
+        update_task_status(task_id, "in_progress")
+        invalidate_task_pages(task[6])
+        bot.answer_callback_query(call.id)
+        
+        # Prepare task start message
+        start_message = "✅ Vazifa boshlandi!\n\n"
+        start_message += f"📝 Vazifa: {task[1]}\n\n"  # description
+        start_message += "Vazifani yakunlash uchun '📌 Mening vazifalarim' bo'limiga o'ting."
+        
+        bot.send_message(call.message.chat.id, start_message)
+        
+        # Send location if coordinates are available
+        if task[2] and task[3]:
+            bot.send_location(call.message.chat.id, task[2], task[3])
+            bot.send_message(call.message.chat.id, "📍 Vazifa joylashuvi yuqorida ko'rsatilgan.")
+        
+        # Notify admin
+        add_message(
+            call.from_user.id,
+            ADMIN_CHAT_ID,
+            f"Vazifa #{task_id} boshlandi",
+            "task_started",
+            task_id
+        )
         
+        user_name = call.from_user.first_name or "Noma'lum"
+        admin_notifier.notify(
+            "task_started",
+            f"🔔 Vazifa #{task_id} boshlandi\n"
+            f"👤 Xodim: {user_name}"
+        )
+        return True
+
+    @callbacks.route("start_task")
+    def start_task(call):
+        """Start a task from a per-task message"""
         try:
-            # Get task details including location
-            task = get_task_by_id(task_id)
-            if not task:
-                bot.answer_callback_query(call.id, "❌ Vazifa topilmadi!")
-                return
-            
-            update_task_status(task_id, "in_progress")
-            
-            bot.edit_message_reply_markup(
-                call.message.chat.id,
-                call.message.message_id,
-                reply_markup=None
-            )
-            
-            # Prepare task start message
-            start_message = "✅ Vazifa boshlandi!\n\n"
-            start_message += f"📝 Vazifa: {task[1]}\n\n"  # description
-            start_message += "Vazifani yakunlash uchun '📌 Mening vazifalarim' bo'limiga o'ting."
-            
-            bot.send_message(call.message.chat.id, start_message)
-            
-            # Send location if coordinates are available
-            if task[2] and task[3]:
-                bot.send_location(call.message.chat.id, task[2], task[3])
-                bot.send_message(call.message.chat.id, "📍 Vazifa joylashuvi yuqorida ko'rsatilgan.")
-            
-            # Notify admin
-            add_message(
-                call.from_user.id,
-                ADMIN_CHAT_ID,
-                f"Vazifa #{task_id} boshlandi",
-                "task_started",
-                task_id
-            )
-            
-            user_name = call.from_user.first_name or "Noma'lum"
-            bot.send_message(
-                ADMIN_CHAT_ID,
-                f"🔔 Vazifa #{task_id} boshlandi\n"
-                f"👤 Xodim: {user_name}"
-            )
+            if begin_task(call, int(call.data.split(":")[1])):
+                bot.edit_message_reply_markup(
+                    call.message.chat.id,
+                    call.message.message_id,
+                    reply_markup=None
+                )
             
         except Exception as e:
             bot.send_message(call.message.chat.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("complete_task_"))
+    @callbacks.route("complete_task")
     def complete_task_start(call):
         """Start task completion process"""
-        task_id = int(call.data.split("_")[-1])
-        
-        set_user_state(call.message.chat.id, "complete_task_report", str(task_id))
+        # The task ID is inline, so the button works after a restart and on any worker
+        task_id = int(call.data.split(":")[1])
+        bot.answer_callback_query(call.id)
+        set_user_state(call.message.chat.id, "complete_task_report", {"task_id": task_id})
         
         markup = types.ReplyKeyboardRemove()
         bot.send_message(
@@ -3299,10 +3555,10 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "complete_task_report")
+    @bot.message_handler(func=lambda message: current_state(message) == "complete_task_report")
     def get_completion_report(message):
         """Get task completion report"""
-        state, task_id = get_user_state(message.chat.id)
+        task_id = get_user_state(message.chat.id).data.get("task_id", 0)
         
         # Save report (text or voice)
         report_text = ""
@@ -3315,24 +3571,17 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             report_text = f"Ovozli hisobot: {voice_path}"
         
         # Store report temporarily
-        temp_data = {
-            "task_id": int(task_id) if task_id else 0,
-            "report": report_text
-        }
-        set_user_state(message.chat.id, "complete_task_media", serialize_json_data(temp_data))
+        set_user_state(message.chat.id, "complete_task_media", {"task_id": task_id, "report": report_text})
         
         bot.send_message(
             message.chat.id,
             "📸 Endi vazifa bajarilganligini tasdiqlovchi rasm yoki video yuboring:"
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "complete_task_media", 
+    @bot.message_handler(func=lambda message: current_state(message) == "complete_task_media", 
                         content_types=['photo', 'video'])
     def get_completion_media(message):
         """Get task completion media"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
-        
         # Save media file
         media_path = None
         if message.content_type == 'photo':
@@ -3342,8 +3591,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             file_info = bot.get_file(message.video.file_id)
             media_path = save_media_file(file_info, bot, "video")
         
-        temp_data["media"] = media_path
-        set_user_state(message.chat.id, "complete_task_payment", serialize_json_data(temp_data))
+        update_user_state(message.chat.id, "complete_task_payment", media=media_path)
         
         markup = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
         markup.add("💳 Karta orqali olindi")
@@ -3358,12 +3606,9 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             reply_markup=markup
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "complete_task_payment")
+    @bot.message_handler(func=lambda message: current_state(message) == "complete_task_payment")
     def get_payment_method(message):
         """Get payment method selection"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
-        
         if message.text == "🔙 Bekor qilish":
             clear_user_state(message.chat.id)
             show_employee_panel(message)
@@ -3371,8 +3616,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         
         if message.text == "💳 Karta orqali olindi":
             # Card payment process
-            temp_data["payment_method"] = "card"
-            set_user_state(message.chat.id, "card_payment_amount", serialize_json_data(temp_data))
+            update_user_state(message.chat.id, "card_payment_amount", payment_method="card")
             
             markup = types.ReplyKeyboardRemove()
             bot.send_message(
@@ -3383,8 +3627,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             
         elif message.text == "💵 Naqd pul olindi":
             # Cash payment process
-            temp_data["payment_method"] = "cash"  
-            set_user_state(message.chat.id, "cash_payment_amount", serialize_json_data(temp_data))
+            update_user_state(message.chat.id, "cash_payment_amount", payment_method="cash")
             
             markup = types.ReplyKeyboardRemove()
             bot.send_message(
@@ -3395,8 +3638,7 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
             
         elif message.text == "💸 Qarzga qo'yildi":
             # Debt process
-            temp_data["payment_method"] = "debt"
-            set_user_state(message.chat.id, "debt_person_name", serialize_json_data(temp_data))
+            update_user_state(message.chat.id, "debt_person_name", payment_method="debt")
             
             markup = types.ReplyKeyboardRemove() 
             bot.send_message(
@@ -3408,23 +3650,37 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
         else:
             bot.send_message(message.chat.id, "❌ Iltimos, variantlardan birini tanlang.")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "card_payment_amount")
+    def complete_task(temp_data, received_amount):
+        """Mark the wizard's task completed; returns False if it is gone.
+
+        The wizard state is cleared only after the follow-ups are sent, so a
+        task that an earlier, failed attempt already completed still counts:
+        the retry sends what that attempt did not.
+        """
+        if update_task_status(
+            temp_data["task_id"],
+            "completed",
+            completion_report=temp_data["report"],
+            completion_media=temp_data.get("media") or "",
+            received_amount=received_amount
+        ):
+            return True
+        task = get_task_by_id(temp_data["task_id"])
+        return bool(task) and task[8] == "completed"  # status
+
+    @bot.message_handler(func=lambda message: current_state(message) == "card_payment_amount")
     def process_card_payment(message):
         """Process card payment completion"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
+        temp_data = get_user_state(message.chat.id).data
         
         try:
             received_amount = float(message.text.replace(" ", "").replace(",", ""))
             
-            # Complete the task
-            update_task_status(
-                temp_data["task_id"],
-                "completed",
-                completion_report=temp_data["report"],
-                completion_media=temp_data.get("media") or "",
-                received_amount=received_amount
-            )
+            if not complete_task(temp_data, received_amount):
+                clear_user_state(message.chat.id)
+                show_employee_panel(message)
+                return
+            invalidate_task_pages(find_employee_name(message.chat.id))
             
             # Get employee name
             employee_name = None
@@ -3434,35 +3690,23 @@ Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko
                     break
             
             # Success message to employee
-            success_msg = f"""
-✅ Vazifa muvaffaqiyatli yakunlandi!
-
-💳 To'lov usuli: Karta orqali
-💰 Miqdor: {received_amount:,.0f} so'm  
-📝 Status: Karta orqali to'lov qabul qilindi va hisobga tushirildi
-
-Rahmat!
-"""
+            locale = locale_for(message.from_user)
+            success_msg = CARD_PAYMENT_DONE.render(locale, amount=received_amount)
             bot.send_message(message.chat.id, success_msg)
             
             # Return to employee panel after task completion
             # Task completed successfully
             
             # Admin notification
-            admin_message = f"""
-✅ Vazifa yakunlandi!
-
-🆔 Vazifa ID: {temp_data["task_id"]}
-👤 Xodim: {employee_name or "Noma'lum"}
-💳 To'lov usuli: Karta orqali  
-💰 Olingan to'lov: {received_amount:,.0f} so'm
-📊 Status: Kartaga o'tkazildi, hisobga tushirildi
-
-📝 Hisobot: {temp_data["report"]}
-"""
+            admin_message = CARD_PAYMENT_ADMIN.render(
+                task_id=temp_data["task_id"],
+                employee=employee_name or "Noma'lum",
+                amount=received_amount,
+                report=temp_data["report"]
+            )
             
-            bot.send_message(ADMIN_CHAT_ID, admin_message)
-            send_completion_media(temp_data)
+            # The media goes out right after the digest that explains it
+            admin_notifier.notify("task_completed", admin_message, attach=lambda: send_completion_media(temp_data))
             
         except ValueError:
             bot.send_message(message.chat.id, "❌ Iltimos, to'g'ri raqam kiriting!")
@@ -3474,23 +3718,19 @@ Rahmat!
         clear_user_state(message.chat.id)
         show_employee_panel(message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "cash_payment_amount")
+    @bot.message_handler(func=lambda message: current_state(message) == "cash_payment_amount")
     def process_cash_payment(message):
         """Process cash payment completion"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
+        temp_data = get_user_state(message.chat.id).data
         
         try:
             received_amount = float(message.text.replace(" ", "").replace(",", ""))
             
-            # Complete the task
-            update_task_status(
-                temp_data["task_id"],
-                "completed", 
-                completion_report=temp_data["report"],
-                completion_media=temp_data.get("media") or "",
-                received_amount=received_amount
-            )
+            if not complete_task(temp_data, received_amount):
+                clear_user_state(message.chat.id)
+                show_employee_panel(message)
+                return
+            invalidate_task_pages(find_employee_name(message.chat.id))
             
             # Get employee name
             employee_name = None
@@ -3500,35 +3740,23 @@ Rahmat!
                     break
             
             # Success message to employee
-            success_msg = f"""
-✅ Vazifa muvaffaqiyatli yakunlandi!
-
-💵 To'lov usuli: Naqd pul
-💰 Miqdor: {received_amount:,.0f} so'm
-📝 Status: Naqd pul qabul qilindi
-
-Rahmat!
-"""
+            locale = locale_for(message.from_user)
+            success_msg = CASH_PAYMENT_DONE.render(locale, amount=received_amount)
             bot.send_message(message.chat.id, success_msg)
             
             # Return to employee panel after task completion
             # Task completed successfully
             
             # Admin notification
-            admin_message = f"""
-✅ Vazifa yakunlandi!
-
-🆔 Vazifa ID: {temp_data["task_id"]}
-👤 Xodim: {employee_name or "Noma'lum"}
-💵 To'lov usuli: Naqd pul
-💰 Olingan to'lov: {received_amount:,.0f} so'm
-📊 Status: Naqd pul olingan
-
-📝 Hisobot: {temp_data["report"]}
-"""
+            admin_message = CASH_PAYMENT_ADMIN.render(
+                task_id=temp_data["task_id"],
+                employee=employee_name or "Noma'lum",
+                amount=received_amount,
+                report=temp_data["report"]
+            )
             
-            bot.send_message(ADMIN_CHAT_ID, admin_message)
-            send_completion_media(temp_data)
+            # The media goes out right after the digest that explains it
+            admin_notifier.notify("task_completed", admin_message, attach=lambda: send_completion_media(temp_data))
             
         except ValueError:
             bot.send_message(message.chat.id, "❌ Iltimos, to'g'ri raqam kiriting!")
@@ -3540,14 +3768,10 @@ Rahmat!
         clear_user_state(message.chat.id)  
         show_employee_panel(message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "debt_person_name")
+    @bot.message_handler(func=lambda message: current_state(message) == "debt_person_name")
     def get_debt_person_name(message):
         """Get the name of person who owes money"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
-        
-        temp_data["debt_person"] = message.text.strip()
-        set_user_state(message.chat.id, "debt_amount", serialize_json_data(temp_data))
+        update_user_state(message.chat.id, "debt_amount", debt_person=message.text.strip())
         
         bot.send_message(
             message.chat.id,
@@ -3555,16 +3779,12 @@ Rahmat!
             "Miqdorini kiriting (so'mda):"
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "debt_amount")
+    @bot.message_handler(func=lambda message: current_state(message) == "debt_amount")
     def get_debt_amount(message):
         """Get debt amount"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
-        
         try:
             debt_amount = float(message.text.replace(" ", "").replace(",", ""))
-            temp_data["debt_amount"] = debt_amount
-            set_user_state(message.chat.id, "debt_reason", serialize_json_data(temp_data))
+            temp_data = update_user_state(message.chat.id, "debt_reason", debt_amount=debt_amount)
             
             bot.send_message(
                 message.chat.id,
@@ -3576,14 +3796,10 @@ Rahmat!
             bot.send_message(message.chat.id, "❌ Iltimos, to'g'ri raqam kiriting!")
             return
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "debt_reason")
+    @bot.message_handler(func=lambda message: current_state(message) == "debt_reason")
     def get_debt_reason(message):
         """Get debt reason"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
-        
-        temp_data["debt_reason"] = message.text.strip()
-        set_user_state(message.chat.id, "debt_payment_date", serialize_json_data(temp_data))
+        temp_data = update_user_state(message.chat.id, "debt_payment_date", debt_reason=message.text.strip())
         
         bot.send_message(
             message.chat.id,
@@ -3591,33 +3807,33 @@ Rahmat!
             "To'lov sanasini kiriting (masalan: 01.01.2024):"
         )
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "debt_payment_date")
+    @bot.message_handler(func=lambda message: current_state(message) == "debt_payment_date")
     def complete_debt_process(message):
         """Complete debt process and finish task"""
-        state, data_str = get_user_state(message.chat.id)
-        temp_data = parse_json_data(data_str)
+        temp_data = get_user_state(message.chat.id).data
         
         payment_date = message.text.strip()
         
         try:
-            # Complete the task with debt
-            update_task_status(
-                temp_data["task_id"],
-                "completed",
-                completion_report=temp_data["report"],
-                completion_media=temp_data.get("media") or "",
-                received_amount=0  # No money received, it's debt
-            )
+            # No money received, it's debt
+            if not complete_task(temp_data, 0):
+                clear_user_state(message.chat.id)
+                show_employee_panel(message)
+                return
+            invalidate_task_pages(find_employee_name(message.chat.id))
             
             # Add debt record
-            add_debt(
+            debt_id = add_debt(
                 employee_name=temp_data["debt_person"],
                 employee_chat_id=0,  # Unknown chat ID for external person
                 task_id=temp_data["task_id"],
                 amount=temp_data["debt_amount"],
                 reason=temp_data["debt_reason"],
-                payment_date=payment_date
+                payment_date=payment_date,
+                # Keyed on the task, so a retry after a failed send finds the first debt
+                idempotency_key=f"debt:task:{temp_data['task_id']}"
             )
+            schedule_debt_reminder(debt_id, payment_date)
             
             # Get employee name
             employee_name = None
@@ -3661,8 +3877,7 @@ Qarz ma'lumotlari saqlandi. Rahmat!
 📝 Vazifa hisoboti: {temp_data["report"]}
 """
             
-            bot.send_message(ADMIN_CHAT_ID, admin_message)
-            send_completion_media(temp_data)
+            admin_notifier.notify("debt", admin_message, attach=lambda: send_completion_media(temp_data))
             
         except Exception as e:
             bot.send_message(message.chat.id, f"❌ Xatolik: {str(e)}")
@@ -3677,13 +3892,13 @@ Qarz ma'lumotlari saqlandi. Rahmat!
             try:
                 with open(temp_data["media"], 'rb') as f:
                     if "photo" in temp_data["media"]:
-                        bot.send_photo(ADMIN_CHAT_ID, f, caption="📸 Vazifa rasmi")
+                        bot.send_photo(ADMIN_CHAT_ID, f, caption=f"📸 Vazifa #{temp_data['task_id']} rasmi")
                     elif "video" in temp_data["media"]:
-                        bot.send_video(ADMIN_CHAT_ID, f, caption="🎥 Vazifa videosi")
+                        bot.send_video(ADMIN_CHAT_ID, f, caption=f"🎥 Vazifa #{temp_data['task_id']} videosi")
                     elif "voice" in temp_data["media"]:
-                        bot.send_voice(ADMIN_CHAT_ID, f, caption="🎤 Ovozli hisobot")
+                        bot.send_voice(ADMIN_CHAT_ID, f, caption=f"🎤 Vazifa #{temp_data['task_id']} ovozli hisoboti")
             except Exception as e:
-                print(f"Error sending media to admin: {e}")
+                log.error("Error sending media to admin: %s", e)
 
     # CUSTOMER SECTION
     @bot.message_handler(func=lambda message: message.text == "👥 Mijoz")
@@ -3717,13 +3932,13 @@ Qarz ma'lumotlari saqlandi. Rahmat!
             reply_markup=markup
         )
 
-    @bot.message_handler(content_types=['contact'], func=lambda message: get_user_state(message.chat.id)[0] == "customer_phone")
+    @bot.message_handler(content_types=['contact'], func=lambda message: current_state(message) == "customer_phone")
     def get_customer_phone(message):
         """Get customer phone number"""
         if message.contact:
             phone_number = message.contact.phone_number
             temp_data = {"phone": phone_number, "name": message.from_user.first_name or "Anonim"}
-            set_user_state(message.chat.id, "customer_location", serialize_json_data(temp_data))
+            set_user_state(message.chat.id, "customer_location", temp_data)
             
             markup = types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
             location_btn = types.KeyboardButton("📍 Joylashuvni yuborish", request_location=True)
@@ -3739,7 +3954,7 @@ Qarz ma'lumotlari saqlandi. Rahmat!
         else:
             bot.send_message(message.chat.id, "❌ Telefon raqamini yuborishda xatolik. Qayta urinib ko'ring.")
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "customer_phone" and message.text == "🔙 Bekor qilish")
+    @bot.message_handler(func=lambda message: current_state(message) == "customer_phone" and message.text == "🔙 Bekor qilish")
     def cancel_customer_phone(message):
         """Cancel customer phone input"""
         clear_user_state(message.chat.id)
@@ -3747,13 +3962,13 @@ Qarz ma'lumotlari saqlandi. Rahmat!
 
 
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "customer_location" and message.text == "🔙 Bekor qilish")
+    @bot.message_handler(func=lambda message: current_state(message) == "customer_location" and message.text == "🔙 Bekor qilish")
     def cancel_customer_location(message):
         """Cancel customer location input"""
         clear_user_state(message.chat.id)
         customer_panel(message)
 
-    @bot.message_handler(func=lambda message: get_user_state(message.chat.id)[0] == "customer_chat")
+    @bot.message_handler(func=lambda message: current_state(message) == "customer_chat")
     def handle_customer_message(message):
         """Handle customer messages to admin"""
         if message.text == "❌ Suhbatni tugatish":
@@ -3768,8 +3983,7 @@ Qarz ma'lumotlari saqlandi. Rahmat!
             return
         
         # Get customer data
-        state, data_str = get_user_state(message.chat.id)
-        customer_data = parse_json_data(data_str)
+        customer_data = get_user_state(message.chat.id).data
         
         # Forward message to admin with customer info
         customer_info = f"""
@@ -3781,7 +3995,7 @@ Qarz ma'lumotlari saqlandi. Rahmat!
         
         forwarded_message = f"💬 Mijoz xabari:\n\n{customer_info}\n📝 Xabar: {message.text}"
         
-        bot.send_message(ADMIN_CHAT_ID, forwarded_message)
+        admin_notifier.notify("customer_chat", forwarded_message, urgent=True)
         
         bot.send_message(
             message.chat.id,
@@ -3833,6 +4047,64 @@ Qarz ma'lumotlari saqlandi. Rahmat!
 
 
 
+    # Sampling profiler: runs for a while, then the admin gets the stacks as a file
+    stack_sampler = StackSampler()
+
+    def deliver_profile(profile):
+        """Send a finished profile to the admin as a collapsed-stack file"""
+        try:
+            ensure_directories()
+            filename = f"profile_{datetime.fromtimestamp(profile.started).strftime('%Y%m%d_%H%M%S')}.txt"
+            filepath = profile.write_collapsed(os.path.join(REPORTS_DIR, filename))
+            top = "\n".join(f"{share:>4.0%} {frame}" for frame, share in profile.top_functions())
+            caption = (
+                f"🔬 Profil: {profile.duration:.0f} soniya, {profile.samples} ta namuna, "
+                f"profiler yuki {profile.overhead:.2%}\n\n"
+                f"Eng ko'p uchragan funksiyalar:\n{top}\n\n"
+                f"Fayl collapsed-stack formatida (flamegraph.pl, speedscope.app)"
+            )
+            with open(filepath, 'rb') as f:
+                bot.send_document(ADMIN_CHAT_ID, f, caption=caption[:1024])
+            os.remove(filepath)
+        except Exception as e:
+            log.error("Profile delivery error: %s", e)
+
+    def start_profiler(message, seconds):
+        if stack_sampler.start(seconds, deliver_profile):
+            bot.send_message(
+                message.chat.id,
+                f"🔬 Profiler {seconds} soniya ishlaydi. Natija fayl sifatida yuboriladi.\n"
+                f"Oldinroq to'xtatish uchun \"🔬 Profiler\" tugmasini yana bosing."
+            )
+        else:
+            bot.send_message(message.chat.id, "⚠️ Profiler allaqachon ishlayapti.")
+
+    @bot.message_handler(func=lambda message: message.text == "🔬 Profiler")
+    def toggle_profiler(message):
+        """Start the profiler for the default time, or stop a running one early"""
+        if message.chat.id != ADMIN_CHAT_ID:
+            return
+        
+        if stack_sampler.running:
+            stack_sampler.stop()
+            bot.send_message(message.chat.id, "⏹ Profiler to'xtatildi, natija tayyorlanmoqda...")
+        else:
+            start_profiler(message, PROFILER_DEFAULT_SECONDS)
+
+    @bot.message_handler(commands=['profile'])
+    def profile_command(message):
+        """Admin: /profile [seconds] starts the profiler"""
+        if message.chat.id != ADMIN_CHAT_ID:
+            return
+        
+        parts = message.text.split()
+        try:
+            seconds = int(parts[1]) if len(parts) > 1 else PROFILER_DEFAULT_SECONDS
+        except ValueError:
+            bot.send_message(message.chat.id, "❌ Noto'g'ri format. Ishlatish: /profile [soniya]")
+            return
+        start_profiler(message, max(1, min(seconds, PROFILER_MAX_SECONDS)))
+
     # COMMON HANDLERS
     @bot.message_handler(func=lambda message: message.text == "🔙 Ortga" and message.chat.id != ADMIN_CHAT_ID)
     def go_back(message):
@@ -3854,22 +4126,23 @@ Qarz ma'lumotlari saqlandi. Rahmat!
     # Callback query handlers for interactive location cards
 
     # Callback query handlers for interactive location cards
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('calc_distance_'))
-    def handle_distance_calculation(call):
+    @callbacks.route("calc_distance", payload=True)
+    def handle_distance_calculation(call, point):
         """Handle distance calculation from location"""
         try:
-            _, _, lat, lon = call.data.split('_')
-            latitude = float(lat)
-            longitude = float(lon)
+            latitude, longitude = point
             
             # Create inline keyboard for distance calculation options
             keyboard = types.InlineKeyboardMarkup()
             keyboard.add(
-                types.InlineKeyboardButton("📍 Toshkent markazidan", callback_data=f"dist_tashkent_{lat}_{lon}"),
-                types.InlineKeyboardButton("🏢 Ofisdan", callback_data=f"dist_office_{lat}_{lon}")
+                types.InlineKeyboardButton("📍 Toshkent markazidan", callback_data=callbacks.data("dist", ("tashkent", latitude, longitude))),
+                types.InlineKeyboardButton("🏢 Ofisdan", callback_data=callbacks.data("dist", ("office", latitude, longitude)))
+            )
+            keyboard.add(
+                types.InlineKeyboardButton("👥 Xodimlardan", callback_data=callbacks.data("eta", point))
             )
             keyboard.add(
-                types.InlineKeyboardButton("🔙 Orqaga", callback_data=f"back_location_{lat}_{lon}")
+                types.InlineKeyboardButton("🔙 Orqaga", callback_data=callbacks.data("back_location", point))
             )
             
             bot.edit_message_text(
@@ -3884,14 +4157,11 @@ Qarz ma'lumotlari saqlandi. Rahmat!
         except Exception as e:
             bot.answer_callback_query(call.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('dist_'))
-    def handle_specific_distance(call):
+    @callbacks.route("dist", payload=True)
+    def handle_specific_distance(call, target):
         """Calculate specific distance"""
         try:
-            parts = call.data.split('_')
-            location_type = parts[1]
-            lat = float(parts[2])
-            lon = float(parts[3])
+            location_type, lat, lon = target
             
             # Define reference points
             reference_points = {
@@ -3901,27 +4171,7 @@ Qarz ma'lumotlari saqlandi. Rahmat!
             
             if location_type in reference_points:
                 ref_lat, ref_lon, location_name = reference_points[location_type]
-                
-                # Calculate distance using Haversine formula
-                import math
-                
-                def haversine_distance(lat1, lon1, lat2, lon2):
-                    R = 6371  # Earth's radius in kilometers
-                    
-                    lat1_rad = math.radians(lat1)
-                    lon1_rad = math.radians(lon1)
-                    lat2_rad = math.radians(lat2)
-                    lon2_rad = math.radians(lon2)
-                    
-                    dlat = lat2_rad - lat1_rad
-                    dlon = lon2_rad - lon1_rad
-                    
-                    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-                    c = 2 * math.asin(math.sqrt(a))
-                    
-                    return R * c
-                
-                distance = haversine_distance(ref_lat, ref_lon, lat, lon)
+                trip = route(ref_lat, ref_lon, lat, lon)
                 
                 # Create result message
                 result_text = f"""
@@ -3930,10 +4180,10 @@ Qarz ma'lumotlari saqlandi. Rahmat!
 📍 **Manzil:** {location_name}
 🎯 **Belgilangan joy:** {lat:.6f}, {lon:.6f}
 
-📐 **Masofa:** {distance:.2f} km
-⏱ **Taxminiy vaqt:**
-• 🚗 Avtomobil: {int(distance * 2)} daqiqa
-• 🚶 Piyoda: {int(distance * 12)} daqiqa
+📐 **Masofa:** {trip.distance_m / 1000:.2f} km{'' if trip.exact else ' (taxminiy)'}
+⏱ **Yo'l vaqti:**
+• 🚗 Avtomobil: {format_duration(trip.drive_s)}
+• 🚶 Piyoda: {format_duration(trip.walk_s)}
 
 🗺 **Navigatsiya:**
 • [Google Maps Yo'l](https://maps.google.com/maps?saddr={ref_lat},{ref_lon}&daddr={lat},{lon})
@@ -3942,7 +4192,7 @@ Qarz ma'lumotlari saqlandi. Rahmat!
                 keyboard = types.InlineKeyboardMarkup()
                 keyboard.add(
                     types.InlineKeyboardButton("🗺 Navigatsiya", url=f"https://maps.google.com/maps?saddr={ref_lat},{ref_lon}&daddr={lat},{lon}"),
-                    types.InlineKeyboardButton("🔙 Orqaga", callback_data=f"back_location_{lat}_{lon}")
+                    types.InlineKeyboardButton("🔙 Orqaga", callback_data=callbacks.data("back_location", (lat, lon)))
                 )
                 
                 bot.edit_message_text(
@@ -3956,13 +4206,53 @@ Qarz ma'lumotlari saqlandi. Rahmat!
         except Exception as e:
             bot.answer_callback_query(call.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('nearby_places_'))
-    def handle_nearby_places(call):
+    @callbacks.route("eta", payload=True)
+    def handle_employee_etas(call, point):
+        """Travel time from each employee's last known location to the point"""
+        try:
+            latitude, longitude = point
+            locations = get_latest_employee_locations()
+            if not locations:
+                bot.answer_callback_query(call.id, "📭 Xodimlar lokatsiyasi hali yo'q")
+                return
+            
+            last_seen = {name: created_at for name, _, _, created_at in locations}
+            trips = routes_to(latitude, longitude, {name: (lat, lon) for name, lat, lon, _ in locations})
+            
+            lines = [
+                f"👤 {name}: 🚗 {format_duration(trip.drive_s)} ({trip.distance_m / 1000:.1f} km)\n"
+                f"   🕐 Lokatsiya vaqti: {last_seen[name]}"
+                for name, trip in sorted(trips.items(), key=lambda item: item[1].drive_s)
+            ]
+            text = (
+                f"👥 **Xodimlar yetib kelish vaqti**\n\n"
+                f"🎯 **Belgilangan joy:** {latitude:.6f}, {longitude:.6f}\n\n" + "\n\n".join(lines)
+            )
+            if not all(trip.exact for trip in trips.values()):
+                text += "\n\n⚠️ Yo'l xaritasi topilmagan joylar uchun vaqt taxminiy"
+            
+            keyboard = types.InlineKeyboardMarkup()
+            keyboard.add(
+                types.InlineKeyboardButton("🔙 Orqaga", callback_data=callbacks.data("back_location", point))
+            )
+            
+            bot.edit_message_text(
+                split_message(text)[0],
+                call.message.chat.id,
+                call.message.message_id,
+                reply_markup=keyboard,
+                parse_mode='Markdown'
+            )
+            bot.answer_callback_query(call.id)
+            
+        except Exception as e:
+            bot.answer_callback_query(call.id, f"❌ Xatolik: {str(e)}")
+
+    @callbacks.route("nearby_places", payload=True)
+    def handle_nearby_places(call, point):
         """Show nearby places"""
         try:
-            _, _, lat, lon = call.data.split('_')
-            latitude = float(lat)
-            longitude = float(lon)
+            latitude, longitude = point
             
             # Simulated nearby places (in real implementation, you would use Google Places API)
             nearby_info = f"""
@@ -3987,7 +4277,7 @@ Bu joyni quyidagi xizmatlar orqali o'rganishingiz mumkin:
                 types.InlineKeyboardButton("🔍 Yandex", url=f"https://yandex.ru/maps/?ll={longitude},{latitude}&z=16")
             )
             keyboard.add(
-                types.InlineKeyboardButton("🔙 Orqaga", callback_data=f"back_location_{lat}_{lon}")
+                types.InlineKeyboardButton("🔙 Orqaga", callback_data=callbacks.data("back_location", point))
             )
             
             bot.edit_message_text(
@@ -4001,13 +4291,11 @@ Bu joyni quyidagi xizmatlar orqali o'rganishingiz mumkin:
         except Exception as e:
             bot.answer_callback_query(call.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('refresh_location_'))
-    def handle_location_refresh(call):
+    @callbacks.route("refresh_location", payload=True)
+    def handle_location_refresh(call, point):
         """Refresh location information"""
         try:
-            _, _, lat, lon = call.data.split('_')
-            latitude = float(lat)
-            longitude = float(lon)
+            latitude, longitude = point
             
             current_time = datetime.now().strftime('%d.%m.%Y %H:%M:%S')
             
@@ -4024,15 +4312,7 @@ Bu joyni quyidagi xizmatlar orqali o'rganishingiz mumkin:
 • Oxirgi yangilanish: Hozir
 """
             
-            keyboard = types.InlineKeyboardMarkup(row_width=2)
-            keyboard.add(
-                types.InlineKeyboardButton("🧭 Navigatsiya", url=f"https://maps.google.com/?q={latitude},{longitude}"),
-                types.InlineKeyboardButton("📱 Telefondan ochish", url=f"geo:{latitude},{longitude}")
-            )
-            keyboard.add(
-                types.InlineKeyboardButton("📏 Masofa hisoblash", callback_data=f"calc_distance_{latitude}_{longitude}"),
-                types.InlineKeyboardButton("📊 Atrofdagi joylar", callback_data=f"nearby_places_{latitude}_{longitude}")
-            )
+            keyboard = location_actions_keyboard(latitude, longitude, refresh=False)
             
             bot.edit_message_text(
                 refresh_text,
@@ -4047,27 +4327,14 @@ Bu joyni quyidagi xizmatlar orqali o'rganishingiz mumkin:
         except Exception as e:
             bot.answer_callback_query(call.id, f"❌ Xatolik: {str(e)}")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('back_location_'))
-    def handle_back_to_location(call):
+    @callbacks.route("back_location", payload=True)
+    def handle_back_to_location(call, point):
         """Return to main location view"""
         try:
-            _, _, lat, lon = call.data.split('_')
-            latitude = float(lat)
-            longitude = float(lon)
+            latitude, longitude = point
             
             # Recreate the main location interface
-            keyboard = types.InlineKeyboardMarkup(row_width=2)
-            keyboard.add(
-                types.InlineKeyboardButton("🧭 Navigatsiya", url=f"https://maps.google.com/?q={latitude},{longitude}"),
-                types.InlineKeyboardButton("📱 Telefondan ochish", url=f"geo:{latitude},{longitude}")
-            )
-            keyboard.add(
-                types.InlineKeyboardButton("📏 Masofa hisoblash", callback_data=f"calc_distance_{latitude}_{longitude}"),
-                types.InlineKeyboardButton("🔄 Yangilash", callback_data=f"refresh_location_{latitude}_{longitude}")
-            )
-            keyboard.add(
-                types.InlineKeyboardButton("📊 Atrofdagi joylar", callback_data=f"nearby_places_{latitude}_{longitude}")
-            )
+            keyboard = location_actions_keyboard(latitude, longitude)
             
             bot.edit_message_text(
                 f"🎮 **Interaktiv Amallar**\n\n"
@@ -4085,106 +4352,122 @@ Bu joyni quyidagi xizmatlar orqali o'rganishingiz mumkin:
     @bot.message_handler(func=lambda message: True)
     def handle_unknown(message):
         """Handle unknown messages"""
+        metrics.UNHANDLED_UPDATES.inc("message")
         bot.send_message(
             message.chat.id,
             "❓ Tushunmadim. Iltimos, menyudan tanlang yoki /start bosing."
         )
 
-    # Start the bot with enhanced error handling for production
-    try:
-        print("🚀 Enhanced Telegram Task Management Bot ishga tushmoqda...")
-        print(f"🔑 Bot Token: {'✅ Mavjud' if BOT_TOKEN else '❌ Mavjud emas'}")
-        print(f"👑 Admin chat ID: {ADMIN_CHAT_ID}")
-        print(f"👥 Xodimlar soni: {len(EMPLOYEES)}")
-        print("📊 Ma'lumotlar bazasi tayyorlandi")
-        print("✅ Bot muvaffaqiyatli ishga tushdi!")
-        print("📱 Bot Telegram orqali foydalanishga tayyor")
-        print("🛑 Botni to'xtatish uchun Ctrl+C bosing")
-        
-        # Keep-alive mechanism to prevent sleeping
-        def keep_alive():
-            """Keep the bot active with periodic pings"""
-            import time
-            import requests
-            while True:
-                try:
-                    time.sleep(300)  # Every 5 minutes
-                    # Self-ping to stay awake
-                    try:
-                        import socket
-                        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        s.connect(("127.0.0.1", 8080))
-                        s.close()
-                        print("💓 Keep-alive ping sent")
-                    except:
-                        pass
-                except Exception as e:
-                    print(f"⚠️ Keep-alive error: {e}")
-        
-        # Start keep-alive thread
-        import threading
-        keep_alive_thread = threading.Thread(target=keep_alive, daemon=True)
-        keep_alive_thread.start()
-        print("💓 Keep-alive mechanism started - Bot won't sleep")
-
-        # Enhanced polling with better error handling for production
-        while True:
-            try:
-                print("🔄 Bot doimiy ishlash rejimida...")
-                # Clear any existing webhook first
-                bot.remove_webhook()
-                import time
-                time.sleep(2)
-                bot.infinity_polling(none_stop=True, interval=1, timeout=60, long_polling_timeout=120)
-            except Exception as e:
-                print(f"⚠️ Bot ulanishida xatolik: {e}")
-                # Send notification about restart
-                try:
-                    bot.send_message(
-                        ADMIN_CHAT_ID,
-                        f"⚠️ Bot xatolik tufayli qayta ishga tushmoqda!\n\n"
-                        f"📝 Xatolik: {str(e)[:100]}...\n"
-                        f"🔄 10 soniyadan keyin qayta ulanish."
-                    )
-                except:
-                    pass
-                print("🔄 10 soniyadan keyin avtomatik qayta ulanish...")
-                import time
-                time.sleep(10)
-                print("🚀 Bot qayta ishga tushirilmoqda...")
-                continue
-        
-    except KeyboardInterrupt:
-        print("\n⚠️ Manual shutdown initiated...")
+    # Served on the health server's /metrics path
+    add_query_observer(metrics.observe_query)
+    metrics.instrument_bot(bot, callbacks.actions())
+    metrics.instrument_api()
+
+    # Redelivered updates (restarts, webhook retries) are dispatched once
+    UpdateDedup().install(bot)
+
+    # Shutdown order: no new updates, finish the taken ones, then timers and buffers
+    if drain is not None:
+        drain.track(bot)
+        drain.on_stop(bot.stop_polling)
+        drain.add("scheduler", scheduler.stop)
+        drain.add("admin digests", admin_notifier.stop)
+
+    return bot, admin_notifier
+
+
+def start_webhook(bot, drain: Drain):
+    """Receive updates on the HTTP front end's webhook path instead of polling"""
+    # Updates arrive on the process's one HTTP port; started here when main.py runs on its own
+    frontend.serve(HTTP_PORT)
+    frontend.attach_bot(bot)
+    # Deliveries refused while draining (503) are retried by Telegram after the restart
+    drain.on_stop(lambda: frontend.attach_bot(None))
+    url = f"{WEBHOOK_URL.rstrip('/')}/webhook/{BOT_TOKEN}"
+    while not drain.stopping.is_set():
+        try:
+            bot.set_webhook(url=url)
+            log.info("🔗 Webhook rejimi: yangilanishlar %s/webhook/... orqali keladi", WEBHOOK_URL.rstrip('/'))
+            return
+        except Exception as e:
+            log.warning("⚠️ Webhook o'rnatilmadi: %s; 10 soniyadan keyin qayta urinish", e)
+            drain.stopping.wait(10)
+
+
+def start_polling(bot, drain: Drain):
+    """Poll from a supervised thread; a crash restarts polling instead of the process"""
+    # Delete webhook to ensure polling works; it is a network round trip, so it
+    # runs beside startup and polling retries until it has landed
+    def delete_webhook():
+        try:
+            bot.delete_webhook()
+        except Exception as e:
+            log.warning("⚠️ Webhook deletion warning: %s", e)
+    
+    threading.Thread(target=delete_webhook, name="delete_webhook", daemon=True).start()
+
+    def poll():
+        log.info("🔄 Bot doimiy ishlash rejimida...")
+        bot.infinity_polling(none_stop=True, interval=1, timeout=60, long_polling_timeout=120)
+
+    def on_crash(e, wait):
         try:
-            import time
             bot.send_message(
                 ADMIN_CHAT_ID,
-                "⚠️ Bot o'chish rejimiga o'tmoqda!\n\n"
-                "🔄 Qayta ishga tushirish uchun serverni restart qiling."
+                f"⚠️ Bot xatolik tufayli qayta ishga tushmoqda!\n\n"
+                f"📝 Xatolik: {str(e)[:100]}...\n"
+                f"🔄 {wait:.0f} soniyadan keyin qayta ulanish."
             )
-            print("📢 Shutdown notification sent to admin")
-            time.sleep(10)  # Wait 10 seconds
-        except Exception as e:
-            print(f"❌ Shutdown notification error: {e}")
-        print("\n🛑 Bot to'xtatildi.")
-        sys.exit(0)
+        finally:
+            # A webhook set in the meantime would block polling
+            try:
+                bot.remove_webhook()
+            except Exception:
+                pass
+
+    threading.Thread(target=supervise, args=(poll, drain.stopping, on_crash),
+                     name="polling", daemon=True).start()
+
+
+def main():
+    """Main function to start the enhanced bot"""
+    setup_logging()
+    if not BOT_TOKEN:
+        log.critical("❌ BOT_TOKEN mavjud emas. Iltimos, bot tokenini qo'shing.")
+        sys.exit(1)
+
+    drain = Drain()
+    bot, admin_notifier = create_bot(BOT_TOKEN, drain=drain)
+    # SIGTERM (platform stop) and Ctrl+C both drain before exiting
+    drain.install_signal_handlers()
+
+    log.info("🚀 Enhanced Telegram Task Management Bot ishga tushmoqda...")
+    log.info("🔑 Bot Token: %s", "✅ Mavjud" if BOT_TOKEN else "❌ Mavjud emas")
+    log.info("👑 Admin chat ID: %s", ADMIN_CHAT_ID)
+    log.info("👥 Xodimlar soni: %d", len(EMPLOYEES))
+    log.info("📊 Ma'lumotlar bazasi tayyorlandi")
+    if WEBHOOK_URL:
+        start_webhook(bot, drain)
+    else:
+        start_polling(bot, drain)
+    log.info("✅ Bot muvaffaqiyatli ishga tushdi!")
+    log.info("📱 Bot Telegram orqali foydalanishga tayyor")
+    log.info("🛑 Botni to'xtatish uchun Ctrl+C bosing")
+
+    drain.wait()
+    log.info("⚠️ Shutdown initiated, draining...")
+    drain.run()
+    try:
+        bot.send_message(
+            ADMIN_CHAT_ID,
+            "⚠️ Bot o'chish rejimiga o'tmoqda!\n\n"
+            "🔄 Qayta ishga tushirish uchun serverni restart qiling."
+        )
+        log.info("📢 Shutdown notification sent to admin")
     except Exception as e:
-        print(f"❌ Jiddiy bot xatosi: {e}")
-        print("🚨 Bot avtomatik qayta ishga tushirilmoqda...")
-        import time
-        time.sleep(15)
-        print("🔄 Qayta ulanish...")
-        # Recursive restart to ensure bot never stops
-        try:
-            main()  # Restart the entire main function
-        except Exception as restart_error:
-            print(f"❌ Qayta ishga tushirishda xatolik: {restart_error}")
-            print("⏳ 30 soniya kutib, yana urinish...")
-            time.sleep(30)
-            main()  # Try again
+        log.error("❌ Shutdown notification error: %s", e)
+    log.info("🛑 Bot to'xtatildi.")
+    sys.exit(0)
 
 if __name__ == "__main__":
-    bot.remove_webhook()
-    bot.set_webhook(url=WEBHOOK_URL)
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+    main()
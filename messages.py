@@ -0,0 +1,354 @@
+"""
+Message templates and reply keyboards, prepared once at import.
+
+Handlers used to rebuild the same multiline f-strings and ReplyKeyboardMarkup
+objects on every call. Templates keep each message's Uzbek and Russian
+bodies in one place, with their fields checked once at import; rendering
+with str.format_map costs a microsecond or two more than an inline
+f-string, which no send notices. Keyboards are serialized to the Bot API
+JSON once and passed to telebot as is (it forwards reply_markup strings
+untouched); that is where the per-call work is saved.
+"""
+
+import json
+from string import Formatter
+from typing import Dict, List, Optional
+
+from config import DEFAULT_LOCALE
+
+LOCALES = ("uz", "ru")
+
+
+def locale_for(user) -> str:
+    """Pick the template locale for a Telegram user (message.from_user)"""
+    code = (getattr(user, "language_code", None) or "")[:2].lower()
+    return code if code in LOCALES else DEFAULT_LOCALE
+
+
+class Template:
+    """A message body per locale, parsed and checked once, rendered with str.format_map"""
+
+    __slots__ = ("name", "fields", "_bodies")
+
+    def __init__(self, name: str, **bodies: str):
+        if DEFAULT_LOCALE not in bodies:
+            raise ValueError(f"{name}: '{DEFAULT_LOCALE}' matni yo'q")
+
+        self.name = name
+        self.fields = None
+        self._bodies = {}
+        for locale, body in bodies.items():
+            body = body.strip("\n")
+            fields = {field for _, field, _, _ in Formatter().parse(body) if field is not None}
+            if not all(field.isidentifier() for field in fields):
+                raise ValueError(f"{name}: faqat oddiy nomli maydonlar mumkin: {sorted(fields)}")
+            if self.fields is None:
+                self.fields = frozenset(fields)
+            elif fields != self.fields:
+                raise ValueError(f"{name}: '{locale}' maydonlari boshqacha: {sorted(fields ^ self.fields)}")
+            self._bodies[locale] = body
+
+    def render(self, locale: str = DEFAULT_LOCALE, **values) -> str:
+        """Render the template in locale, falling back to the default one"""
+        body = self._bodies.get(locale) or self._bodies[DEFAULT_LOCALE]
+        return body.format_map(values)
+
+
+CURRENCY = {"uz": "so'm", "ru": "сум"}
+NOT_SET = {"uz": "Belgilanmagan", "ru": "Не указано"}
+
+
+def format_money(amount: Optional[float], locale: str = DEFAULT_LOCALE) -> str:
+    """Amount in so'm, or the 'not set' label"""
+    if amount is None:
+        return NOT_SET.get(locale, NOT_SET[DEFAULT_LOCALE])
+    return f"{amount:,.0f} {CURRENCY.get(locale, CURRENCY[DEFAULT_LOCALE])}"
+
+
+TASK_ASSIGNED = Template(
+    "task_assigned",
+    uz="""
+🔔 Sizga yangi vazifa tayinlandi!
+
+📝 Vazifa: {description}
+💰 To'lov: {payment}
+📅 Vaqt: {time}
+
+Vazifani boshlash uchun "👤 Xodim" tugmasini bosing va vazifalar ro'yxatini ko'ring.
+""",
+    ru="""
+🔔 Вам назначена новая задача!
+
+📝 Задача: {description}
+💰 Оплата: {payment}
+📅 Время: {time}
+
+Чтобы начать, нажмите "👤 Xodim" и откройте список задач.
+""",
+)
+
+CARD_PAYMENT_DONE = Template(
+    "card_payment_done",
+    uz="""
+✅ Vazifa muvaffaqiyatli yakunlandi!
+
+💳 To'lov usuli: Karta orqali
+💰 Miqdor: {amount:,.0f} so'm
+📝 Status: Karta orqali to'lov qabul qilindi va hisobga tushirildi
+
+Rahmat!
+""",
+    ru="""
+✅ Задача успешно завершена!
+
+💳 Способ оплаты: Картой
+💰 Сумма: {amount:,.0f} сум
+📝 Статус: Оплата картой получена и зачислена
+
+Спасибо!
+""",
+)
+
+CASH_PAYMENT_DONE = Template(
+    "cash_payment_done",
+    uz="""
+✅ Vazifa muvaffaqiyatli yakunlandi!
+
+💵 To'lov usuli: Naqd pul
+💰 Miqdor: {amount:,.0f} so'm
+📝 Status: Naqd pul qabul qilindi
+
+Rahmat!
+""",
+    ru="""
+✅ Задача успешно завершена!
+
+💵 Способ оплаты: Наличные
+💰 Сумма: {amount:,.0f} сум
+📝 Статус: Наличные получены
+
+Спасибо!
+""",
+)
+
+CARD_PAYMENT_ADMIN = Template(
+    "card_payment_admin",
+    uz="""
+✅ Vazifa yakunlandi!
+
+🆔 Vazifa ID: {task_id}
+👤 Xodim: {employee}
+💳 To'lov usuli: Karta orqali
+💰 Olingan to'lov: {amount:,.0f} so'm
+📊 Status: Kartaga o'tkazildi, hisobga tushirildi
+
+📝 Hisobot: {report}
+""",
+    ru="""
+✅ Задача завершена!
+
+🆔 ID задачи: {task_id}
+👤 Сотрудник: {employee}
+💳 Способ оплаты: Картой
+💰 Получено: {amount:,.0f} сум
+📊 Статус: Переведено на карту, зачислено
+
+📝 Отчёт: {report}
+""",
+)
+
+CASH_PAYMENT_ADMIN = Template(
+    "cash_payment_admin",
+    uz="""
+✅ Vazifa yakunlandi!
+
+🆔 Vazifa ID: {task_id}
+👤 Xodim: {employee}
+💵 To'lov usuli: Naqd pul
+💰 Olingan to'lov: {amount:,.0f} so'm
+📊 Status: Naqd pul olingan
+
+📝 Hisobot: {report}
+""",
+    ru="""
+✅ Задача завершена!
+
+🆔 ID задачи: {task_id}
+👤 Сотрудник: {employee}
+💵 Способ оплаты: Наличные
+💰 Получено: {amount:,.0f} сум
+📊 Статус: Наличные получены
+
+📝 Отчёт: {report}
+""",
+)
+
+TASK_INFO = Template(
+    "task_info",
+    uz="""
+🆔 Vazifa ID: {task_id}
+{status_emoji} Holat: {status}
+
+📝 Tavsif: {description}
+💰 To'lov: {payment}
+📅 Yaratilgan: {created}""",
+    ru="""
+🆔 ID задачи: {task_id}
+{status_emoji} Статус: {status}
+
+📝 Описание: {description}
+💰 Оплата: {payment}
+📅 Создана: {created}""",
+)
+
+TASK_INFO_LOCATION = Template("task_info_location", uz="📍 Lokatsiya: {lat:.6f}, {lon:.6f}",
+                              ru="📍 Локация: {lat:.6f}, {lon:.6f}")
+TASK_INFO_RECEIVED = Template("task_info_received", uz="💵 Olingan: {amount:,.0f} so'm",
+                              ru="💵 Получено: {amount:,.0f} сум")
+TASK_INFO_REPORT = Template("task_info_report", uz="📋 Hisobot: {report}", ru="📋 Отчёт: {report}")
+
+LOCATION_CARD_STYLES = {
+    "employee_location": ("🟢", "👤 Xodim Lokatsiyasi", "📍"),
+    "task_location": ("🔵", "🎯 Vazifa Lokatsiyasi", "🚩"),
+    "customer_location": ("🟡", "👥 Mijoz Lokatsiyasi", "📌"),
+    "general": ("⚪", "📍 Lokatsiya Ma'lumoti", "📍"),
+}
+
+LOCATION_CARD = Template(
+    "location_card",
+    uz="""
+{color} **{title}** {color}
+╭─────────────────────────╮
+│  {icon} **{sender}**
+│  🌍 Joylashuv ma'lumotlari
+╰─────────────────────────╯
+
+📊 **Koordinatalar:**
+• 🌐 Kenglik: `{lat:.6f}`
+• 🌐 Uzunlik: `{lon:.6f}`
+
+🗺 **Interaktiv Xaritalar:**
+• [📍 Google Maps](https://maps.google.com/?q={lat},{lon})
+• [🗺 Yandex Maps](https://yandex.ru/maps/?ll={lon},{lat}&z=16&l=map)
+
+⏰ **Vaqt:** {time}
+📡 **Status:** ✅ Faol
+
+┌─────────────────────────┐
+│   🎯 Tezkor Amallar:    │
+├─────────────────────────┤
+│ 🧭 Navigatsiya          │
+│ 📏 Masofa hisoblash     │
+│ 📱 Telefondan ochish    │
+└─────────────────────────┘
+""",
+    ru="""
+{color} **{title}** {color}
+╭─────────────────────────╮
+│  {icon} **{sender}**
+│  🌍 Данные о местоположении
+╰─────────────────────────╯
+
+📊 **Координаты:**
+• 🌐 Широта: `{lat:.6f}`
+• 🌐 Долгота: `{lon:.6f}`
+
+🗺 **Интерактивные карты:**
+• [📍 Google Maps](https://maps.google.com/?q={lat},{lon})
+• [🗺 Yandex Maps](https://yandex.ru/maps/?ll={lon},{lat}&z=16&l=map)
+
+⏰ **Время:** {time}
+📡 **Статус:** ✅ Активно
+
+┌─────────────────────────┐
+│   🎯 Быстрые действия:  │
+├─────────────────────────┤
+│ 🧭 Навигация            │
+│ 📏 Расчёт расстояния    │
+│ 📱 Открыть в телефоне   │
+└─────────────────────────┘
+""",
+)
+
+DETAILED_STATISTICS = Template(
+    "detailed_statistics",
+    uz="""
+📊 Batafsil Tizim Statistikasi
+
+📝 VAZIFALAR:
+{task_status}
+💰 Umumiy to'lov: {total_payments:,.0f} so'm
+💵 Olingan to'lov: {total_received:,.0f} so'm
+💸 To'lanmagan: {unpaid:,.0f} so'm
+
+💳 QARZLAR:
+🔢 To'lanmagan qarzlar: {debt_count} ta
+💰 Qolgan qarz miqdori: {total_debt:,.0f} so'm
+
+📍 LOKATSIYA KUZATUVI:
+📊 So'nggi 24 soat: {recent_locations} ta lokatsiya
+
+🏆 ENG FAOL XODIMLAR:
+{top_employees}
+
+👥 Ro'yxatdagi xodimlar: {employee_count} ta
+
+🕐 Hisoblangan vaqt: {time}
+""",
+    ru="""
+📊 Подробная статистика системы
+
+📝 ЗАДАЧИ:
+{task_status}
+💰 Общая сумма: {total_payments:,.0f} сум
+💵 Получено: {total_received:,.0f} сум
+💸 Не оплачено: {unpaid:,.0f} сум
+
+💳 ДОЛГИ:
+🔢 Непогашенные долги: {debt_count}
+💰 Остаток долга: {total_debt:,.0f} сум
+
+📍 ОТСЛЕЖИВАНИЕ:
+📊 За последние 24 часа: {recent_locations} локаций
+
+🏆 САМЫЕ АКТИВНЫЕ СОТРУДНИКИ:
+{top_employees}
+
+👥 Сотрудников в списке: {employee_count}
+
+🕐 Рассчитано: {time}
+""",
+)
+
+
+class Keyboard:
+    """A reply keyboard serialized to Bot API JSON once"""
+
+    __slots__ = ("rows", "json")
+
+    def __init__(self, rows: List[List[str]], resize: bool = True, one_time: bool = False):
+        self.rows = rows
+        markup = {"keyboard": [[{"text": text} for text in row] for row in rows],
+                  "resize_keyboard": resize}
+        if one_time:
+            markup["one_time_keyboard"] = True
+        self.json = json.dumps(markup, ensure_ascii=False)
+
+
+# Button texts double as handler routes, so keyboards are not translated
+KEYBOARDS: Dict[str, str] = {name: keyboard.json for name, keyboard in {
+    "start": Keyboard([["🔐 Admin", "👤 Xodim"], ["👥 Mijoz"]]),
+    "admin_panel": Keyboard([
+        ["➕ Yangi xodim qo'shish", "📤 Vazifa berish"],
+        ["📍 Xodimlarni kuzatish", "👥 Mijozlar so'rovlari"],
+        ["💸 Qarzlar", "📊 Ma'lumotlar"],
+        ["🔬 Profiler", "🔙 Ortga"],
+    ]),
+    "employee_panel": Keyboard([
+        ["📌 Mening vazifalarim", "📂 Vazifalar tarixi"],
+        ["📍 Optimal marshrut", "📊 Hisobotlar"],
+        ["🔙 Ortga"],
+    ]),
+    "cancel": Keyboard([["🔙 Bekor qilish"]]),
+}.items()}
+KEYBOARDS["remove"] = json.dumps({"remove_keyboard": True})
@@ -0,0 +1,206 @@
+"""
+Runtime metrics in the Prometheus text format.
+
+Handler calls and latency, the SQLite statements each handler runs, and
+outgoing Bot API calls are measured in-process. render() produces the text
+served on the health server's /metrics path; the format is simple enough
+that no client library is needed.
+"""
+
+import functools
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+
+# Upper bounds in seconds, as in the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic total per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    """Bucketed distribution per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        row = self._values.get(labels)
+        return row[-1] if row else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((labels, list(row)) for labels, row in self._values.items())
+        for labels, row in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, row):
+                cumulative += hits
+                le = 'le="%g"' % bound
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {row[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {row[-2]:g}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {row[-1]}"
+
+
+HANDLER_CALLS = Counter("bot_handler_calls_total", "Updates handled, by handler", ["handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Handler calls that raised, by handler", ["handler"])
+HANDLER_SECONDS = Histogram("bot_handler_duration_seconds", "Handler wall time", ["handler"])
+DB_QUERIES = Counter("bot_db_queries_total", "SQLite statements executed, by the handler that ran them", ["handler"])
+DB_SECONDS = Counter("bot_db_query_seconds_total", "Time spent executing SQLite statements, by handler", ["handler"])
+API_SECONDS = Histogram("bot_telegram_api_duration_seconds", "Bot API request latency", ["method"])
+API_ERRORS = Counter("bot_telegram_api_errors_total", "Failed Bot API requests", ["method", "error"])
+UNHANDLED_UPDATES = Counter("bot_unhandled_updates_total", "Updates no handler acted on, by kind", ["kind"])
+
+# Statements run outside an update (scheduler, notifier, startup) are counted here
+BACKGROUND = "background"
+
+_current = threading.local()
+
+
+def current_handler() -> str:
+    return getattr(_current, "handler", BACKGROUND)
+
+
+def observe_query(sql: str, parameters, seconds: float, conn=None):
+    """database query observer: attribute the statement to the running handler"""
+    handler = current_handler()
+    DB_QUERIES.inc(handler)
+    DB_SECONDS.inc(handler, amount=seconds)
+
+
+def timed_handler(function, label=None):
+    """Wrap a telebot handler so its calls, errors, latency and SQL are recorded.
+
+    label(update) names the handler per call; by default the function name.
+    """
+    @functools.wraps(function)
+    def wrapper(update, *args, **kwargs):
+        handler = label(update) if label else function.__name__
+        previous = getattr(_current, "handler", None)
+        _current.handler = handler
+        started = time.perf_counter()
+        try:
+            return function(update, *args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler)
+            HANDLER_CALLS.inc(handler)
+            if previous is None:
+                del _current.handler
+            else:
+                _current.handler = previous
+    return wrapper
+
+
+def instrument_bot(bot, callback_actions: Iterable[str] = ()):
+    """Time every handler registered on bot so far.
+
+    Callback queries share one dispatcher, so they are labelled by action;
+    actions outside callback_actions become "callback:unknown" to keep the
+    label set bounded.
+    """
+    known = set(callback_actions)
+
+    def callback_label(call):
+        action = (call.data or "").partition(":")[0]
+        return f"callback:{action if action in known else 'unknown'}"
+
+    for handler in bot.message_handlers + bot.edited_message_handlers:
+        handler["function"] = timed_handler(handler["function"])
+    for handler in bot.callback_query_handlers:
+        handler["function"] = timed_handler(handler["function"], callback_label)
+
+
+def instrument_api():
+    """Time every outgoing Bot API request and count failures by method"""
+    from telebot import apihelper
+
+    make_request = apihelper._make_request
+    if getattr(make_request, "instrumented", False):
+        return
+
+    @functools.wraps(make_request)
+    def timed_request(token, method_name, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return make_request(token, method_name, *args, **kwargs)
+        except Exception as e:
+            API_ERRORS.inc(method_name, type(e).__name__)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - started, method_name)
+
+    timed_request.instrumented = True
+    apihelper._make_request = timed_request
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
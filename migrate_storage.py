@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+One-shot migration of the legacy stores into the shared database.
+
+Merges tasks.db and qarzdorlik.db (written by models.TaskModel/DebtModel
+before they became adapters) and the topshiriqlar.xlsx task log into
+task_management.db. Every imported row is recorded in legacy_imports, so
+running the migrator again only picks up rows it has not seen.
+
+Usage:
+    python migrate_storage.py [--tasks-db tasks.db] [--debts-db qarzdorlik.db]
+                              [--excel topshiriqlar.xlsx] [--dry-run]
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import database
+from config import ADMIN_CHAT_ID, EMPLOYEES
+from models import LEGACY_TASK_STATUSES, legacy_task_description, parse_legacy_location
+
+# An xlsx row and its tasks.db twin are written a moment apart by the old handler
+EXCEL_DUPLICATE_WINDOW = 5  # seconds
+
+
+def _already_imported(cursor, source, source_id):
+    cursor.execute(
+        "SELECT 1 FROM legacy_imports WHERE source = ? AND source_id = ?", (source, str(source_id))
+    )
+    return cursor.fetchone() is not None
+
+
+def _record_import(cursor, source, source_id, target_table, target_id):
+    cursor.execute("""
+        INSERT INTO legacy_imports (source, source_id, target_table, target_id)
+        VALUES (?, ?, ?, ?)
+    """, (source, str(source_id), target_table, target_id))
+
+
+def _insert_task(cursor, description, location, employee, amount, status, created_at):
+    lat, lon, address = parse_legacy_location(location)
+    cursor.execute("""
+        INSERT INTO tasks (description, location_lat, location_lon, location_address,
+                          payment_amount, assigned_to, assigned_by, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (description, lat, lon, address, amount, employee, ADMIN_CHAT_ID,
+          LEGACY_TASK_STATUSES.get(status, "pending"), created_at))
+    return cursor.lastrowid
+
+
+def _to_amount(value):
+    try:
+        return float(str(value).replace(" ", "").replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def migrate_tasks_db(cursor, path):
+    """Import the legacy Uzbek-column tasks table; returns (imported, skipped)"""
+    source = os.path.basename(path)
+    legacy = sqlite3.connect(path)
+    rows = legacy.execute(
+        "SELECT id, vazifa, manzil, xodim, summa, telefon, status, sana, vaqt FROM tasks ORDER BY id"
+    ).fetchall()
+    legacy.close()
+
+    imported = 0
+    for task_id, vazifa, manzil, xodim, summa, telefon, status, sana, vaqt in rows:
+        if _already_imported(cursor, source, task_id):
+            continue
+        target_id = _insert_task(cursor, legacy_task_description(vazifa, telefon), manzil,
+                                 xodim, summa, status, f"{sana} {vaqt}")
+        _record_import(cursor, source, task_id, "tasks", target_id)
+        imported += 1
+    return imported, len(rows) - imported
+
+
+def migrate_debts_db(cursor, path):
+    """Import legacy debts without due-date reminders; ledger entries are backfilled by init_database"""
+    source = os.path.basename(path)
+    legacy = sqlite3.connect(path)
+    rows = legacy.execute("SELECT id, employee_name, amount, reason, date FROM debts ORDER BY id").fetchall()
+    legacy.close()
+
+    imported = 0
+    for debt_id, employee_name, amount, reason, date in rows:
+        if _already_imported(cursor, source, debt_id):
+            continue
+        cursor.execute("""
+            INSERT INTO debts (employee_name, employee_chat_id, amount, reason, payment_date, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (employee_name, EMPLOYEES.get(employee_name, 0), amount, reason, date, date))
+        target_id = cursor.lastrowid
+        # The legacy date is when the debt was taken, not when it is due; mark the
+        # reminder as handled so the scheduler backfill does not fire it at once
+        cursor.execute("""
+            INSERT INTO scheduled_jobs (kind, ref_id, run_at, status, fired_at)
+            VALUES ('debt_reminder', ?, ?, 'cancelled', ?)
+        """, (target_id, time.time(), datetime.now().isoformat()))
+        _record_import(cursor, source, debt_id, "debts", target_id)
+        imported += 1
+    return imported, len(rows) - imported
+
+
+def migrate_excel(cursor, path, tasks_source):
+    """Import topshiriqlar.xlsx rows, one task per listed employee.
+
+    Rows the old admin handler also wrote to tasks.db are linked to that
+    task instead of being inserted twice. Each row is also copied into the
+    task log so the regenerated spreadsheet keeps the full history.
+    """
+    import openpyxl
+
+    source = os.path.basename(path)
+    cursor.execute("""
+        SELECT t.id, t.description, t.assigned_to, t.created_at FROM legacy_imports i
+        JOIN tasks t ON t.id = i.target_id
+        WHERE i.source = ? AND i.target_table = 'tasks'
+    """, (tasks_source,))
+    twins = {}
+    for task_id, description, employee, created_at in cursor.fetchall():
+        twins.setdefault((description, employee), []).append((created_at, task_id))
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    imported = linked = skipped = 0
+    for row_number, row in enumerate(workbook.active.iter_rows(min_row=2, values_only=True), 2):
+        if not row or not row[2]:
+            continue
+        sana, vaqt, topshiriq, lokatsiya, hodimlar, pul, holat = (list(row) + [None] * 7)[:7]
+        created_at = f"{sana} {vaqt}"
+
+        if not _already_imported(cursor, source, row_number):
+            cursor.execute("""
+                INSERT INTO task_log (logged_at, description, location, employees, payment, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (created_at, topshiriq, lokatsiya, hodimlar, None if pul is None else str(pul), holat))
+            _record_import(cursor, source, row_number, "task_log", cursor.lastrowid)
+
+        for employee in str(hodimlar or "").split(","):
+            employee = employee.strip().split()[-1] if employee.strip() else ""
+            source_id = f"{row_number}:{employee}"
+            if not employee or _already_imported(cursor, source, source_id):
+                skipped += 1
+                continue
+
+            target_id = None
+            for twin_created_at, twin_id in twins.get((topshiriq, employee), []):
+                try:
+                    gap = abs((datetime.fromisoformat(twin_created_at) -
+                               datetime.fromisoformat(created_at)).total_seconds())
+                except (TypeError, ValueError):
+                    continue
+                if gap <= EXCEL_DUPLICATE_WINDOW:
+                    target_id = twin_id
+                    linked += 1
+                    break
+
+            if target_id is None:
+                target_id = _insert_task(cursor, topshiriq, lokatsiya, employee, _to_amount(pul),
+                                         holat, created_at)
+                imported += 1
+            _record_import(cursor, source, source_id, "tasks", target_id)
+    workbook.close()
+    return imported, linked, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge legacy stores into the shared database")
+    parser.add_argument("--tasks-db", default="tasks.db")
+    parser.add_argument("--debts-db", default="qarzdorlik.db")
+    parser.add_argument("--excel", default="topshiriqlar.xlsx")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be imported, change nothing")
+    args = parser.parse_args()
+
+    database.init_database()
+    conn = database.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        if os.path.exists(args.tasks_db):
+            imported, skipped = migrate_tasks_db(cursor, args.tasks_db)
+            print(f"📝 {args.tasks_db}: {imported} ta vazifa import qilindi, {skipped} ta avval import qilingan")
+
+        if os.path.exists(args.debts_db):
+            imported, skipped = migrate_debts_db(cursor, args.debts_db)
+            print(f"💸 {args.debts_db}: {imported} ta qarz import qilindi, {skipped} ta avval import qilingan")
+
+        if os.path.exists(args.excel):
+            try:
+                imported, linked, skipped = migrate_excel(cursor, args.excel, os.path.basename(args.tasks_db))
+                print(f"📊 {args.excel}: {imported} ta yangi vazifa, {linked} ta mavjud vazifaga bog'landi, "
+                      f"{skipped} ta o'tkazib yuborildi")
+            except ImportError:
+                print(f"⚠️ {args.excel} o'qish uchun openpyxl kerak, o'tkazib yuborildi")
+
+        if args.dry_run:
+            conn.rollback()
+            print("🔍 Dry run: hech narsa saqlanmadi")
+            return
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Imported debts get their ledger charges and balances here
+    database.init_database()
+    print("✅ Migratsiya tugadi")
+
+
+if __name__ == "__main__":
+    main()
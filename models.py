@@ -1,193 +1,167 @@
-import sqlite3
 from datetime import datetime
-from typing import List, Dict, Optional
-import os
+from typing import List, Dict, Optional, Tuple
+
+import database
+from config import ADMIN_CHAT_ID, EMPLOYEES
+
+# Legacy handlers speak Uzbek task statuses; the shared store uses English ones
+LEGACY_TASK_STATUSES = {
+    "⏳ Davom etmoqda": "pending",
+    "Davom etmoqda": "pending",
+    "🔄 Jarayonda": "in_progress",
+    "✅ Bajarildi": "completed",
+}
+TASK_STATUS_LABELS = {
+    "pending": "⏳ Davom etmoqda",
+    "in_progress": "🔄 Jarayonda",
+    "completed": "✅ Bajarildi",
+}
+
+NO_PHONE = "Telefon yo'q"
+
+def parse_legacy_location(location: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """Split a legacy "lat, lon" string; anything else is kept as an address"""
+    try:
+        lat, lon = (float(part) for part in str(location).split(","))
+        return lat, lon, None
+    except (TypeError, ValueError):
+        return None, None, location
+
+def legacy_task_description(description: str, phone: str = None) -> str:
+    """Fold the legacy phone column into the description"""
+    if phone and phone != NO_PHONE:
+        return f"{description}\n📞 {phone}"
+    return description
 
 class DatabaseModel:
-    def __init__(self, db_path: str):
+    """Adapter giving the legacy handlers their old API on top of the shared store"""
+
+    def __init__(self, db_path: str = None):
+        # db_path is accepted for compatibility; all data lives in the shared store
         self.db_path = db_path
         self.init_database()
-    
+
     def init_database(self):
         """Initialize database tables"""
-        pass
-    
+        database.init_database()
+
     def get_connection(self):
         """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        return database.get_connection()
 
 class TaskModel(DatabaseModel):
-    def __init__(self, db_path: str = "tasks.db"):
-        super().__init__(db_path)
-    
-    def init_database(self):
-        """Initialize tasks database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                vazifa TEXT NOT NULL,
-                manzil TEXT NOT NULL,
-                xodim TEXT NOT NULL,
-                summa REAL NOT NULL,
-                telefon TEXT,
-                status TEXT DEFAULT 'Davom etmoqda',
-                sana TEXT NOT NULL,
-                vaqt TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-        conn.close()
-    
-    def add_task(self, description: str, location: str, employee: str, 
-                 amount: float, phone: str = "Telefon yo'q") -> bool:
+    def add_task(self, description: str, location: str, employee: str,
+                 amount: float, phone: str = NO_PHONE) -> bool:
         """Add new task to database"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            now = datetime.now()
-            cursor.execute("""
-                INSERT INTO tasks (vazifa, manzil, xodim, summa, telefon, status, sana, vaqt)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (description, location, employee, amount, phone, "⏳ Davom etmoqda", 
-                  now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S")))
-            conn.commit()
-            conn.close()
+            lat, lon, address = parse_legacy_location(location)
+            database.add_task(
+                legacy_task_description(description, phone), lat, lon, address,
+                amount, employee, ADMIN_CHAT_ID
+            )
             return True
         except Exception as e:
             print(f"Task qo'shishda xato: {e}")
             return False
-    
+
+    def add_task_group(self, description: str, location: str, employees: List[str],
+                       amount: float, phone: str = NO_PHONE) -> Dict[str, int]:
+        """Add one task for several employees at once; returns {employee: task_id}"""
+        lat, lon, address = parse_legacy_location(location)
+        _, task_ids = database.add_task_group(
+            legacy_task_description(description, phone), lat, lon, address,
+            amount, employees, ADMIN_CHAT_ID
+        )
+        return task_ids
+
+    def _to_dict(self, row) -> Dict:
+        task_id, description, lat, lon, address, amount, status, created_at = row
+        created = (created_at or "").replace("T", " ")
+        return {
+            'id': task_id,
+            'description': description,
+            'location': address or (f"{lat}, {lon}" if lat is not None else ""),
+            'amount': amount or 0,
+            'phone': NO_PHONE,
+            'status': TASK_STATUS_LABELS.get(status, status),
+            'date': created[:10],
+            'time': created[11:19]
+        }
+
     def get_tasks_by_employee(self, employee: str, status: str = None) -> List[Dict]:
         """Get tasks for specific employee"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        query = """
+            SELECT id, description, location_lat, location_lon, location_address,
+                   payment_amount, status, created_at
+            FROM tasks WHERE assigned_to = ?
+        """
+        params = [employee]
         if status:
-            cursor.execute("""
-                SELECT id, vazifa, manzil, summa, telefon, status, sana, vaqt 
-                FROM tasks WHERE xodim = ? AND status = ?
-            """, (employee, status))
-        else:
-            cursor.execute("""
-                SELECT id, vazifa, manzil, summa, telefon, status, sana, vaqt 
-                FROM tasks WHERE xodim = ?
-            """, (employee,))
-        
+            query += " AND status = ?"
+            params.append(LEGACY_TASK_STATUSES.get(status, status))
+        cursor.execute(query, params)
         rows = cursor.fetchall()
         conn.close()
-        
-        tasks = []
-        for row in rows:
-            tasks.append({
-                'id': row[0],
-                'description': row[1],
-                'location': row[2],
-                'amount': row[3],
-                'phone': row[4],
-                'status': row[5],
-                'date': row[6],
-                'time': row[7]
-            })
-        return tasks
-    
+
+        return [self._to_dict(row) for row in rows]
+
     def update_task_status(self, task_id: int, status: str) -> bool:
         """Update task status"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE tasks SET status = ? WHERE id = ?", (status, task_id))
-            conn.commit()
-            conn.close()
+            database.update_task_status(task_id, LEGACY_TASK_STATUSES.get(status, status))
             return True
         except Exception as e:
             print(f"Status yangilashda xato: {e}")
             return False
-    
+
     def get_tasks_in_date_range(self, employee: str, start_date: str, end_date: str, status: str = "✅ Bajarildi") -> List[Dict]:
         """Get tasks in date range"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT vazifa, manzil, summa, sana FROM tasks
-            WHERE xodim = ? AND status = ? AND sana BETWEEN ? AND ?
-        """, (employee, status, start_date, end_date))
+            SELECT id, description, location_lat, location_lon, location_address,
+                   payment_amount, status, created_at
+            FROM tasks
+            WHERE assigned_to = ? AND status = ? AND date(created_at) BETWEEN ? AND ?
+        """, (employee, LEGACY_TASK_STATUSES.get(status, status), start_date, end_date))
         rows = cursor.fetchall()
         conn.close()
-        
+
         tasks = []
         for row in rows:
+            task = self._to_dict(row)
             tasks.append({
-                'description': row[0],
-                'location': row[1],
-                'amount': row[2],
-                'date': row[3]
+                'description': task['description'],
+                'location': task['location'],
+                'amount': task['amount'],
+                'date': task['date']
             })
         return tasks
 
 class DebtModel(DatabaseModel):
-    def __init__(self, db_path: str = "qarzdorlik.db"):
-        super().__init__(db_path)
-    
-    def init_database(self):
-        """Initialize debt database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS debts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_name TEXT NOT NULL,
-                amount REAL NOT NULL,
-                reason TEXT NOT NULL,
-                date TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-        conn.close()
-    
     def add_debt(self, employee_name: str, amount: float, reason: str) -> bool:
         """Add debt record"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
             date = datetime.now().strftime("%Y-%m-%d")
-            cursor.execute("""
-                INSERT INTO debts (employee_name, amount, reason, date)
-                VALUES (?, ?, ?, ?)
-            """, (employee_name, amount, reason, date))
-            conn.commit()
-            conn.close()
+            database.add_debt(employee_name, EMPLOYEES.get(employee_name, 0), None, amount, reason, date)
             return True
         except Exception as e:
             print(f"Qarz qo'shishda xato: {e}")
             return False
-    
+
     def get_debts_by_employee(self, employee_name: str) -> List[Dict]:
-        """Get debts for specific employee"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT amount, reason, date FROM debts WHERE employee_name = ?
-        """, (employee_name,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        debts = []
-        for row in rows:
-            debts.append({
-                'amount': row[0],
-                'reason': row[1],
-                'date': row[2]
-            })
-        return debts
-    
+        """Get unpaid debts for specific employee"""
+        debts = database.get_debts(employee_name)
+        outstanding = database.get_debts_outstanding([debt[0] for debt in debts])
+
+        return [{
+            'amount': outstanding.get(debt[0], debt[4]),
+            'reason': debt[5],
+            'date': (debt[7] or "")[:10]
+        } for debt in debts]
+
     def get_total_debt(self, employee_name: str) -> float:
         """Get total debt for employee"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT SUM(amount) FROM debts WHERE employee_name = ?
-        """, (employee_name,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result[0] else 0.0
+        return database.get_debtor_balance(employee_name)
@@ -0,0 +1,167 @@
+"""
+Batched notifications to the admin chat.
+
+Routine events (task starts, completions, debts, inquiries, location shares)
+are buffered per kind and sent as one digest message when the kind's window
+elapses or its buffer reaches the batch size. Urgent events are sent at once.
+An event's attachment (a location, completion media) is sent right after the
+message that carries its text, so it never arrives before its explanation.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import ADMIN_BATCH_SIZE, ADMIN_BATCH_WINDOW
+from pager import MAX_MESSAGE_LENGTH, tg_len
+
+log = logging.getLogger(__name__)
+
+DIGEST_SEPARATOR = "\n\n━━━━━━━━━━━━━━━\n\n"
+
+DIGEST_TITLES = {
+    "task_started": "🔔 Boshlangan vazifalar",
+    "task_completed": "✅ Yakunlangan vazifalar",
+    "debt": "💸 Yangi qarzlar",
+    "inquiry": "📋 Yangi mijoz so'rovlari",
+    "location": "📍 Xodimlar lokatsiyalari",
+}
+
+
+class NotificationAggregator:
+    """Buffers admin notifications per kind and sends them as digests"""
+
+    def __init__(self, send: Callable[[str], None], window: float = ADMIN_BATCH_WINDOW,
+                 batch_size: int = ADMIN_BATCH_SIZE):
+        self._send = send
+        self.window = window
+        self.batch_size = batch_size
+        self._buffers: Dict[str, List[Tuple[str, Optional[Callable[[], None]]]]] = {}
+        self._deadlines: Dict[str, float] = {}  # kind -> monotonic time of its flush
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.events = 0
+        self.messages = 0
+
+    def notify(self, kind: str, text: str, urgent: bool = False, attach: Callable[[], None] = None):
+        """Queue text under kind; urgent events skip the buffer.
+
+        attach(), if given, sends what belongs with the text and is called once
+        the message carrying the text has been sent.
+        """
+        if urgent or self.window <= 0:
+            with self._cond:
+                self.events += 1
+            self._deliver([(text, attach)])
+            return
+
+        with self._cond:
+            self.events += 1
+            buffer = self._buffers.setdefault(kind, [])
+            buffer.append((text, attach))
+            if len(buffer) == 1:
+                self._deadlines[kind] = time.monotonic() + self.window
+            elif len(buffer) >= self.batch_size:
+                self._deadlines[kind] = 0
+            self._cond.notify()
+
+    def flush(self, kind: str = None):
+        """Send buffered events now (all kinds when kind is None)"""
+        for batch_kind, events in self._take([kind] if kind else None):
+            self._deliver(events, batch_kind)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(events) for events in self._buffers.values())
+
+    def start(self):
+        """Start the flushing thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="admin-notifier")
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the thread and send whatever is still buffered"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _take(self, kinds: Optional[List[str]]) -> List[Tuple[str, list]]:
+        with self._cond:
+            taken = []
+            for kind in list(kinds or self._buffers):
+                events = self._buffers.pop(kind, None)
+                self._deadlines.pop(kind, None)
+                if events:
+                    taken.append((kind, events))
+            return taken
+
+    def _deliver(self, events: List[Tuple[str, Optional[Callable[[], None]]]], kind: str = None):
+        title = DIGEST_TITLES.get(kind, "🔔 Bildirishnomalar")
+        for batch in split_digests([text for text, _ in events], title):
+            try:
+                self._send(format_digest(batch, title))
+                with self._cond:
+                    self.messages += 1
+            except Exception as e:
+                log.error("Admin notification error: %s", e)
+            # Attachments follow the message their text went out in
+            for _, attach in events[:len(batch)]:
+                if attach is not None:
+                    try:
+                        attach()
+                    except Exception as e:
+                        log.error("Admin notification attachment error: %s", e)
+            events = events[len(batch):]
+
+    def _next_due(self) -> List[str]:
+        """Block until some kind is due; returns the due kinds ([] once stopped)"""
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                due = [kind for kind, deadline in self._deadlines.items() if deadline <= now]
+                if due:
+                    return due
+                timeout = min(self._deadlines.values()) - now if self._deadlines else None
+                self._cond.wait(timeout)
+            return []
+
+    def _run(self):
+        while self._running:
+            for kind, events in self._take(self._next_due()):
+                self._deliver(events, kind)
+
+
+def build_digests(texts: List[str], title: str) -> List[str]:
+    """Join texts under a title, starting a new message before the length limit"""
+    return [format_digest(batch, title) for batch in split_digests(texts, title)]
+
+
+def format_digest(batch: List[str], title: str) -> str:
+    return batch[0] if len(batch) == 1 else f"{title} ({len(batch)} ta)\n\n" + DIGEST_SEPARATOR.join(batch)
+
+
+def split_digests(texts: List[str], title: str) -> List[List[str]]:
+    """Consecutive runs of texts that each fit in one digest message"""
+    if len(texts) == 1:
+        return [texts]
+
+    # Room for the "(N ta)" counter and the blank line after the title
+    budget = MAX_MESSAGE_LENGTH - tg_len(title) - 12
+    batches, current, length = [], [], 0
+    for text in texts:
+        added = tg_len(text) + (tg_len(DIGEST_SEPARATOR) if current else 0)
+        if current and length + added > budget:
+            batches.append(current)
+            current, length, added = [], 0, tg_len(text)
+        current.append(text)
+        length += added
+    batches.append(current)
+    return batches
@@ -0,0 +1,100 @@
+"""
+Splitting long bot output into Telegram-sized messages.
+
+Telegram limits a message to 4096 UTF-16 code units, so emoji outside the
+BMP count twice. Text is cut on block (blank line) and line boundaries
+first, then on spaces outside Markdown entities, and never inside an emoji
+sequence.
+"""
+
+from typing import Iterable, Iterator, List
+
+MAX_MESSAGE_LENGTH = 4096
+
+# Characters that attach to the previous one (ZWJ, variation selectors, skin tones)
+_JOINERS = {"\u200d", "\ufe0e", "\ufe0f"} | {chr(c) for c in range(0x1F3FB, 0x1F400)}
+
+
+def tg_len(text: str) -> int:
+    """Length as Telegram counts it (UTF-16 code units)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _entities_closed(text: str) -> bool:
+    """True when no bold/code/link entity is left open at the end of text"""
+    return text.count("**") % 2 == 0 and text.count("`") % 2 == 0 and text.count("[") <= text.count(")")
+
+
+def _hard_split(text: str, limit: int) -> List[str]:
+    """Split one over-long line, preferring spaces outside entities"""
+    pieces = []
+    while tg_len(text) > limit:
+        # Largest prefix within the limit
+        end, size = 0, 0
+        while end < len(text):
+            width = 2 if ord(text[end]) > 0xFFFF else 1
+            if size + width > limit:
+                break
+            size += width
+            end += 1
+        cut = end
+        space = text.rfind(" ", 0, end)
+        while space > 0 and not _entities_closed(text[:space]):
+            space = text.rfind(" ", 0, space)
+        if space > 0:
+            cut = space
+        else:
+            # Keep emoji sequences whole
+            while 0 < cut < len(text) and (text[cut] in _JOINERS or text[cut - 1] == "\u200d"):
+                cut -= 1
+            cut = cut or end
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip(" ")
+    pieces.append(text)
+    return pieces
+
+
+def paginate(blocks: Iterable[str], limit: int = MAX_MESSAGE_LENGTH, separator: str = "\n") -> Iterator[str]:
+    """Pack blocks into messages of at most limit, yielding each as soon as it is full"""
+    current, size = [], 0
+    sep_len = tg_len(separator)
+    for block in blocks:
+        block_len = tg_len(block)
+        if block_len > limit:
+            if current:
+                yield separator.join(current)
+                current, size = [], 0
+            pieces = []
+            for line in block.split("\n"):
+                pieces.extend(_hard_split(line, limit) if tg_len(line) > limit else [line])
+            yield from paginate(pieces, limit, "\n")
+            continue
+
+        added = block_len + (sep_len if current else 0)
+        if current and size + added > limit:
+            yield separator.join(current)
+            current, size, added = [], 0, block_len
+        current.append(block)
+        size += added
+    if current:
+        yield separator.join(current)
+
+
+def take_page(blocks: Iterable[str], limit: int = MAX_MESSAGE_LENGTH, separator: str = "\n\n") -> List[str]:
+    """Take blocks from the front while they fit in one message; the rest stay unread"""
+    taken, size = [], 0
+    sep_len = tg_len(separator)
+    for block in blocks:
+        added = tg_len(block) + (sep_len if taken else 0)
+        if taken and size + added > limit:
+            break
+        taken.append(block)
+        size += added
+    return taken
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Split text into messages on paragraph, line and word boundaries"""
+    if tg_len(text) <= limit:
+        return [text]
+    return [part for part in paginate(text.split("\n\n"), limit, "\n\n") if part.strip()]
@@ -0,0 +1,125 @@
+"""
+Sampling profiler for the running bot.
+
+A background thread snapshots every other thread's Python stack at a fixed
+interval (sys._current_frames) and counts identical stacks. The result is
+written in the collapsed-stack format ("thread;file:function;... count")
+that flamegraph.pl, speedscope and similar tools read. Time spent sampling
+is measured; when it exceeds max_overhead of the wall time the interval is
+stretched so the profiler never costs the bot more than that.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from config import PROFILER_INTERVAL, PROFILER_MAX_OVERHEAD
+
+MAX_DEPTH = 64  # frames kept per stack, innermost first
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profile:
+    """Collapsed stacks and the sampler's own cost"""
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = time.time()
+        self.duration = 0.0
+        self.sampling_time = 0.0
+
+    @property
+    def overhead(self) -> float:
+        """Fraction of wall time the sampler thread spent sampling"""
+        return self.sampling_time / self.duration if self.duration else 0.0
+
+    def top_functions(self, limit: int = 5):
+        """(frame, share of samples) for the innermost frames seen most"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [(frame, count / total) for frame, count in leaves.most_common(limit)]
+
+    def write_collapsed(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class StackSampler:
+    """Samples all thread stacks for a while, one run at a time"""
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_overhead: float = PROFILER_MAX_OVERHEAD):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, on_done: Callable[[Profile], None] = None) -> bool:
+        """Profile for seconds in the background; False if a run is already going"""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds, on_done),
+                                            name="StackSampler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """End the current run early; on_done still receives the partial profile"""
+        self._stop.set()
+
+    def _run(self, seconds: float, on_done):
+        profile = self.sample(seconds)
+        if on_done:
+            on_done(profile)
+
+    def sample(self, seconds: float) -> Profile:
+        """Profile the other threads for seconds (or until stop()) in this thread"""
+        profile = Profile()
+        own = threading.get_ident()
+        names = {}
+        interval = self.interval
+        started = time.perf_counter()
+        deadline = started + seconds
+        while not self._stop.is_set():
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_DEPTH:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                profile.stacks[";".join(reversed(labels))] += 1
+            del frames, frame
+            profile.samples += 1
+
+            spent = time.perf_counter() - tick
+            profile.sampling_time += spent
+            # Stretch the interval so sampling stays under max_overhead of wall time
+            interval = max(self.interval, spent / self.max_overhead)
+            self._stop.wait(max(0.0, min(interval - spent, deadline - time.perf_counter())))
+        profile.duration = time.perf_counter() - started
+        return profile
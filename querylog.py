@@ -0,0 +1,119 @@
+"""
+Per-statement SQLite statistics and a slow-query log.
+
+QueryLog observes every statement run on a backend connection (see
+database.add_query_observer). Statements are grouped by their normalized
+text - literals replaced with ?, IN lists collapsed, whitespace squeezed -
+and each group keeps its count, total and worst time. A statement slower
+than SLOW_QUERY_MS is logged with its parameters and its EXPLAIN QUERY PLAN,
+captured on the same connection. The admin report lists the groups that
+cost the most, so index work can start from the top of it.
+"""
+
+import functools
+import logging
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+from config import QUERY_STATS_SIZE, SLOW_QUERY_MS
+
+log = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# Longest parameter repr kept in a log line
+MAX_PARAMS_REPR = 300
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize(sql: str) -> str:
+    """Statement text with literals as ?, IN lists as (?...) and single spaces"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def explain(conn: sqlite3.Connection, sql: str, parameters=()) -> str:
+    """EXPLAIN QUERY PLAN as an indented tree, or "" when it cannot be explained"""
+    try:
+        # A plain cursor, so the plan query is not observed (and timed) itself
+        rows = conn.cursor(sqlite3.Cursor).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return ""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+class StatementStats:
+    __slots__ = ("count", "total", "worst", "slow", "plan")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.slow = 0
+        self.plan = None
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class QueryLog:
+    """Aggregates statement timings and logs slow statements with their plans"""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, max_statements: int = QUERY_STATS_SIZE):
+        self.slow_seconds = slow_ms / 1000
+        self.max_statements = max_statements
+        self._stats: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, sql: str, parameters, seconds: float, conn=None):
+        """database query observer"""
+        key = normalize(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    # Forget the cheapest statement; the report is about the costly ones
+                    del self._stats[min(self._stats, key=lambda k: self._stats[k].total)]
+                stats = self._stats[key] = StatementStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.worst = max(stats.worst, seconds)
+            slow = seconds >= self.slow_seconds
+            if slow:
+                stats.slow += 1
+            need_plan = slow and stats.plan is None
+
+        if not slow:
+            return
+        plan = explain(conn, sql, parameters) if need_plan and conn is not None else stats.plan
+        if need_plan:
+            stats.plan = plan or ""
+        params = repr(parameters)
+        if len(params) > MAX_PARAMS_REPR:
+            params = params[:MAX_PARAMS_REPR] + "..."
+        log.warning("Slow query %.1f ms: %s params=%s plan=%s",
+                    seconds * 1000, key, params, (plan or "-").replace("\n", " | "))
+
+    def report(self, limit: int = 10) -> List[Tuple[str, StatementStats]]:
+        """The statements with the most total time, costliest first"""
+        with self._lock:
+            items = list(self._stats.items())
+        items.sort(key=lambda item: item[1].total, reverse=True)
+        return items[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
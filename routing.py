@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Offline road routing for distances and travel times.
+
+An OSM extract is compiled once into a binary index:
+    python routing.py build extract.osm[.bz2|.gz] data/roads.graph
+
+Building contracts the road graph into a contraction hierarchy: nodes are
+ranked, and shortcuts keep drive times exact when lower-ranked nodes are
+skipped. The index holds node coordinates sorted by grid cell (for snapping
+points to the road network) and each node's edges to higher-ranked nodes,
+with drive time and length. The bot memory-maps it; a route is two small
+upward searches that meet in the middle, and many employees heading to one
+task share the task's search. Without an index distances fall back to a
+straight line times a detour factor.
+"""
+
+import array
+import bisect
+import heapq
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import (
+    ROUTING_DETOUR_FACTOR, ROUTING_FALLBACK_SPEED_KMH, ROUTING_GRAPH_FILE, ROUTING_WALK_SPEED_KMH
+)
+
+log = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+CELL_SIZE = 0.01  # degrees per snapping cell, about 1 km
+SNAP_RINGS = 3  # cells searched around a point before giving up on snapping
+
+WITNESS_SETTLE_LIMIT = 50  # nodes a witness search may settle while building
+
+MAGIC = b"RGR2"
+# magic, nodes, upward edges, downward edges, cells, pad, cell size (degrees)
+HEADER = struct.Struct("<4sIIII4xd")
+
+# km/h by highway class, used when a way has no usable maxspeed
+HIGHWAY_SPEEDS = {
+    "motorway": 90, "motorway_link": 50, "trunk": 70, "trunk_link": 40,
+    "primary": 50, "primary_link": 35, "secondary": 45, "secondary_link": 30,
+    "tertiary": 35, "tertiary_link": 25, "unclassified": 30, "residential": 25,
+    "living_street": 10, "service": 15, "road": 25,
+}
+
+
+class Route(NamedTuple):
+    distance_m: float
+    drive_s: float
+    walk_s: float
+    exact: bool  # False when estimated from the straight line
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def estimate_route(lat1: float, lon1: float, lat2: float, lon2: float) -> Route:
+    """Straight-line distance stretched by the detour factor"""
+    distance = haversine_m(lat1, lon1, lat2, lon2) * ROUTING_DETOUR_FACTOR
+    return Route(distance, distance / (ROUTING_FALLBACK_SPEED_KMH / 3.6),
+                 distance / (ROUTING_WALK_SPEED_KMH / 3.6), False)
+
+
+def _cell_key(lat: float, lon: float, cell_size: float) -> int:
+    return math.floor(lat / cell_size) * 1_000_000 + math.floor(lon / cell_size)
+
+
+# =============================================================================
+# Building the index
+# =============================================================================
+
+def _parse_speed(value: str) -> Optional[float]:
+    try:
+        speed = float(value.split()[0])
+    except (ValueError, IndexError):
+        return None
+    if "mph" in value:
+        speed *= 1.609
+    return speed if speed > 0 else None
+
+
+def _direction(tags: Dict[str, str]) -> int:
+    """1 for one-way along the nodes, -1 against them, 0 for both ways"""
+    oneway = tags.get("oneway")
+    if oneway == "-1":
+        return -1
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway != "no" and (tags.get("junction") == "roundabout" or tags["highway"].startswith("motorway")):
+        return 1
+    return 0
+
+
+def read_osm(path: str) -> Tuple[Dict[int, Tuple[float, float]], List[Tuple[List[int], float, int]]]:
+    """Node coordinates and drivable ways (node refs, km/h, direction) of an OSM XML extract"""
+    # Only the offline build reads OSM; the bot never loads these modules
+    import bz2
+    import gzip
+    import xml.etree.ElementTree as ET
+
+    opener = bz2.open if path.endswith(".bz2") else gzip.open if path.endswith(".gz") else open
+    coords, ways = {}, []
+    with opener(path, "rb") as source:
+        for _, elem in ET.iterparse(source):
+            if elem.tag == "node":
+                coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+                elem.clear()
+            elif elem.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+                speed = HIGHWAY_SPEEDS.get(tags.get("highway"))
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                if speed and len(refs) > 1 and tags.get("access") not in ("no", "private"):
+                    ways.append((refs, _parse_speed(tags.get("maxspeed", "")) or speed, _direction(tags)))
+                elem.clear()
+    return coords, ways
+
+
+def _witness_costs(forward: List[Dict], source: int, skip: int, max_cost: float) -> Dict[int, float]:
+    """Bounded Dijkstra from source that avoids skip"""
+    costs, heap, settled = {source: 0.0}, [(0.0, source)], 0
+    while heap and settled < WITNESS_SETTLE_LIMIT:
+        cost, node = heapq.heappop(heap)
+        if cost > costs[node]:
+            continue
+        if cost > max_cost:
+            break
+        settled += 1
+        for neighbour, (seconds, _) in forward[node].items():
+            arrival = cost + seconds
+            if neighbour != skip and arrival < costs.get(neighbour, float("inf")):
+                costs[neighbour] = arrival
+                heapq.heappush(heap, (arrival, neighbour))
+    return costs
+
+
+def _shortcuts_for(node: int, forward: List[Dict], backward: List[Dict]) -> List[Tuple[int, int, float, float]]:
+    """Shortcuts (source, target, seconds, meters) needed to remove node"""
+    outgoing, shortcuts = forward[node], []
+    if not outgoing:
+        return shortcuts
+    longest = max(seconds for seconds, _ in outgoing.values())
+    for source, (in_seconds, in_meters) in backward[node].items():
+        costs = _witness_costs(forward, source, node, in_seconds + longest)
+        for target, (out_seconds, out_meters) in outgoing.items():
+            if target != source and costs.get(target, float("inf")) > in_seconds + out_seconds:
+                shortcuts.append((source, target, in_seconds + out_seconds, in_meters + out_meters))
+    return shortcuts
+
+
+def contract(forward: List[Dict], backward: List[Dict]) -> Tuple[List[list], List[list], int]:
+    """Contraction hierarchy of a graph given as node -> {neighbour: (seconds, meters)}.
+
+    Returns each node's edges to higher-ranked nodes (outgoing for the search
+    from the start, incoming for the search from the destination) and the
+    number of shortcuts added. The adjacency dicts are consumed.
+    """
+    up, down = [None] * len(forward), [None] * len(forward)
+    contracted_neighbours = [0] * len(forward)
+    added = 0
+
+    def priority(node, shortcuts):
+        return len(shortcuts) - len(forward[node]) - len(backward[node]) + contracted_neighbours[node]
+
+    heap = [(priority(node, _shortcuts_for(node, forward, backward)), node) for node in range(len(forward))]
+    heapq.heapify(heap)
+    while heap:
+        _, node = heapq.heappop(heap)
+        # Priorities go stale as neighbours are contracted; re-check lazily
+        shortcuts = _shortcuts_for(node, forward, backward)
+        current = priority(node, shortcuts)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, node))
+            continue
+
+        up[node] = [(target, seconds, meters) for target, (seconds, meters) in forward[node].items()]
+        down[node] = [(source, seconds, meters) for source, (seconds, meters) in backward[node].items()]
+        for target in forward[node]:
+            del backward[target][node]
+            contracted_neighbours[target] += 1
+        for source in backward[node]:
+            del forward[source][node]
+            contracted_neighbours[source] += 1
+        forward[node], backward[node] = {}, {}
+
+        for source, target, seconds, meters in shortcuts:
+            if seconds < forward[source].get(target, (float("inf"),))[0]:
+                forward[source][target] = backward[target][source] = (seconds, meters)
+                added += 1
+    return up, down, added
+
+
+def build_graph(coords: Dict[int, Tuple[float, float]], ways: List[Tuple[List[int], float, int]],
+                path: str, cell_size: float = CELL_SIZE) -> Tuple[int, int, int]:
+    """Write the routing index for the given ways; returns (nodes, road edges, shortcuts)"""
+    used = {ref for refs, _, _ in ways for ref in refs if ref in coords}
+    # Nodes of one cell are contiguous, so snapping scans a slice
+    order = sorted(used, key=lambda ref: _cell_key(*coords[ref], cell_size))
+    index = {ref: i for i, ref in enumerate(order)}
+
+    forward = [{} for _ in order]
+    backward = [{} for _ in order]
+    edges = 0
+    for refs, speed, direction in ways:
+        mps = speed / 3.6
+        for a, b in zip(refs, refs[1:]):
+            if a not in index or b not in index or a == b:
+                continue
+            u, v = index[a], index[b]
+            length = haversine_m(*coords[a], *coords[b])
+            arcs = ([(u, v)] if direction >= 0 else []) + ([(v, u)] if direction <= 0 else [])
+            for source, target in arcs:
+                if length / mps < forward[source].get(target, (float("inf"),))[0]:
+                    edges += target not in forward[source]
+                    forward[source][target] = backward[target][source] = (length / mps, length)
+
+    up, down, shortcuts = contract(forward, backward)
+
+    lats = array.array("d", (coords[ref][0] for ref in order))
+    lons = array.array("d", (coords[ref][1] for ref in order))
+    cell_keys, cell_starts = array.array("q"), array.array("I")
+    for i, ref in enumerate(order):
+        key = _cell_key(*coords[ref], cell_size)
+        if not cell_keys or cell_keys[-1] != key:
+            cell_keys.append(key)
+            cell_starts.append(i)
+    cell_starts.append(len(order))
+
+    def adjacency_arrays(adjacency):
+        first, targets, times, lengths = array.array("I", [0]), array.array("I"), array.array("f"), array.array("f")
+        for arcs in adjacency:
+            for target, seconds, meters in arcs:
+                targets.append(target)
+                times.append(seconds)
+                lengths.append(meters)
+            first.append(len(targets))
+        return [first, targets, times, lengths]
+
+    up_arrays, down_arrays = adjacency_arrays(up), adjacency_arrays(down)
+    sections = [lats, lons, cell_keys, cell_starts] + up_arrays + down_arrays
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        # 8-byte arrays come first so every section stays aligned
+        f.write(HEADER.pack(MAGIC, len(order), len(up_arrays[1]), len(down_arrays[1]), len(cell_keys),
+                            cell_size))
+        for section in sections:
+            section.tofile(f)
+    os.replace(tmp_path, path)
+    return len(order), edges, shortcuts
+
+
+# =============================================================================
+# Querying the index
+# =============================================================================
+
+class RoadGraph:
+    """A memory-mapped routing index"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, nodes, up_edges, down_edges, cells, self.cell_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"Marshrut indeksi emas: {path}")
+        self.node_count = nodes
+
+        view, offset = memoryview(self._mmap), HEADER.size
+
+        def section(fmt, count):
+            nonlocal offset
+            size = struct.calcsize(fmt) * count
+            part = view[offset:offset + size].cast(fmt)
+            offset += size
+            return part
+
+        self.lat, self.lon = section("d", nodes), section("d", nodes)
+        self._cell_keys, self._cell_starts = section("q", cells), section("I", cells + 1)
+        self._up = tuple(section(fmt, count) for fmt, count in
+                         (("I", nodes + 1), ("I", up_edges), ("f", up_edges), ("f", up_edges)))
+        self._down = tuple(section(fmt, count) for fmt, count in
+                           (("I", nodes + 1), ("I", down_edges), ("f", down_edges), ("f", down_edges)))
+
+    def nearest_node(self, lat: float, lon: float) -> Optional[int]:
+        """Closest road node within SNAP_RINGS cells, or None"""
+        row, col = math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+        scale = math.cos(math.radians(lat)) ** 2
+        best, best_d = None, float("inf")
+        for ring in range(SNAP_RINGS + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    key = r * 1_000_000 + c
+                    i = bisect.bisect_left(self._cell_keys, key)
+                    if i == len(self._cell_keys) or self._cell_keys[i] != key:
+                        continue
+                    for node in range(self._cell_starts[i], self._cell_starts[i + 1]):
+                        d = (self.lat[node] - lat) ** 2 + (self.lon[node] - lon) ** 2 * scale
+                        if d < best_d:
+                            best, best_d = node, d
+            # A closer node can still sit one ring further out
+            if best is not None and ring > 0:
+                return best
+        return best
+
+    @staticmethod
+    def _upward(edges, start: int) -> Iterator[Tuple[float, float, int]]:
+        """Dijkstra over edges to higher-ranked nodes, yielding (seconds, meters, node) in order"""
+        first, targets, times, lengths = edges
+        best, heap = {start: 0.0}, [(0.0, 0.0, start)]
+        while heap:
+            seconds, meters, node = heapq.heappop(heap)
+            if seconds > best[node]:
+                continue
+            yield seconds, meters, node
+            for edge in range(first[node], first[node + 1]):
+                neighbour, arrival = targets[edge], seconds + times[edge]
+                if arrival < best.get(neighbour, float("inf")):
+                    best[neighbour] = arrival
+                    heapq.heappush(heap, (arrival, meters + lengths[edge], neighbour))
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[float, float]]:
+        """(drive seconds, meters) of the fastest route, by bidirectional upward search"""
+        searches = (self._upward(self._up, source), self._upward(self._down, target))
+        heads = [next(search, None) for search in searches]
+        reached = ({}, {})
+        best = (float("inf"), 0.0)
+        while True:
+            # A side stops once it cannot improve on the best meeting point
+            live = [side for side in (0, 1) if heads[side] and heads[side][0] < best[0]]
+            if not live:
+                break
+            side = min(live, key=lambda s: heads[s][0])
+            seconds, meters, node = heads[side]
+            reached[side][node] = (seconds, meters)
+            other = reached[1 - side].get(node)
+            if other and seconds + other[0] < best[0]:
+                best = (seconds + other[0], meters + other[1])
+            heads[side] = next(searches[side], None)
+        return best if best[0] < float("inf") else None
+
+    def paths_to(self, target: int, sources: Dict[Hashable, int]) -> Dict[Hashable, Tuple[float, float]]:
+        """(drive seconds, meters) from each source node to target, sharing the target's search"""
+        into_target = {node: (seconds, meters) for seconds, meters, node in self._upward(self._down, target)}
+        found = {}
+        for key, source in sources.items():
+            best = (float("inf"), 0.0)
+            for seconds, meters, node in self._upward(self._up, source):
+                if seconds >= best[0]:
+                    break
+                other = into_target.get(node)
+                if other and seconds + other[0] < best[0]:
+                    best = (seconds + other[0], meters + other[1])
+            if best[0] < float("inf"):
+                found[key] = best
+        return found
+
+
+_graph = None
+_graph_lock = threading.Lock()
+_graph_loaded = False
+
+
+def get_graph() -> Optional[RoadGraph]:
+    """The configured routing index, loaded on first use (None when there is none)"""
+    global _graph, _graph_loaded
+    with _graph_lock:
+        if not _graph_loaded:
+            _graph_loaded = True
+            if os.path.exists(ROUTING_GRAPH_FILE):
+                try:
+                    _graph = RoadGraph(ROUTING_GRAPH_FILE)
+                except (OSError, ValueError, struct.error) as e:
+                    log.warning("Routing index %s not loaded, using straight-line estimates: %s",
+                                ROUTING_GRAPH_FILE, e)
+        return _graph
+
+
+def _snapped_route(graph: RoadGraph, lat1: float, lon1: float, lat2: float, lon2: float,
+                   found: Optional[Tuple[float, float]], start: int, end: int) -> Route:
+    # The legs between the points and their road nodes are covered at walking pace
+    legs = haversine_m(lat1, lon1, graph.lat[start], graph.lon[start]) + \
+        haversine_m(lat2, lon2, graph.lat[end], graph.lon[end])
+    seconds, meters = found
+    distance = meters + legs
+    return Route(distance, seconds + legs / (ROUTING_WALK_SPEED_KMH / 3.6),
+                 distance / (ROUTING_WALK_SPEED_KMH / 3.6), True)
+
+
+def route(lat1: float, lon1: float, lat2: float, lon2: float, graph: RoadGraph = None) -> Route:
+    """Road distance and travel times from the first point to the second"""
+    graph = graph or get_graph()
+    if graph:
+        start, end = graph.nearest_node(lat1, lon1), graph.nearest_node(lat2, lon2)
+        if start is not None and end is not None:
+            found = graph.shortest_path(start, end)
+            if found:
+                return _snapped_route(graph, lat1, lon1, lat2, lon2, found, start, end)
+    return estimate_route(lat1, lon1, lat2, lon2)
+
+
+def routes_to(lat: float, lon: float, origins: Dict[Hashable, Tuple[float, float]],
+              graph: RoadGraph = None) -> Dict[Hashable, Route]:
+    """Route from every origin (key -> (lat, lon)) to one destination"""
+    graph = graph or get_graph()
+    routes = {}
+    end = graph.nearest_node(lat, lon) if graph else None
+    if end is not None:
+        starts = {key: graph.nearest_node(*point) for key, point in origins.items()}
+        found = graph.paths_to(end, {key: node for key, node in starts.items() if node is not None})
+        for key, result in found.items():
+            routes[key] = _snapped_route(graph, *origins[key], lat, lon, result, starts[key], end)
+    for key, point in origins.items():
+        if key not in routes:
+            routes[key] = estimate_route(*point, lat, lon)
+    return routes
+
+
+def format_duration(seconds: float) -> str:
+    """'1 soat 5 daqiqa' style travel time"""
+    minutes = max(1, round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours} soat {minutes} daqiqa" if minutes else f"{hours} soat"
+    return f"{minutes} daqiqa"
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline routing index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile an OSM XML extract into a routing index")
+    build.add_argument("extract")
+    build.add_argument("output", nargs="?", default=ROUTING_GRAPH_FILE)
+    args = parser.parse_args()
+
+    coords, ways = read_osm(args.extract)
+    nodes, edges, shortcuts = build_graph(coords, ways, args.output)
+    print(f"✅ {args.output}: {nodes} ta tugun, {edges} ta yo'l qirrasi, {shortcuts} ta yorliq")
+
+
+if __name__ == "__main__":
+    main()
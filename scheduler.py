@@ -0,0 +1,164 @@
+"""
+Persistent job scheduler for debt reminders and the admin digest.
+
+Pending jobs live in the scheduled_jobs table and are loaded into an
+in-memory min-heap at startup; a single thread sleeps until the earliest
+job is due. Jobs are claimed in the database before their handler runs,
+so restarts never send the same reminder twice.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Union
+
+from database import add_scheduled_job, cancel_scheduled_jobs, claim_scheduled_jobs, get_pending_jobs
+
+log = logging.getLogger(__name__)
+
+DUE_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y")
+
+# Upper bound on a single sleep so wall-clock changes are picked up
+MAX_WAIT = 60
+
+
+def parse_due_date(text: str, hour: int = 9) -> Optional[datetime]:
+    """Parse a user-entered payment date; returns that day at `hour` or None"""
+    text = (text or "").strip()
+    for date_format in DUE_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).replace(hour=hour)
+        except ValueError:
+            continue
+    return None
+
+
+def next_daily_run(hour: int, now: datetime = None) -> datetime:
+    """Next occurrence of `hour`:00 strictly after now"""
+    now = now or datetime.now()
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+class Scheduler:
+    """One-shot jobs keyed by kind, persisted in scheduled_jobs"""
+
+    def __init__(self):
+        self._heap = []
+        self._jobs: Dict[int, tuple] = {}  # job_id -> (kind, ref_id, payload)
+        self._handlers: Dict[str, Callable] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def register(self, kind: str, handler: Callable[[Optional[int], Any], None]):
+        """Set the handler called as handler(ref_id, payload) when a job fires"""
+        self._handlers[kind] = handler
+
+    def load(self) -> int:
+        """Load every pending job from the database; returns how many"""
+        jobs = get_pending_jobs()
+        with self._cond:
+            for job_id, kind, ref_id, run_at, payload in jobs:
+                if job_id not in self._jobs:
+                    self._jobs[job_id] = (kind, ref_id, payload)
+                    self._heap.append((run_at, job_id))
+            heapq.heapify(self._heap)
+            self._cond.notify()
+        return len(jobs)
+
+    def schedule(self, kind: str, run_at: Union[datetime, float], ref_id: int = None,
+                 payload: Any = None) -> int:
+        """Persist a job and queue it; returns the job ID"""
+        if isinstance(run_at, datetime):
+            run_at = run_at.timestamp()
+
+        job_id = add_scheduled_job(kind, run_at, ref_id, payload)
+        with self._cond:
+            self._jobs[job_id] = (kind, ref_id, payload)
+            heapq.heappush(self._heap, (run_at, job_id))
+            self._cond.notify()
+        return job_id
+
+    def cancel(self, kind: str, ref_id: int) -> int:
+        """Cancel pending jobs of a kind for ref_id; returns how many"""
+        job_ids = cancel_scheduled_jobs(kind, ref_id)
+        with self._cond:
+            # Heap entries of cancelled jobs are skipped when popped
+            for job_id in job_ids:
+                self._jobs.pop(job_id, None)
+        return len(job_ids)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scheduler")
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the scheduler thread; due jobs that were not claimed stay pending"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _next_due(self):
+        """Block until jobs are due and pop them; returns [] once stopped"""
+        with self._cond:
+            while self._running:
+                while self._heap and self._heap[0][1] not in self._jobs:
+                    heapq.heappop(self._heap)
+
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        run_at, job_id = heapq.heappop(self._heap)
+                        job = self._jobs.pop(job_id, None)
+                        if job:
+                            due.append((job_id,) + job)
+                    return due
+
+                timeout = self._heap[0][0] - now if self._heap else MAX_WAIT
+                self._cond.wait(min(timeout, MAX_WAIT))
+            return []
+
+    def _run(self):
+        while self._running:
+            due = self._next_due()
+            if not due:
+                continue
+
+            try:
+                claimed = set(claim_scheduled_jobs([job[0] for job in due]))
+            except Exception as e:
+                log.error("Scheduler claim error: %s", e)
+                # Put the jobs back and retry shortly
+                with self._cond:
+                    for job_id, kind, ref_id, payload in due:
+                        self._jobs[job_id] = (kind, ref_id, payload)
+                        heapq.heappush(self._heap, (time.time() + 5, job_id))
+                continue
+
+            for job_id, kind, ref_id, payload in due:
+                if job_id not in claimed:
+                    continue
+                handler = self._handlers.get(kind)
+                if not handler:
+                    log.warning("Scheduler: no handler for job kind '%s'", kind)
+                    continue
+                try:
+                    handler(ref_id, payload)
+                except Exception as e:
+                    log.exception("Scheduler job %s (%s) error: %s", job_id, kind, e)
@@ -0,0 +1,32 @@
+"""
+Bounded pool for sending the same kind of notification to many chats
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Tuple
+
+from config import SENDER_POOL_SIZE
+
+
+def send_all(recipients: Iterable[Any], send: Callable[[Any], None],
+             max_workers: int = SENDER_POOL_SIZE) -> Tuple[List[Any], List[Tuple[Any, Exception]]]:
+    """Call send(recipient) for every recipient, at most max_workers at a time.
+
+    Returns (delivered, failed) where failed holds (recipient, error) pairs;
+    one failing recipient never stops the others.
+    """
+    recipients = list(recipients)
+    delivered, failed = [], []
+    if not recipients:
+        return delivered, failed
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(recipients))) as pool:
+        futures = [(recipient, pool.submit(send, recipient)) for recipient in recipients]
+        for recipient, future in futures:
+            try:
+                future.result()
+                delivered.append(recipient)
+            except Exception as e:
+                failed.append((recipient, e))
+
+    return delivered, failed
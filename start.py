@@ -6,45 +6,19 @@ Handles deployment-specific requirements and health checks for Cloud Run
 
 import os
 import sys
-import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import socket
 
-# Import the main bot
-from main import main as start_bot
-
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    """Simple health check endpoint for Cloud Run"""
-    
-    def do_GET(self):
-        """Handle GET requests"""
-        if self.path == '/health' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'Bot is running')
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Suppress default logging"""
-        pass
+import frontend
 
 def start_health_server():
-    """Start HTTP health check server for deployment"""
+    """Bind the HTTP front end: health check, metrics, website API and webhook on one port"""
     try:
         # Use PORT environment variable or default to 8080
         port = int(os.environ.get('PORT', 8080))
-        
-        # Create server
-        server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
-        print(f"🌐 Health check server started on port {port}")
-        server.serve_forever()
-        
+        frontend.serve(port)
+        print(f"🌐 HTTP server started on port {port} (health, metrics, website API, webhook)")
     except Exception as e:
-        print(f"⚠️ Health server error: {e}")
+        print(f"⚠️ HTTP server error: {e}")
         # Continue without health server - bot can still work
 
 def check_required_env():
@@ -67,33 +41,18 @@ def main():
     """Main function for production deployment"""
     print("🚀 Starting Enhanced Telegram Bot for production deployment...")
     print("🌐 Production mode: Autoscale Deployment")
-    print("📱 Bot + Website API + Health Check server")
+    print("📱 Bot + Website API + Health Check on one HTTP port")
     
     # Check environment variables
     check_required_env()
     
-    # Start health check server in a separate thread for Cloud Run
-    health_thread = threading.Thread(target=start_health_server, daemon=True)
-    health_thread.start()
-    
-    # Start website API in separate thread
-    from website_api import app as website_app
-    website_thread = threading.Thread(
-        target=lambda: website_app.run(host='0.0.0.0', port=8081, debug=False),
-        daemon=True
-    )
-    website_thread.start()
-    print("🌐 Website API started on port 8081")
-    
-    # Small delay to let health server start
-    time.sleep(2)
-    
-    # Start keep-alive service
-    from keep_alive import start_keep_alive
-    start_keep_alive()
+    # The health port answers before the bot (and Flask) are even imported;
+    # the website API is served from the same port once a request needs it
+    start_health_server()
     
     # Start the main bot
     try:
+        from main import main as start_bot
         print("🤖 Starting Telegram bot...")
         start_bot()
     except KeyboardInterrupt:
@@ -6,59 +6,33 @@ Optimized for Render's free tier hosting
 
 import os
 import sys
-import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
 
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    """Health check endpoint for Render.com"""
-    
-    def do_GET(self):
-        """Handle GET requests"""
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                'status': 'healthy',
-                'service': 'Enhanced Telegram Task Bot',
-                'timestamp': time.time(),
-                'platform': 'render.com'
-            }
-            self.wfile.write(json.dumps(response).encode())
-        elif self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            html = """
-            <!DOCTYPE html>
-            <html>
-            <head><title>Enhanced Telegram Task Bot</title></head>
-            <body>
-                <h1>🤖 Enhanced Telegram Task Management Bot</h1>
-                <p>✅ Bot is running on Render.com</p>
-                <p>📱 Telegram bot is active and ready</p>
-                <p>🔗 <a href="/health">Health Check</a></p>
-            </body>
-            </html>
-            """
-            self.wfile.write(html.encode())
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Custom logging for Render"""
-        print(f"[RENDER] {format % args}")
+import frontend
+
+HOME_PAGE = """
+<!DOCTYPE html>
+<html>
+<head><title>Enhanced Telegram Task Bot</title></head>
+<body>
+    <h1>🤖 Enhanced Telegram Task Management Bot</h1>
+    <p>✅ Bot is running on Render.com</p>
+    <p>📱 Telegram bot is active and ready</p>
+    <p>🔗 <a href="/health">Health Check</a></p>
+</body>
+</html>
+"""
+
+def render_home(environ):
+    """Landing page for Render.com"""
+    return "200 OK", "text/html; charset=utf-8", HOME_PAGE.encode()
 
 def start_web_server():
-    """Start web server for Render.com"""
+    """Bind the HTTP front end for Render.com: health, metrics, website API and webhook"""
     try:
         port = int(os.environ.get('PORT', 10000))
-        server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
+        frontend.serve(port, routes={'/health': frontend.health_json, '/': render_home})
         print(f"🌐 Render web server started on port {port}")
-        server.serve_forever()
     except Exception as e:
         print(f"❌ Web server error: {e}")
         sys.exit(1)
@@ -87,12 +61,8 @@ def main():
     # Check environment
     check_environment()
     
-    # Start web server in background thread (required for Render)
-    web_thread = threading.Thread(target=start_web_server, daemon=True)
-    web_thread.start()
-    
-    # Small delay to let web server start
-    time.sleep(2)
+    # Bind the port (required for Render) before the bot is imported
+    start_web_server()
     
     # Import and start the bot
     try:
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for callback routing and server-side button payloads
+"""
+
+import time
+from types import SimpleNamespace
+
+from callbacks import CallbackRegistry
+
+
+def test_tokenized_payload_round_trip_and_plain_routes():
+    callbacks = CallbackRegistry()
+    seen = []
+
+    @callbacks.route("calc_distance", payload=True)
+    def calc_distance(call, point):
+        seen.append(point)
+
+    @callbacks.route("pg")
+    def page(call):
+        seen.append(call.data)
+
+    data = callbacks.data("calc_distance", (41.311081234567, -69.240562987654))
+    assert len(data.encode()) <= 64
+
+    assert callbacks.dispatch(SimpleNamespace(data=data))
+    assert callbacks.dispatch(SimpleNamespace(data="pg:ts:b:42"))
+    assert seen == [(41.311081234567, -69.240562987654), "pg:ts:b:42"]
+
+    # Old-format buttons and unknown tokens are reported, not routed
+    assert not callbacks.dispatch(SimpleNamespace(data="calc_distance_41.3_69.2"))
+    assert not callbacks.dispatch(SimpleNamespace(data="calc_distance:nope"))
+
+
+def test_payloads_expire_and_are_bounded():
+    callbacks = CallbackRegistry(maxsize=3, ttl=0.05)
+    callbacks.route("start_task", payload=True)(lambda call, task_id: None)
+
+    data = callbacks.data("start_task", 7)
+    for task_id in range(5):
+        callbacks.data("start_task", task_id)
+    assert len(callbacks) == 3
+    assert not callbacks.dispatch(SimpleNamespace(data=data))
+
+    data = callbacks.data("start_task", 8)
+    time.sleep(0.06)
+    assert not callbacks.dispatch(SimpleNamespace(data=data))
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Tests for database helpers that run against a throwaway SQLite file
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the database module at a fresh temporary database"""
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database._inquiry_status_cache.clear()
+    database.init_database()
+    return database
+
+
+def test_inquiry_status_is_cached_until_response(db):
+    inquiry_id = db.add_customer_inquiry("Ali Valiyev", "Konditsioner o'rnatish kerak")
+
+    status = db.get_inquiry_status(inquiry_id)
+    assert status["status"] == "pending"
+    assert db.get_inquiry_status(inquiry_id) is status
+
+    db.respond_to_inquiry(inquiry_id, "Ertaga boramiz")
+    answered = db.get_inquiry_status(inquiry_id)
+    assert answered["status"] == "responded"
+    assert answered["admin_response"] == "Ertaga boramiz"
+    assert answered["etag"] != status["etag"]
+
+
+def test_missing_inquiry_status_is_none(db):
+    assert db.get_inquiry_status(999) is None
+
+
+def test_wait_for_inquiry_status_times_out_unchanged(db):
+    inquiry_id = db.add_customer_inquiry("Ali Valiyev", "Konditsioner o'rnatish kerak")
+    etag = db.get_inquiry_status(inquiry_id)["etag"]
+
+    started = time.monotonic()
+    status = db.wait_for_inquiry_status(inquiry_id, etag, timeout=0.2)
+    assert status["etag"] == etag
+    assert time.monotonic() - started >= 0.2
+
+
+def test_wait_for_inquiry_status_wakes_on_response(db):
+    inquiry_id = db.add_customer_inquiry("Ali Valiyev", "Konditsioner o'rnatish kerak")
+    etag = db.get_inquiry_status(inquiry_id)["etag"]
+
+    responder = threading.Timer(0.1, db.respond_to_inquiry, (inquiry_id, "Javob"))
+    responder.start()
+    started = time.monotonic()
+    status = db.wait_for_inquiry_status(inquiry_id, etag, timeout=5)
+    responder.join()
+
+    assert status["status"] == "responded"
+    assert time.monotonic() - started < 2
+
+
+def test_inquiry_feed_returns_changes_since_cursor(db):
+    from inquiry_feed import InquiryFeed
+
+    first = db.add_customer_inquiry("Ali Valiyev", "Konditsioner o'rnatish kerak", source="website")
+    feed = InquiryFeed(window=5)
+    assert feed.refresh() == []
+    cursor = db.get_inquiry_feed_version()
+
+    second = db.add_customer_inquiry("Vali Aliyev", "Ta'mirlash", source="telegram")
+    db.respond_to_inquiry(first, "Ertaga boramiz")
+
+    changes = db.get_inquiry_changes(cursor)
+    assert [inquiry[0] for _, inquiry in changes] == [second, first]
+    assert changes[-1][0] == db.get_inquiry_feed_version()
+    assert db.get_inquiry_changes(changes[-1][0]) == []
+    assert [inquiry[0] for _, inquiry in db.get_inquiry_changes(cursor, source="website")] == [first]
+
+    assert {inquiry[0] for inquiry in feed.refresh()} == {first, second}
+    assert feed.latest("website")[0][10] == "responded"
+    assert [inquiry[0] for inquiry in feed.latest()] == [second, first]
+    assert db.get_inquiry_counts() == {"website": 1, "telegram": 1, "pending": 1, "total": 2}
+
+
+def test_inquiry_pages_walk_by_id_cursor(db):
+    ids = [db.add_customer_inquiry(f"Mijoz {i}", "So'rov", source="website") for i in range(7)]
+    db.add_customer_inquiry("Bot mijozi", "So'rov", source="telegram")
+
+    first, has_more = db.get_customer_inquiries_page("website", limit=3)
+    assert [row[0] for row in first] == ids[6:3:-1] and has_more
+
+    second, has_more = db.get_customer_inquiries_page("website", before_id=first[-1][0], limit=3)
+    assert [row[0] for row in second] == ids[3:0:-1] and has_more
+
+    last, has_more = db.get_customer_inquiries_page("website", before_id=second[-1][0], limit=3)
+    assert [row[0] for row in last] == [ids[0]] and not has_more
+
+    back, has_newer = db.get_customer_inquiries_page("website", after_id=second[0][0], limit=3)
+    assert back == first and not has_newer
+
+
+def test_debt_pages_skip_paid_and_deleted(db):
+    for i in range(4):
+        db.add_debt(f"Xodim {i}", 100 + i, None, 1000 * (i + 1), "Avans", "2026-11-01")
+    debts, has_more = db.get_debts_page(limit=10)
+    debt_ids = [debt[0] for debt in debts]
+    assert len(debt_ids) == 4 and not has_more
+
+    assert db.mark_debt_paid(debt_ids[0])[0] == "Xodim 3"
+    assert db.delete_debt(debt_ids[1]) == ("Xodim 2", 3000.0, "Avans")
+    assert db.delete_debt(debt_ids[1]) is None
+
+    debts, has_more = db.get_debts_page(limit=1)
+    assert [debt[0] for debt in debts] == [debt_ids[2]] and has_more
+
+
+def test_debt_ledger_tracks_partial_payments(db):
+    debt_id = db.add_debt("Ali", 101, None, 100000, "Avans", "2026-11-01")
+    db.add_debt("Ali", 101, None, 50000, "Asbob", "2026-11-01")
+    assert db.get_debtor_balance("Ali") == 150000
+
+    payment = db.record_debt_payment(debt_id, 40000)
+    assert payment["remaining"] == 60000
+    assert db.get_debts_page()[0][-1][8] == "unpaid"
+    with pytest.raises(ValueError):
+        db.record_debt_payment(debt_id, 70000)
+
+    assert db.record_debt_payment(debt_id)["paid"] == 60000
+    assert db.get_debt_outstanding(debt_id) == 0
+    assert debt_id not in [debt[0] for debt in db.get_debts()]
+    assert db.get_debtor_balance("Ali") == 50000
+    assert db.get_task_statistics()["total_debts"] == 50000
+    assert db.reconcile_debt_ledger() == []
+
+
+def test_concurrent_debt_payments_cannot_overpay(db, monkeypatch):
+    # Widen the window between reading the balance and posting the payment
+    read_outstanding = db._debt_outstanding
+    monkeypatch.setattr(db, "_debt_outstanding", lambda *args: (read_outstanding(*args), time.sleep(0.02))[0])
+    debt_id = db.add_debt("Ali", 101, None, 100000, "Avans", "2026-11-01")
+    start = threading.Barrier(8)
+    paid, refused = [], []
+
+    def pay():
+        start.wait()
+        try:
+            paid.append(db.record_debt_payment(debt_id, 30000)["paid"])
+        except ValueError:
+            refused.append(True)
+
+    threads = [threading.Thread(target=pay) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (len(paid), len(refused)) == (3, 5)
+    assert db.get_debt_outstanding(debt_id) == 10000
+
+
+def test_debt_ledger_backfill_and_reconciliation(db):
+    conn = db.get_connection()
+    conn.execute("""
+        INSERT INTO debts (employee_name, employee_chat_id, amount, reason, payment_date, status)
+        VALUES ('Vali', 0, 30000, 'Eski qarz', '2025-01-01', 'unpaid'),
+               ('Vali', 0, 20000, 'Eski qarz', '2025-01-01', 'paid')
+    """)
+    conn.commit()
+    conn.close()
+
+    db.init_database()
+    assert db.get_debtor_balance("Vali") == 30000
+
+    conn = db.get_connection()
+    conn.execute("UPDATE debtor_balances SET balance = 1 WHERE debtor = 'Vali'")
+    conn.commit()
+    conn.close()
+
+    assert db.reconcile_debt_ledger() == [("Vali", 1, 30000)]
+    assert db.get_debtor_balance("Vali") == 30000
+
+    debt_id = db.get_debts("Vali")[0][0]
+    db.delete_debt(debt_id)
+    assert db.get_total_outstanding_debt() == 0
+
+
+def test_legacy_models_use_shared_store_on_memory_backend(monkeypatch):
+    from models import DebtModel, TaskModel
+
+    backend = database.MemoryBackend()
+    monkeypatch.setattr(database, "_backend", backend)
+    try:
+        tasks = TaskModel()
+        assert tasks.add_task("Konditsioner", "41.3, 69.2", "Kamol", 150000)
+        [task] = tasks.get_tasks_by_employee("Kamol", "⏳ Davom etmoqda")
+        assert task["location"] == "41.3, 69.2" and task["status"] == "⏳ Davom etmoqda"
+
+        assert tasks.update_task_status(task["id"], "✅ Bajarildi")
+        assert database.get_employee_tasks("Kamol", "completed")[0][0] == task["id"]
+
+        debts = DebtModel()
+        debts.add_debt("Kamol", 20000, "Avans")
+        assert debts.get_total_debt("Kamol") == 20000
+        assert debts.get_debts_by_employee("Kamol")[0]["reason"] == "Avans"
+    finally:
+        backend.close()
+
+
+def test_migrate_storage_is_idempotent(db, tmp_path):
+    import sqlite3
+    import migrate_storage
+
+    legacy_tasks = tmp_path / "tasks.db"
+    conn = sqlite3.connect(legacy_tasks)
+    conn.execute("""CREATE TABLE tasks (id INTEGER PRIMARY KEY, vazifa TEXT, manzil TEXT, xodim TEXT,
+                    summa REAL, telefon TEXT, status TEXT, sana TEXT, vaqt TEXT)""")
+    conn.execute("""INSERT INTO tasks VALUES (1, 'Ta''mirlash', '41.3, 69.2', 'Fozil', 50000,
+                    'Telefon yo''q', '✅ Bajarildi', '2025-01-15', '10:00:00')""")
+    conn.commit()
+    conn.close()
+
+    legacy_debts = tmp_path / "qarzdorlik.db"
+    conn = sqlite3.connect(legacy_debts)
+    conn.execute("CREATE TABLE debts (id INTEGER PRIMARY KEY, employee_name TEXT, amount REAL, reason TEXT, date TEXT)")
+    conn.execute("INSERT INTO debts VALUES (1, 'Fozil', 30000, 'Avans', '2025-01-10')")
+    conn.commit()
+    conn.close()
+
+    for _ in range(2):
+        conn = db.get_connection()
+        migrate_storage.migrate_tasks_db(conn.cursor(), str(legacy_tasks))
+        migrate_storage.migrate_debts_db(conn.cursor(), str(legacy_debts))
+        conn.commit()
+        conn.close()
+        db.init_database()
+
+    [task] = db.get_employee_tasks("Fozil")
+    assert task[8] == "completed" and task[9] == "2025-01-15 10:00:00"
+    assert len(db.get_debts("Fozil")) == 1
+    assert db.get_debtor_balance("Fozil") == 30000
+    # The legacy date is not a due date: no reminder is backfilled for it
+    assert db.get_unscheduled_debts("debt_reminder") == []
+
+
+def test_task_log_streams_in_append_order(db):
+    assert db.get_task_log_version() == 0
+    for i in range(5):
+        db.append_task_log(f"Vazifa {i}", "41.3, 69.2", "Kamol, Fozil", "1000", "⏳ Davom etmoqda")
+
+    rows = list(db.iter_task_log(batch_size=2))
+    assert [row[1] for row in rows] == [f"Vazifa {i}" for i in range(5)]
+    assert db.get_task_log_version() == 5
+
+
+def test_task_group_assigns_everyone_in_one_transaction(db):
+    db.add_task("Oldingi vazifa", 41.3, 69.2, None, 1000, "Kamol", 1)
+    group_id, task_ids = db.add_task_group("Montaj", 41.3, 69.2, None, 50000,
+                                           ["Fozil", "Kamol", "Fozil", "Ali"], 1)
+
+    assert list(task_ids) == ["Fozil", "Kamol", "Ali"]
+    for employee, task_id in task_ids.items():
+        [task] = [t for t in db.get_employee_tasks(employee) if t[0] == task_id]
+        assert task[1] == "Montaj" and task[6] == employee
+
+    conn = db.get_connection()
+    rows = conn.execute("SELECT task_id, group_id, employee FROM task_assignments ORDER BY task_id").fetchall()
+    conn.close()
+    assert rows == [(task_id, group_id, employee) for employee, task_id in task_ids.items()]
+
+
+def test_send_all_reports_partial_failures():
+    from sender_pool import send_all
+
+    def send(recipient):
+        if recipient % 3 == 0:
+            raise RuntimeError("blocked")
+
+    delivered, failed = send_all(range(10), send, max_workers=4)
+    assert delivered == [1, 2, 4, 5, 7, 8]
+    assert [recipient for recipient, _ in failed] == [0, 3, 6, 9]
+
+
+def test_search_and_history_pages_stay_within_filter(db):
+    for i in range(15):
+        task_id = db.add_task(f"Montaj {i}", None, None, None, 1000, "Kamol" if i % 2 else "Fozil", 1)
+        db.update_task_status(task_id, "completed", received_amount=1000 * (i % 3))
+    db.add_task("Boshqa ish", None, None, None, 0, "Ali", 1)
+
+    first, has_more = db.search_tasks_page("Montaj", limit=5)
+    second, _ = db.search_tasks_page("Montaj", before_id=first[-1][0], limit=5)
+    assert has_more and len(first) == len(second) == 5
+    assert all("Montaj" in row[1] for row in first + second)
+
+    rows, has_more = db.get_completed_tasks_page("Kamol", paid_only=True, limit=20)
+    assert not has_more and all(row[4] > 0 for row in rows)
+    assert db.get_completed_tasks_summary("Kamol", paid_only=True) == (len(rows), sum(row[4] for row in rows))
+
+
+def test_user_state_merges_data_in_one_write(db):
+    db.set_user_state(42, "assign_task_description")
+    db.update_user_state(42, "assign_task_location", description="Konditsioner")
+    data = db.update_user_state(42, "assign_task_employee", location={"latitude": 41.3, "longitude": 69.2},
+                                payment=None, employees=["Ali"], due=datetime(2026, 11, 1))
+
+    assert db.get_user_state(42) == ("assign_task_employee", {
+        "description": "Konditsioner", "location": {"latitude": 41.3, "longitude": 69.2},
+        "payment": None, "employees": ["Ali"], "due": "2026-11-01 00:00:00"})
+    assert data == db.get_user_state(42).data
+    db.set_user_state(42, "assign_task_description")  # a new wizard starts empty
+    assert db.get_user_state(42).data == {}
+    db.clear_user_state(42)
+    assert db.get_user_state(42) == ("", {})
+
+
+def test_concurrent_user_state_appends_all_land(db):
+    db.set_user_state(42, "assign_task_employee", {"description": "Konditsioner"})
+    names = [f"Xodim {i}" for i in range(8)]
+    start = threading.Barrier(len(names))
+
+    def select(name):
+        start.wait()
+        db.update_user_state(42, "assign_task_employee", merge=lambda data: data.setdefault("employees", []).append(name))
+
+    threads = [threading.Thread(target=select, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(db.get_user_state(42).data["employees"]) == names
+
+
+def test_user_state_reads_rows_written_as_json(db):
+    conn = db.get_connection()
+    conn.executemany("INSERT INTO user_states (chat_id, state, state_data) VALUES (?, ?, ?)", [
+        (1, "customer_chat", '{"name": "Ali", "phone": "+998901234567"}'),
+        (2, "complete_task_report", "17"),
+    ])
+    conn.commit()
+    conn.close()
+
+    assert db.get_user_state(1) == ("customer_chat", {"name": "Ali", "phone": "+998901234567"})
+    assert db.get_user_state(2) == ("complete_task_report", {})
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for update de-duplication and idempotent writes
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import database
+from dedup import UpdateDedup, idempotency_key
+from lifecycle import Draining
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database.init_database()
+    return database
+
+
+def test_update_is_dispatched_once_across_restarts_unless_refused(db):
+    dispatched = []
+
+    def process_new_updates(updates):
+        if updates[0].update_id == 3:
+            raise Draining("shutting down")
+        dispatched.extend(update.update_id for update in updates)
+
+    bot = SimpleNamespace(process_new_updates=process_new_updates, last_update_id=0)
+    UpdateDedup().install(bot)
+    updates = [SimpleNamespace(update_id=i) for i in (1, 2, 1)]
+    bot.process_new_updates(updates)
+    with pytest.raises(Draining):
+        bot.process_new_updates([SimpleNamespace(update_id=3)])
+
+    # A new process shares the SQLite claims but not the in-memory set
+    restarted = UpdateDedup()
+    assert restarted.claim([2, 3, 4]) == [3, 4]  # 3 was refused while draining, so it is processed
+    assert restarted.claim([4]) == []
+    assert dispatched == [1, 2]
+
+
+def test_polling_moves_past_a_batch_of_duplicates(db):
+    telebot = pytest.importorskip("telebot")
+    UpdateDedup().claim([500, 501])  # processed before the crash, never confirmed
+
+    bot = telebot.TeleBot("123:TEST", threaded=False)
+    UpdateDedup().install(bot)
+    offsets = []
+
+    def get_updates(offset=None, **kwargs):
+        offsets.append(offset)
+        return [telebot.types.Update.de_json({"update_id": update_id}) for update_id in (500, 501) if update_id >= offset]
+
+    bot.get_updates = get_updates
+    for _ in range(2):
+        bot._TeleBot__retrieve_updates(timeout=0)
+
+    assert offsets == [1, 502]
+
+
+def test_repeated_writes_with_the_same_key_create_one_row(db):
+    message = SimpleNamespace(chat=SimpleNamespace(id=42), message_id=7)
+    key = idempotency_key("debt", message)
+
+    first = db.add_debt("Kamol", 1, None, 50000, "Avans", "01.01.2030", idempotency_key=key)
+    again = db.add_debt("Kamol", 1, None, 50000, "Avans", "01.01.2030", idempotency_key=key)
+    assert first == again
+    assert len(db.get_debts("Kamol")) == 1
+    assert db.get_total_outstanding_debt() == 50000
+
+    group = db.add_task_group("Ta'mirlash", 41.3, 69.2, None, 100000, ["Kamol", "Fozil"], 42,
+                              idempotency_key=idempotency_key("task_group", message))
+    assert db.add_task_group("Ta'mirlash", 41.3, 69.2, None, 100000, ["Kamol", "Fozil"], 42,
+                             idempotency_key=idempotency_key("task_group", message)) == group
+    assert len(db.get_employee_tasks("Kamol")) == 1
+
+    task_id = group[1]["Kamol"]
+    assert db.update_task_status(task_id, "completed", received_amount=100000)
+    assert not db.update_task_status(task_id, "completed", received_amount=100000)
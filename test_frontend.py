@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the single HTTP front end
+"""
+
+import threading
+import urllib.error
+import urllib.request
+
+import frontend
+
+
+def get(port, path, data=None):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", data=data, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_slow_request_does_not_hold_up_health_and_metrics():
+    release = threading.Event()
+
+    def slow(environ):
+        release.wait(5)
+        return "200 OK", "text/plain", b"done"
+
+    port = frontend.serve(0, routes={"/slow": slow}, host="127.0.0.1").server_port
+    try:
+        waiting = threading.Thread(target=get, args=(port, "/slow"))
+        waiting.start()
+        assert get(port, "/health") == (200, b"Bot is running")
+        status, body = get(port, "/metrics")
+        assert status == 200 and b"# TYPE" in body
+        release.set()
+        waiting.join(5)
+    finally:
+        release.set()
+        frontend.shutdown()
+
+
+def test_webhook_asks_telegram_to_retry_until_the_bot_is_attached():
+    port = frontend.serve(0, host="127.0.0.1").server_port
+    front_end = frontend._front_end
+    front_end.webhook_path = "/webhook/123:abc"
+    try:
+        assert get(port, "/webhook/123:abc")[0] == 405
+        assert get(port, "/webhook/123:abc", data=b'{"update_id": 1}')[0] == 503
+    finally:
+        frontend.shutdown()
+    assert not frontend.running()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests for the shutdown drain and the supervisor loop, against a fake Telegram API
+"""
+
+import threading
+
+import pytest
+
+import database
+from config import ADMIN_CHAT_ID, EMPLOYEES
+from lifecycle import Drain, Draining, supervise
+
+telebot = pytest.importorskip("telebot")
+
+from benchmarks.fake_telegram import FakeTelegram  # noqa: E402
+
+CUSTOMER_BASE_ID = 9_000_000
+
+
+def test_drain_finishes_every_taken_update_and_flushes_digests(tmp_path, monkeypatch):
+    import main as bot_main
+
+    monkeypatch.chdir(tmp_path)  # media and reports are created in the working directory
+    # File-backed like production: concurrent writers wait for the lock instead of failing
+    database.set_backend(database.SQLiteBackend(str(tmp_path / "bot.db")))
+    fake = FakeTelegram(latency=0.002)
+    drain = Drain()
+    try:
+        bot, notifier = bot_main.create_bot("123:TEST", drain=drain)
+        fake.install(bot)
+
+        employees = [chat_id for chat_id in EMPLOYEES.values() if chat_id != ADMIN_CHAT_ID]
+        for chat_id in employees:
+            database.set_user_state(chat_id, "employee_location")
+        customers = [CUSTOMER_BASE_ID + i for i in range(60)]
+        updates = [fake.location(chat_id, 41.3 + i / 1000, 69.2) for i in range(15) for chat_id in employees]
+        updates += [fake.text(chat_id, "👥 Mijoz") for chat_id in customers]
+        bot.process_new_updates([telebot.types.Update.de_json(update) for update in updates])
+
+        assert drain.in_flight.count > 0  # still under load when the drain starts
+        timings = drain.run(timeout=20)
+
+        with pytest.raises(Draining):
+            bot.process_new_updates([telebot.types.Update.de_json(fake.text(customers[0], "👥 Mijoz"))])
+    finally:
+        fake.uninstall()
+        database.set_backend(database.SQLiteBackend())
+
+    assert drain.in_flight.count == 0
+    assert sum(timings.values()) < 15
+    for chat_id in employees:
+        confirmations = [m for m in fake.sent[chat_id] if m.get("text", "").startswith("✅ Lokatsiya qabul qilindi")]
+        assert len(confirmations) == 15
+    for chat_id in customers:
+        assert sum("Mijoz paneli" in m.get("text", "") for m in fake.sent[chat_id]) == 1
+    # Every buffered location notice reached the admin before the drain returned
+    admin_text = "\n".join(m.get("text", "") for m in fake.sent[ADMIN_CHAT_ID])
+    assert admin_text.count("🗺 https://maps.google.com/") == 15 * len(employees)
+    assert notifier.pending_count() == 0
+
+
+def test_task_wizard_resumes_after_a_restart(tmp_path, monkeypatch):
+    import main as bot_main
+
+    monkeypatch.chdir(tmp_path)
+    database.set_backend(database.SQLiteBackend(str(tmp_path / "bot.db")))
+    fake = FakeTelegram()
+    employee = next(name for name, chat_id in EMPLOYEES.items() if chat_id != ADMIN_CHAT_ID)
+
+    def send(bot, *updates):
+        bot.process_new_updates([telebot.types.Update.de_json(update) for update in updates])
+
+    try:
+        bot, _ = bot_main.create_bot("123:TEST", threaded=False, background=False)
+        fake.install(bot)
+        send(bot, fake.text(ADMIN_CHAT_ID, "📤 Vazifa berish"), fake.text(ADMIN_CHAT_ID, "Konditsioner o'rnatish"),
+             fake.location(ADMIN_CHAT_ID, 41.3, 69.2), fake.text(ADMIN_CHAT_ID, "⏭ To'lov belgilanmagan"),
+             fake.text(ADMIN_CHAT_ID, employee))
+
+        # A new process picks the wizard up where the old one left it
+        bot, _ = bot_main.create_bot("123:TEST", threaded=False, background=False)
+        fake.install(bot)
+        send(bot, fake.text(ADMIN_CHAT_ID, "📨 Yuborish"))
+        tasks = database.get_employee_tasks(employee)
+        state = database.get_user_state(ADMIN_CHAT_ID)
+    finally:
+        fake.uninstall()
+        database.set_backend(database.SQLiteBackend())
+
+    assert [(task[1], task[2], task[3]) for task in tasks] == [("Konditsioner o'rnatish", 41.3, 69.2)]
+    assert state == ("", {})
+
+
+def test_task_buttons_work_after_a_restart(tmp_path, monkeypatch):
+    import main as bot_main
+
+    monkeypatch.chdir(tmp_path)
+    database.set_backend(database.SQLiteBackend(str(tmp_path / "bot.db")))
+    fake = FakeTelegram()
+    employee, chat_id = next((name, chat_id) for name, chat_id in EMPLOYEES.items() if chat_id != ADMIN_CHAT_ID)
+
+    def send(bot, *updates):
+        bot.process_new_updates([telebot.types.Update.de_json(update) for update in updates])
+
+    try:
+        database.init_database()
+        started = database.add_task("Konditsioner", 41.3, 69.2, None, None, employee, ADMIN_CHAT_ID)
+        legacy = database.add_task("Quvur", 41.3, 69.2, None, None, employee, ADMIN_CHAT_ID)
+        database.update_task_status(started, "in_progress")
+        bot, _ = bot_main.create_bot("123:TEST", threaded=False, background=False)
+        fake.install(bot)
+        send(bot, fake.text(chat_id, "📌 Mening vazifalarim"))
+        complete = fake.last_inline_buttons(chat_id)[f"✅ #{started} Yakunlash"]
+
+        # The list was sent by the old process; the press reaches a new one
+        bot, _ = bot_main.create_bot("123:TEST", threaded=False, background=False)
+        fake.install(bot)
+        send(bot, fake.callback(chat_id, complete))
+        state = database.get_user_state(chat_id)
+        send(bot, fake.callback(chat_id, f"start_task_{legacy}"))
+        legacy_status = database.get_task_by_id(legacy)[8]
+    finally:
+        fake.uninstall()
+        database.set_backend(database.SQLiteBackend())
+
+    assert state == ("complete_task_report", {"task_id": started})
+    assert legacy_status == "in_progress"
+
+
+def test_debt_completion_retried_after_a_failure_records_the_debt(tmp_path, monkeypatch):
+    import main as bot_main
+
+    monkeypatch.chdir(tmp_path)
+    database.set_backend(database.SQLiteBackend(str(tmp_path / "bot.db")))
+    fake = FakeTelegram()
+    employee, chat_id = next((name, chat_id) for name, chat_id in EMPLOYEES.items() if chat_id != ADMIN_CHAT_ID)
+
+    failures = []
+
+    def add_debt_failing_once(**kwargs):
+        if not failures:
+            failures.append(kwargs)
+            raise database.sqlite3.OperationalError("database is locked")
+        return database.add_debt(**kwargs)
+
+    monkeypatch.setattr(bot_main, "add_debt", add_debt_failing_once)
+    try:
+        database.init_database()
+        task_id = database.add_task("Konditsioner", 41.3, 69.2, None, None, employee, ADMIN_CHAT_ID)
+        database.set_user_state(chat_id, "debt_payment_date", {
+            "task_id": task_id, "report": "O'rnatildi", "debt_person": "Aziz",
+            "debt_amount": 150000.0, "debt_reason": "Oldindan to'lov"})
+        bot, notifier = bot_main.create_bot("123:TEST", threaded=False, background=False)
+        fake.install(bot)
+
+        bot.process_new_updates([telebot.types.Update.de_json(fake.text(chat_id, "01.12.2026"))])
+        after_failure = (database.get_task_by_id(task_id)[8], database.get_debts(), notifier.pending_count())
+        bot.process_new_updates([telebot.types.Update.de_json(fake.text(chat_id, "01.12.2026"))])
+        debts = database.get_debts()
+        state = database.get_user_state(chat_id)
+        pending = notifier.pending_count()
+    finally:
+        fake.uninstall()
+        database.set_backend(database.SQLiteBackend())
+
+    # The task was completed before the debt insert failed; the retry still records it
+    assert after_failure == ("completed", [], 0)
+    assert [(debt[1], debt[3], debt[4]) for debt in debts] == [("Aziz", task_id, 150000.0)]
+    assert state == ("", {})
+    assert pending == 1
+
+
+def test_supervisor_restarts_crashes_without_recursion():
+    stopping = threading.Event()
+    runs, waits = [], []
+
+    def poll():
+        runs.append(len(runs))
+        if len(runs) == 4:
+            stopping.set()
+            return
+        raise ConnectionError("network down")
+
+    supervise(poll, stopping, on_crash=lambda e, wait: waits.append(wait), delay=0.001, max_delay=0.004)
+
+    assert len(runs) == 4
+    assert waits == [0.001, 0.002, 0.004]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the queued logger: sampling, structured fields and dropping on a full queue
+"""
+
+import io
+import logging
+import threading
+
+from logs import dropped_records, setup_logging, stop_logging
+
+
+def test_sampled_records_and_extra_fields_reach_the_writer():
+    stream = io.StringIO()
+    setup_logging("DEBUG", stream=stream, sample_every=10)
+    log = logging.getLogger("test.logs")
+    try:
+        for i in range(25):
+            log.debug("Location %s", i, extra={"sample": "location"})
+        log.info("Vazifa yuborildi", extra={"task_id": 7})
+    finally:
+        stop_logging()
+
+    lines = stream.getvalue().splitlines()
+    locations = [line for line in lines if "Location" in line]
+    assert len(locations) == 3 and "sampled=1/10" in locations[0]
+    assert any("INFO test.logs Vazifa yuborildi task_id=7" in line for line in lines)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    release = threading.Event()
+
+    class BlockedStream(io.StringIO):
+        def write(self, text):
+            release.wait(5)
+            return super().write(text)
+
+    setup_logging("INFO", stream=BlockedStream(), queue_size=5)
+    try:
+        for i in range(50):
+            logging.getLogger("test.logs").info("xabar %d", i)
+        # One record is with the blocked writer, five wait in the queue
+        assert dropped_records() >= 40
+    finally:
+        release.set()
+        stop_logging()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests for message templates and prepared keyboards
+"""
+
+import json
+
+import pytest
+
+import messages
+from messages import Template, KEYBOARDS, TASK_INFO, locale_for
+
+
+class User:
+    def __init__(self, language_code):
+        self.language_code = language_code
+
+
+def test_templates_render_per_locale_with_fallback():
+    template = Template("greeting", uz="Salom, {name}! {amount:,.0f} so'm {{ok}}",
+                        ru="Привет, {name}! {amount:,.0f} сум {{ok}}")
+    assert template.render(name="Kamol", amount=1500.0) == "Salom, Kamol! 1,500 so'm {ok}"
+    assert template.render("ru", name="Kamol", amount=1500.0) == "Привет, Kamol! 1,500 сум {ok}"
+    assert template.render("en", name="Kamol", amount=1500.0) == template.render(name="Kamol", amount=1500.0)
+
+    assert locale_for(User("ru-RU")) == "ru"
+    assert locale_for(User(None)) == messages.DEFAULT_LOCALE
+
+    with pytest.raises(ValueError):
+        Template("broken", uz="{name}", ru="{title}")
+
+    assert TASK_INFO.fields == {"task_id", "status_emoji", "status", "description", "payment", "created"}
+
+
+def test_keyboards_are_serialized_bot_api_markup():
+    markup = json.loads(KEYBOARDS["start"])
+    assert markup["resize_keyboard"] is True
+    assert [[button["text"] for button in row] for row in markup["keyboard"]] == [
+        ["🔐 Admin", "👤 Xodim"], ["👥 Mijoz"]
+    ]
+    assert json.loads(KEYBOARDS["remove"]) == {"remove_keyboard": True}
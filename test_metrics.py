@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for handler, SQL and API metrics and their Prometheus rendering
+"""
+
+from types import SimpleNamespace
+
+import database
+import metrics
+
+
+def test_handler_metrics_attribute_sql_to_the_running_handler():
+    backend = database.MemoryBackend()
+    database.set_backend(backend)
+    database.add_query_observer(metrics.observe_query)
+    try:
+        database.init_database()
+
+        def show_tasks(message):
+            database.get_employee_tasks("Kamol")
+
+        def dispatch_callback(call):
+            raise RuntimeError("boom")
+
+        bot = SimpleNamespace(
+            message_handlers=[{"function": show_tasks}],
+            edited_message_handlers=[],
+            callback_query_handlers=[{"function": dispatch_callback}],
+        )
+        metrics.instrument_bot(bot, callback_actions=["tb"])
+
+        bot.message_handlers[0]["function"](SimpleNamespace(text="📌 Mening vazifalarim"))
+        for data in ("tb:s:1:0", "x" * 40):
+            try:
+                bot.callback_query_handlers[0]["function"](SimpleNamespace(data=data))
+            except RuntimeError:
+                pass
+    finally:
+        database.remove_query_observer(metrics.observe_query)
+        database.set_backend(database.SQLiteBackend())
+        backend.close()
+
+    assert metrics.HANDLER_CALLS.value("show_tasks") == 1
+    assert metrics.DB_QUERIES.value("show_tasks") >= 1
+    assert metrics.DB_QUERIES.value("background") >= 1  # init_database ran outside a handler
+    assert metrics.HANDLER_ERRORS.value("callback:tb") == 1
+    assert metrics.HANDLER_ERRORS.value("callback:unknown") == 1
+    assert metrics.current_handler() == metrics.BACKGROUND
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_latency_seconds", "Test latency", ["method"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 3):
+        histogram.observe(value, "send\"Message")
+
+    text = metrics.render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{method="send\\"Message",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{method="send\\"Message",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{method="send\\"Message",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{method="send\\"Message"} 3' in text
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for batched admin notifications
+"""
+
+import time
+
+from notifier import MAX_MESSAGE_LENGTH, NotificationAggregator, build_digests
+
+
+def test_routine_events_are_batched_and_urgent_ones_bypass():
+    sent = []
+    notifier = NotificationAggregator(sent.append, window=0.2, batch_size=3)
+    notifier.start()
+    try:
+        notifier.notify("task_started", "Vazifa #1 boshlandi")
+        notifier.notify("task_started", "Vazifa #2 boshlandi")
+        notifier.notify("customer_chat", "Mijoz xabari", urgent=True)
+        assert sent == ["Mijoz xabari"]
+
+        # Reaching the batch size sends without waiting for the window
+        notifier.notify("debt", "Qarz 1")
+        notifier.notify("debt", "Qarz 2")
+        notifier.notify("debt", "Qarz 3")
+        deadline = time.time() + 0.15
+        while len(sent) < 2 and time.time() < deadline:
+            time.sleep(0.005)
+        assert len(sent) == 2 and "(3 ta)" in sent[1]
+
+        time.sleep(0.3)
+        assert len(sent) == 3
+        assert "Vazifa #1 boshlandi" in sent[2] and "Vazifa #2 boshlandi" in sent[2]
+        assert (notifier.events, notifier.messages) == (6, 3)
+    finally:
+        notifier.stop(1)
+
+
+def test_stop_flushes_and_digests_respect_length_limit():
+    sent = []
+    notifier = NotificationAggregator(sent.append, window=60)
+    notifier.notify("inquiry", "So'rov")
+    notifier.stop()
+    assert sent == ["So'rov"]
+
+    digests = build_digests(["x" * 1500] * 7, "📋 So'rovlar")
+    assert len(digests) > 1
+    assert all(len(digest) <= MAX_MESSAGE_LENGTH for digest in digests)
+    assert sum(digest.count("x" * 1500) for digest in digests) == 7
+
+
+def test_attachments_follow_the_message_that_carries_their_text():
+    sent = []
+    notifier = NotificationAggregator(sent.append, window=60)
+    notifier.notify("customer", "Yangi mijoz", urgent=True, attach=lambda: sent.append("lokatsiya"))
+    notifier.notify("task_completed", "Vazifa #1", attach=lambda: sent.append("rasm #1"))
+    notifier.notify("task_completed", "x" * 3000, attach=lambda: sent.append("rasm #2"))
+    notifier.notify("task_completed", "y" * 3000, attach=lambda: sent.append("rasm #3"))
+    assert sent == ["Yangi mijoz", "lokatsiya"]
+
+    notifier.stop()
+    # The digest is split before the length limit; each photo follows its own part
+    assert sent[3:] == ["rasm #1", "rasm #2", "y" * 3000, "rasm #3"]
+    assert "Vazifa #1" in sent[2] and "x" * 3000 in sent[2]
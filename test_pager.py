@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting long messages into Telegram-sized pages
+"""
+
+from pager import split_message, take_page, tg_len
+
+
+def test_split_keeps_entries_emoji_and_entities_whole():
+    entries = [f"{i}. 👤 **Xodim {i}**\n   📍 41.311081, 69.240562\n   🕐 10:00" for i in range(300)]
+    parts = split_message("\n\n".join(entries))
+
+    assert len(parts) > 1
+    assert all(tg_len(part) <= 4096 for part in parts)
+    assert all(part.count("**") % 2 == 0 for part in parts)
+    assert sum(len(part.split("\n\n")) for part in parts) == 300
+
+    family = "👨‍👩‍👧"
+    parts = split_message(family * 100, limit=50)
+    assert all(tg_len(part) <= 50 for part in parts)
+    assert "".join(parts) == family * 100
+
+
+def test_take_page_reads_only_what_fits():
+    rendered = []
+
+    def rows():
+        for i in range(100):
+            rendered.append(i)
+            yield "x" * 100
+
+    page = take_page(rows(), limit=1000)
+    assert len(page) == 9
+    assert len(rendered) == 10
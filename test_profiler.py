@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the stack-sampling profiler
+"""
+
+import threading
+import time
+
+from profiler import StackSampler
+
+
+def busy_handler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_stacks_and_stays_under_its_overhead_cap(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_handler, args=(stop,), name="WorkerThread1")
+    worker.start()
+    try:
+        profile = StackSampler(interval=0.001, max_overhead=0.05).sample(0.3)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.samples > 10
+    assert profile.overhead <= 0.1
+    stacks = [stack for stack in profile.stacks if stack.startswith("WorkerThread1;")]
+    assert any("test_profiler.py:busy_handler" in stack for stack in stacks)
+
+    path = profile.write_collapsed(str(tmp_path / "profile.txt"))
+    line = open(path).readline().rstrip("\n")
+    assert line.rsplit(" ", 1)[1].isdigit()
+
+
+def test_background_run_can_be_stopped_early():
+    sampler = StackSampler()
+    done = []
+    assert sampler.start(60, done.append)
+    assert not sampler.start(60)
+    time.sleep(0.05)
+    sampler.stop()
+    sampler._thread.join(2)
+    assert done and done[0].duration < 5
+    assert not sampler.running
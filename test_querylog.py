@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for statement normalization, query statistics and the slow-query log
+"""
+
+import logging
+
+import database
+from querylog import QueryLog, normalize
+
+
+def test_normalize_groups_statements_that_differ_only_in_literals():
+    assert normalize("SELECT * FROM tasks\n   WHERE id = 42 AND status = 'done'") == \
+        "SELECT * FROM tasks WHERE id = ? AND status = ?"
+    assert normalize("SELECT * FROM debts WHERE id IN (?, ?, ?)") == normalize("SELECT * FROM debts WHERE id IN (?,?)")
+    assert normalize("SELECT t1.x FROM t1") == "SELECT t1.x FROM t1"
+
+
+def test_slow_statements_are_logged_with_parameters_and_plan(caplog):
+    backend = database.MemoryBackend()
+    database.set_backend(backend)
+    query_log = QueryLog(slow_ms=0)
+    try:
+        database.init_database()
+        database.add_query_observer(query_log.observe)
+        with caplog.at_level(logging.WARNING, logger="querylog"):
+            for name in ("Kamol", "Fozil"):
+                database.get_employee_tasks(name)
+    finally:
+        database.remove_query_observer(query_log.observe)
+        database.set_backend(database.SQLiteBackend())
+        backend.close()
+
+    statement, stats = next((key, stats) for key, stats in query_log.report(50) if "FROM tasks" in key)
+    assert stats.count == 2 and stats.slow == 2
+    assert "SEARCH" in stats.plan or "SCAN" in stats.plan
+    assert any("'Kamol'" in record.getMessage() and "plan=" in record.getMessage() for record in caplog.records)
+
+
+def test_rebuilding_the_bot_keeps_one_observer_per_statement(tmp_path, monkeypatch):
+    import main as bot_main
+
+    monkeypatch.chdir(tmp_path)
+    database.set_backend(database.MemoryBackend())
+    try:
+        bot_main.create_bot("123:TEST", threaded=False, background=False)
+        observers = database._query_observers
+        bot_main.create_bot("123:TEST", threaded=False, background=False)
+        assert database._query_observers == observers
+    finally:
+        database.set_backend(database.SQLiteBackend())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline routing index
+"""
+
+import routing
+from routing import RoadGraph, build_graph, read_osm, route, routes_to
+
+# A--B--C along a 50 km/h street, plus a one-way shortcut A->C
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="41.3000" lon="69.2400"/>
+  <node id="2" lat="41.3000" lon="69.2500"/>
+  <node id="3" lat="41.3100" lon="69.2500"/>
+  <node id="9" lat="41.5000" lon="69.5000"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="primary"/></way>
+  <way id="11"><nd ref="1"/><nd ref="3"/><tag k="highway" v="primary"/><tag k="oneway" v="yes"/></way>
+  <way id="12"><nd ref="2"/><nd ref="9"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+
+def make_graph(tmp_path):
+    extract = tmp_path / "city.osm"
+    extract.write_text(OSM)
+    path = str(tmp_path / "roads.graph")
+    assert build_graph(*read_osm(str(extract)), path) == (3, 5, 0)
+    return RoadGraph(path)
+
+
+def test_routes_follow_one_way_streets(tmp_path):
+    graph = make_graph(tmp_path)
+
+    there = route(41.3000, 69.2400, 41.3100, 69.2500, graph=graph)
+    back = route(41.3100, 69.2500, 41.3000, 69.2400, graph=graph)
+    assert there.exact and back.exact
+    # The shortcut is one-way, so the way back goes around through B
+    assert there.distance_m < back.distance_m
+    assert abs(back.distance_m - 1950) < 50
+    assert abs(back.drive_s - back.distance_m / (50 / 3.6)) < 1
+
+    etas = routes_to(41.3100, 69.2500, {"Kamol": (41.3000, 69.2400), "Aziz": (41.3001, 69.2499)}, graph=graph)
+    assert etas["Kamol"].distance_m == there.distance_m
+    assert etas["Aziz"].exact and etas["Aziz"].distance_m < there.distance_m
+
+
+def test_without_index_falls_back_to_estimate(tmp_path, monkeypatch):
+    monkeypatch.setattr(routing, "get_graph", lambda: None)
+    estimate = route(41.3000, 69.2400, 41.3100, 69.2500)
+    assert not estimate.exact
+    assert estimate.distance_m > routing.haversine_m(41.3000, 69.2400, 41.3100, 69.2500)
+    assert estimate.walk_s > estimate.drive_s
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent job scheduler
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import database
+from scheduler import Scheduler, parse_due_date, next_daily_run
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database.init_database()
+    return database
+
+
+def test_due_jobs_fire_once_across_restarts(db):
+    fired = []
+    done = threading.Event()
+
+    def handler(ref_id, payload):
+        fired.append((ref_id, payload))
+        done.set()
+
+    scheduler = Scheduler()
+    scheduler.register("debt_reminder", handler)
+    scheduler.schedule("debt_reminder", time.time() + 0.1, ref_id=7, payload={"n": 1})
+    scheduler.schedule("debt_reminder", time.time() + 3600, ref_id=8)
+    scheduler.start()
+    assert done.wait(2)
+    scheduler.stop(1)
+    assert fired == [(7, {"n": 1})]
+
+    # A restarted scheduler only sees the job that has not fired yet
+    restarted = Scheduler()
+    assert restarted.load() == 1
+    assert [job[2] for job in db.get_pending_jobs()] == [8]
+
+
+def test_cancelled_jobs_do_not_fire(db):
+    fired = []
+    scheduler = Scheduler()
+    scheduler.register("debt_reminder", lambda ref_id, payload: fired.append(ref_id))
+    scheduler.schedule("debt_reminder", time.time() + 0.2, ref_id=1)
+    scheduler.schedule("debt_reminder", time.time() + 0.2, ref_id=2)
+    assert scheduler.cancel("debt_reminder", 1) == 1
+
+    scheduler.start()
+    time.sleep(0.5)
+    scheduler.stop(1)
+    assert fired == [2]
+
+
+def test_due_date_parsing():
+    assert parse_due_date("2026-11-01", 9) == datetime(2026, 11, 1, 9)
+    assert parse_due_date("01.11.2026", 9) == datetime(2026, 11, 1, 9)
+    assert parse_due_date("ertaga") is None
+    assert next_daily_run(9, datetime(2026, 11, 1, 9, 0)) == datetime(2026, 11, 2, 9)
+    assert next_daily_run(9, datetime(2026, 11, 1, 8, 30)) == datetime(2026, 11, 1, 9)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Tests for ordering an employee's task stops
+"""
+
+import random
+
+from tour import distance_matrix, nearest_neighbour_path, path_length, plan_tour, two_opt
+
+
+def test_stops_along_a_street_are_visited_in_order():
+    start = (41.3000, 69.2000)
+    stops = [(41.3000, 69.2000 + 0.01 * k) for k in (3, 1, 5, 2, 4)]
+
+    order, length = plan_tour(start, stops)
+
+    assert order == [1, 3, 0, 4, 2]
+    assert abs(length - 4200) < 50  # 0.05° of longitude at 41.3°N
+
+
+def test_two_opt_never_lengthens_and_keeps_every_stop():
+    rng = random.Random(7)
+    points = [(41.2 + rng.random() * 0.2, 69.1 + rng.random() * 0.3) for _ in range(120)]
+    matrix = distance_matrix(points)
+
+    greedy = nearest_neighbour_path(matrix)
+    improved = two_opt(greedy, matrix)
+
+    assert improved[0] == 0
+    assert sorted(improved) == list(range(len(points)))
+    assert path_length(improved, matrix) < path_length(greedy, matrix)
+    assert plan_tour(points[0], []) == ([], 0.0)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the website API's conditional and long-poll inquiry status
+"""
+
+import pytest
+
+import database
+
+pytest.importorskip("flask")
+
+import website_api  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database._inquiry_status_cache.clear()
+    database.init_database()
+    return website_api.app.test_client()
+
+
+def test_wait_answers_not_modified_for_the_etag_query_parameter(client):
+    inquiry_id = database.add_customer_inquiry("Ali Valiyev", "Konditsioner o'rnatish kerak")
+    etag = client.get(f"/api/inquiry_status/{inquiry_id}").get_etag()[0]
+
+    assert client.get(f"/api/inquiry_status/{inquiry_id}/wait?etag={etag}&timeout=0").status_code == 304
+    assert client.get(f"/api/inquiry_status/{inquiry_id}/wait?timeout=0",
+                      headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+
+    database.respond_to_inquiry(inquiry_id, "Ertaga boramiz")
+    changed = client.get(f"/api/inquiry_status/{inquiry_id}/wait?etag={etag}&timeout=0")
+    assert changed.status_code == 200
+    assert changed.get_json()["inquiry"]["status"] == "responded"
+
+
+def test_admin_feed_requires_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(website_api, "ADMIN_API_TOKEN", "s3cret")
+    url = "/api/inquiries/changes?timeout=0"
+
+    assert client.get(url, headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    assert client.get(url + "&token=s3cret").status_code == 200
+    for headers in ({}, {"Authorization": "Bearer s3cre"}, {"Authorization": "Bearer sécret"}):
+        assert client.get(url, headers=headers).status_code == 403
+
+    monkeypatch.setattr(website_api, "ADMIN_API_TOKEN", "")
+    assert client.get(url + "&token=").status_code == 403
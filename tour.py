@@ -0,0 +1,102 @@
+"""
+Visiting order for an employee's open tasks.
+
+The path starts at the employee's last known location and does not return.
+It is built nearest-neighbour first and then improved with 2-opt moves,
+checking only each stop's nearest neighbours so hundreds of stops stay
+fast. Distances come from a matrix computed once per plan.
+"""
+
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+from routing import EARTH_RADIUS_M
+
+NEIGHBOURS = 10  # candidate stops checked per 2-opt move
+
+
+def distance_matrix(points: Sequence[Tuple[float, float]]) -> List[List[float]]:
+    """Meters between every pair of (lat, lon) points.
+
+    Points are projected once onto a plane tangent at their mean latitude,
+    which is within a fraction of a percent of great-circle distance across a
+    city, so each entry is a single math.dist call.
+    """
+    if not points:
+        return []
+    scale = math.radians(1) * EARTH_RADIUS_M
+    kx = scale * math.cos(math.radians(sum(lat for lat, _ in points) / len(points)))
+    projected = [(lon * kx, lat * scale) for lat, lon in points]
+    return [[math.dist(p, q) for q in projected] for p in projected]
+
+
+def path_length(path: Sequence[int], matrix: List[List[float]]) -> float:
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+def nearest_neighbour_path(matrix: List[List[float]], start: int = 0) -> List[int]:
+    """Greedy path from start, always going to the closest unvisited point"""
+    unvisited = set(range(len(matrix))) - {start}
+    path = [start]
+    while unvisited:
+        row = matrix[path[-1]]
+        path.append(min(unvisited, key=row.__getitem__))
+        unvisited.remove(path[-1])
+    return path
+
+
+def _gain(path: List[int], matrix: List[List[float]], lo: int, hi: int) -> float:
+    """Length saved by reversing path[lo + 1:hi + 1]"""
+    a, b, c = path[lo], path[lo + 1], path[hi]
+    saved = matrix[a][b] - matrix[a][c]
+    if hi + 1 < len(path):
+        e = path[hi + 1]
+        saved += matrix[c][e] - matrix[b][e]
+    return saved
+
+
+def two_opt(path: List[int], matrix: List[List[float]], neighbours: int = NEIGHBOURS) -> List[int]:
+    """Improve an open path (first point fixed) until no 2-opt move shortens it"""
+    path = list(path)
+    position = [0] * len(matrix)
+    for i, node in enumerate(path):
+        position[node] = i
+    near = [heapq.nsmallest(neighbours + 1, range(len(row)), key=row.__getitem__)[1:] for row in matrix]
+
+    def reverse(lo, hi):
+        path[lo + 1:hi + 1] = reversed(path[lo + 1:hi + 1])
+        for i in range(lo + 1, hi + 1):
+            position[path[i]] = i
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(path)):
+            a = path[i]
+            succ = matrix[a][path[i + 1]] if i + 1 < len(path) else 0.0
+            pred = matrix[a][path[i - 1]] if i > 0 else 0.0
+            for c in near[a]:
+                if matrix[a][c] >= max(succ, pred):
+                    break
+                j = position[c]
+                # New edge a-c replacing a's outgoing edge
+                if j > i + 1 and matrix[a][c] < succ and _gain(path, matrix, i, j) > 1e-9:
+                    reverse(i, j)
+                    improved = True
+                    break
+                # New edge c-a replacing a's incoming edge (the start stays first)
+                if 1 <= j < i - 1 and matrix[a][c] < pred and _gain(path, matrix, j - 1, i - 1) > 1e-9:
+                    reverse(j - 1, i - 1)
+                    improved = True
+                    break
+    return path
+
+
+def plan_tour(start: Tuple[float, float], stops: Sequence[Tuple[float, float]]) -> Tuple[List[int], float]:
+    """Order of stops (indexes into stops) from start, and the straight-line length in meters"""
+    if not stops:
+        return [], 0.0
+    matrix = distance_matrix([start] + list(stops))
+    path = two_opt(nearest_neighbour_path(matrix), matrix)
+    return [node - 1 for node in path[1:]], path_length(path, matrix)
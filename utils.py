@@ -1,10 +1,15 @@
 import os
 import json
-import openpyxl
+import logging
 from datetime import datetime, timedelta
 from typing import List, Tuple, Optional, Dict, Any
-from config import REPORTS_DIR, MEDIA_DIR
+from config import REPORTS_DIR, MEDIA_DIR, DEFAULT_LOCALE
 from database import get_employee_tasks, get_debts, get_task_statistics
+from messages import (
+    TASK_INFO, TASK_INFO_LOCATION, TASK_INFO_RECEIVED, TASK_INFO_REPORT, format_money
+)
+
+log = logging.getLogger(__name__)
 
 def ensure_directories():
     """Ensure required directories exist"""
@@ -30,7 +35,7 @@ def save_media_file(file_info, bot, media_type: str) -> str:
     
     return filepath
 
-def format_task_info(task: Tuple) -> str:
+def format_task_info(task: Tuple, locale: str = DEFAULT_LOCALE) -> str:
     """Format task information for display"""
     (task_id, description, location_lat, location_lon, location_address,
      payment_amount, assigned_to, assigned_by, status, created_at,
@@ -52,25 +57,27 @@ def format_task_info(task: Tuple) -> str:
     # Safe status formatting
     status_text = status.title() if status else "Noma'lum"
     
-    task_text = f"""
-🆔 Vazifa ID: {task_id}
-{status_emoji} Holat: {status_text}
-
-📝 Tavsif: {description}
-💰 To'lov: {f"{payment_amount:,.0f} so'm" if payment_amount else "Belgilanmagan"}
-📅 Yaratilgan: {created_time}
-"""
+    lines = [TASK_INFO.render(
+        locale,
+        task_id=task_id,
+        status_emoji=status_emoji,
+        status=status_text,
+        description=description,
+        payment=format_money(payment_amount or None, locale),
+        created=created_time
+    )]
     
     if location_lat and location_lon:
-        task_text += f"📍 Lokatsiya: {location_lat:.6f}, {location_lon:.6f}\n"
+        lines.append(TASK_INFO_LOCATION.render(locale, lat=location_lat, lon=location_lon))
     
     if status == "completed" and received_amount is not None:
-        task_text += f"💵 Olingan: {received_amount:,.0f} so'm\n"
+        lines.append(TASK_INFO_RECEIVED.render(locale, amount=received_amount))
     
     if completion_report:
-        task_text += f"📋 Hisobot: {completion_report[:100]}{'...' if len(completion_report) > 100 else ''}\n"
+        report = completion_report[:100] + ('...' if len(completion_report) > 100 else '')
+        lines.append(TASK_INFO_REPORT.render(locale, report=report))
     
-    return task_text.strip()
+    return "\n".join(lines)
 
 def generate_employee_report(employee_name: str, days: int = 30) -> Optional[str]:
     """Generate Excel report for employee"""
@@ -97,6 +104,8 @@ def generate_employee_report(employee_name: str, days: int = 30) -> Optional[str
     if not filtered_tasks:
         return None
     
+    import openpyxl  # heavy; loaded on the first report, not at startup
+    
     # Create workbook
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -161,6 +170,8 @@ def generate_admin_report() -> Optional[str]:
     # Get statistics
     stats = get_task_statistics()
     
+    import openpyxl
+    
     # Create workbook
     wb = openpyxl.Workbook()
     
@@ -186,10 +197,9 @@ def generate_admin_report() -> Optional[str]:
     
     # Tasks details sheet
     ws2 = wb.create_sheet("Vazifalar")
-    from database import DATABASE_PATH
-    import sqlite3
+    from database import get_connection
     
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -351,10 +361,10 @@ def generate_custom_export(export_type: str) -> Optional[str]:
     """Generate custom data export based on type"""
     ensure_directories()
     
-    from database import DATABASE_PATH
-    import sqlite3
+    from database import get_connection
+    import openpyxl
     
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     
     wb = openpyxl.Workbook()
@@ -434,5 +444,5 @@ def generate_custom_export(export_type: str) -> Optional[str]:
         return filepath
         
     except Exception as e:
-        print(f"Export error: {e}")
+        log.error("Export error: %s", e)
         return None
\ No newline at end of file
@@ -3,28 +3,18 @@ import os
 from datetime import datetime
 from typing import List, Dict
 
+from database import append_task_log, get_task_log_version, iter_task_log
+
+TASK_LOG_HEADERS = ["Sana", "Vaqt", "Topshiriq", "Lokatsiya", "Hodimlar", "Pul miqdori", "Holat"]
+
 class ExcelHandler:
-    def __init__(self, file_path: str = "topshiriqlar.xlsx"):
+    def __init__(self, file_path: str = os.path.join("hisobotlar", "topshiriqlar.xlsx")):
         self.file_path = file_path
+        self._exported_version = None
     
     def save_task_to_excel(self, description: str, location, employees_list: List[str], 
                           payment: str, status: str = "⏳ Davom etmoqda"):
-        """Save task to Excel file"""
-        headers = ["Sana", "Vaqt", "Topshiriq", "Lokatsiya", "Hodimlar", "Pul miqdori", "Holat"]
-        
-        now = datetime.now()
-        date_str = now.strftime("%Y-%m-%d")
-        time_str = now.strftime("%H:%M:%S")
-        
-        # Create or load workbook
-        if not os.path.exists(self.file_path):
-            wb = openpyxl.Workbook()
-            sheet = wb.active
-            sheet.append(headers)
-        else:
-            wb = openpyxl.load_workbook(self.file_path)
-            sheet = wb.active
-        
+        """Record a task send in the task log (the spreadsheet is built by export_task_log)"""
         # Format location and employees
         if hasattr(location, 'latitude') and hasattr(location, 'longitude'):
             loc_str = f"{location.latitude}, {location.longitude}"
@@ -33,9 +23,31 @@ class ExcelHandler:
         
         emp_str = ", ".join(employees_list)
         
-        # Add row
-        sheet.append([date_str, time_str, description, loc_str, emp_str, payment, status])
-        wb.save(self.file_path)
+        append_task_log(description, loc_str, emp_str, payment, status)
+    
+    def export_task_log(self) -> str:
+        """Write the whole task log to the spreadsheet in one streaming pass"""
+        version = get_task_log_version()
+        if version == self._exported_version and os.path.exists(self.file_path):
+            return self.file_path
+        
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        
+        # Write-only workbooks stream rows to disk instead of holding them all
+        wb = openpyxl.Workbook(write_only=True)
+        sheet = wb.create_sheet()
+        sheet.append(TASK_LOG_HEADERS)
+        for logged_at, description, location, employees, payment, status in iter_task_log():
+            date_str, _, time_str = logged_at.partition(" ")
+            sheet.append([date_str, time_str, description, location, employees, payment, status])
+        
+        # Replace the old file atomically so readers never see a half-written one
+        tmp_path = self.file_path + ".tmp"
+        wb.save(tmp_path)
+        os.replace(tmp_path, self.file_path)
+        
+        self._exported_version = version
+        return self.file_path
     
     def create_employee_report(self, employee_name: str, tasks: List[Dict]) -> str:
         """Create Excel report for employee"""
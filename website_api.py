@@ -4,24 +4,32 @@ Website Integration API for Customer Inquiries
 Provides API endpoints for website to submit customer requests
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+import hmac
 import json
 import os
-from datetime import datetime
-from database import add_customer_inquiry, init_database
-from config import ADMIN_CHAT_ID
-import telebot
+from datetime import datetime, timezone
+from database import (
+    add_customer_inquiry, init_database, wait_for_inquiry_status, wait_for_inquiry_changes,
+    get_inquiry_status as get_cached_inquiry_status
+)
+from config import ADMIN_CHAT_ID, ADMIN_API_TOKEN, INQUIRY_LONG_POLL_TIMEOUT
 
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "website_api_secret_key")
 
-# Initialize bot for notifications
+# Bot for admin notifications, created on the first inquiry
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "")
-if BOT_TOKEN:
-    bot = telebot.TeleBot(BOT_TOKEN)
-else:
-    bot = None
+_bot = None
+
+def get_bot():
+    """Notification bot, or None without a token"""
+    global _bot
+    if _bot is None and BOT_TOKEN:
+        import telebot
+        _bot = telebot.TeleBot(BOT_TOKEN)
+    return _bot
 
 @app.route('/api/submit_inquiry', methods=['POST'])
 def submit_inquiry():
@@ -69,6 +77,7 @@ def submit_inquiry():
         )
         
         # Send notification to admin
+        bot = get_bot()
         if bot and ADMIN_CHAT_ID:
             try:
                 admin_message = f"""
@@ -105,41 +114,193 @@ def submit_inquiry():
             'error': 'Server xatosi yuz berdi. Iltimos, qayta urinib ko\'ring.'
         }), 500
 
+def _parse_db_timestamp(value):
+    """Parse SQLite CURRENT_TIMESTAMP (UTC) into an aware datetime"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def _inquiry_status_response(status, known_etag=None):
+    """Build a conditional (ETag / Last-Modified) response for inquiry status.
+    
+    known_etag is the client's ETag when it was sent outside If-None-Match (?etag=).
+    """
+    last_modified = _parse_db_timestamp(status['responded_at'] or status['created_at'])
+    
+    if known_etag:
+        not_modified = known_etag == status['etag']
+    elif request.if_none_match:
+        not_modified = request.if_none_match.contains(status['etag'])
+    elif request.if_modified_since and last_modified:
+        not_modified = last_modified <= request.if_modified_since
+    else:
+        not_modified = False
+    
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        response = jsonify({
+            'success': True,
+            'inquiry': {
+                'id': status['id'],
+                'customer_name': status['customer_name'],
+                'status': status['status'],
+                'created_at': status['created_at'],
+                'admin_response': status['admin_response'],
+                'responded_at': status['responded_at']
+            }
+        })
+    
+    response.set_etag(status['etag'])
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/inquiry_status/<int:inquiry_id>', methods=['GET'])
 def get_inquiry_status(inquiry_id):
-    """Get inquiry status by ID"""
+    """Get inquiry status by ID (supports If-None-Match / If-Modified-Since)"""
+    try:
+        status = get_cached_inquiry_status(inquiry_id)
+        
+        if not status:
+            return jsonify({
+                'success': False,
+                'error': 'So\'rov topilmadi'
+            }), 404
+        
+        return _inquiry_status_response(status)
+        
+    except Exception as e:
+        print(f"Status API Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Server xatosi'
+        }), 500
+
+@app.route('/api/inquiry_status/<int:inquiry_id>/wait', methods=['GET'])
+def wait_inquiry_status(inquiry_id):
+    """Long-poll inquiry status until it changes from the client's ETag or timeout passes"""
     try:
-        from database import get_inquiry_by_id
+        known_etag = request.args.get('etag', '').strip('"')
+        if not known_etag and request.if_none_match:
+            known_etag = next(iter(request.if_none_match), None)
         
-        inquiry = get_inquiry_by_id(inquiry_id)
+        try:
+            timeout = float(request.args.get('timeout', INQUIRY_LONG_POLL_TIMEOUT))
+        except ValueError:
+            timeout = INQUIRY_LONG_POLL_TIMEOUT
+        timeout = max(0.0, min(timeout, INQUIRY_LONG_POLL_TIMEOUT))
         
-        if not inquiry:
+        status = wait_for_inquiry_status(inquiry_id, known_etag, timeout)
+        
+        if not status:
             return jsonify({
                 'success': False,
                 'error': 'So\'rov topilmadi'
             }), 404
         
-        inquiry_id, customer_name, customer_phone, customer_username, chat_id, inquiry_text, inquiry_type, location_lat, location_lon, location_address, status, admin_response, created_at, responded_at, source = inquiry
+        return _inquiry_status_response(status, known_etag)
+        
+    except Exception as e:
+        print(f"Status API Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Server xatosi'
+        }), 500
+
+INQUIRY_FIELDS = (
+    'id', 'customer_name', 'customer_phone', 'customer_username', 'chat_id', 'inquiry_text',
+    'inquiry_type', 'location_lat', 'location_lon', 'location_address', 'status',
+    'admin_response', 'created_at', 'responded_at', 'source'
+)
+
+def _inquiry_to_dict(version, inquiry):
+    """Serialize a customer_inquiries row for the admin feed"""
+    data = dict(zip(INQUIRY_FIELDS, inquiry))
+    data['version'] = version
+    return data
+
+def _is_admin_request():
+    """Check the admin API token from the Authorization header or ?token="""
+    if not ADMIN_API_TOKEN:
+        return False
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header[7:] if auth_header.startswith('Bearer ') else request.args.get('token')
+    # Constant-time, so response timing does not leak how much of a guess matched
+    return hmac.compare_digest((token or "").encode(), ADMIN_API_TOKEN.encode())
+
+def _feed_cursor():
+    """Read the feed cursor from Last-Event-ID (SSE reconnect) or ?since="""
+    raw = request.headers.get('Last-Event-ID') or request.args.get('since', '0')
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+@app.route('/api/inquiries/changes', methods=['GET'])
+def inquiry_changes():
+    """Long-poll for inquiries created or updated after the ?since= cursor (admin only)"""
+    if not _is_admin_request():
+        return jsonify({'success': False, 'error': 'Ruxsat yo\'q'}), 403
+    
+    try:
+        since = _feed_cursor()
+        source = request.args.get('source') or None
+        try:
+            timeout = float(request.args.get('timeout', INQUIRY_LONG_POLL_TIMEOUT))
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Noto\'g\'ri parametr'}), 400
+        timeout = max(0.0, min(timeout, INQUIRY_LONG_POLL_TIMEOUT))
+        limit = max(1, min(limit, 500))
+        
+        changes = wait_for_inquiry_changes(since, timeout, source=source, limit=limit)
         
         return jsonify({
             'success': True,
-            'inquiry': {
-                'id': inquiry_id,
-                'customer_name': customer_name,
-                'status': status,
-                'created_at': created_at,
-                'admin_response': admin_response,
-                'responded_at': responded_at
-            }
+            'cursor': changes[-1][0] if changes else since,
+            'inquiries': [_inquiry_to_dict(version, inquiry) for version, inquiry in changes]
         })
         
     except Exception as e:
-        print(f"Status API Error: {e}")
+        print(f"Feed API Error: {e}")
         return jsonify({
             'success': False,
             'error': 'Server xatosi'
         }), 500
 
+@app.route('/api/inquiries/stream', methods=['GET'])
+def inquiry_stream():
+    """Server-sent events stream of new and changed inquiries (admin only)"""
+    if not _is_admin_request():
+        return jsonify({'success': False, 'error': 'Ruxsat yo\'q'}), 403
+    
+    since = _feed_cursor()
+    source = request.args.get('source') or None
+    
+    def generate(cursor):
+        yield "retry: 3000\n\n"
+        while True:
+            changes = wait_for_inquiry_changes(cursor, INQUIRY_LONG_POLL_TIMEOUT, source=source)
+            if not changes:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            
+            for version, inquiry in changes:
+                payload = json.dumps(_inquiry_to_dict(version, inquiry), ensure_ascii=False)
+                yield f"id: {version}\nevent: inquiry\ndata: {payload}\n\n"
+                cursor = version
+    
+    response = Response(stream_with_context(generate(since)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -184,6 +345,27 @@ def home():
     <div class="endpoint">
         <h3><span class="method">GET</span> /api/inquiry_status/{inquiry_id}</h3>
         <p>So'rov holatini tekshirish</p>
+        <p><code>ETag</code> va <code>Last-Modified</code> qaytaradi; <code>If-None-Match</code> yoki
+        <code>If-Modified-Since</code> yuborilsa, o'zgarmagan holat uchun <code>304</code> qaytariladi.</p>
+    </div>
+    
+    <div class="endpoint">
+        <h3><span class="method">GET</span> /api/inquiry_status/{inquiry_id}/wait?timeout=25</h3>
+        <p>Holat o'zgarguncha kutish (long-poll). Oxirgi <code>ETag</code> ni <code>If-None-Match</code>
+        sarlavhasida yoki <code>?etag=</code> parametrida yuboring; vaqt tugasa <code>304</code> qaytadi.</p>
+    </div>
+    
+    <div class="endpoint">
+        <h3><span class="method">GET</span> /api/inquiries/changes?since=0&amp;timeout=25</h3>
+        <p>Admin uchun: <code>since</code> kursoridan keyin yangi yoki o'zgargan so'rovlar (long-poll).
+        Javobdagi <code>cursor</code> ni keyingi so'rovda yuboring.
+        <code>Authorization: Bearer ADMIN_API_TOKEN</code> talab qilinadi.</p>
+    </div>
+    
+    <div class="endpoint">
+        <h3><span class="method">GET</span> /api/inquiries/stream?token=ADMIN_API_TOKEN</h3>
+        <p>Admin uchun: yangi va o'zgargan so'rovlar oqimi (Server-Sent Events).
+        Qayta ulanishda <code>Last-Event-ID</code> kursor sifatida ishlatiladi.</p>
     </div>
     
     <div class="endpoint">